@@ -0,0 +1,42 @@
+# coding=utf-8
+
+"""
+ArrayManager.update_bar 的耗时不应该随 size 变大而增加
+"""
+
+import time
+from datetime import datetime, timedelta
+
+from tumbler.object import BarData
+from tumbler.function.bar import ArrayManager
+
+
+def run(n=200000, sizes=(100, 1000, 5000, 20000)):
+    bar = BarData()
+    bar.symbol = "btc_usdt"
+    bar.exchange = "BINANCE"
+    bar.open_price = bar.high_price = bar.low_price = bar.close_price = 10000.0
+    bar.volume = 1.0
+    start_dt = datetime(2020, 1, 1)
+
+    for size in sizes:
+        am = ArrayManager(size)
+        start = time.time()
+        for i in range(n):
+            bar.datetime = start_dt + timedelta(minutes=i)
+            am.update_bar(bar)
+        cost = time.time() - start
+        print("size:{} update_bar avg:{:.3f} us".format(size, cost * 1e6 / n))
+
+        start = time.time()
+        for i in range(10000):
+            am.update_bar(bar)
+            am.ma(20)
+            am.ma(20)
+            am.atr(14)
+        cost = time.time() - start
+        print("size:{} update_bar + 2*ma + atr avg:{:.3f} us".format(size, cost * 1e6 / 10000))
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,149 @@
+# coding=utf-8
+
+"""
+tick 模式回测撮合模型对比: InstantFillModel (原来的穿价即全部成交) 与 QueueFillModel (排队位置 + 盘口深度 + 逐笔成交, 可部分成交)
+随机生成带 5 档深度的 tick 和逐笔成交, 做市策略一直在买一/卖一挂单, 价格变了就撤单重挂
+打印两种模型的成交笔数, 成交量, 部分成交次数和每个 tick 的耗时
+"""
+
+import time
+import random
+from datetime import datetime, timedelta
+
+from tumbler.constant import Exchange, Direction, Offset, Status
+from tumbler.object import TickData, MarketTradeData
+from tumbler.apps.backtester.backtesting import BacktestingEngine, BacktestingMode
+from tumbler.apps.backtester.fill_model import InstantFillModel, QueueFillModel
+
+SYMBOL = "btc_usdt"
+VT_SYMBOL = SYMBOL + "." + Exchange.BINANCE.value
+DEPTH = 5
+
+
+class QuoteStrategy(object):
+    def __init__(self, engine, strategy_name, setting):
+        self.engine = engine
+        self.strategy_name = strategy_name
+        self.volume = setting.get("volume", 1)
+        self.inited = False
+        self.trading = False
+
+        self.bid_order_id = None
+        self.ask_order_id = None
+        self.bid_price = 0
+        self.ask_price = 0
+        self.pos = 0
+        self.n_trade = 0
+        self.n_part = 0
+        self.traded_volume = 0
+
+    def on_init(self):
+        pass
+
+    def on_start(self):
+        pass
+
+    def quote(self, order_id, price, direction):
+        if order_id:
+            self.engine.cancel_order(self, order_id)
+        return self.engine.send_order(self, SYMBOL, Exchange.BINANCE.value, direction, Offset.OPEN.value,
+                                      price, self.volume)[0][0]
+
+    def on_tick(self, tick):
+        if tick.bid_prices[0] != self.bid_price or not self.bid_order_id:
+            self.bid_price = tick.bid_prices[0]
+            self.bid_order_id = self.quote(self.bid_order_id, self.bid_price, Direction.LONG.value)
+        if tick.ask_prices[0] != self.ask_price or not self.ask_order_id:
+            self.ask_price = tick.ask_prices[0]
+            self.ask_order_id = self.quote(self.ask_order_id, self.ask_price, Direction.SHORT.value)
+
+    def on_order(self, order):
+        if order.status == Status.PARTTRADED.value:
+            self.n_part += 1
+        if not order.is_active():
+            if order.vt_order_id == self.bid_order_id:
+                self.bid_order_id = None
+            elif order.vt_order_id == self.ask_order_id:
+                self.ask_order_id = None
+
+    def on_trade(self, trade):
+        self.n_trade += 1
+        self.traded_volume += trade.volume
+        if trade.direction == Direction.LONG.value:
+            self.pos += trade.volume
+        else:
+            self.pos -= trade.volume
+
+    def on_stop_order(self, stop_order):
+        pass
+
+
+def make_data(n, price_tick=0.5, seed=5):
+    rs = random.Random(seed)
+    start = datetime(2021, 1, 1)
+    bid = 10000.0
+    volumes = {}  # price: 挂单量, 每个价位的量在前后 tick 之间连续变化
+    ticks = []
+    market_trades = []
+    for i in range(n):
+        dt = start + timedelta(milliseconds=100 * i)
+        bid = bid + rs.choice((-price_tick, 0, 0, 0, 0, 0, price_tick))
+
+        tick = TickData()
+        tick.symbol = SYMBOL
+        tick.exchange = Exchange.BINANCE.value
+        tick.vt_symbol = VT_SYMBOL
+        tick.datetime = dt
+        tick.last_price = bid
+        for j in range(DEPTH):
+            tick.bid_prices[j] = bid - j * price_tick
+            tick.ask_prices[j] = bid + (j + 1) * price_tick
+            for price in (tick.bid_prices[j], tick.ask_prices[j]):
+                volumes[price] = max(1.0, volumes.get(price, float(rs.randint(5, 30))) + rs.randint(-2, 2))
+            tick.bid_volumes[j] = volumes[tick.bid_prices[j]]
+            tick.ask_volumes[j] = volumes[tick.ask_prices[j]]
+        ticks.append(tick)
+
+        # 两个 tick 之间的逐笔成交, 主动卖打在买一, 主动买打在卖一
+        ts = dt.timestamp() * 1000
+        arr = []
+        for k in range(rs.randint(0, 3)):
+            if rs.random() < 0.5:
+                arr.append((bid, float(rs.randint(1, 10)), Direction.SHORT.value, str(ts - 50 + k)))
+            else:
+                arr.append((bid + price_tick, float(rs.randint(1, 10)), Direction.LONG.value, str(ts - 50 + k)))
+        if arr:
+            market_trade = MarketTradeData()
+            market_trade.symbol = SYMBOL
+            market_trade.exchange = Exchange.BINANCE.value
+            market_trade.vt_symbol = VT_SYMBOL
+            market_trade.info_arr = arr
+            market_trades.append(market_trade)
+    return ticks, market_trades
+
+
+def run_once(fill_model, ticks, market_trades):
+    engine = BacktestingEngine()
+    engine.set_parameters(VT_SYMBOL, "1m", ticks[0].datetime, rate=0, slippage=0, size=1, price_tick=0.5,
+                          end=ticks[-1].datetime, mode=BacktestingMode.TICK.value)
+    engine.set_fill_model(fill_model, market_trades)
+    engine.add_strategy(QuoteStrategy, {"volume": 5})
+    engine.history_data = ticks
+    engine.output = lambda msg: None
+
+    start = time.time()
+    engine.run_backtesting()
+    return time.time() - start, engine.strategy
+
+
+def run(n=200000):
+    ticks, market_trades = make_data(n)
+    for fill_model in (InstantFillModel(), QueueFillModel(depth=DEPTH)):
+        cost, strategy = run_once(fill_model, ticks, market_trades)
+        print("[{}] ticks:{} trades:{} traded volume:{} part traded:{} pos:{} cost:{:.2f}s per tick:{:.1f}us".format(
+            fill_model.__class__.__name__, n, strategy.n_trade, strategy.traded_volume, strategy.n_part,
+            strategy.pos, cost, cost * 1e6 / n))
+
+
+if __name__ == "__main__":
+    run()
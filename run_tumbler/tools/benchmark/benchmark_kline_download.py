@@ -0,0 +1,143 @@
+# coding=utf-8
+
+"""
+顺序下载 (DataClient.get_kline + 每个 symbol 写一次库) 与 KlineDownloader (并发分页 + 流水线批量写库) 对比
+本地起一个仿 binance /api/v3/klines 的桩服务, 每个请求固定延迟 delay 秒; 写库用 sleep 模拟
+最后模拟中途失败, 检查 resume 只补下断点之后的数据
+"""
+
+import json
+import time
+import random
+from datetime import datetime, timedelta
+from threading import Thread, Lock
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tumbler.constant import Interval
+from tumbler.data.binance_data import BinanceClient
+from tumbler.data.download.kline_downloader import KlineDownloader, KlineCheckpoint
+
+MINUTE_MS = 60 * 1000
+
+
+class FakeKlineHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    delay = 0.05
+    fail_rate = 0.0
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        start = int(query["startTime"][0])
+        end = int(query["endTime"][0])
+        limit = int(query.get("limit", ["1000"])[0])
+        time.sleep(self.delay)
+
+        if random.random() < self.fail_rate:
+            data = {"code": -1003, "msg": "Too many requests"}
+        else:
+            first = (start + MINUTE_MS - 1) // MINUTE_MS * MINUTE_MS
+            data = []
+            for t in range(first, end + 1, MINUTE_MS):
+                if len(data) >= limit:
+                    break
+                price = str(10000 + (t // MINUTE_MS) % 100)
+                data.append([t, price, price, price, price, "1.0", t + MINUTE_MS - 1])
+
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeKlineServer(ThreadingHTTPServer):
+    request_queue_size = 256
+    daemon_threads = True
+
+
+def start_fake_server(delay=0.05):
+    FakeKlineHandler.delay = delay
+    server = FakeKlineServer(("127.0.0.1", 0), FakeKlineHandler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class FakeSaver(object):
+    """
+    模拟数据库批量写入: 每次固定开销 + 每根K线的开销, 记录写入的 (symbol, datetime) 去重后数量
+    """
+
+    def __init__(self, call_cost=0.02, bar_cost=0.00001):
+        self.call_cost = call_cost
+        self.bar_cost = bar_cost
+        self.keys = set()
+        self.calls = 0
+        self.lock = Lock()
+
+    def __call__(self, bars, symbol, period):
+        time.sleep(self.call_cost + self.bar_cost * len(bars))
+        with self.lock:
+            self.calls += 1
+            for bar in bars:
+                self.keys.add((bar.symbol, bar.datetime))
+
+
+def run_sequential(client, symbols, start_dt, end_dt):
+    saver = FakeSaver()
+    start = time.time()
+    for symbol in symbols:
+        bars = client.get_kline(symbol, Interval.MINUTE.value, start_dt, end_dt)
+        saver(bars, symbol, Interval.MINUTE.value)
+    return time.time() - start, saver
+
+
+def run_downloader(client, symbols, start_dt, end_dt, checkpoint, max_workers=16, resume=True):
+    saver = FakeSaver()
+    downloader = KlineDownloader(client, saver, max_workers=max_workers, rate=1000, checkpoint=checkpoint)
+    start = time.time()
+    downloader.download(symbols, Interval.MINUTE.value, start_dt, end_dt, resume=resume)
+    return time.time() - start, saver, downloader
+
+
+def run(n_symbols=8, days=5, delay=0.2):
+    server = start_fake_server(delay)
+    client = BinanceClient(url_base="http://127.0.0.1:{}".format(server.server_address[1]))
+
+    symbols = ["coin{}_usdt".format(i) for i in range(n_symbols)]
+    end_dt = datetime(2021, 1, 1)
+    start_dt = end_dt - timedelta(days=days)
+    expect = n_symbols * (days * 1440 + 1)
+
+    cost, saver = run_sequential(client, symbols, start_dt, end_dt)
+    print("[sequential] bars:{}/{} cost:{:.3f}s".format(len(saver.keys), expect, cost))
+
+    checkpoint = KlineCheckpoint("benchmark_kline_download_checkpoint.json")
+    for symbol in symbols:
+        checkpoint.clear(client.get_exchange(), symbol, Interval.MINUTE.value)
+
+    cost, saver, downloader = run_downloader(client, symbols, start_dt, end_dt, checkpoint, resume=False)
+    print("[KlineDownloader] bars:{}/{} requests:{} save calls:{} cost:{:.3f}s".format(
+        len(saver.keys), expect, downloader.request_count, saver.calls, cost))
+
+    # 中途失败后续传
+    for symbol in symbols:
+        checkpoint.clear(client.get_exchange(), symbol, Interval.MINUTE.value)
+    random.seed(1)
+    FakeKlineHandler.fail_rate = 0.2
+    cost, saver1, downloader = run_downloader(client, symbols, start_dt, end_dt, checkpoint)
+    FakeKlineHandler.fail_rate = 0.0
+    cost, saver2, downloader2 = run_downloader(client, symbols, start_dt, end_dt, checkpoint)
+    print("[resume] first run bars:{} errors:{}, resume run requests:{} bars:{}, total distinct bars:{}/{}".format(
+        len(saver1.keys), downloader.error_count, downloader2.request_count, len(saver2.keys),
+        len(saver1.keys | saver2.keys), expect))
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    run()
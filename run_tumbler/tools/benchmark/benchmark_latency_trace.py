@@ -0,0 +1,124 @@
+# coding=utf-8
+
+"""
+行情到下单延迟追踪的演示和开销测试, 不连交易所
+喂行情的线程模拟 WebsocketClient._run (mark_recv + gateway.on_ws_tick), 经过 EventEngine 和 CtaEngine 推给策略,
+策略每 order_every 个 tick 通过 MainEngine.send_order 下一单, 网关 send_order 模拟 REST 客户端同步部分的耗时
+分别在关闭/开启 latency_trace 时跑一遍, 对比吞吐, 并打印各阶段的 p50/p99/max
+"""
+
+import time
+from threading import Event as ThreadEvent
+
+from tumbler.constant import Exchange, Direction, OrderType, Offset
+from tumbler.engine import MainEngine
+from tumbler.event import EventEngine
+from tumbler.gate import BaseGateway
+from tumbler.object import TickData, OrderRequest
+from tumbler.apps.cta_strategy.engine import CtaEngine
+from tumbler.service.latency_trace_service import latency_trace_manager
+
+VT_SYMBOL = "btc_usdt." + Exchange.BINANCE.value
+
+
+class FakeGateway(BaseGateway):
+    def __init__(self, event_engine, send_cost=0.0002):
+        super(FakeGateway, self).__init__(event_engine, Exchange.BINANCE.value)
+        self.send_cost = send_cost
+        self.order_count = 0
+
+    def send_order(self, req):
+        # 模拟签名和把请求交给 REST 客户端的同步耗时
+        end = time.perf_counter() + self.send_cost
+        while time.perf_counter() < end:
+            pass
+        self.order_count += 1
+        return "{}.{}".format(self.order_count, self.gateway_name)
+
+
+class FakeStrategy(object):
+    def __init__(self, main_engine, strategy_name, n, order_every=10, work=0.00005):
+        self.main_engine = main_engine
+        self.strategy_name = strategy_name
+        self.inited = True
+        self.n = n
+        self.order_every = order_every
+        self.work = work
+        self.tick_count = 0
+        self.done = ThreadEvent()
+
+    def on_tick(self, tick):
+        end = time.perf_counter() + self.work
+        while time.perf_counter() < end:
+            pass
+
+        self.tick_count += 1
+        if self.tick_count % self.order_every == 0:
+            req = OrderRequest()
+            req.symbol = tick.symbol
+            req.exchange = tick.exchange
+            req.vt_symbol = tick.vt_symbol
+            req.price = tick.bid_prices[0]
+            req.volume = 1
+            req.type = OrderType.LIMIT.value
+            req.direction = Direction.LONG.value
+            req.offset = Offset.OPEN.value
+            self.main_engine.send_order(req, tick.exchange)
+        if self.tick_count >= self.n:
+            self.done.set()
+
+
+def run_once(n, enabled):
+    latency_trace_manager.enable(enabled)
+    latency_trace_manager.get_report(reset=True)
+
+    event_engine = EventEngine()
+    main_engine = MainEngine(event_engine)
+    gateway = FakeGateway(event_engine)
+    main_engine.gateways[gateway.gateway_name] = gateway
+
+    cta_engine = CtaEngine(main_engine, event_engine)
+    cta_engine.register_event()
+    strategy = FakeStrategy(main_engine, "bench_strategy", n)
+    cta_engine.symbol_strategy_map[VT_SYMBOL].append(strategy)
+
+    tick = TickData()
+    tick.symbol = "btc_usdt"
+    tick.exchange = Exchange.BINANCE.value
+    tick.vt_symbol = VT_SYMBOL
+    tick.gateway_name = gateway.gateway_name
+
+    start = time.time()
+    for i in range(n):
+        if latency_trace_manager.enabled:
+            latency_trace_manager.mark_recv()
+        tick.bid_prices[0] = 10000 + i % 100
+        gateway.on_ws_tick(tick)
+        if i % 50 == 0:
+            # 行情是一批一批到的
+            time.sleep(0.0005)
+    strategy.done.wait(60)
+    cost = time.time() - start
+
+    event_engine.stop()
+    return cost, gateway.order_count, latency_trace_manager.get_report()
+
+
+def run(n=20000):
+    # 最后统一取报告, 中途不要被定时器清空
+    latency_trace_manager.report_interval = 3600
+    cost, orders, report = run_once(n, False)
+    print("[latency_trace off] ticks:{} orders:{} cost:{:.3f}s".format(n, orders, cost))
+
+    cost, orders, report = run_once(n, True)
+    print("[latency_trace on] ticks:{} orders:{} cost:{:.3f}s".format(n, orders, cost))
+    for key, stat in sorted(report["stats"].items()):
+        print("{:<45} count:{:>6} avg:{:>8.3f}ms p50:{:>6}ms p99:{:>6}ms max:{:>8.3f}ms".format(
+            key, stat["count"], stat["avg"], stat["p50"], stat["p99"], stat["max"]))
+
+    latency_trace_manager.dump(report)
+    print("dump to {}".format(latency_trace_manager.filename))
+
+
+if __name__ == "__main__":
+    run()
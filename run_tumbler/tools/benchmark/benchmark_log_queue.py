@@ -0,0 +1,94 @@
+# coding=utf-8
+
+"""
+策略 write_log 在交易线程上的耗时: 同步 FilePrint 与队列模式 (log.queue = True) 对比
+磁盘抖动用 stream.write 每 stall_every 次 sleep stall 秒模拟
+最后用很小的队列演示 drop 策略和 dropped 计数
+"""
+
+import time
+import logging
+from datetime import datetime
+
+from tumbler.function import FilePrint
+from tumbler.function.latency import LatencyHistogram
+from tumbler.function.log_queue import LogQueue, enable_log_queue, BatchTimedRotatingFileHandler
+
+# 毫秒
+BUCKETS = (0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.5, 1, 5, 10, 50)
+
+
+class SlowStream(object):
+    def __init__(self, stream, stall=0.02, stall_every=500):
+        self.stream = stream
+        self.stall = stall
+        self.stall_every = stall_every
+        self.count = 0
+
+    def write(self, s):
+        self.count += 1
+        if self.count % self.stall_every == 0:
+            time.sleep(self.stall)
+        return self.stream.write(s)
+
+    def flush(self):
+        self.stream.flush()
+
+    def close(self):
+        self.stream.close()
+
+
+def strategy_write_log(file_print, msg):
+    # 和 CtaTemplate.write_log 相同的写法
+    file_print.write('{:%Y-%m-%d %H:%M:%S}:[{}]:{}', args=(datetime.now(), "bench_strategy", msg))
+
+
+def run_file_print(file_print, n):
+    file_print.file_handler.stream = SlowStream(file_print.file_handler.stream)
+    hist = LatencyHistogram(BUCKETS)
+    start = time.time()
+    for i in range(n):
+        t = time.perf_counter()
+        strategy_write_log(file_print, "on_merge_tick bid:{} ask:{} pos:{}".format(100 + i, 101 + i, i % 7))
+        hist.add((time.perf_counter() - t) * 1000)
+    cost = time.time() - start
+    return cost, hist.get_stat()
+
+
+def print_stat(name, cost, stat):
+    print("[{}] calls:{} cost:{:.3f}s avg:{:.4f}ms p50:{}ms p99:{}ms max:{:.3f}ms".format(
+        name, stat["count"], cost, stat["avg"], stat["p50"], stat["p99"], stat["max"]))
+
+
+def run(n=20000):
+    sync_print = FilePrint("bench_sync.log", "benchmark_log", mode="w")
+    print_stat("sync FilePrint", *run_file_print(sync_print, n))
+    sync_print.close()
+
+    log_queue = enable_log_queue(max_size=100000, batch_size=500)
+    queue_print = FilePrint("bench_queue.log", "benchmark_log", mode="w")
+    cost, stat = run_file_print(queue_print, n)
+    print_stat("queued FilePrint", cost, stat)
+    start = time.time()
+    queue_print.close()
+    print("[queued FilePrint] drain:{:.3f}s stat:{}".format(time.time() - start, log_queue.get_stat()))
+
+    # 队列很小且磁盘很慢时丢弃多余日志, 调用方不受影响
+    small_queue = LogQueue(max_size=1000, batch_size=100)
+    logger = logging.getLogger("benchmark_log_drop")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    handler = BatchTimedRotatingFileHandler(filename=queue_print.folder_path + "/bench_drop.log", when="H")
+    handler.stream = SlowStream(handler.stream, stall=0.01, stall_every=50)
+    logger.addHandler(handler)
+    start = time.time()
+    for i in range(n):
+        small_queue.put(logger, logging.INFO, "tick {}", (i,))
+    cost = time.time() - start
+    small_queue.flush()
+    print("[drop policy] calls:{} cost:{:.3f}s stat:{}".format(n, cost, small_queue.get_stat()))
+    handler.close()
+
+
+if __name__ == "__main__":
+    run()
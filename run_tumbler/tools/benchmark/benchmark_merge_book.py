@@ -0,0 +1,97 @@
+# coding=utf-8
+
+"""
+合并盘口耗时对比: 原来每秒把所有档位放到一个列表全量排序, MergeDepthBook 做 k 路堆归并只取前 MAX_PRICE_NUM 档,
+并且只重新合并有变化的 symbol
+"""
+
+import time
+import random
+from datetime import datetime
+
+from tumbler.constant import MAX_PRICE_NUM
+from tumbler.object import TickData
+from tumbler.aggregation.merge_book import MergeDepthBook
+
+
+def make_tick(symbol, exchange, mid):
+    tick = TickData()
+    tick.symbol = symbol
+    tick.exchange = exchange
+    tick.datetime = datetime.now()
+    for i in range(MAX_PRICE_NUM):
+        tick.bid_prices[i] = round(mid - 0.5 - i * random.uniform(0.5, 1.5), 1)
+        tick.ask_prices[i] = round(mid + 0.5 + i * random.uniform(0.5, 1.5), 1)
+        tick.bid_volumes[i] = round(random.uniform(0.1, 10), 3)
+        tick.ask_volumes[i] = round(random.uniform(0.1, 10), 3)
+    tick.bid_prices.sort(reverse=True)
+    tick.ask_prices.sort()
+    return tick
+
+
+def sort_merge(ticks):
+    to_sort_bids_arr = []
+    to_sort_asks_arr = []
+    for vt in ticks:
+        if vt.bid_prices[0] > 0:
+            for i in range(len(vt.bid_prices)):
+                if vt.bid_prices[i] > 0:
+                    to_sort_bids_arr.append((vt.bid_prices[i], vt.bid_volumes[i], vt.exchange))
+                if vt.ask_prices[i] > 0:
+                    to_sort_asks_arr.append((vt.ask_prices[i], vt.ask_volumes[i], vt.exchange))
+    to_sort_bids_arr.sort(reverse=True)
+    to_sort_asks_arr.sort(reverse=False)
+    return to_sort_bids_arr[:MAX_PRICE_NUM], to_sort_asks_arr[:MAX_PRICE_NUM]
+
+
+def run(n_symbols=20, n_exchanges=8, rounds=200, change_ratio=0.3):
+    symbols = ["coin{}_usdt".format(i) for i in range(n_symbols)]
+    exchanges = ["EXCHANGE{}".format(i) for i in range(n_exchanges)]
+    ticks = {symbol: {exchange: make_tick(symbol, exchange, 10000.0) for exchange in exchanges}
+             for symbol in symbols}
+
+    book = MergeDepthBook()
+    for symbol in symbols:
+        book.add_symbol(symbol)
+        for tick in ticks[symbol].values():
+            book.update_tick(tick)
+
+    for symbol in symbols:
+        bids, asks = sort_merge(ticks[symbol].values())
+        merge_tick = book.merge(symbol)
+        assert merge_tick.bids == bids and merge_tick.asks == asks
+
+    start = time.time()
+    for r in range(rounds):
+        for symbol in symbols:
+            sort_merge(ticks[symbol].values())
+    sort_cost = time.time() - start
+
+    start = time.time()
+    for r in range(rounds):
+        for symbol in symbols:
+            book.merge(symbol)
+    heap_cost = time.time() - start
+
+    # 每轮只有一部分 symbol 的行情有变化
+    changed = symbols[:max(1, int(n_symbols * change_ratio))]
+    start = time.time()
+    for r in range(rounds):
+        for symbol in changed:
+            book.update_tick(ticks[symbol][exchanges[r % n_exchanges]])
+        for symbol in symbols:
+            if book.is_dirty(symbol):
+                book.merge(symbol)
+            else:
+                book.get_merge_tick(symbol)
+    dirty_cost = time.time() - start
+
+    print("symbols:{} exchanges:{} rounds:{}".format(n_symbols, n_exchanges, rounds))
+    print("full sort:          {:.3f} ms/round".format(sort_cost * 1000.0 / rounds))
+    print("heap merge:         {:.3f} ms/round".format(heap_cost * 1000.0 / rounds))
+    print("heap merge + dirty: {:.3f} ms/round (change ratio:{}, incl. update_tick)".format(
+        dirty_cost * 1000.0 / rounds, change_ratio))
+
+
+if __name__ == "__main__":
+    run()
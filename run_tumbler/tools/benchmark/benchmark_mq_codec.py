@@ -0,0 +1,116 @@
+# coding=utf-8
+
+"""
+MQMsg 编解码吞吐对比: json vs binary
+每种消息类型分别统计 encode / decode 每秒条数和消息字节数
+"""
+
+import time
+from datetime import datetime
+
+from tumbler.constant import MQCodecType, Direction, Offset, Status, OrderType
+from tumbler.object import TickData, MergeTickData, BBOTickData, OrderData, TradeData
+from tumbler.function.mq_codec import mq_codec_manager
+
+
+def make_tick():
+    tick = TickData()
+    tick.symbol = "btc_usdt"
+    tick.exchange = "HUOBI"
+    tick.vt_symbol = "btc_usdt.HUOBI"
+    tick.name = "btc/usdt"
+    tick.gateway_name = "HUOBI"
+    tick.last_price = 10000.5
+    tick.volume = 12345.6
+    tick.datetime = datetime.now()
+    tick.compute_date_and_time()
+    for i in range(len(tick.bid_prices)):
+        tick.bid_prices[i] = 10000.0 - i
+        tick.ask_prices[i] = 10001.0 + i
+        tick.bid_volumes[i] = 1.5 + i
+        tick.ask_volumes[i] = 2.5 + i
+    return tick
+
+
+def make_merge_tick():
+    merge_tick = MergeTickData()
+    merge_tick.symbol = "btc_usdt"
+    merge_tick.vt_symbol = "btc_usdt.AGGREGATION"
+    merge_tick.bids = [(10000.0 - i, 1.5 + i, "HUOBI") for i in range(len(merge_tick.bids))]
+    merge_tick.asks = [(10001.0 + i, 2.5 + i, "BINANCE") for i in range(len(merge_tick.asks))]
+    merge_tick.datetime = datetime.now()
+    return merge_tick
+
+
+def make_bbo_tick():
+    bbo_tick = BBOTickData()
+    bbo_tick.exchange = "HUOBI"
+    for i in range(50):
+        bbo_tick.symbol_dic["coin{}_usdt".format(i)] = {"bid": [100.0 + i, 1.0], "ask": [101.0 + i, 2.0], "vol": 10}
+    bbo_tick.datetime = datetime.now()
+    return bbo_tick
+
+
+def make_order():
+    order = OrderData()
+    order.symbol = "btc_usdt"
+    order.exchange = "HUOBI"
+    order.vt_symbol = "btc_usdt.HUOBI"
+    order.order_id = "HUOBI_1_123456"
+    order.vt_order_id = "HUOBI.HUOBI_1_123456"
+    order.direction = Direction.LONG.value
+    order.type = OrderType.LIMIT.value
+    order.offset = Offset.OPEN.value
+    order.price = 10000.5
+    order.volume = 0.5
+    order.status = Status.NOTTRADED.value
+    order.order_time = "12:00:00"
+    order.gateway_name = "HUOBI"
+    return order
+
+
+def make_trade():
+    trade = TradeData()
+    trade.symbol = "btc_usdt"
+    trade.exchange = "HUOBI"
+    trade.vt_symbol = "btc_usdt.HUOBI"
+    trade.trade_id = "987654"
+    trade.vt_trade_id = "HUOBI.987654"
+    trade.order_id = "HUOBI_1_123456"
+    trade.vt_order_id = "HUOBI.HUOBI_1_123456"
+    trade.direction = Direction.LONG.value
+    trade.offset = Offset.OPEN.value
+    trade.price = 10000.5
+    trade.volume = 0.5
+    trade.trade_time = "12:00:00"
+    trade.datetime = datetime.now()
+    trade.gateway_name = "HUOBI"
+    return trade
+
+
+def run(n=50000):
+    for name, obj in [("tick", make_tick()), ("merge_tick", make_merge_tick()), ("bbo_tick", make_bbo_tick()),
+                      ("order", make_order()), ("trade", make_trade())]:
+        u_class = obj.__class__
+        for codec in [MQCodecType.JSON.value, MQCodecType.BINARY.value]:
+            mq_codec_manager.set_codec(codec)
+
+            start = time.time()
+            for i in range(n):
+                msg = obj.get_mq_msg()
+            encode_cost = time.time() - start
+
+            start = time.time()
+            for i in range(n):
+                new_obj = u_class()
+                new_obj.get_from_mq_msg(msg)
+            decode_cost = time.time() - start
+
+            print("[{}] {:<6} size:{:>5} encode:{:>8.0f}/s decode:{:>8.0f}/s".format(
+                name, codec, len(msg), n / encode_cost, n / decode_cost))
+
+    mq_codec_manager.set_codec(MQCodecType.JSON.value)
+
+
+if __name__ == "__main__":
+    run()
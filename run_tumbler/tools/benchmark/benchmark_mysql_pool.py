@@ -0,0 +1,58 @@
+# coding=utf-8
+
+"""
+按 symbol 逐个读K线的三种方式对比 (需要 global_config.json 里配置好的 mysql 和已有的 kline_1day 数据)
+1. 每次新建 MySQLdb 连接 (连接池之前每个 MysqlService() 都会新建连接)
+2. 共享连接池, 每个 symbol 一次 get_bars
+3. get_bars_dict 一次查询全部 symbol
+"""
+
+import time
+from datetime import datetime
+
+import MySQLdb
+
+import tumbler.config as config
+from tumbler.constant import Interval
+from tumbler.object import BarData
+from tumbler.service.mysql_service import MysqlService
+
+
+def new_connection():
+    settings = config.SETTINGS
+    return MySQLdb.connect(host=settings["mysql_host"], user=settings["mysql_user"],
+                           passwd=settings["mysql_password"], db=settings["mysql_database"],
+                           port=settings["mysql_port"])
+
+
+def run(n_symbols=200, start_datetime=datetime(2021, 1, 1), end_datetime=datetime(2021, 12, 31)):
+    service = MysqlService.get_mysql_service()
+    print("health:{}".format(service.check_health()))
+    symbols = service.get_mysql_distinct_symbol(MysqlService.get_kline_table(Interval.DAY.value))[:n_symbols]
+
+    start = time.time()
+    n = 0
+    for symbol in symbols:
+        sqll, args = service.get_bars_sql("*", [symbol], Interval.DAY.value, start_datetime, end_datetime, "symbol")
+        conn = new_connection()
+        cur = conn.cursor()
+        cur.execute(sqll, args)
+        n += len([BarData.init_from_mysql_db(arr) for arr in cur.fetchall()])
+        cur.close()
+        conn.close()
+    print("[new connection per symbol] symbols:{} bars:{} cost:{:.3f}s".format(len(symbols), n, time.time() - start))
+
+    start = time.time()
+    n = 0
+    for symbol in symbols:
+        n += len(service.get_bars([symbol], Interval.DAY.value, start_datetime, end_datetime))
+    print("[pooled get_bars per symbol] symbols:{} bars:{} cost:{:.3f}s".format(len(symbols), n, time.time() - start))
+
+    start = time.time()
+    bars_dict = service.get_bars_dict(symbols, Interval.DAY.value, start_datetime, end_datetime)
+    n = sum([len(bars) for bars in bars_dict.values()])
+    print("[get_bars_dict] symbols:{} bars:{} cost:{:.3f}s".format(len(symbols), n, time.time() - start))
+
+
+if __name__ == "__main__":
+    run()
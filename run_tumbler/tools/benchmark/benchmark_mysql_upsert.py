@@ -0,0 +1,106 @@
+# coding=utf-8
+
+"""
+因子宽表写入 mysql: 旧的 按列 x 按 symbol, delete datetime in (...) + insert
+与 MysqlService.replace_factor_from_pd (参数化 insert ... on duplicate key update 一次流式写入) 对比
+需要 global_config.json 里配置好的 mysql, 在 tumbler 库里建两张临时表, 结束后删除
+"""
+
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from tumbler.object import FactorData
+from tumbler.service.mysql_service import MysqlService, FACTOR_COLUMNS
+
+LEGACY_TABLE = "`tumbler`.`bench_factor_legacy`"
+UPSERT_TABLE = "`tumbler`.`bench_factor_upsert`"
+
+CREATE_SQL = """CREATE TABLE IF NOT EXISTS {} (
+  `factor_code` varchar(50) NOT NULL,
+  `symbol` varchar(45) NOT NULL,
+  `datetime` varchar(20) NOT NULL,
+  `val` double(50,30) NOT NULL,
+  UNIQUE KEY `unique_factor` (`factor_code`,`symbol`,`datetime`)
+) ENGINE=InnoDB DEFAULT CHARSET=latin1"""
+
+
+def make_factor_df(n_symbols=100, n_days=365, n_factors=20):
+    days = [datetime(2021, 1, 1) + timedelta(days=i) for i in range(n_days)]
+    symbols = ["coin{}_usdt".format(i) for i in range(n_symbols)]
+    df = pd.DataFrame({
+        "symbol": np.repeat(symbols, n_days),
+        "datetime": days * n_symbols
+    })
+    for i in range(n_factors):
+        df["factor_{}".format(i)] = np.random.randn(len(df.index))
+    return df
+
+
+def execute(service, sqll):
+    conn = service.get_conn()
+    cur = conn.cursor()
+    cur.execute(sqll)
+    conn.commit()
+    cur.close()
+    conn.close()
+
+
+def legacy_replace_factor(service, ret, symbol, factor_code):
+    conn = service.get_conn()
+    cur = conn.cursor()
+    ii = 0
+    while ii < len(ret):
+        tmp_rets = ret[ii: ii + service.max_update_nums]
+        ii = ii + service.max_update_nums
+        all_datetime_strs = ["'" + x[2] + "'" for x in tmp_rets]
+        cur.execute("delete from {} where datetime in ({}) and symbol='{}' and factor_code='{}'".format(
+            LEGACY_TABLE, ','.join(all_datetime_strs), symbol, factor_code))
+        cur.executemany("insert into {}(factor_code,symbol,datetime,val) values(%s,%s,%s,%s)".format(LEGACY_TABLE),
+                        tmp_rets)
+        conn.commit()
+    cur.close()
+    conn.close()
+
+
+def legacy_replace_factor_from_pd(service, df):
+    df = df.set_index(["symbol", "datetime"])
+    for col in df.columns:
+        series = df[col].dropna()
+        ret = FactorData.get_data_from_series(col, series)
+        diff_dic = FactorData.get_diff_symbol_from_ret(ret)
+        for symbol in list(diff_dic.keys()):
+            legacy_replace_factor(service, diff_dic[symbol], symbol, col)
+
+
+def run():
+    service = MysqlService.get_mysql_service()
+    df = make_factor_df()
+    n = len(df.index) * (len(df.columns) - 2)
+
+    for table in [LEGACY_TABLE, UPSERT_TABLE]:
+        execute(service, CREATE_SQL.format(table))
+        execute(service, "truncate table {}".format(table))
+
+    try:
+        for i in range(2):
+            # 第二轮是覆盖已有数据
+            start = time.time()
+            legacy_replace_factor_from_pd(service, df)
+            cost = time.time() - start
+            print("[legacy] round:{} rows:{} cost:{:.2f}s rows/sec:{:.0f}".format(i, n, cost, n / cost))
+
+            start = time.time()
+            service.upsert_rows(UPSERT_TABLE, FACTOR_COLUMNS, MysqlService.iter_factor_rows_from_pd(df),
+                                update_columns=["val"])
+            cost = time.time() - start
+            print("[upsert] round:{} rows:{} cost:{:.2f}s rows/sec:{:.0f}".format(i, n, cost, n / cost))
+    finally:
+        for table in [LEGACY_TABLE, UPSERT_TABLE]:
+            execute(service, "drop table if exists {}".format(table))
+
+
+if __name__ == "__main__":
+    run()
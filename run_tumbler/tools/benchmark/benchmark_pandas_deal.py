@@ -0,0 +1,58 @@
+# coding=utf-8
+
+"""
+PandasDeal 每根bar耗时对比:
+全量模式每根bar都对所有历史重算, 增量模式只算最近 max_lookback 根,
+跑 100k 根bar后增量模式的单根耗时应该保持不变
+"""
+
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from tumbler.constant import Interval
+from tumbler.object import BarData
+from tumbler.function.bar import PandasDeal
+from tumbler.function.technique import PD_Technique
+
+
+def func(df):
+    return PD_Technique.ema_strategy(df, 5, 20, name="pos")
+
+
+def make_bars(n, start=datetime(2020, 1, 1)):
+    close = 10000 + np.cumsum(np.random.randn(n))
+    bars = []
+    for i in range(n):
+        bar = BarData()
+        bar.symbol = "btc_usdt"
+        bar.exchange = "BINANCE"
+        bar.vt_symbol = "btc_usdt.BINANCE"
+        bar.datetime = start + timedelta(minutes=i)
+        bar.open_price = bar.high_price = bar.low_price = bar.close_price = float(close[i])
+        bar.volume = 1.0
+        bars.append(bar)
+    return bars
+
+
+def run(total_bars=100000, init_bars=500, max_lookback=300, report_step=10000, full_mode_bars=5000):
+    bars = make_bars(total_bars + init_bars)
+    for lookback, n in [(max_lookback, total_bars), (0, full_mode_bars)]:
+        pandas_deal = PandasDeal(func, 1, Interval.MINUTE.value, max_lookback=lookback)
+        pandas_deal.init_array = [bar.get_dict() for bar in bars[:init_bars]]
+        pandas_deal.on_init()
+
+        mode = "incremental" if lookback else "full"
+        step = min(report_step, n)
+        start = time.time()
+        for i, bar in enumerate(bars[init_bars:init_bars + n], 1):
+            pandas_deal.on_window_bar(bar)
+            if i % step == 0:
+                cost = time.time() - start
+                print("[{}] bars:{} avg per bar:{:.3f} ms".format(mode, i, cost * 1000.0 / step))
+                start = time.time()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,337 @@
+# coding=utf-8
+
+"""
+PD_Technique.quick_income_compute / quick_rate_compute 数组实现与原来逐行循环的对比
+1. 多 symbol, 含加仓/减仓/反手/nan 仓位的随机数据, 检查结果逐位相同
+2. 单列耗时, 以及 quick_income_compute_matrix 一次算多组参数与逐列循环的耗时
+"""
+
+import io
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from tumbler.constant import Direction
+from tumbler.function.technique import PD_Technique
+
+
+def legacy_quick_income_compute(df, sllippage, rate, size=1, name="income",
+                                name_rate="income_rate", pos_name="pos", debug=False):
+    '''
+    改写之前的逐行实现, 用于核对结果
+    '''
+    if "symbol" in df.columns:
+        symbol_arr = list(df["symbol"])
+    else:
+        symbol_arr = [col[0] for col in df.index]
+    if debug:
+        df.to_csv("c.log")
+    win_times = 0
+    loss_times = 0
+    total_fee = 0
+    datetime_arr = list(df["datetime"])
+    close_arr = list(df["close"])
+    open_arr = list(df["open"])
+    close_arr.append(close_arr[-1])  # 多加一个close, 用于后面补充计算
+    open_arr.append(open_arr[-1])  # 多加一个open, 用于后面补充计算
+    datetime_arr.append(datetime_arr[-1])  # 多加一个open, 用于后面补充计算
+    pos_arr = list(df[pos_name])
+    for i in range(len(pos_arr)):
+        if str(pos_arr[i]) == "nan":
+            pos_arr[i] = 0
+
+    income_rate_ret = []
+    income_ret = []
+    ll = len(pos_arr)
+    income_rate = 0
+    income = 0
+    pre_pos = 0
+    last_entry_price = 0
+    new_entry_price = 0
+    last_entry_time = ""
+    new_entry_time = ""
+    exit_time = ""
+
+    for i in range(ll):
+        if i > 0 and symbol_arr[i] != symbol_arr[i - 1]:
+            pre_pos = 0
+            last_entry_price = 0
+            new_entry_price = 0
+            last_entry_time = ""
+            new_entry_time = ""
+        fee = size * abs(pos_arr[i] - pre_pos) * (open_arr[i + 1] * rate + sllippage)
+        pc_pos = 0
+        exit_price = 0
+        if pre_pos > 0:
+            if pos_arr[i] < pre_pos:
+                pc_pos = min(pre_pos, pre_pos - pos_arr[i])
+                exit_price = open_arr[i + 1]
+                exit_time = datetime_arr[i + 1]
+
+                if pos_arr[i] < 0:
+                    new_entry_price = open_arr[i + 1]
+                    new_entry_time = datetime_arr[i + 1]
+
+            elif pos_arr[i] > pre_pos:
+                pc_pos = 0
+                exit_price = 0
+                exit_time = ""
+                new_sz = pos_arr[i] - pre_pos
+                new_entry_price = (last_entry_price * abs(pre_pos) + open_arr[i + 1] * new_sz) / abs(pos_arr[i])
+                new_entry_time = datetime_arr[i + 1]
+
+        elif pre_pos < 0:
+            if pos_arr[i] < pre_pos:
+                pc_pos = 0
+                exit_price = 0
+                exit_time = ""
+                new_sz = abs(pos_arr[i] - pre_pos)
+                new_entry_price = (last_entry_price * abs(pre_pos) + open_arr[i + 1] * new_sz) / abs(pos_arr[i])
+                new_entry_time = datetime_arr[i + 1]
+
+            elif pos_arr[i] > pre_pos:
+                pc_pos = min(pos_arr[i] - pre_pos, abs(pre_pos))
+                exit_price = open_arr[i + 1]
+                exit_time = datetime_arr[i + 1]
+                if pos_arr[i] > 0:
+                    new_entry_price = open_arr[i + 1]
+                    new_entry_time = datetime_arr[i + 1]
+        else:
+            if pos_arr[i] > 0:
+                new_entry_price = open_arr[i + 1]
+                new_entry_time = datetime_arr[i + 1]
+            elif pos_arr[i] < 0:
+                new_entry_price = open_arr[i + 1]
+                new_entry_time = datetime_arr[i + 1]
+
+        if pre_pos > 0:
+            direction = 1
+        elif pre_pos < 0:
+            direction = -1
+        else:
+            direction = 0
+
+        if i + 1 < ll and symbol_arr[i + 1] == symbol_arr[i]:
+            pnl = size * pc_pos * (exit_price - last_entry_price) * direction
+        else:
+            pnl = size * pc_pos * (close_arr[i] - last_entry_price) * direction
+
+        if debug:
+            print(f"datetime:{datetime_arr[i]}, pos:{pos_arr[i]}")
+        if abs(pnl) > 0:
+            if debug:
+                print(
+                    f"{last_entry_time}-{exit_time},pnl:{pnl},fee:{fee},close:{close_arr[i]},exit_price:{exit_price},"
+                    f"last_entry_price:{last_entry_price},pos:{pos_arr[i]},pc_pos:{pc_pos},direction:{direction}")
+            income += pnl - fee
+            income_rate += (pnl - fee) / close_arr[i]
+
+            if pnl - fee > 0:
+                win_times += 1
+            else:
+                loss_times += 1
+        total_fee += fee
+
+        income_ret.append(income)
+        income_rate_ret.append(income_rate)
+        last_entry_price = new_entry_price
+        last_entry_time = new_entry_time
+        pre_pos = pos_arr[i]
+
+    df[name] = np.array(income_ret)
+    df[name_rate] = np.array(income_rate_ret)
+    print(f"[quick_income_compute] total_income:{income_ret[-1]} total_fee:{total_fee}"
+          f" win_times:{win_times} loss_times:{loss_times}")
+    return df
+
+
+def legacy_quick_rate_compute(df, slippage, fee_rate, dates_arr, add_hours=8, pos_name="pos",
+                              direction=Direction.BOTH.value):
+    '''
+    改写之前的逐行实现, 用于核对结果
+    '''
+    close_arr = list(df["close"])
+    open_arr = list(df["open"])
+    datetime_arr = list(df["datetime"])
+    pos_arr = list(df[pos_name])
+    for i in range(len(pos_arr)):
+        if str(pos_arr[i]) == "nan":
+            pos_arr[i] = 0
+
+    fee_dic = {}
+    slippage_dic = {}
+    income_dic = {}
+
+    pre_dateime_str = ""
+    ll = len(pos_arr)
+    entry_pos = 0
+    for i in range(ll):
+        tmp_datetime_str = (datetime.strptime(str(datetime_arr[i]), '%Y-%m-%d %H:%M:%S') - timedelta(
+            hours=add_hours)).strftime("%Y-%m-%d") + " 00:00:00"
+        # print(f"i:{i}, tmp_datetime_str:{tmp_datetime_str} pre_dateime_str:{pre_dateime_str}")
+        # 判断是否在交易日, 如在交易日，则累加进收入数据里
+        if tmp_datetime_str in dates_arr:
+            if tmp_datetime_str not in fee_dic.keys():
+                fee_dic[tmp_datetime_str] = 0
+                slippage_dic[tmp_datetime_str] = 0
+                income_dic[tmp_datetime_str] = 0
+
+            if i > 0:
+                pre_signal_pos = pos_arr[i - 1]
+                # print(f"pre_signal_pos:{pre_signal_pos}")
+                if pre_signal_pos != entry_pos:
+                    change_size = 0
+                    if direction == Direction.BOTH.value:
+                        change_size = abs(pre_signal_pos - entry_pos)
+                        entry_pos = pre_signal_pos
+                    elif direction == Direction.LONG.value:
+                        if pre_signal_pos >= 0:
+                            change_size = abs(pre_signal_pos - entry_pos)
+                            entry_pos = pre_signal_pos
+                        else:
+                            change_size = abs(entry_pos)
+                            entry_pos = 0
+                    elif direction == Direction.SHORT.value:
+                        if pre_signal_pos <= 0:
+                            change_size = abs(pre_signal_pos - entry_pos)
+                            entry_pos = pre_signal_pos
+                        else:
+                            change_size = abs(entry_pos)
+                            entry_pos = 0
+                    else:
+                        print("[quick_rate_compute] direction error!")
+
+                    # print(f"change_size:{change_size}")
+                    if change_size > 0:
+                        fee_dic[tmp_datetime_str] += change_size * fee_rate
+                        slippage_dic[tmp_datetime_str] += change_size * slippage / close_arr[i]
+                        income_dic[tmp_datetime_str] -= change_size * fee_rate + change_size * slippage / close_arr[
+                            i]
+
+                # # debug
+                # if abs(entry_pos) > 0:
+                #     print(f"add {tmp_datetime_str} {open_arr[i]}, {close_arr[i]}, "
+                #           f"{(close_arr[i] - open_arr[i]) / open_arr[i] * entry_pos}")
+
+                income_dic[tmp_datetime_str] += (close_arr[i] - open_arr[i]) / open_arr[i] * entry_pos
+
+                # # debug
+                # if abs(entry_pos) > 0:
+                #     print(f"income_dic[{tmp_datetime_str}]:{income_dic[tmp_datetime_str]}")
+        else:
+            if i > 0:
+                change_size = abs(entry_pos)
+                if change_size > 0:
+                    if pre_dateime_str in fee_dic.keys():
+                        fee_dic[pre_dateime_str] += change_size * fee_rate
+                        slippage_dic[pre_dateime_str] += change_size * slippage / close_arr[i - 1]
+
+                        # print("debug add {}".format(change_size * fee_rate + change_size * slippage / close_arr[i - 1]))
+                        income_dic[pre_dateime_str] -= change_size * fee_rate + change_size * slippage \
+                                                       / close_arr[i - 1]
+                    else:
+                        print(f"[quick_rate_compute] error pre_dateime_str:{pre_dateime_str}!")
+
+                entry_pos = 0
+
+        pre_dateime_str = tmp_datetime_str
+
+        # debug
+        # print(f"after i:{i}, tmp_datetime_str:{tmp_datetime_str}"
+        #       f" pre_dateime_str:{pre_dateime_str} entry_pos:{entry_pos}")
+
+    return fee_dic, slippage_dic, income_dic
+
+
+def make_df(n_symbols=5, n_rows=20000, seed=1):
+    rs = np.random.RandomState(seed)
+    start = datetime(2021, 1, 1)
+    dfs = []
+    for k in range(n_symbols):
+        close = 100 * np.exp(np.cumsum(rs.randn(n_rows) * 0.01))
+        df = pd.DataFrame({
+            "symbol": "coin{}_usdt".format(k),
+            "datetime": [(start + timedelta(hours=i)).strftime("%Y-%m-%d %H:%M:%S") for i in range(n_rows)],
+            "open": np.append(close[0], close[:-1]),
+            "close": close
+        })
+        # 仓位大部分时间不变, 变化时在 -2 ~ 2 之间, 覆盖加仓/减仓/反手
+        pos = rs.randint(-2, 3, n_rows).astype(float)
+        pos[rs.rand(n_rows) < 0.9] = np.nan
+        pos = np.array(pd.Series(pos).ffill())
+        pos[rs.rand(n_rows) < 0.001] = np.nan
+        df["pos"] = pos
+        dfs.append(df)
+    return pd.concat(dfs, ignore_index=True)
+
+
+def same(a, b):
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    return a.shape == b.shape and bool(np.all((a == b) | (np.isnan(a) & np.isnan(b))))
+
+
+def timeit(func, *args, **kwargs):
+    start = time.time()
+    with redirect_stdout(io.StringIO()):
+        ret = func(*args, **kwargs)
+    return ret, time.time() - start
+
+
+def check_income(df):
+    old, old_cost = timeit(legacy_quick_income_compute, df.copy(), 0.01, 0.001, size=2)
+    new, new_cost = timeit(PD_Technique.quick_income_compute, df.copy(), 0.01, 0.001, size=2)
+    ok = same(old["income"], new["income"]) and same(old["income_rate"], new["income_rate"])
+    print("[quick_income_compute] rows:{} same:{} legacy:{:.3f}s new:{:.3f}s speedup:{:.1f}x".format(
+        len(df.index), ok, old_cost, new_cost, old_cost / new_cost))
+
+
+def check_rate(df):
+    df = df[df["symbol"] == df["symbol"].iloc[0]].copy()
+    days = sorted(set((pd.to_datetime(df["datetime"]) - timedelta(hours=8)).dt.strftime("%Y-%m-%d 00:00:00")))
+    dates_arr = days[::3] + days[1::7]
+    for direction in [Direction.BOTH.value, Direction.LONG.value, Direction.SHORT.value]:
+        old, old_cost = timeit(legacy_quick_rate_compute, df, 0.0005, 0.001, dates_arr, direction=direction)
+        new, new_cost = timeit(PD_Technique.quick_rate_compute, df, 0.0005, 0.001, dates_arr, direction=direction)
+        ok = all(list(x.keys()) == list(y.keys()) and same(list(x.values()), list(y.values()))
+                 for x, y in zip(old, new))
+        print("[quick_rate_compute] direction:{} rows:{} days:{} same:{} legacy:{:.3f}s new:{:.3f}s "
+              "speedup:{:.1f}x".format(direction, len(df.index), len(old[0]), ok, old_cost, new_cost,
+                                       old_cost / new_cost))
+
+
+def check_matrix(df, n_params=50):
+    rs = np.random.RandomState(2)
+    pos_names = []
+    for k in range(n_params):
+        name = "pos_{}".format(k)
+        df[name] = np.where(rs.rand(len(df.index)) < 0.02, df["pos"], np.nan)
+        df[name] = df.groupby("symbol")[name].ffill()
+        pos_names.append(name)
+
+    start = time.time()
+    with redirect_stdout(io.StringIO()):
+        old = [legacy_quick_income_compute(df.copy(), 0.01, 0.001, pos_name=name)["income"].values
+               for name in pos_names]
+    old_cost = time.time() - start
+
+    (income, income_rate, stat_df), new_cost = timeit(PD_Technique.quick_income_compute_matrix, df, 0.01, 0.001,
+                                                      pos_names)
+    ok = same(np.column_stack(old), income)
+    print("[quick_income_compute_matrix] rows:{} params:{} same:{} legacy loop:{:.3f}s matrix:{:.3f}s "
+          "speedup:{:.1f}x".format(len(df.index), n_params, ok, old_cost, new_cost, old_cost / new_cost))
+    print(stat_df.sort_values("total_income", ascending=False).head())
+
+
+def run():
+    df = make_df()
+    check_income(df)
+    check_rate(df)
+    check_matrix(df)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,111 @@
+# coding=utf-8
+
+"""
+RestClient (线程池 + requests) 与 AsyncRestClient (asyncio + 长连接池) 对比
+本地起一个 HTTP/1.1 keep-alive 的桩服务, 每个请求固定延迟 delay 秒, 返回 json
+1. add_request 批量下单的吞吐
+2. direct_request 串行请求的单次延迟 (requests 每次新建连接, AsyncRestClient 复用连接)
+3. 令牌桶限频是否生效
+"""
+
+import json
+import time
+from threading import Thread, Event
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tumbler.api.rest import RestClient
+from tumbler.api.rest.async_rest_client import AsyncRestClient
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    delay = 0.005
+
+    def _reply(self):
+        length = int(self.headers.get("Content-Length", 0) or 0)
+        body = self.rfile.read(length) if length else b""
+        time.sleep(self.delay)
+        data = json.dumps({"status": "ok", "path": self.path, "body": body.decode("utf-8")}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = _reply
+    do_POST = _reply
+    do_DELETE = _reply
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    request_queue_size = 256
+
+
+def start_stub_server(port=0, delay=0.005):
+    StubHandler.delay = delay
+    server = StubServer(("127.0.0.1", port), StubHandler)
+    server.daemon_threads = True
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_add_request(client, n):
+    done = Event()
+    result = {"count": 0}
+
+    def on_callback(data, request):
+        result["count"] += 1
+        if result["count"] >= n:
+            done.set()
+
+    start = time.time()
+    for i in range(n):
+        client.add_request("POST", "/api/v1/order", on_callback, data=json.dumps({"id": i}),
+                           headers={"Content-Type": "application/json"})
+    done.wait(60)
+    return time.time() - start
+
+
+def run_direct_request(client, n):
+    start = time.time()
+    for i in range(n):
+        client.direct_request("GET", "/api/v1/ticker", lambda data, request: None, params={"symbol": "btc_usdt"})
+    return time.time() - start
+
+
+def run(n=2000, n_direct=300, delay=0.005):
+    server = start_stub_server(delay=delay)
+    url_base = "http://127.0.0.1:{}".format(server.server_address[1])
+
+    sync_client = RestClient()
+    sync_client.init(url_base)
+    sync_client.start()
+
+    async_client = AsyncRestClient(max_in_flight=50, max_connections_per_host=50)
+    async_client.init(url_base)
+    async_client.start()
+
+    for name, client in [("RestClient", sync_client), ("AsyncRestClient", async_client)]:
+        cost = run_add_request(client, n)
+        print("[{}] add_request n:{} cost:{:.3f}s req/sec:{:.0f}".format(name, n, cost, n / cost))
+
+    for name, client in [("RestClient", sync_client), ("AsyncRestClient", async_client)]:
+        cost = run_direct_request(client, n_direct)
+        print("[{}] direct_request avg latency:{:.3f} ms".format(name, cost * 1000.0 / n_direct))
+
+    for path, stat in async_client.get_latency_stat().items():
+        print("[AsyncRestClient] latency {} {}".format(path, stat))
+
+    async_client.set_rate_limit("/api/v1/order", 100)
+    cost = run_add_request(async_client, 300)
+    print("[AsyncRestClient] rate limit 100/s, 300 requests cost:{:.3f}s".format(cost))
+
+    async_client.stop()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,103 @@
+# coding=utf-8
+
+"""
+check_stop_order 找触发停止单的耗时: 原来每个 tick 遍历全部停止单, 与 StopOrderBook 按 vt_symbol + 价格二分对比
+10000 个停止单分布在 n_symbols 个币对上 (网格/马丁类策略), 每个 tick 随机游走, 触发的停止单被移除后在远处补一个
+两边每个 tick 选出的停止单 (包括顺序) 必须完全相同
+"""
+
+import time
+import random
+
+from tumbler.constant import Direction
+from tumbler.object import StopOrder
+from tumbler.function.stop_order_book import StopOrderBook
+
+
+def legacy_triggered(stop_orders, vt_symbol, last_price):
+    ret = []
+    for stop_order in list(stop_orders.values()):
+        if stop_order.vt_symbol != vt_symbol:
+            continue
+
+        long_triggered = (stop_order.direction == Direction.LONG.value and last_price >= stop_order.price)
+        short_triggered = (stop_order.direction == Direction.SHORT.value and last_price <= stop_order.price)
+        if long_triggered or short_triggered:
+            ret.append(stop_order)
+    return ret
+
+
+class StopOrderMaker(object):
+    def __init__(self):
+        self.count = 0
+
+    def make(self, vt_symbol, direction, price):
+        self.count += 1
+        stop_order = StopOrder()
+        stop_order.vt_symbol = vt_symbol
+        stop_order.direction = direction
+        stop_order.price = price
+        stop_order.volume = 1
+        stop_order.vt_order_id = "stop_{}".format(self.count)
+        return stop_order
+
+
+def run(n_stops=10000, n_symbols=20, n_ticks=20000, seed=1):
+    rs = random.Random(seed)
+    symbols = ["coin{}_usdt.BINANCE".format(i) for i in range(n_symbols)]
+    prices = {symbol: 100.0 for symbol in symbols}
+
+    legacy = {}
+    book = StopOrderBook()
+    maker = StopOrderMaker()
+
+    def add(symbol, distance):
+        # 买停止单挂在上方, 卖停止单挂在下方
+        if rs.random() < 0.5:
+            stop_order = maker.make(symbol, Direction.LONG.value, round(prices[symbol] + distance, 2))
+        else:
+            stop_order = maker.make(symbol, Direction.SHORT.value, round(prices[symbol] - distance, 2))
+        legacy[stop_order.vt_order_id] = stop_order
+        book[stop_order.vt_order_id] = stop_order
+
+    for i in range(n_stops):
+        add(symbols[i % n_symbols], rs.uniform(0.5, 20))
+
+    ticks = []
+    for i in range(n_ticks):
+        symbol = rs.choice(symbols)
+        prices[symbol] = round(prices[symbol] * (1 + rs.gauss(0, 0.002)), 2)
+        ticks.append((symbol, prices[symbol]))
+
+    for symbol in symbols:
+        prices[symbol] = 100.0
+    legacy_cost = book_cost = 0
+    triggered = 0
+    for symbol, price in ticks:
+        prices[symbol] = price
+        start = time.perf_counter()
+        arr_legacy = legacy_triggered(legacy, symbol, price)
+        legacy_cost += time.perf_counter() - start
+
+        start = time.perf_counter()
+        arr_book = book.get_triggered(symbol, price)
+        book_cost += time.perf_counter() - start
+
+        if [x.vt_order_id for x in arr_legacy] != [x.vt_order_id for x in arr_book]:
+            raise ValueError("triggered stop orders differ at {} {}".format(symbol, price))
+
+        triggered += len(arr_book)
+        for stop_order in arr_book:
+            legacy.pop(stop_order.vt_order_id)
+            book.pop(stop_order.vt_order_id)
+            add(symbol, rs.uniform(5, 20))
+
+    print("[check_stop_order] stops:{} symbols:{} ticks:{} triggered:{} same:True".format(
+        n_stops, n_symbols, n_ticks, triggered))
+    print("[legacy scan] total:{:.3f}s per tick:{:.1f}us".format(legacy_cost, legacy_cost * 1e6 / n_ticks))
+    print("[StopOrderBook] total:{:.3f}s per tick:{:.1f}us speedup:{:.0f}x".format(
+        book_cost, book_cost * 1e6 / n_ticks, legacy_cost / book_cost))
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,241 @@
+# coding=utf-8
+
+"""
+TickEngine 挂单簿耗时: 原来两层单链表 OrderNode + 每个 tick dict(zip(columns, row)), 与 PriceLevelBook + 按列取值的 TickRow 对比
+模拟 100ms 一个 tick 的做市回测, 策略每个 tick 在盘口附近挂买卖单, 挂单超过 max_orders 后撤最早的
+链表版本保留在这里只用来对比, 其中原来遍历时跳过下一个挂单 / 下一个价位的问题已经按新版本修正, 两边成交必须完全相同
+"""
+
+import time
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from tumbler.apps.backtester.work_tick_engine.new_tick_engine import TickEngine, Strategy, Trade
+
+
+class OrderNode:
+    def __init__(self, Data=None):
+        self.Data = Data
+        self.Next = None
+        self.Next2 = None
+
+    def insert(self, newNode):
+        newNode.Next = self.Next
+        self.Next = newNode
+
+    def insert2(self, newNode):
+        newNode.Next2 = self.Next2
+        self.Next2 = newNode
+
+    def removeNext(self):
+        self.Next = self.Next.Next
+
+    def removeNext2(self):
+        self.Next2 = self.Next2.Next2
+
+
+class LinkedListTickEngine(TickEngine):
+    def __init__(self, *args, **kwargs):
+        super(LinkedListTickEngine, self).__init__(*args, **kwargs)
+        self.askQueue = OrderNode()
+        self.bidQueue = OrderNode()
+
+    def Start(self, ticks):
+        self.ticks = ticks
+        self.strategy.OnInit(self)
+        self.pos = np.zeros((ticks.shape[0], 1))
+        self.BuyPrc = np.zeros((ticks.shape[0], 1))
+        self.SellPrc = np.zeros((ticks.shape[0], 1))
+
+        columns = ticks.columns
+        data = ticks.values
+        for i in range(ticks.shape[0]):
+            self.i = i
+            tick = dict(zip(columns, data[i, :]))
+            self.ctick = tick
+            self.DoMatch(tick)
+            self.strategy.OnTick(tick)
+            self.pos[i] = self.strategy.pos
+        self.strategy.OnFinish()
+
+    def insertOrder(self, order):
+        price = order.price
+        newOrderNode = OrderNode(order)
+        if order.side == 'B':
+            next = self.bidQueue
+            while next.Next and price < next.Next.Data:
+                next = next.Next
+            self.nBid += 1
+        else:
+            next = self.askQueue
+            while next.Next and price > next.Next.Data:
+                next = next.Next
+            self.nAsk += 1
+        if not next.Next or price != next.Next.Data:
+            next.insert(OrderNode(price))
+        nextorder = next.Next
+        while nextorder.Next2:
+            nextorder = nextorder.Next2
+        nextorder.insert2(newOrderNode)
+        self.nOrder += 1
+        self.orderMap[order.id] = order
+
+    def cancelOrder(self, orderid):
+        order = self.orderMap[orderid]
+        self.nOrder -= 1
+        if order.side == 'B':
+            node = self.bidQueue
+            self.nBid -= 1
+        else:
+            node = self.askQueue
+            self.nAsk -= 1
+        while node.Next and order.price != node.Next.Data:
+            node = node.Next
+        node2 = node.Next
+        while node2.Next2 and orderid != node2.Next2.Data.id:
+            node2 = node2.Next2
+        node2.removeNext2()
+        del self.orderMap[orderid]
+        if not node.Next.Next2:
+            node.removeNext()
+
+    def DoTrade(self, trdprice, node2, order, msg):
+        trd = Trade(order.id, order.symbol, order.side, order.qty, trdprice, self.ctick['date'], 'F')
+        trd.msg = msg
+        self.strategy.OnTrade(trd)
+        node2.removeNext2()
+        del self.orderMap[order.id]
+        self.allTrade.append(trd)
+        if order.side == 'B':
+            self.BuyPrc[self.i] = trdprice
+            self.nBid -= 1
+        else:
+            self.SellPrc[self.i] = trdprice
+            self.nAsk -= 1
+
+    def match_side(self, head, is_bid, px1, vol1, fill, fPrice):
+        node = head
+        while node.Next and ((is_bid and px1 <= node.Next.Data) or (not is_bid and px1 >= node.Next.Data)):
+            node2 = node.Next
+            price = node2.Data
+            if (is_bid and px1 - price < -1e-6) or (not is_bid and px1 - price > 1e-6):
+                while node2.Next2:
+                    order = node2.Next2.Data
+                    trdprice = max(px1, order.price) if is_bid else min(px1, order.price)
+                    self.DoTrade(trdprice, node2, order, '1' if is_bid else '4')
+            else:
+                order = node2.Next2.Data
+                if abs(price - px1) < 1e-6:
+                    if np.isnan(order.aheadqty):
+                        order.aheadqty = vol1 * self.queueparam
+                    elif order.aheadqty >= vol1:
+                        fill = max(fill, self.fillparam * (order.aheadqty - vol1))
+                while node2 and node2.Next2:
+                    order = node2.Next2.Data
+                    if abs(price - fPrice) < 1e-6:
+                        order.aheadqty -= fill
+                        if order.aheadqty <= 0:
+                            self.DoTrade(price, node2, order, '2' if is_bid else '5')
+                            continue
+                    elif (is_bid and price - fPrice > 1e-6) or (not is_bid and price - fPrice < -1e-6):
+                        self.DoTrade(price, node2, order, '3' if is_bid else '6')
+                        continue
+                    node2 = node2.Next2
+            if not node.Next.Next2:
+                node.removeNext()
+            else:
+                node = node.Next
+
+    def DoMatch(self, tick):
+        self.match_side(self.bidQueue, True, tick['bid1'], tick['bidvol1'], tick['bidFill'], tick['bfPrice'])
+        self.match_side(self.askQueue, False, tick['ask1'], tick['askvol1'], tick['askFill'], tick['afPrice'])
+
+
+class QuoteStrategy(Strategy):
+    """
+    每个 tick 在买一下方/卖一上方 [min_level, min_level + levels] 个价位内随机挂一单, 挂单超过 max_orders 撤最早的
+    levels 小时挂单集中在少数几个价位上, 每个价位排很长的队
+    """
+
+    def __init__(self, max_orders=2000, min_level=0, levels=100, price_tick=0.5, seed=7):
+        super(QuoteStrategy, self).__init__()
+        self.max_orders = max_orders
+        self.min_level = min_level
+        self.levels = levels
+        self.price_tick = price_tick
+        self.rs = random.Random(seed)
+        self.n_update = 0
+
+    def OnTick(self, tick):
+        self.ctime = tick['date']
+        bid = tick['bid1'] - self.rs.randint(self.min_level, self.min_level + self.levels) * self.price_tick
+        ask = tick['ask1'] + self.rs.randint(self.min_level, self.min_level + self.levels) * self.price_tick
+        self.sendOrder("btc_usdt", 'B', 'O', bid, 1)
+        self.sendOrder("btc_usdt", 'S', 'O', ask, 1)
+        self.n_update += 2
+        while len(self.orderMap) > self.max_orders:
+            self.cancelOrder(next(iter(self.orderMap)))
+            self.n_update += 1
+
+
+def make_ticks(n, price_tick=0.5, seed=3):
+    rs = random.Random(seed)
+    start = datetime(2020, 1, 1)
+    bid = 10000.0
+    rows = []
+    prev_bid = prev_ask = None
+    for i in range(n):
+        bid = max(price_tick, bid + rs.choice((-price_tick, 0, 0, 0, price_tick)))
+        ask = bid + price_tick
+        rows.append({
+            "date": start + timedelta(milliseconds=100 * i),
+            "bid1": bid,
+            "ask1": ask,
+            "bidvol1": float(rs.randint(1, 50)),
+            "askvol1": float(rs.randint(1, 50)),
+            "bidFill": float(rs.randint(0, 20)),
+            "askFill": float(rs.randint(0, 20)),
+            "bfPrice": prev_bid if prev_bid is not None else bid,
+            "afPrice": prev_ask if prev_ask is not None else ask,
+            "mid": (bid + ask) / 2.0
+        })
+        prev_bid, prev_ask = bid, ask
+    return pd.DataFrame(rows)
+
+
+def run_engine(engine_class, ticks, **kwargs):
+    strategy = QuoteStrategy(**kwargs)
+    engine = engine_class()
+    engine.RegisterStrategy(strategy)
+    start = time.time()
+    engine.Start(ticks)
+    return time.time() - start, engine, strategy
+
+
+def trade_key(engine):
+    return [(trd.id, trd.side, trd.qty, trd.price, trd.msg) for trd in engine.allTrade]
+
+
+def run(n_compare=100000, n_day=864000):
+    ticks = make_ticks(n_compare)
+    for kwargs in ({"max_orders": 200}, {"max_orders": 5000}, {"max_orders": 5000, "min_level": 200, "levels": 4}):
+        cost_old, engine_old, st_old = run_engine(LinkedListTickEngine, ticks, **kwargs)
+        cost_new, engine_new, st_new = run_engine(TickEngine, ticks, **kwargs)
+        if trade_key(engine_old) != trade_key(engine_new) or st_old.pos != st_new.pos:
+            raise ValueError("trades differ, {}".format(kwargs))
+        print("[{}] ticks:{} order updates:{} trades:{} same:True".format(
+            kwargs, n_compare, st_new.n_update, len(engine_new.allTrade)))
+        print("    [linked list] cost:{:.2f}s  [PriceLevelBook] cost:{:.2f}s speedup:{:.1f}x".format(
+            cost_old, cost_new, cost_old / cost_new))
+
+    ticks = make_ticks(n_day)
+    cost, engine, strategy = run_engine(TickEngine, ticks, max_orders=5000)
+    print("[PriceLevelBook] one day of 100ms ticks:{} order updates:{} trades:{} cost:{:.2f}s".format(
+        n_day, strategy.n_update, len(engine.allTrade), cost))
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,79 @@
+# coding=utf-8
+
+"""
+tick 从网关到策略的吞吐:
+网关维护一个不断被修改的 tick, 收到行情后 on_ws_tick 推送,
+经过 EventEngine 分发给 CtaEngine.process_tick_event, 再到策略的 on_tick
+同时统计处理期间新分配的对象数量
+"""
+
+import gc
+import time
+from copy import copy
+from datetime import datetime
+
+from tumbler.event import EventEngine
+from tumbler.gate import BaseGateway
+from tumbler.object import TickData
+from tumbler.apps.cta_strategy.engine import CtaEngine
+
+
+class BenchStrategy(object):
+    def __init__(self):
+        self.inited = True
+        self.trading = True
+        self.count = 0
+
+    def on_tick(self, tick):
+        self.count += 1
+
+
+class BenchGateway(BaseGateway):
+    def __init__(self, event_engine, gateway_copy=False):
+        super(BenchGateway, self).__init__(event_engine, "BENCH")
+        # 旧的推送方式: 网关自己先 copy 一次再 on_ws_tick
+        self.gateway_copy = gateway_copy
+        self.tick = TickData()
+        self.tick.symbol = "btc_usdt"
+        self.tick.exchange = "BENCH"
+        self.tick.vt_symbol = "btc_usdt.BENCH"
+        self.tick.gateway_name = "BENCH"
+
+    def on_packet(self, i):
+        tick = self.tick
+        tick.last_price = 10000.0 + i % 100
+        tick.bid_prices[0] = tick.last_price - 0.5
+        tick.ask_prices[0] = tick.last_price + 0.5
+        tick.datetime = datetime.now()
+        if self.gateway_copy:
+            tick = copy(tick)
+        self.on_ws_tick(tick)
+
+
+def run(n=200000, gateway_copy=False):
+    event_engine = EventEngine()
+    cta_engine = CtaEngine(None, event_engine)
+    cta_engine.register_event()
+    strategy = BenchStrategy()
+    cta_engine.symbol_strategy_map["btc_usdt.BENCH"].append(strategy)
+
+    gateway = BenchGateway(event_engine, gateway_copy)
+    event_engine.start()
+
+    gc.collect()
+    gen0_before = gc.get_stats()[0]["collections"]
+    start = time.time()
+    for i in range(n):
+        gateway.on_packet(i)
+    while strategy.count < n:
+        time.sleep(0.001)
+    cost = time.time() - start
+    gen0_after = gc.get_stats()[0]["collections"]
+
+    event_engine.stop()
+    print("ticks:{} cost:{:.3f}s ticks/sec:{:.0f} gen0 gc:{}".format(
+        n, cost, n / cost, gen0_after - gen0_before))
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,120 @@
+# coding=utf-8
+
+"""
+WebsocketClient (每个连接一个接收线程 + 一个 ping 线程) 与 AsyncWebsocketClient (所有连接共用一个事件循环) 对比
+本地起一个 websocket 桩服务, 客户端连上后发送 {"op": "start", "n": N}, 服务端连续推送 N 条行情
+统计 n_clients 个连接一共收完 n_clients * N 条消息的耗时和线程数
+"""
+
+import json
+import time
+import asyncio
+import threading
+from threading import Thread, Event
+
+from aiohttp import web
+
+from tumbler.api.websocket import WebsocketClient
+from tumbler.api.websocket.async_websocket_client import AsyncWebsocketClient, ws_loop_manager
+
+PACKET = json.dumps({
+    "stream": "btcusdt@depth10",
+    "data": {"bids": [["10000.0", "1.0"]] * 10, "asks": [["10001.0", "1.0"]] * 10}
+})
+
+
+async def ws_handler(request):
+    ws = web.WebSocketResponse()
+    await ws.prepare(request)
+    async for msg in ws:
+        req = json.loads(msg.data)
+        if req.get("op") == "start":
+            for i in range(req["n"]):
+                await ws.send_str(PACKET)
+    return ws
+
+
+def start_stub_server(port=18765):
+    ready = Event()
+
+    def run_server():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        app = web.Application()
+        app.router.add_get("/ws", ws_handler)
+        runner = web.AppRunner(app)
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", port).start())
+        ready.set()
+        loop.run_forever()
+
+    Thread(target=run_server, daemon=True).start()
+    ready.wait()
+    return "ws://127.0.0.1:{}/ws".format(port)
+
+
+class Counter(object):
+    def __init__(self, total):
+        self.total = total
+        self.count = 0
+        self.lock = threading.Lock()
+        self.done = Event()
+
+    def add(self):
+        with self.lock:
+            self.count += 1
+            if self.count >= self.total:
+                self.done.set()
+
+
+def make_client_class(base):
+    class BenchClient(base):
+        def __init__(self, counter, n):
+            super(BenchClient, self).__init__()
+            self.counter = counter
+            self.n = n
+
+        def on_connected(self):
+            self.send_packet({"op": "start", "n": self.n})
+
+        def on_packet(self, packet):
+            self.counter.add()
+
+        def on_error(self, exception_type, exception_value, tb):
+            print(self.exception_detail(exception_type, exception_value, tb))
+
+    return BenchClient
+
+
+def run_clients(base, url, n_clients, n):
+    counter = Counter(n_clients * n)
+    client_class = make_client_class(base)
+    clients = [client_class(counter, n) for i in range(n_clients)]
+
+    start = time.time()
+    for client in clients:
+        client.init(url)
+        client.start()
+    counter.done.wait(120)
+    cost = time.time() - start
+    threads = threading.active_count()
+
+    for client in clients:
+        client.stop()
+    return cost, threads, clients
+
+
+def run(n_clients=17, n=5000):
+    url = start_stub_server()
+    base_threads = threading.active_count()
+
+    for base in [WebsocketClient, AsyncWebsocketClient]:
+        cost, threads, clients = run_clients(base, url, n_clients, n)
+        print("[{}] clients:{} messages:{} cost:{:.3f}s msg/sec:{:.0f} extra threads:{}".format(
+            base.__name__, n_clients, n_clients * n, cost, n_clients * n / cost, threads - base_threads))
+
+    print("[AsyncWebsocketClient] avg batch size:{:.1f}".format(ws_loop_manager.get_stat()["avg_batch_size"]))
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,94 @@
+# coding=utf-8
+
+"""
+各个入口进程启动时实际 import 了哪些模块, 花了多少时间
+每个入口在单独的子进程里用 python -X importtime 执行, 解析 stderr 得到每个模块的 self / cumulative 耗时
+
+python import_time_report.py                 # 默认的几个入口
+python import_time_report.py cta aggregation # 指定入口
+python import_time_report.py "import tumbler.gateway.okex5"  # 任意代码
+"""
+
+import os
+import sys
+import time
+import subprocess
+from collections import defaultdict
+
+ENTRY_POINTS = {
+    "cta": "from tumbler.apps.cta_strategy import CtaApp",
+    "aggregation": "from tumbler.aggregation.aggregation import Aggregation",
+    "data_recorder": "from tumbler.apps.data_recorder import DataRecorderApp",
+    "gateway": "from tumbler.gateway import gateway_dict, rest_exchange_map, ws_exchange_map"
+}
+
+
+def run_import_time(code):
+    """
+    返回 (总耗时秒, [(module, self_us, cumulative_us)])
+    """
+    env = dict(os.environ)
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+    env["PYTHONPATH"] = os.pathsep.join([root, env.get("PYTHONPATH", "")])
+
+    start = time.time()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], env=env,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    cost = time.time() - start
+
+    arr = []
+    errors = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            errors.append(line)
+            continue
+        items = line[len("import time:"):].split("|")
+        if len(items) != 3 or not items[0].strip().isdigit():
+            continue
+        arr.append((items[2].strip(), int(items[0]), int(items[1])))
+
+    if proc.returncode != 0:
+        print("\n".join(errors[-10:]))
+    return cost, arr
+
+
+def group_by_package(arr, depth=2):
+    """
+    按包名前 depth 段汇总 self 耗时, 比如 tumbler.gateway / pandas / sklearn
+    """
+    dic = defaultdict(int)
+    for module, self_us, cumulative_us in arr:
+        dic[".".join(module.split(".")[:depth])] += self_us
+    return sorted(dic.items(), key=lambda x: -x[1])
+
+
+def report(name, code, top=15):
+    cost, arr = run_import_time(code)
+    total_us = sum(x[1] for x in arr)
+    print("=" * 80)
+    print("[{}] {}".format(name, code))
+    print("process cost:{:.3f}s import cost:{:.3f}s modules:{}".format(cost, total_us / 1e6, len(arr)))
+
+    tumbler_modules = [x for x in arr if x[0].split(".")[0] == "tumbler"]
+    print("tumbler modules:{} gateways:{}".format(
+        len(tumbler_modules), sorted(set(x[0].split(".")[2] for x in tumbler_modules
+                                         if x[0].startswith("tumbler.gateway.")))))
+
+    print("-- top cumulative")
+    for module, self_us, cumulative_us in sorted(arr, key=lambda x: -x[2])[:top]:
+        print("{:>10.1f} ms  {}".format(cumulative_us / 1000.0, module))
+
+    print("-- top packages by self time")
+    for package, self_us in group_by_package(arr)[:top]:
+        print("{:>10.1f} ms  {}".format(self_us / 1000.0, package))
+
+
+def run(args):
+    if not args:
+        args = list(ENTRY_POINTS.keys())
+    for arg in args:
+        report(arg, ENTRY_POINTS.get(arg, arg))
+
+
+if __name__ == "__main__":
+    run(sys.argv[1:])
@@ -20,7 +20,7 @@ out_file = None
 
 
 def on_bar(bar):
-    print(bar.__dict__)
+    print(bar.get_fields())
 
 
 def on_window_bar(bar):
@@ -0,0 +1,38 @@
+# coding=utf-8
+
+from datetime import datetime, timedelta
+
+from tumbler.object import BarData
+from tumbler.apps.alpha_trader.template import AlphaTemplate
+
+
+class FakeMysqlService(object):
+    def get_bars_dict(self, symbols, period, start_datetime, end_datetime):
+        ret = {}
+        for symbol in symbols:
+            bars = []
+            for i in range(3):
+                bar = BarData()
+                bar.symbol = symbol
+                bar.exchange = "OKEX5"
+                bar.vt_symbol = symbol + ".OKEX5"
+                bar.datetime = datetime(2021, 1, 1) + timedelta(days=i)
+                bar.close_price = 100.0 + i
+                bars.append(bar)
+            ret[symbol] = bars
+        return ret
+
+
+def test_load_bars_dict_shared_symbol():
+    template = AlphaTemplate.__new__(AlphaTemplate)
+    template.mysql_service_manager = FakeMysqlService()
+
+    # 两个 vt_symbol 对应同一个 mysql symbol btc_usdt
+    for vt_symbols in (["btc_usdt_swap.OKEX5", "btc_usdt.OKEX5"], ["btc_usdt.OKEX5", "btc_usdt_swap.OKEX5"]):
+        bars_dict = template.load_bars_dict_from_mysql(vt_symbols, "1d", datetime(2021, 1, 1), datetime(2021, 2, 1))
+        for vt_symbol in vt_symbols:
+            bars = bars_dict[vt_symbol]
+            assert len(bars) == 3
+            assert all(bar.vt_symbol == vt_symbol for bar in bars)
+            assert all(bar.symbol == vt_symbol.split(".")[0] for bar in bars)
+        assert not set(map(id, bars_dict[vt_symbols[0]])) & set(map(id, bars_dict[vt_symbols[1]]))
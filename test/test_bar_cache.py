@@ -0,0 +1,102 @@
+# coding=utf-8
+
+from datetime import datetime, timedelta
+
+from tumbler.object import BarArrayData
+from tumbler.data.bar_cache import BarCache
+
+
+class FakeSource(object):
+    """
+    数据源里已有的1分钟bar, 可以中途补数据
+    """
+
+    def __init__(self, start, n):
+        self.datetime_list = [start + timedelta(minutes=i) for i in range(n)]
+        self.calls = []
+
+    def extend(self, n):
+        last = self.datetime_list[-1]
+        self.datetime_list += [last + timedelta(minutes=i + 1) for i in range(n)]
+
+    def fetch(self, symbol, exchange, interval, start, end, source):
+        self.calls.append((start, end))
+        dts = [dt for dt in self.datetime_list if start <= dt <= end]
+        prices = [float(i) for i in range(len(dts))]
+        return BarArrayData.from_columns(symbol, exchange, interval, dts, prices, prices, prices, prices, prices)
+
+
+def make_cache(tmp_path, monkeypatch, source):
+    monkeypatch.setattr(BarCache, "fetch", staticmethod(source.fetch))
+    return BarCache(root_dir=str(tmp_path), max_size=0)
+
+
+def load_index(cache):
+    return cache.load_index(cache.get_symbol_dir("btc_usdt.BINANCE", "1m"))
+
+
+def test_cover_only_returned_bars(tmp_path, monkeypatch):
+    start = datetime(2021, 1, 1)
+    source = FakeSource(start, 60)
+    cache = make_cache(tmp_path, monkeypatch, source)
+
+    end = start + timedelta(hours=2)
+    arr = cache.load_bar_array("btc_usdt", "BINANCE", "1m", start, end)
+    assert len(arr) == 60
+    assert [(c["start"], c["end"]) for c in load_index(cache)] == [(start, start + timedelta(minutes=59))]
+
+    # 数据源后来补了数据, 没有被覆盖的部分要重新取
+    source.extend(30)
+    arr = cache.load_bar_array("btc_usdt", "BINANCE", "1m", start, end)
+    assert len(arr) == 90
+    assert source.calls[-1][0] == start + timedelta(minutes=59)
+    assert [(c["start"], c["end"]) for c in load_index(cache)] == [(start, start + timedelta(minutes=89))]
+
+
+def test_open_ended_not_covered(tmp_path, monkeypatch):
+    now = datetime.now().replace(second=0, microsecond=0)
+    start = now - timedelta(minutes=30)
+    source = FakeSource(start, 31)
+    cache = make_cache(tmp_path, monkeypatch, source)
+
+    arr = cache.load_bar_array("btc_usdt", "BINANCE", "1m", start)
+    # 最后一根还没走完, 不缓存
+    assert len(arr) == 30
+    chunks = load_index(cache)
+    assert len(chunks) == 1 and chunks[0]["end"] < now
+
+    n_calls = len(source.calls)
+    cache.load_bar_array("btc_usdt", "BINANCE", "1m", start)
+    assert len(source.calls) == n_calls + 1
+
+
+def test_invalidate(tmp_path, monkeypatch):
+    start = datetime(2021, 1, 1)
+    source = FakeSource(start, 100)
+    cache = make_cache(tmp_path, monkeypatch, source)
+    end = start + timedelta(minutes=99)
+    cache.load_bar_array("btc_usdt", "BINANCE", "1m", start, end)
+
+    cache.invalidate("btc_usdt.BINANCE", "1m", start + timedelta(minutes=40), start + timedelta(minutes=59))
+    assert [(c["start"], c["end"]) for c in load_index(cache)] == [
+        (start, start + timedelta(minutes=39)), (start + timedelta(minutes=60), end)]
+
+    n_calls = len(source.calls)
+    arr = cache.load_bar_array("btc_usdt", "BINANCE", "1m", start, end)
+    assert len(arr) == 100
+    assert source.calls[n_calls:] == [(start + timedelta(minutes=39), start + timedelta(minutes=60))]
+    assert [(c["start"], c["end"]) for c in load_index(cache)] == [(start, end)]
+
+
+def test_loaded_array_survives_chunk_removal(tmp_path, monkeypatch):
+    start = datetime(2021, 1, 1)
+    source = FakeSource(start, 100)
+    cache = make_cache(tmp_path, monkeypatch, source)
+    end = start + timedelta(minutes=99)
+    arr = cache.load_bar_array("btc_usdt", "BINANCE", "1m", start, end)
+
+    # 别的进程合并或淘汰时删掉了这个目录, 已经加载的数据仍然可以读
+    cache.invalidate("btc_usdt.BINANCE", "1m")
+    assert load_index(cache) == []
+    assert len(arr) == 100
+    assert float(arr.close.sum()) == float(sum(range(100)))
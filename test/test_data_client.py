@@ -0,0 +1,28 @@
+# coding=utf-8
+
+import time
+from datetime import datetime
+
+from tumbler.data.data import DataClient
+
+
+def test_pandas_from_rows_skip_bad_row_and_dst(monkeypatch):
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    try:
+        # 2021-03-14 02:00 美东进入夏令时, 前后两根的本地时间偏移不同
+        rows = [
+            [1615701600000, "1", "2", "0.5", "1.5", "10"],
+            [1615705200000, "bad", "2", "0.5", "1.5", "10"],
+            [1615708800000, 1.5, 3, 1, 2, 20],
+            [1615712400000, 2],
+        ]
+        df = DataClient().get_pandas_from_rows("btc_usdt", rows)
+        assert len(df) == 2
+        assert list(df["datetime"]) == [datetime.fromtimestamp(rows[0][0] / 1e3),
+                                         datetime.fromtimestamp(rows[2][0] / 1e3)]
+        assert list(df["close"]) == [1.5, 2.0]
+        assert list(df["volume"]) == [10.0, 20.0]
+    finally:
+        monkeypatch.undo()
+        time.tzset()
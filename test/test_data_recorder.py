@@ -0,0 +1,73 @@
+# coding=utf-8
+
+from tumbler.apps.data_recorder import engine as recorder_engine
+from tumbler.apps.data_recorder.engine import RecorderEngine
+
+
+class FakeEventEngine(object):
+    def register(self, event_type, handler):
+        pass
+
+    def put(self, event):
+        pass
+
+
+class FakeMongoService(object):
+    """
+    前 fail_times 次写入失败, 之后正常写入
+    """
+
+    def __init__(self, fail_times):
+        self.fail_times = fail_times
+        self.saved = []
+
+    def save_tick_data(self, datas):
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            raise IOError("mongodb down")
+        self.saved.extend(datas)
+
+    def save_bar_data(self, datas):
+        self.save_tick_data(datas)
+
+
+def make_engine(monkeypatch, mongo):
+    monkeypatch.setattr(recorder_engine, "load_json", lambda filename: {})
+    monkeypatch.setattr(recorder_engine, "mongo_service_manager", mongo)
+    engine = RecorderEngine(None, FakeEventEngine())
+    engine.close()
+    return engine
+
+
+def test_flush_keeps_batch_on_error(monkeypatch):
+    mongo = FakeMongoService(fail_times=1)
+    engine = make_engine(monkeypatch, mongo)
+
+    engine.buffers["tick"] = [1, 2, 3]
+    engine.flush()
+    assert mongo.saved == []
+    assert engine.buffers["tick"] == [1, 2, 3]
+    # 退避期间不写
+    assert not engine.need_flush()
+
+    # 新来的数据排在后面
+    engine.add_task(("tick", 4))
+    engine.next_retry_time = 0
+    engine.last_flush_time = 0
+    assert engine.need_flush()
+    engine.flush()
+    assert mongo.saved == [1, 2, 3, 4]
+    assert engine.buffers["tick"] == []
+    assert engine.retry_interval == 0
+
+
+def test_buffer_size_limit(monkeypatch):
+    mongo = FakeMongoService(fail_times=100)
+    engine = make_engine(monkeypatch, mongo)
+    engine.max_buffer_size = 5
+
+    engine.buffers["tick"] = list(range(8))
+    engine.flush()
+    # 超过上限丢掉最早的数据
+    assert engine.buffers["tick"] == [3, 4, 5, 6, 7]
+    assert engine.get_stat()["drop_count"] == 3
@@ -0,0 +1,71 @@
+# coding=utf-8
+
+from datetime import datetime, timedelta
+
+from tumbler.constant import Direction
+from tumbler.object import TickData, OrderData, MarketTradeData
+from tumbler.apps.backtester.fill_model import QueueFillModel
+
+
+def make_tick(dt, bid, bid_volume):
+    tick = TickData()
+    tick.symbol = "btc_usdt"
+    tick.exchange = "BINANCE"
+    tick.vt_symbol = "btc_usdt.BINANCE"
+    tick.datetime = dt
+    tick.bid_prices[0] = bid
+    tick.bid_volumes[0] = bid_volume
+    tick.ask_prices[0] = bid + 1
+    tick.ask_volumes[0] = 10
+    return tick
+
+
+def make_order(order_id, price, volume):
+    order = OrderData()
+    order.vt_order_id = order_id
+    order.direction = Direction.LONG.value
+    order.price = price
+    order.volume = volume
+    order.traded = 0
+    return order
+
+
+def test_same_level_orders_share_trade_volume():
+    start = datetime(2021, 1, 1)
+    ticks = [make_tick(start, 100, 2), make_tick(start + timedelta(milliseconds=100), 100, 2)]
+
+    # 两个 tick 之间在买一上主动卖出 7, 先吃掉前面排队的 2, 剩下 5 只够第一个挂单全部成交
+    market_trade = MarketTradeData()
+    market_trade.info_arr = [(100, 7, Direction.SHORT.value, str(start.timestamp() * 1000 + 50))]
+
+    model = QueueFillModel(depth=1)
+    model.prepare(ticks, [market_trade])
+
+    first = make_order("a", 100, 5)
+    second = make_order("b", 100, 5)
+    assert model.match(first, 0, ticks[0], True) == []
+    assert model.match(second, 0, ticks[0], True) == []
+
+    assert model.match(first, 1, ticks[1], False) == [(100, 5)]
+    assert model.match(second, 1, ticks[1], False) == []
+    assert model.get_queue_ahead("b") == 0
+
+
+def test_same_level_partial_fill_in_order():
+    start = datetime(2021, 1, 1)
+    ticks = [make_tick(start, 100, 0), make_tick(start + timedelta(milliseconds=100), 100, 0)]
+
+    market_trade = MarketTradeData()
+    market_trade.info_arr = [(100, 7, Direction.SHORT.value, str(start.timestamp() * 1000 + 50))]
+
+    model = QueueFillModel(depth=1)
+    model.prepare(ticks, [market_trade])
+
+    first = make_order("a", 100, 5)
+    second = make_order("b", 100, 5)
+    model.match(first, 0, ticks[0], True)
+    model.match(second, 0, ticks[0], True)
+
+    # 总成交量不超过市场成交的 7
+    assert model.match(first, 1, ticks[1], False) == [(100, 5)]
+    assert model.match(second, 1, ticks[1], False) == [(100, 2)]
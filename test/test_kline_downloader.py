@@ -0,0 +1,112 @@
+# coding=utf-8
+
+import time
+from datetime import datetime, timedelta
+
+from tumbler.data.download import kline_downloader
+from tumbler.data.download.kline_downloader import KlineDownloader, KlineCheckpoint
+
+MINUTE_MS = 60 * 1000
+
+
+class FakeClient(object):
+    support_range_request = True
+    page_limit = 100
+
+    def __init__(self):
+        self.requests = []
+
+    def get_exchange(self):
+        return "FAKE"
+
+    def get_format_symbol(self, symbol):
+        return symbol
+
+    def get_format_period(self, period):
+        return period
+
+    def make_request(self, symbol, interval, start_dt, end_dt, limit):
+        self.requests.append((start_dt, end_dt))
+        first = (start_dt + MINUTE_MS - 1) // MINUTE_MS * MINUTE_MS
+        return [[t] for t in range(first, end_dt + 1, MINUTE_MS)][:limit]
+
+    def get_bars_from_rows(self, symbol, period, rows):
+        return [int(row[0]) for row in rows]
+
+
+class FakeSaver(object):
+    def __init__(self):
+        self.keys = set()
+
+    def __call__(self, bars, symbol, period):
+        self.keys.update(bars)
+
+
+def to_ms(dt):
+    return int(time.mktime(dt.timetuple()) * 1e3)
+
+
+def make_downloader(tmp_path, monkeypatch):
+    monkeypatch.setattr(kline_downloader, "get_file_path", lambda filename: str(tmp_path / filename))
+    client = FakeClient()
+    saver = FakeSaver()
+    downloader = KlineDownloader(client, saver, max_workers=2, rate=1000, checkpoint=KlineCheckpoint())
+    return downloader, client, saver
+
+
+def test_resume_inside_range(tmp_path, monkeypatch):
+    downloader, client, saver = make_downloader(tmp_path, monkeypatch)
+    start_dt = datetime(2021, 1, 2)
+    end_dt = start_dt + timedelta(minutes=999)
+    downloader.download(["btc_usdt"], "1m", start_dt, end_dt)
+    assert len(saver.keys) == 1000
+    assert downloader.checkpoint.get("FAKE", "btc_usdt", "1m") == [[to_ms(start_dt), to_ms(end_dt)]]
+
+    # 同一区间再下载只补断点之后的部分
+    client.requests = []
+    saver.keys.clear()
+    downloader.download(["btc_usdt"], "1m", start_dt, end_dt + timedelta(minutes=100))
+    assert min(saver.keys) > to_ms(end_dt)
+    assert len(saver.keys) == 100
+
+
+def test_backfill_earlier_range(tmp_path, monkeypatch):
+    downloader, client, saver = make_downloader(tmp_path, monkeypatch)
+    later_dt = datetime(2021, 1, 2)
+    downloader.download(["btc_usdt"], "1m", later_dt, later_dt + timedelta(minutes=499))
+
+    # 补下更早的一段, 不能因为断点在后面而跳过
+    saver.keys.clear()
+    earlier_dt = later_dt - timedelta(days=1)
+    downloader.download(["btc_usdt"], "1m", earlier_dt, earlier_dt + timedelta(minutes=299))
+    assert len(saver.keys) == 300
+    assert min(saver.keys) == to_ms(earlier_dt)
+    assert len(downloader.checkpoint.get("FAKE", "btc_usdt", "1m")) == 2
+
+    # 从更早的地方一直下载到后面的区间, 起点所在的已下载区间跳过, 之后的部分都要下载
+    saver.keys.clear()
+    downloader.download(["btc_usdt"], "1m", earlier_dt, later_dt + timedelta(minutes=499))
+    assert min(saver.keys) == to_ms(earlier_dt) + 300 * MINUTE_MS
+    assert to_ms(later_dt) in saver.keys
+    assert downloader.checkpoint.get("FAKE", "btc_usdt", "1m") == [
+        [to_ms(earlier_dt), to_ms(later_dt + timedelta(minutes=499))]]
+
+
+def test_checkpoint_merge(tmp_path, monkeypatch):
+    monkeypatch.setattr(kline_downloader, "get_file_path", lambda filename: str(tmp_path / filename))
+    checkpoint = KlineCheckpoint()
+    checkpoint.update("FAKE", "btc_usdt", "1m", 100, 199)
+    checkpoint.update("FAKE", "btc_usdt", "1m", 300, 399)
+    assert checkpoint.get_resume_ms("FAKE", "btc_usdt", "1m", 50) == 50
+    assert checkpoint.get_resume_ms("FAKE", "btc_usdt", "1m", 150) == 200
+    assert checkpoint.get_resume_ms("FAKE", "btc_usdt", "1m", 250) == 250
+
+    checkpoint.update("FAKE", "btc_usdt", "1m", 200, 299)
+    assert checkpoint.get("FAKE", "btc_usdt", "1m") == [[100, 399]]
+
+    # 重新读文件, 旧格式 (只有最后时间戳) 忽略
+    checkpoint.data["FAKE|eth_usdt|1m"] = 1000
+    checkpoint.save()
+    checkpoint = KlineCheckpoint()
+    assert checkpoint.get("FAKE", "btc_usdt", "1m") == [[100, 399]]
+    assert checkpoint.get("FAKE", "eth_usdt", "1m") == []
@@ -0,0 +1,38 @@
+# coding=utf-8
+
+import sys
+
+from tumbler.function import lazy
+from tumbler.function.lazy import StrategyClassDict
+
+
+class BaseStrategy(object):
+    pass
+
+
+def write_module(path, source):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(source, encoding="utf-8")
+
+
+def test_imported_class_not_override(tmp_path, monkeypatch):
+    monkeypatch.setattr(lazy, "get_file_path", lambda filename: str(tmp_path / filename))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setitem(sys.modules, "test_base_strategy", sys.modules[__name__])
+
+    header = "from test_base_strategy import BaseStrategy\n"
+    write_module(tmp_path / "pkg_a" / "__init__.py", "")
+    write_module(tmp_path / "pkg_a" / "foo.py", header + "class Foo(BaseStrategy):\n    pass\n")
+    write_module(tmp_path / "pkg_a" / "bar.py", header + "from pkg_a.foo import Foo\n\n\n"
+                                                         "class Bar(BaseStrategy):\n    pass\n")
+    write_module(tmp_path / "pkg_b" / "__init__.py", "")
+    write_module(tmp_path / "pkg_b" / "foo.py", header + "class Foo(BaseStrategy):\n    pass\n")
+
+    classes = StrategyClassDict(BaseStrategy, write_log=lambda msg: None)
+    classes.add_folder(tmp_path / "pkg_a", "pkg_a")
+    classes.add_folder(tmp_path / "pkg_b", "pkg_b")
+
+    # bar.py 里 import 进来的 Foo 不能覆盖后加入的 pkg_b.foo.Foo
+    assert classes["Bar"].__module__ == "pkg_a.bar"
+    assert classes["Foo"].__module__ == "pkg_b.foo"
+    assert sorted(classes.class_module_map.keys()) == ["Bar", "Foo"]
@@ -0,0 +1,70 @@
+# coding=utf-8
+
+import ast
+import os
+
+from tumbler.object import SlotsObject, TickData, TradeData, OrderData, BarData
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 这些变量不是 SlotsObject (请求, 统计对象等), 可以继续用 __dict__
+NOT_SLOTS_NAMES = {
+    "request", "req", "sub", "pos_obj", "daily_result", "auction", "log", "trade_entry", "order"
+}
+# 只在这些文件里是普通对象: tick_engine 回测策略里的 order, 引擎和网关里的 OrderRequest / UnSubscribeRequest
+NOT_SLOTS_FILES = {
+    "order": ("tumbler/apps/backtester/work_tick_engine/",),
+    "req": ("tumbler/apps/cta_strategy/engine.py", "tumbler/apps/alpha_trader/engine.py", "tumbler/gateway/"),
+}
+SKIP_FILES = ("tumbler/object.py", "tumbler/function/mq_codec.py", "tumbler/template/freqcode_template/")
+
+
+def find_dict_uses(path):
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return []
+
+    uses = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Attribute) and node.attr == "__dict__" and isinstance(node.value, ast.Name):
+            uses.append((node.value.id, node.lineno))
+    return uses
+
+
+def test_get_fields_not_dict():
+    for cls in (TickData, TradeData, OrderData, BarData):
+        obj = cls()
+        assert isinstance(obj, SlotsObject)
+        # 固定字段都在 __slots__ 里, __dict__ 只有运行时额外添加的字段
+        assert obj.__dict__ == {}
+        assert obj.get_fields()
+
+    trade = TradeData()
+    trade.extra = 1
+    assert trade.get_fields()["extra"] == 1
+
+
+def test_no_dict_on_slots_objects():
+    errors = []
+    for dir_path, _, file_names in os.walk(os.path.join(ROOT, "tumbler")):
+        for file_name in file_names:
+            if not file_name.endswith(".py"):
+                continue
+            path = os.path.join(dir_path, file_name)
+            rel_path = os.path.relpath(path, ROOT).replace(os.sep, "/")
+            if rel_path.startswith(SKIP_FILES):
+                continue
+
+            for name, lineno in find_dict_uses(path):
+                if name == "self":
+                    continue
+                if name in NOT_SLOTS_NAMES:
+                    prefixes = NOT_SLOTS_FILES.get(name, None)
+                    if prefixes is None or rel_path.startswith(prefixes):
+                        continue
+                errors.append("{}:{} {}.__dict__".format(rel_path, lineno, name))
+
+    assert not errors, "use get_fields() instead of __dict__ on SlotsObject:\n" + "\n".join(errors)
@@ -9,7 +9,6 @@ from tumbler.gate import RabbitmqGateway
 from tumbler.gateway import rest_exchange_map, ws_exchange_map
 
 from tumbler.constant import Exchange
-from tumbler.constant import MAX_PRICE_NUM
 import tumbler.config as config
 from tumbler.object import (
     MergeTickData,
@@ -18,10 +17,12 @@ from tumbler.object import (
     SubscribeRequest
 )
 from tumbler.function import get_vt_key, load_json, datetime_bigger
+from tumbler.function.mq_codec import mq_codec_manager
 from tumbler.service import MQSender
 from tumbler.constant import MQSubscribeType
 from tumbler.apps.data_third_part.base import get_diff_type_exchange_name
 from tumbler.service.log_service import log_service_manager
+from tumbler.service.latency_trace_service import latency_trace_manager
 from tumbler.event import (
     EVENT_TICK_REST,
     EVENT_TICK_WS,
@@ -30,6 +31,8 @@ from tumbler.event import (
     EVENT_BBO_TICK
 )
 
+from .merge_book import MergeDepthBook
+
 
 class Aggregation(object):
     """ 接收行情 并聚合 , 之后存储聚合的行情 """
@@ -51,6 +54,8 @@ class Aggregation(object):
         self.recent_datetime_ticks = {}  # 单个交易所最近的时间，datetime.now()
         self.s_ticks = {}  # single_exchange tick
         self.merge_ticks = {}  # {"btc_usdt.MERGE":MergeTickData.object()}
+        self.merge_book = MergeDepthBook()
+        self.last_merge_times = {}  # {"btc_usdt": time.time()} 最近一次推送合并行情的时间
         self.tot_array_ticks = {}  # {"btc_usdt":{"HUOBI":tick.object()}, "eth_usdt":{"HUOBI":tick.object()}}
 
         self.has_start = False
@@ -64,6 +69,11 @@ class Aggregation(object):
         self.flag_produce_single_ticks = data.get("produce_ticks", False)
         self.flag_send_ws_ticks = data.get("produce_direct_ticks", False)
 
+        # merge_on_change: 盘口变化时就推送合并行情, 同一个 symbol 两次推送至少间隔 merge_min_interval 秒
+        # 否则每秒推送一次
+        self.flag_merge_on_change = data.get("merge_on_change", False)
+        self.merge_min_interval = data.get("merge_min_interval", 0.2)
+
         self.symbols = data["symbols"]
         self.exchanges_dict = data["exchanges"]
         self.in_server_stop_exchanges = data.get("in_server_stop_exchanges", [])
@@ -75,6 +85,7 @@ class Aggregation(object):
             tick.datetime = datetime.now()
             tick.gateway_name = Exchange.AGGREGATION.value
             self.merge_ticks[symbol] = tick
+            self.merge_book.add_symbol(symbol)
 
             if self.flag_produce_merge:
                 queue_exchange_name = get_diff_type_exchange_name(MQSubscribeType.MERGE_TICKER.value, tick.vt_symbol)
@@ -147,7 +158,7 @@ class Aggregation(object):
 
         self.active = True
         self.has_start = True
-        self._thread = Thread(target=self.produce_ticks())
+        self._thread = Thread(target=self.produce_ticks)
         self._thread.start()
 
     def connect(self):
@@ -212,9 +223,10 @@ class Aggregation(object):
                 if pre_datetime and tick.datetime >= pre_datetime + timedelta(seconds=1):
                     if self.flag_produce_single_ticks:
                         sender = self.mq_single_sender_dict[tick.vt_symbol]
-                        sender.send("", tick.get_mq_msg())
+                        msg = tick.get_mq_msg()
+                        sender.send("", msg)
 
-                        log_service_manager.write_log("[process_ticks] tick:{}".format(tick.get_mq_msg()))
+                        log_service_manager.write_log("[process_ticks] tick:{}".format(mq_codec_manager.to_text(msg)))
 
                     self.recent_datetime_ticks[tick.vt_symbol] = tick.datetime
 
@@ -230,14 +242,24 @@ class Aggregation(object):
 
                 if datetime_bigger(tick.datetime, bef_tick.datetime):
                     dic[tick.exchange] = copy(tick)
+                    self.merge_book.update_tick(tick)
+
+                    if self.flag_produce_merge and self.flag_merge_on_change:
+                        self.try_publish_merge_tick(tick.symbol)
 
     def produce_ticks(self):
+        interval = self.merge_min_interval if self.flag_merge_on_change else 1
+        last_bbo_time = 0
         while self.active:
             if self.flag_produce_merge:
-                self.produce_merge_ticks()
-            if self.flag_produce_bbo:
+                if self.flag_merge_on_change:
+                    self.produce_changed_merge_ticks()
+                else:
+                    self.produce_merge_ticks()
+            if self.flag_produce_bbo and time.time() - last_bbo_time >= 1:
+                last_bbo_time = time.time()
                 self.produce_bbo_ticks()
-            time.sleep(1)
+            time.sleep(interval)
 
     def produce_bbo_ticks(self):
         b_ticks = {}  # bbo_ticks
@@ -259,49 +281,45 @@ class Aggregation(object):
             self.process_record_bbo_tick(bbo)
 
     def produce_merge_ticks(self):
+        """
+        每秒推送所有 symbol 的合并行情, 只有盘口变化过的 symbol 才重新合并
+        """
         for symbol in self.tot_array_ticks.keys():
-            merge_tick = self.merge_ticks.get(symbol, None)
-            if merge_tick is None:
-                continue
-
-            last_datetime = None
-            dic = self.tot_array_ticks[symbol]
-
-            to_sort_bids_arr = []  # (price,volume,exchange)
-            to_sort_asks_arr = []  # (price,volume,exchange)
-            for exchange in dic.keys():
-                vt = dic[exchange]
-                if not last_datetime or datetime_bigger(vt.datetime, last_datetime):
-                    last_datetime = vt.datetime
-
-                if vt.bid_prices[0] > 0:
-                    ll = len(vt.bid_prices)
-                    for i in range(ll):
-                        if vt.bid_prices[i] > 0:
-                            to_sort_bids_arr.append((vt.bid_prices[i], vt.bid_volumes[i], vt.exchange))
-
-                        if vt.ask_prices[i] > 0:
-                            to_sort_asks_arr.append((vt.ask_prices[i], vt.ask_volumes[i], vt.exchange))
-
-            if len(to_sort_bids_arr) == 0:
-                continue
-
-            to_sort_bids_arr.sort(reverse=True)
-            to_sort_asks_arr.sort(reverse=False)
-
-            for i in range(min(MAX_PRICE_NUM, len(to_sort_bids_arr))):
-                merge_tick.bids[i] = to_sort_bids_arr[i]
-
-            for i in range(min(MAX_PRICE_NUM, len(to_sort_asks_arr))):
-                merge_tick.asks[i] = to_sort_asks_arr[i]
+            if self.merge_book.is_dirty(symbol):
+                self.publish_merge_tick(symbol)
+            else:
+                merge_tick = self.merge_book.get_merge_tick(symbol)
+                if merge_tick is not None:
+                    self.on_merge_tick(merge_tick)
+
+    def produce_changed_merge_ticks(self):
+        """
+        推送因为 merge_min_interval 限制还没有推送的变化
+        """
+        for symbol in self.merge_book.get_dirty_symbols():
+            self.try_publish_merge_tick(symbol)
+
+    def try_publish_merge_tick(self, symbol):
+        if time.time() - self.last_merge_times.get(symbol, 0) >= self.merge_min_interval:
+            self.publish_merge_tick(symbol)
+
+    def publish_merge_tick(self, symbol):
+        merge_tick = self.merge_book.merge(symbol)
+        if merge_tick is None:
+            return
 
-            merge_tick.datetime = last_datetime
-            self.merge_ticks[symbol] = merge_tick
+        self.last_merge_times[symbol] = time.time()
+        self.merge_ticks[symbol] = merge_tick
+        self.on_merge_tick(merge_tick)
 
-            e = Event(EVENT_MERGE_TICK, copy(merge_tick))
-            self.event_engine.put(e)
+    def on_merge_tick(self, merge_tick: MergeTickData):
+        # 合并行情每次都是新对象, 推送后不再修改, 订阅者共享同一个对象
+        if latency_trace_manager.enabled:
+            latency_trace_manager.stamp_put(merge_tick)
+        e = Event(EVENT_MERGE_TICK, merge_tick)
+        self.event_engine.put(e)
 
-            self.process_record_merge_tick(merge_tick)
+        self.process_record_merge_tick(merge_tick)
 
     def process_record_bbo_tick(self, bbo_ticker: BBOTickData):
         if self.flag_produce_bbo:
@@ -20,11 +20,11 @@ from tumbler.event import (
 
 
 def print_tick(e):
-    print("tick:", e.data.__dict__)
+    print("tick:", e.data.get_fields())
 
 
 def print_merge_tick(e):
-    print("merge:", e.data.__dict__)
+    print("merge:", e.data.get_fields())
 
 
 def print_log(e):
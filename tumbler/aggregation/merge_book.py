@@ -0,0 +1,89 @@
+# coding=utf-8
+
+import heapq
+from itertools import islice
+from threading import Lock
+
+from tumbler.constant import MAX_PRICE_NUM, Exchange
+from tumbler.function import get_vt_key, datetime_bigger
+from tumbler.object import MergeTickData
+
+EMPTY_DEPTH_LEVEL = (0.0, 0.0, "")
+
+
+class MergeDepthBook(object):
+    """
+    多交易所合并盘口
+    1. 收到 tick 时把该交易所的买卖盘整理成有序数组 [(price, volume, exchange)]
+    2. 合并时对各交易所的有序数组做 k 路堆归并, 只取前 depth 档
+    3. 只有 tick 变化过的 symbol (dirty) 才需要重新合并, 否则直接用上次的结果
+    排序规则与原来全量 sort 一致: 买盘按 (price, volume, exchange) 降序, 卖盘升序
+    """
+
+    def __init__(self, depth=MAX_PRICE_NUM):
+        self.depth = depth
+        self.books = {}  # {"btc_usdt": {"HUOBI": (datetime, bids, asks)}}
+        self.merge_ticks = {}  # {"btc_usdt": MergeTickData}
+        self.dirty_symbols = set([])
+        self.lock = Lock()
+
+    def add_symbol(self, symbol):
+        self.books.setdefault(symbol, {})
+
+    def update_tick(self, tick):
+        book = self.books.get(tick.symbol, None)
+        if book is None:
+            return
+
+        exchange = tick.exchange
+        bids = [(price, volume, exchange) for price, volume in zip(tick.bid_prices, tick.bid_volumes) if price > 0]
+        if bids:
+            asks = [(price, volume, exchange) for price, volume in zip(tick.ask_prices, tick.ask_volumes) if price > 0]
+        else:
+            asks = []
+        # 交易所推送的盘口本身有序, 这里的排序是线性的, 只是为了保证堆归并的前提
+        bids.sort(reverse=True)
+        asks.sort()
+
+        with self.lock:
+            book[exchange] = (tick.datetime, bids, asks)
+            self.dirty_symbols.add(tick.symbol)
+
+    def is_dirty(self, symbol):
+        return symbol in self.dirty_symbols
+
+    def get_dirty_symbols(self):
+        with self.lock:
+            return list(self.dirty_symbols)
+
+    def get_merge_tick(self, symbol):
+        return self.merge_ticks.get(symbol, None)
+
+    def merge(self, symbol):
+        """
+        重新合并 symbol 的盘口, 没有买盘时返回 None
+        """
+        with self.lock:
+            self.dirty_symbols.discard(symbol)
+            depths = list(self.books.get(symbol, {}).values())
+
+        last_datetime = None
+        for _datetime, bids, asks in depths:
+            if not last_datetime or datetime_bigger(_datetime, last_datetime):
+                last_datetime = _datetime
+
+        bids = list(islice(heapq.merge(*[x[1] for x in depths], reverse=True), self.depth))
+        if not bids:
+            return None
+        asks = list(islice(heapq.merge(*[x[2] for x in depths]), self.depth))
+
+        merge_tick = MergeTickData()
+        merge_tick.symbol = symbol
+        merge_tick.vt_symbol = get_vt_key(symbol, Exchange.AGGREGATION.value)
+        merge_tick.gateway_name = Exchange.AGGREGATION.value
+        merge_tick.bids = bids + [EMPTY_DEPTH_LEVEL] * (self.depth - len(bids))
+        merge_tick.asks = asks + [EMPTY_DEPTH_LEVEL] * (self.depth - len(asks))
+        merge_tick.datetime = last_datetime
+
+        self.merge_ticks[symbol] = merge_tick
+        return merge_tick
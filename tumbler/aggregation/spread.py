@@ -13,6 +13,7 @@ from tumbler.event import (
 from tumbler.constant import MQSubscribeType
 from tumbler.apps.data_third_part.base import get_diff_type_exchange_name
 from tumbler.function import load_json
+from tumbler.function.mq_codec import mq_codec_manager
 from tumbler.service import MQSender, log_service_manager
 from tumbler.object import FutureSpotSpread
 
@@ -81,9 +82,11 @@ class Spread(Aggregation):
                 fs.get_from_merge_tick(merge_tick)
 
                 if self.sender is not None:
-                    self.sender.send("", fs.get_mq_msg())
+                    msg = fs.get_mq_msg()
+                    self.sender.send("", msg)
 
-                    log_service_manager.write_log("[produce_merge_ticks] spread_msg:{}".format(fs.get_mq_msg()))
+                    log_service_manager.write_log("[produce_merge_ticks] spread_msg:{}".format(
+                        mq_codec_manager.to_text(msg)))
 
                 e = Event(EVENT_SPREAD, fs)
                 self.event_engine.put(e)
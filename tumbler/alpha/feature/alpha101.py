@@ -26,14 +26,11 @@ def run():
     mysql_service_manager = MysqlService.get_mysql_service()
     symbols = mysql_service_manager.get_mysql_distinct_symbol(table=MysqlService.get_kline_table(Interval.DAY.value))
 
-    bars = mysql_service_manager.get_bars(symbols=[], period=Interval.DAY.value,
-                                          start_datetime=datetime(2017, 1, 1),
-                                          end_datetime=datetime.now() + timedelta(hours=10),
-                                          sort_way="symbol")
-
-    bars = BarData.suffix_filter(bars, suffix="_usdt")
-
-    df = BarData.get_pandas_from_bars(bars)
+    df = mysql_service_manager.get_bars_to_pandas_data(symbols=[], period=Interval.DAY.value,
+                                                       start_datetime=datetime(2017, 1, 1),
+                                                       end_datetime=datetime.now() + timedelta(hours=10),
+                                                       sort_way="symbol")
+    df = BarData.suffix_filter_df(df, suffix="_usdt")
     df = df.set_index(["symbol", "datetime"]).sort_index()
 
     alpha_obj = Alphas(df)
@@ -50,11 +50,11 @@ def run(bench_symbol="btc_usdt", beta_arrs=[30, 60, 90, 180, 365], suffix="_usdt
                                                 end_datetime=datetime.now() + timedelta(hours=10),
                                                 sort_way="symbol")
     bench_bars.sort()
+    bars_dict = mysql_service_manager.get_bars_dict(symbols=symbols, period=Interval.DAY.value,
+                                                    start_datetime=datetime(2017, 1, 1),
+                                                    end_datetime=datetime.now() + timedelta(hours=10))
     for symbol in symbols:
-        bars = mysql_service_manager.get_bars(symbols=[symbol], period=Interval.DAY.value,
-                                              start_datetime=datetime(2017, 1, 1),
-                                              end_datetime=datetime.now() + timedelta(hours=10),
-                                              sort_way="symbol")
+        bars = bars_dict.get(symbol, [])
         bars.sort()
 
         ori_df = get_same_period_df(bench_bars, bars)
@@ -31,20 +31,16 @@ def run():
     mysql_service_manager = MysqlService.get_mysql_service()
     symbols = mysql_service_manager.get_mysql_distinct_symbol(table=MysqlService.get_kline_table(Interval.DAY.value))
 
-    bars = mysql_service_manager.get_bars(symbols=[], period=Interval.DAY.value,
-                                          start_datetime=datetime(2017, 1, 1),
-                                          end_datetime=datetime.now() + timedelta(hours=10),
-                                          sort_way="symbol")
-
-    bars = BarData.suffix_filter(bars, suffix="_usdt")
+    df = mysql_service_manager.get_bars_to_pandas_data(symbols=[], period=Interval.DAY.value,
+                                                       start_datetime=datetime(2017, 1, 1),
+                                                       end_datetime=datetime.now() + timedelta(hours=10),
+                                                       sort_way="symbol")
+    df = BarData.suffix_filter_df(df, suffix="_usdt")
 
     # bars = mysql_service_manager.get_bars(symbols=["bnb_usdt"], period=Interval.DAY.value,
     #                                       start_datetime=datetime(2017, 1, 1),
     #                                       end_datetime=datetime.now() + timedelta(hours=10),
     #                                       sort_way="symbol")
-    bars.sort()
-
-    df = BarData.get_pandas_from_bars(bars)
     df = df.set_index(["symbol", "datetime"]).sort_index().reset_index()
     # df.to_csv("test.csv")
     # Technique.er(am.close_array, 20)
@@ -0,0 +1,279 @@
+# coding=utf-8
+
+import sys
+import json
+import time
+import asyncio
+from threading import Thread, Lock, get_ident
+
+import aiohttp
+
+from tumbler.function.latency import LatencyHistogram
+
+from .rest_client import Request, RequestStatus, RestClient
+
+
+class AsyncResponse(object):
+    """
+    与 requests.Response 常用接口一致: status_code / text / headers / json()
+    """
+
+    def __init__(self, status_code, text, headers, url):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers
+        self.url = url
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class TokenBucket(object):
+    """
+    令牌桶, 每秒补充 rate 个令牌, 最多存 capacity 个
+    acquire 总是扣一个令牌, 不够时返回需要等待的秒数 (令牌可以预支成负数, 保证先到先得)
+    只在事件循环线程里使用, 不需要加锁
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.tokens = self.capacity
+        self.last_time = time.monotonic()
+
+    def acquire(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_time) * self.rate)
+        self.last_time = now
+
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0
+        return -self.tokens / self.rate
+
+
+def convert_params(params):
+    """
+    按 requests 的规则处理 query 参数: 去掉 None, list 展开成多个同名参数, 值转成字符串
+    """
+    if not isinstance(params, dict):
+        return params
+
+    arr = []
+    for k, v in params.items():
+        if v is None:
+            continue
+        if isinstance(v, (list, tuple)):
+            for x in v:
+                arr.append((k, x.decode("utf-8") if isinstance(x, bytes) else str(x)))
+        else:
+            arr.append((k, v.decode("utf-8") if isinstance(v, bytes) else str(v)))
+    return arr
+
+
+def get_skip_auto_headers(data, headers):
+    """
+    requests 发送字符串 body 时不带 Content-Type, aiohttp 会自动加 text/plain, 这里保持 requests 的行为
+    """
+    if isinstance(data, (str, bytes)):
+        if not headers or not any(k.lower() == "content-type" for k in headers):
+            return ("Content-Type",)
+    return None
+
+
+class AsyncRestClient(RestClient):
+    """
+    asyncio 版本的 RestClient, 接口与 RestClient 相同 (add_request / direct_request / request / sign / 回调),
+    rest_trade_api 只需要把父类换成 AsyncRestClient
+
+    * 单独线程运行事件循环, 所有请求共用一个 aiohttp.ClientSession, 按 host 保持长连接
+    * max_in_flight 限制同时在途的请求数
+    * set_rate_limit 按路径前缀设置令牌桶限频
+    * get_latency_stat 返回每个路径的延迟统计 (毫秒)
+    回调在事件循环线程里执行, 回调里不要做耗时操作
+    """
+
+    def __init__(self, max_in_flight=50, max_connections_per_host=20, keepalive_timeout=60, timeout=15):
+        super(AsyncRestClient, self).__init__()
+        self.max_in_flight = max_in_flight
+        self.max_connections_per_host = max_connections_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+
+        self.proxy = None
+
+        self._loop = None
+        self._loop_thread = None
+        self._loop_thread_ident = None
+        self._loop_lock = Lock()
+        self._session = None
+        self._semaphore = None
+
+        self.rate_limits = {}  # {path_prefix: TokenBucket}
+        self._path_limit_cache = {}  # {path: TokenBucket or None}
+        self.latency_dict = {}  # {path: LatencyHistogram}
+
+    def init(self, url_base, proxy_host="", proxy_port=0):
+        super(AsyncRestClient, self).init(url_base, proxy_host, proxy_port)
+        if proxy_host and proxy_port:
+            self.proxy = "http://{}:{}".format(proxy_host, proxy_port)
+
+    def set_rate_limit(self, path_prefix, rate, capacity=None):
+        """
+        路径以 path_prefix 开头的请求每秒最多 rate 个, 匹配最长的前缀
+        """
+        self.rate_limits[path_prefix] = TokenBucket(rate, capacity)
+        self._path_limit_cache.clear()
+
+    def get_rate_limit(self, path):
+        if path in self._path_limit_cache:
+            return self._path_limit_cache[path]
+
+        bucket = None
+        prefix_len = -1
+        for prefix, b in self.rate_limits.items():
+            if path.startswith(prefix) and len(prefix) > prefix_len:
+                bucket = b
+                prefix_len = len(prefix)
+        if len(self._path_limit_cache) > 10000:
+            self._path_limit_cache.clear()
+        self._path_limit_cache[path] = bucket
+        return bucket
+
+    def get_latency_stat(self):
+        return {path: hist.get_stat() for path, hist in list(self.latency_dict.items())}
+
+    def start(self):
+        if self._active:
+            return
+        self._active = True
+        self._ensure_loop()
+
+    def stop(self):
+        self._active = False
+        with self._loop_lock:
+            loop = self._loop
+            if loop is None:
+                return
+            self._loop = None
+
+        asyncio.run_coroutine_threadsafe(self._close_session(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        self._loop_thread.join()
+        loop.close()
+
+    def join(self):
+        for task in list(self._tasks):
+            task.result()
+
+    def _ensure_loop(self):
+        with self._loop_lock:
+            if self._loop is not None:
+                return self._loop
+
+            loop = asyncio.new_event_loop()
+            self._loop_thread = Thread(target=self._run_loop, args=(loop,), daemon=True)
+            self._loop_thread.start()
+            asyncio.run_coroutine_threadsafe(self._init_session(), loop).result()
+            self._loop = loop
+            return loop
+
+    def _run_loop(self, loop):
+        self._loop_thread_ident = get_ident()
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+    async def _init_session(self):
+        connector = aiohttp.TCPConnector(limit=0, limit_per_host=self.max_connections_per_host,
+                                         keepalive_timeout=self.keepalive_timeout)
+        self._session = aiohttp.ClientSession(connector=connector,
+                                              timeout=aiohttp.ClientTimeout(total=self.timeout))
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+
+    async def _close_session(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _send(self, request):
+        """
+        限频 -> 获取并发名额 -> 签名发送, 返回 AsyncResponse
+        """
+        path = request.path.split("?", 1)[0]
+        bucket = self.get_rate_limit(path)
+        if bucket is not None:
+            wait = bucket.acquire()
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+        async with self._semaphore:
+            request = self.sign(request)
+            url = self.make_full_url(request.path)
+
+            start = time.time()
+            async with self._session.request(request.method, url, headers=request.headers,
+                                             params=convert_params(request.params), data=request.data,
+                                             skip_auto_headers=get_skip_auto_headers(request.data, request.headers),
+                                             proxy=self.proxy) as resp:
+                text = await resp.text()
+            cost = (time.time() - start) * 1000.0
+
+        hist = self.latency_dict.get(path, None)
+        if hist is None:
+            hist = self.latency_dict[path] = LatencyHistogram()
+        hist.add(cost)
+
+        return request, AsyncResponse(resp.status, text, resp.headers, url)
+
+    async def _process_request_async(self, request):
+        try:
+            request, response = await self._send(request)
+            self._process_requst_finished(request, response)
+        except Exception:
+            request.status = RequestStatus.error
+            t, v, tb = sys.exc_info()
+            if request.on_error:
+                request.on_error(t, v, tb, request)
+            else:
+                self.on_error(t, v, tb, request)
+
+    def add_request(self, method, path, callback, params=None, data=None, headers=None, on_failed=None, on_error=None,
+                    extra=None):
+        request = Request(method=method, path=path, params=params, data=data, headers=headers,
+                          callback=callback, on_failed=on_failed, on_error=on_error, extra=extra)
+
+        loop = self._ensure_loop()
+        task = asyncio.run_coroutine_threadsafe(self._process_request_async(request), loop)
+        task.add_done_callback(self._clean_finished_tasks)
+        self._push_task(task)
+        return request
+
+    def _clean_finished_tasks(self, result):
+        with self._tasks_lock:
+            self._tasks = [i for i in self._tasks if not i.done()]
+
+    def direct_request(self, method, path, callback, params=None, data=None, headers=None, on_failed=None,
+                       on_error=None,
+                       extra=None):
+        if get_ident() == self._loop_thread_ident:
+            # 回调里同步请求会卡住事件循环, 退回 requests
+            return super(AsyncRestClient, self).direct_request(method, path, callback, params, data, headers,
+                                                               on_failed, on_error, extra)
+        try:
+            request = Request(method=method, path=path, params=params, data=data, headers=headers,
+                              callback=callback, on_failed=on_failed, on_error=on_error, extra=extra)
+            loop = self._ensure_loop()
+            request, response = asyncio.run_coroutine_threadsafe(self._send(request), loop).result()
+            self._process_requst_finished(request, response)
+            return request
+        except Exception as ex:
+            print("[direct_request] ex:{}".format(ex))
+
+    def request(self, method, path, params=None, data=None, headers=None):
+        if get_ident() == self._loop_thread_ident:
+            return super(AsyncRestClient, self).request(method, path, params, data, headers)
+
+        request = Request(method, path, params, data, headers)
+        loop = self._ensure_loop()
+        request, response = asyncio.run_coroutine_threadsafe(self._send(request), loop).result()
+        return response
@@ -0,0 +1,318 @@
+# coding=utf-8
+
+import sys
+import time
+import asyncio
+from concurrent.futures import CancelledError
+from threading import Thread, Lock, get_ident
+
+import aiohttp
+
+from tumbler.service.log_service import log_service_manager
+from tumbler.service.latency_trace_service import latency_trace_manager
+
+from .websocket_client import WebsocketClient
+
+
+class WebsocketLoop(object):
+    """
+    所有 AsyncWebsocketClient 共用的事件循环线程
+    1. 一个线程一个 asyncio 事件循环, 复用一个 aiohttp.ClientSession, 所有交易所连接都在这里收发
+    2. 收到的消息先放进 pending, 每轮事件循环统一调用一次 _dispatch_pending, 批量执行 unpack_data / on_packet
+    """
+
+    def __init__(self):
+        self.loop = None
+        self.session = None
+        self._thread = None
+        self._thread_ident = None
+        self._lock = Lock()
+
+        self.clients = []
+        self.pending = []
+
+        self.batch_count = 0
+        self.dispatch_count = 0
+
+    def ensure_loop(self):
+        with self._lock:
+            if self.loop is not None:
+                return self.loop
+
+            loop = asyncio.new_event_loop()
+            self._thread = Thread(target=self._run, args=(loop,), daemon=True)
+            self._thread.start()
+            asyncio.run_coroutine_threadsafe(self._init_session(), loop).result()
+            self.loop = loop
+            return loop
+
+    def _run(self, loop):
+        self._thread_ident = get_ident()
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+    async def _init_session(self):
+        self.session = aiohttp.ClientSession()
+
+    def in_loop_thread(self):
+        return get_ident() == self._thread_ident
+
+    def call(self, coro):
+        """
+        在事件循环里执行协程, 可以从任意线程调用, 返回 concurrent.futures.Future 或者 asyncio.Task
+        """
+        loop = self.ensure_loop()
+        if self.in_loop_thread():
+            return loop.create_task(coro)
+        return asyncio.run_coroutine_threadsafe(coro, loop)
+
+    def add_client(self, client):
+        with self._lock:
+            if client not in self.clients:
+                self.clients.append(client)
+
+    def remove_client(self, client):
+        with self._lock:
+            if client in self.clients:
+                self.clients.remove(client)
+
+    def dispatch(self, client, data):
+        recv_time = time.perf_counter() if latency_trace_manager.enabled else None
+        self.pending.append((client, data, recv_time))
+        if len(self.pending) == 1:
+            self.loop.call_soon(self._dispatch_pending)
+
+    def _dispatch_pending(self):
+        pending = self.pending
+        self.pending = []
+        for client, data, recv_time in pending:
+            if recv_time is not None:
+                latency_trace_manager.mark_recv(recv_time)
+            client.process_data(data)
+
+        self.batch_count += 1
+        self.dispatch_count += len(pending)
+
+    def get_stat(self):
+        """
+        每个连接的消息速率和重连次数, 以及批量分发的平均批大小
+        """
+        with self._lock:
+            clients = list(self.clients)
+        return {
+            "connections": [client.get_stat() for client in clients],
+            "avg_batch_size": self.dispatch_count / self.batch_count if self.batch_count else 0.0
+        }
+
+
+ws_loop_manager = WebsocketLoop()
+
+
+class AsyncWebsocketClient(WebsocketClient):
+    """
+    接口和回调与 WebsocketClient 相同 (init / start / stop / join / send_packet / unpack_data /
+    on_connected / on_disconnected / on_packet / on_error), 网关的 ws api 把父类换成 AsyncWebsocketClient 即可
+
+    * 连接不再单独占用接收线程和 ping 线程, 全部跑在 ws_loop_manager 的事件循环上, ping 由 aiohttp heartbeat 完成
+    * 断线后按 1, 2, 4 ... 30 秒退避重连
+    * subscribe_packet / unsubscribe_packet 增量订阅, 不需要重建连接, 重连后自动重发已有的订阅
+      订阅消息先经过 merge_packets 合并, 再按 send_rate_limit 限频发送, 避免超过交易所的消息频率限制
+    * get_stat 返回消息速率和重连次数
+    回调都在事件循环线程里执行, 回调里不要做耗时操作
+    """
+
+    max_reconnect_interval = 30
+    send_rate_limit = 0  # 每秒最多发送的订阅消息数, 0 表示不限制
+
+    def __init__(self):
+        super(AsyncWebsocketClient, self).__init__()
+        self._task = None
+        self.subscriptions = {}  # {key: packet}
+        self._pending_packets = []
+        self._flush_task = None
+        self._last_send_time = 0
+
+        self.connect_count = 0
+        self.msg_count = 0
+        self.last_stat_time = time.time()
+        self.last_stat_msg_count = 0
+
+    @property
+    def connected(self):
+        return self._ws is not None
+
+    def get_name(self):
+        return "{}({})".format(self.__class__.__name__, self.host)
+
+    def get_stat(self):
+        now = time.time()
+        msg_count = self.msg_count
+        rate = (msg_count - self.last_stat_msg_count) / max(now - self.last_stat_time, 1e-6)
+        self.last_stat_time = now
+        self.last_stat_msg_count = msg_count
+        return {
+            "name": self.get_name(),
+            "connected": self.connected,
+            "messages": msg_count,
+            "msg_rate": rate,
+            "reconnects": max(self.connect_count - 1, 0)
+        }
+
+    def start(self):
+        if self._active:
+            return
+        self._active = True
+        ws_loop_manager.add_client(self)
+        self._task = ws_loop_manager.call(self._run_async())
+
+    def stop(self):
+        self._active = False
+        ws_loop_manager.remove_client(self)
+        task = self._task
+        if task is not None:
+            ws_loop_manager.loop.call_soon_threadsafe(task.cancel)
+
+    def join(self):
+        task = self._task
+        if task is None or isinstance(task, asyncio.Task) or ws_loop_manager.in_loop_thread():
+            return
+        try:
+            task.result()
+        except (CancelledError, asyncio.CancelledError):
+            pass
+
+    def subscribe_packet(self, key, packet):
+        """
+        增量订阅, 已连接时放进发送队列, 重连后自动重发
+        """
+        self.subscriptions[key] = packet
+        if self.connected:
+            ws_loop_manager.call(self._queue_packets([packet]))
+
+    def unsubscribe_packet(self, key, packet=None):
+        self.subscriptions.pop(key, None)
+        if packet is not None and self.connected:
+            ws_loop_manager.call(self._queue_packets([packet]))
+
+    def merge_packets(self, packets):
+        """
+        把待发送的订阅消息合并成尽量少的几条, 子类按交易所的格式重写, 默认不合并
+        """
+        return packets
+
+    async def _queue_packets(self, packets, replace=False):
+        if replace:
+            self._pending_packets = list(packets)
+        else:
+            self._pending_packets.extend(packets)
+        if self._pending_packets and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.ensure_future(self._flush_packets())
+
+    async def _flush_packets(self):
+        """
+        限频期间新加入的订阅消息会和还没发出去的合并到一起
+        """
+        while self._pending_packets and self.connected:
+            packets = self.merge_packets(self._pending_packets)
+            self._pending_packets = []
+            for i, packet in enumerate(packets):
+                if self.send_rate_limit:
+                    wait = self._last_send_time + 1.0 / self.send_rate_limit - time.monotonic()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    self._last_send_time = time.monotonic()
+                if not self.connected:
+                    break
+                self._safe_call(self.send_packet, packet)
+                if self._pending_packets:
+                    # 等待期间有新的订阅, 和剩下的一起重新合并
+                    self._pending_packets = packets[i + 1:] + self._pending_packets
+                    break
+
+    def _send_text(self, text):
+        ws = self._ws
+        if ws is not None:
+            ws_loop_manager.call(ws.send_str(text))
+
+    def _send_binary(self, data):
+        ws = self._ws
+        if ws is not None:
+            ws_loop_manager.call(ws.send_bytes(data))
+
+    def _disconnect(self):
+        ws = self._ws
+        if ws is not None:
+            ws_loop_manager.call(ws.close())
+
+    def _ping(self):
+        pass
+
+    def _safe_call(self, func, *args):
+        try:
+            func(*args)
+        except Exception:  # noqa
+            et, ev, tb = sys.exc_info()
+            self.on_error(et, ev, tb)
+
+    async def _run_async(self):
+        reconnect_interval = 1
+        proxy = None
+        if self.proxy_host and self.proxy_port:
+            proxy = "http://{}:{}".format(self.proxy_host, self.proxy_port)
+
+        try:
+            while self._active:
+                try:
+                    ws = await ws_loop_manager.session.ws_connect(self.host, headers=self.header, proxy=proxy,
+                                                                  heartbeat=self.ping_interval, max_msg_size=0)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as ex:
+                    log_service_manager.write_log("[AsyncWebsocketClient] {} connect failed:{}".format(
+                        self.get_name(), ex))
+                    await asyncio.sleep(reconnect_interval)
+                    reconnect_interval = min(reconnect_interval * 2, self.max_reconnect_interval)
+                    continue
+
+                reconnect_interval = 1
+                self._ws = ws
+                self.connect_count += 1
+                self._safe_call(self.on_connected)
+                # 断线前还没发出去的消息不再需要, 重发当前全部订阅
+                await self._queue_packets(self.subscriptions.values(), replace=True)
+
+                try:
+                    async for msg in ws:
+                        if msg.type == aiohttp.WSMsgType.TEXT or msg.type == aiohttp.WSMsgType.BINARY:
+                            ws_loop_manager.dispatch(self, msg.data)
+                        elif msg.type == aiohttp.WSMsgType.ERROR:
+                            break
+                finally:
+                    self._ws = None
+                    await ws.close()
+                    self._safe_call(self.on_disconnected)
+
+                if self._active:
+                    await asyncio.sleep(reconnect_interval)
+        except asyncio.CancelledError:
+            pass
+
+    def process_data(self, data):
+        """
+        由 ws_loop_manager 批量调用
+        """
+        self.msg_count += 1
+        try:
+            if isinstance(data, str):
+                self._record_last_received_text(data)
+            try:
+                packet = self.unpack_data(data)
+            except ValueError as e:
+                log_service_manager.write_log("websocket unable to parse data: {}".format(data))
+                raise e
+
+            self.on_packet(packet)
+        except Exception:  # noqa
+            et, ev, tb = sys.exc_info()
+            self.on_error(et, ev, tb)
+            self._disconnect()
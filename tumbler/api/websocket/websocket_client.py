@@ -10,6 +10,7 @@ from threading import Lock, Thread
 from time import sleep
 
 from tumbler.service.log_service import log_service_manager
+from tumbler.service.latency_trace_service import latency_trace_manager
 
 
 class WebsocketClient(object):
@@ -191,6 +192,9 @@ class WebsocketClient(object):
                             self._disconnect()
                             continue
 
+                        if latency_trace_manager.enabled:
+                            latency_trace_manager.mark_recv()
+
                         self._record_last_received_text(text)
 
                         try:
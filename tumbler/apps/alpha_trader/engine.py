@@ -1,7 +1,5 @@
 # coding=utf-8
 
-import importlib
-import os
 import traceback
 from pathlib import Path
 from collections import defaultdict
@@ -36,6 +34,8 @@ from tumbler.apps.alpha_trader.base import (
     APP_NAME
 )
 from tumbler.function.convert import PositionHolding
+from tumbler.function.lazy import StrategyClassDict
+from tumbler.function.stop_order_book import StopOrderBook
 from tumbler.service.log_service import log_service_manager
 from tumbler.apps.cta_strategy.engine import get_symbol_bars, STOP_ORDER_PREFIX
 from tumbler.aggregation.bbo_aggregation import BBOApiTickerProducer
@@ -51,7 +51,7 @@ class AlphaEngine(BaseEngine):
 
         self.strategy_setting = {}  # strategy_name: dict
 
-        self.classes = {}  # class_name: stategy_class
+        self.classes = StrategyClassDict(AlphaTemplate, self.write_log)  # class_name: stategy_class, 用到时才 import
         self.strategies = {}  # strategy_name: strategy
 
         self.symbol_strategy_map = defaultdict(list)  # vt_symbol: strategy list
@@ -59,7 +59,7 @@ class AlphaEngine(BaseEngine):
         self.order_id_strategy_map = {}  # vt_order_id: strategy
 
         self.stop_order_count = 0  # for generating stop_order_id
-        self.stop_orders = {}  # stop_order_id: stop_order
+        self.stop_orders = StopOrderBook()  # stop_order_id: stop_order, 按 vt_symbol 和价格索引
 
         # 下面这个  strategy_order_id_map 存在一直变大的情况
         self.strategy_order_id_map = defaultdict(set)  # strategy_name: order_id list
@@ -196,33 +196,15 @@ class AlphaEngine(BaseEngine):
 
     def load_strategy_class_from_folder(self, path, module_name=""):
         """
-        Load strategy class from certain folder.
+        Index strategy class in certain folder, the module is imported when the class is used.
         """
-        for dirpath, dirnames, filenames in os.walk(str(path)):
-            for filename in filenames:
-                if filename.endswith(".py"):
-                    strategy_module_name = ".".join(
-                        [module_name, filename.replace(".py", "")])
-                elif filename.endswith(".pyd"):
-                    strategy_module_name = ".".join(
-                        [module_name, filename.split(".")[0]])
-
-                self.load_strategy_class_from_module(strategy_module_name)
+        self.classes.add_folder(path, module_name)
 
     def load_strategy_class_from_module(self, module_name):
         """
         Load strategy class from module file.
         """
-        try:
-            module = importlib.import_module(module_name)
-
-            for name in dir(module):
-                value = getattr(module, name)
-                if isinstance(value, type) and issubclass(value, AlphaTemplate) and value is not AlphaTemplate:
-                    self.classes[value.__name__] = value
-        except:
-            msg = "strategy_file {} load error ：\n{}".format(module_name, traceback.format_exc())
-            self.write_log(msg)
+        self.classes.load_module(module_name)
 
     def load_strategy_setting(self, setting={}):
         """
@@ -415,60 +397,58 @@ class AlphaEngine(BaseEngine):
         self.main_engine.cancel_order(req, order.exchange)
 
     def check_stop_order(self, tick):
-        for stop_order in list(self.stop_orders.values()):
-            if stop_order.vt_symbol != tick.vt_symbol:
+        # 只取出被这个 tick 价格穿过的停止单
+        for stop_order in self.stop_orders.get_triggered(tick.vt_symbol, tick.last_price):
+            if stop_order.vt_order_id not in self.stop_orders:
+                # 前面触发的停止单回调里撤掉了
                 continue
 
-            long_triggered = (stop_order.direction == Direction.LONG.value and tick.last_price >= stop_order.price)
-            short_triggered = (stop_order.direction == Direction.SHORT.value and tick.last_price <= stop_order.price)
-
-            if long_triggered or short_triggered:
-                strategy = self.strategies[stop_order.strategy_name]
-
-                # To get excuted immediately after stop order is
-                # triggered, use limit price if available, otherwise
-                # use ask_price_5 or bid_price_5
-                if stop_order.direction == Direction.LONG.value:
-                    price = tick.ask_prices[5]
-                    if not price:
-                        price = tick.ask_prices[0] * 1.002
-                else:
-                    price = tick.bid_prices[5]
-                    if not price:
-                        price = tick.bid_prices[0] * 0.998
-
-                contract = self.main_engine.get_contract(stop_order.vt_symbol)
-
-                price = get_round_order_price(price, contract.price_tick)
-
-                vt_order_ids = self.send_limit_order(
-                    strategy,
-                    stop_order.symbol,
-                    stop_order.exchange,
-                    stop_order.direction,
-                    stop_order.offset,
-                    price,
-                    stop_order.volume
-                )
-
-                # Update stop order status if placed successfully
-                if vt_order_ids:
-                    # Remove from relation map.
-                    self.stop_orders.pop(stop_order.vt_order_id)
-
-                    strategy_vt_order_ids = self.strategy_order_id_map[strategy.strategy_name]
-                    if stop_order.vt_order_id in strategy_vt_order_ids:
-                        strategy_vt_order_ids.remove(stop_order.vt_order_id)
-
-                    # Change stop order status to cancelled and update to strategy.
-                    stop_order.status = StopOrderStatus.TRIGGERED.value
-                    stop_order.vt_order_ids = vt_order_ids
-
-                    self.call_strategy_func(strategy, strategy.on_stop_order, stop_order)
-
-                    strategy_vt_order_ids = self.strategy_order_id_map[strategy.strategy_name]
-                    for vt_order_id, order in vt_order_ids:
-                        strategy_vt_order_ids.add(vt_order_id)
+            strategy = self.strategies[stop_order.strategy_name]
+
+            # To get excuted immediately after stop order is
+            # triggered, use limit price if available, otherwise
+            # use ask_price_5 or bid_price_5
+            if stop_order.direction == Direction.LONG.value:
+                price = tick.ask_prices[5]
+                if not price:
+                    price = tick.ask_prices[0] * 1.002
+            else:
+                price = tick.bid_prices[5]
+                if not price:
+                    price = tick.bid_prices[0] * 0.998
+
+            contract = self.main_engine.get_contract(stop_order.vt_symbol)
+
+            price = get_round_order_price(price, contract.price_tick)
+
+            vt_order_ids = self.send_limit_order(
+                strategy,
+                stop_order.symbol,
+                stop_order.exchange,
+                stop_order.direction,
+                stop_order.offset,
+                price,
+                stop_order.volume
+            )
+
+            # Update stop order status if placed successfully
+            if vt_order_ids:
+                # Remove from relation map.
+                self.stop_orders.pop(stop_order.vt_order_id)
+
+                strategy_vt_order_ids = self.strategy_order_id_map[strategy.strategy_name]
+                if stop_order.vt_order_id in strategy_vt_order_ids:
+                    strategy_vt_order_ids.remove(stop_order.vt_order_id)
+
+                # Change stop order status to cancelled and update to strategy.
+                stop_order.status = StopOrderStatus.TRIGGERED.value
+                stop_order.vt_order_ids = vt_order_ids
+
+                self.call_strategy_func(strategy, strategy.on_stop_order, stop_order)
+
+                strategy_vt_order_ids = self.strategy_order_id_map[strategy.strategy_name]
+                for vt_order_id, order in vt_order_ids:
+                    strategy_vt_order_ids.add(vt_order_id)
 
     def close(self):
         self.stop_all_strategies()
@@ -510,7 +490,7 @@ class AlphaEngine(BaseEngine):
 
     def process_position_event(self, event):
         position = event.data
-        log_service_manager.write_log("[process_position_event]:{}".format(position.__dict__))
+        log_service_manager.write_log("[process_position_event]:{}".format(position.get_fields()))
 
         pos_obj = self.position_dic.get(position.vt_symbol, None)
         if pos_obj:
@@ -541,7 +521,7 @@ class AlphaEngine(BaseEngine):
 
     def process_order_event(self, event):
         order = event.data
-        log_service_manager.write_log("process_order_event:{}".format(order.__dict__))
+        log_service_manager.write_log("process_order_event:{}".format(order.get_fields()))
         strategy = self.order_id_strategy_map.get(order.vt_order_id, None)
         if not strategy:
             return
@@ -565,7 +545,7 @@ class AlphaEngine(BaseEngine):
     def process_trade_event(self, event):
         trade = event.data
 
-        log_service_manager.write_log("process_trade_event:{}".format(trade.__dict__))
+        log_service_manager.write_log("process_trade_event:{}".format(trade.get_fields()))
 
         # Filter duplicate trade push
         if trade.vt_trade_id in self.vt_trade_ids:
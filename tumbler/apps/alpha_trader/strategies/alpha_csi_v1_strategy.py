@@ -230,6 +230,6 @@ class AlphaCsiV1Strategy(AlphaTemplate):
 
     def on_trade(self, trade):
         self.write_log('[on_trade] start')
-        msg = '[trade detail] :{}'.format(trade.__dict__)
+        msg = '[trade detail] :{}'.format(trade.get_fields())
         self.write_important_log(msg)
         self.send_ding_msg(msg)
@@ -253,6 +253,7 @@ class AlphaCsiV3Strategy(AlphaTemplate):
     def update_contracts(self):
         if self.time_update_contracts.can_work():
             self.future_manager.run_update()
+            new_symbol_exchanges = {}
             for vt_symbol in self.future_manager.get_all_vt_symbols():
                 if vt_symbol not in self.symbol_exchanges.keys():
                     contract = self.future_manager.get_contract(vt_symbol)
@@ -261,39 +262,51 @@ class AlphaCsiV3Strategy(AlphaTemplate):
                         se = SymbolExchange(contract, self, self.hour_func, self.hour_window,
                                             self.day_window, init_pos=init_pos)
                         self.symbol_exchanges[vt_symbol] = se
-
-                        bars = self.load_bars_from_mysql(vt_symbol, Interval.HOUR.value,
-                                                         datetime.now() - timedelta(days=60), datetime.now())
-
-                        start_time = None
-                        end_time = None
-                        if bars:
-                            start_time = bars[0].datetime
-                            end_time = bars[-1].datetime
-                        self.write_log(f"[update_contracts] load_bars_from_mysql hour "
-                                       f" {vt_symbol}, {start_time}, {end_time}")
-                        # 直接导
-                        for bar in bars:
-                            se.on_bar(bar)
-
-                        if len(bars):
-                            # 补充 minute 数据
-                            bars = self.load_bars_from_mysql(vt_symbol, Interval.MINUTE.value,
-                                                             bars[-1].datetime + timedelta(hours=1), datetime.now())
-
-                            start_time = None
-                            end_time = None
-                            if bars:
-                                start_time = bars[0].datetime
-                                end_time = bars[-1].datetime
-                            self.write_log(f"[update_contracts] load_bars_from_mysql min "
-                                           f" {vt_symbol}, {start_time}, {end_time}")
-                            for bar in bars:
-                                se.on_bar(bar)
-
+                        new_symbol_exchanges[vt_symbol] = se
                     else:
                         self.write_log(f"[update_contracts] why contract{contract} vt_symbol:{vt_symbol}")
 
+            if not new_symbol_exchanges:
+                return
+
+            # 新合约的历史K线一次查询, 不再每个合约查一次
+            now = datetime.now()
+            hour_bars_dict = self.load_bars_dict_from_mysql(list(new_symbol_exchanges.keys()), Interval.HOUR.value,
+                                                            now - timedelta(days=60), now)
+            minute_start_dict = {}  # {start_time: [vt_symbol]}
+            for vt_symbol, se in new_symbol_exchanges.items():
+                bars = hour_bars_dict.get(vt_symbol, [])
+                start_time = None
+                end_time = None
+                if bars:
+                    start_time = bars[0].datetime
+                    end_time = bars[-1].datetime
+                self.write_log(f"[update_contracts] load_bars_from_mysql hour "
+                               f" {vt_symbol}, {start_time}, {end_time}")
+                # 直接导
+                for bar in bars:
+                    se.on_bar(bar)
+
+                if len(bars):
+                    # 补充 minute 数据
+                    minute_start_dict.setdefault(bars[-1].datetime + timedelta(hours=1), []).append(vt_symbol)
+
+            for minute_start, vt_symbols in minute_start_dict.items():
+                minute_bars_dict = self.load_bars_dict_from_mysql(vt_symbols, Interval.MINUTE.value,
+                                                                  minute_start, now)
+                for vt_symbol in vt_symbols:
+                    bars = minute_bars_dict.get(vt_symbol, [])
+                    start_time = None
+                    end_time = None
+                    if bars:
+                        start_time = bars[0].datetime
+                        end_time = bars[-1].datetime
+                    self.write_log(f"[update_contracts] load_bars_from_mysql min "
+                                   f" {vt_symbol}, {start_time}, {end_time}")
+                    se = new_symbol_exchanges[vt_symbol]
+                    for bar in bars:
+                        se.on_bar(bar)
+
     def update_account(self):
         self.write_log("[update_account]")
         if self.time_update_accounts.can_work():
@@ -416,7 +429,7 @@ class AlphaCsiV3Strategy(AlphaTemplate):
                             Direction.FORBID.value, 0)
 
     def on_tick(self, tick):
-        self.write_log("[on_tick] why has this? tick:{}".format(tick.__dict__))
+        self.write_log("[on_tick] why has this? tick:{}".format(tick.get_fields()))
 
     def on_bbo_tick(self, bbo_ticker):
         if self.time_work_bbo.can_work():
@@ -449,6 +462,6 @@ class AlphaCsiV3Strategy(AlphaTemplate):
 
     def on_trade(self, trade):
         self.write_log('[on_trade] start')
-        msg = '[trade detail] :{}'.format(trade.__dict__)
+        msg = '[trade detail] :{}'.format(trade.get_fields())
         self.write_important_log(msg)
         self.send_ding_msg(msg)
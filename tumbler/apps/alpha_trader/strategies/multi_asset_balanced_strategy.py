@@ -269,7 +269,7 @@ class MultiAssetBalancedStrategy(AlphaTemplate):
             self.write_log(f"[update_account] exchange_info:{self.exchange_info}")
 
     def on_bbo_tick(self, bbo_ticker):
-        # self.write_log(f"[on_bbo_tick] bbo_ticker:{bbo_ticker.__dict__}")
+        # self.write_log(f"[on_bbo_tick] bbo_ticker:{bbo_ticker.get_fields()}")
         if self.time_work_bbo.can_work():
             self.update_account()
             self.update_contracts()
@@ -297,6 +297,6 @@ class MultiAssetBalancedStrategy(AlphaTemplate):
 
     def on_trade(self, trade):
         self.write_log('[on_trade] start')
-        msg = '[trade detail] :{}'.format(trade.__dict__)
+        msg = '[trade detail] :{}'.format(trade.get_fields())
         self.write_important_log(msg)
         self.send_ding_msg(msg)
@@ -22,8 +22,7 @@ class DataFetchTemplate(object):
         self.fetch_print = FilePrint(self.strategy_name + ".log", "data_fetch_strategy_run_log", mode="w")
 
     def write_log(self, msg):
-        self.fetch_print.write('{}:[{}]:{}'.format(datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                                                   self.strategy_name, msg))
+        self.fetch_print.write('{:%Y-%m-%d %H:%M:%S}:[{}]:{}', args=(datetime.now(), self.strategy_name, msg))
 
 
 class AlphaTemplate(object):
@@ -97,6 +96,34 @@ class AlphaTemplate(object):
                 bar.vt_symbol = vt_symbol
         return ret_bars
 
+    def load_bars_dict_from_mysql(self, vt_symbols, period, start_datetime, end_datetime):
+        """
+        多个 vt_symbol 一次查询, 返回 {vt_symbol: [BarData]}
+        """
+        symbol_vt_symbols = {}
+        for vt_symbol in vt_symbols:
+            symbol, exchange = get_from_vt_key(vt_symbol)
+            if "_swap" in symbol:
+                symbol = symbol.replace('usdt_swap', 'usdt').replace('usd_swap', 'usdt')
+            symbol_vt_symbols.setdefault(symbol, []).append(vt_symbol)
+
+        bars_dict = self.mysql_service_manager.get_bars_dict(
+            symbols=list(symbol_vt_symbols.keys()), period=period, start_datetime=start_datetime,
+            end_datetime=end_datetime)
+
+        ret = {}
+        for symbol, arr in symbol_vt_symbols.items():
+            bars = bars_dict.get(symbol, [])
+            for i, vt_symbol in enumerate(arr):
+                ori_symbol, exchange = get_from_vt_key(vt_symbol)
+                # 共用同一个 mysql symbol 时, 前面的 vt_symbol 用拷贝, 最后一个才改原来的列表
+                ret_bars = bars if i == len(arr) - 1 else [copy(bar) for bar in bars]
+                for bar in ret_bars:
+                    bar.symbol = ori_symbol
+                    bar.vt_symbol = vt_symbol
+                ret[vt_symbol] = ret_bars
+        return ret
+
     def subscribe_bbo_exchanges(self, exchange, inst_types=[]):
         self.write_log("[AlphaTemplate] [subscribe_bbo_exchanges] go!")
         self.cta_engine.subscribe_bbo_exchanges(self, exchange, inst_types)
@@ -119,8 +146,7 @@ class AlphaTemplate(object):
         """
         Write a log message.
         """
-        self.file_print.write(
-            '{}:[{}]:{}'.format(datetime.now().strftime("%Y-%m-%d %H:%M:%S"), self.strategy_name, msg))
+        self.file_print.write('{:%Y-%m-%d %H:%M:%S}:[{}]:{}', args=(datetime.now(), self.strategy_name, msg))
 
     def load_server_bars(self, vt_symbols: list, days, interval=Interval.DAY.value, callback=None):
         if not callback:
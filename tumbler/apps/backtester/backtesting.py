@@ -7,6 +7,8 @@ from itertools import product
 from functools import lru_cache
 from enum import Enum
 from time import time
+import os
+import shutil
 import multiprocessing
 import random
 
@@ -16,13 +18,15 @@ import seaborn as sns
 from pandas import DataFrame
 from deap import creator, base, tools, algorithms
 
-from tumbler.function import get_vt_key, get_from_vt_key, get_round_order_price
+from tumbler.function import get_vt_key, get_from_vt_key, get_round_order_price, get_folder_path
 from tumbler.constant import EMPTY_STRING, EMPTY_FLOAT, MAX_PRICE_NUM
 from tumbler.constant import Status, Direction, StopOrderStatus, OrderType
-from tumbler.object import TickData, TradeData, OrderData, StopOrder, BarData
+from tumbler.object import TickData, TradeData, OrderData, StopOrder, BarData, BarArrayData
 from tumbler.service import mongo_service_manager
+from tumbler.data.bar_cache import bar_cache_manager
 from tumbler.function.pnl import StrategyPnlStat
 from tumbler.service.log_service import log_service_manager
+from tumbler.apps.backtester.fill_model import InstantFillModel
 
 
 STOPORDER_PREFIX = "8btc_stop"
@@ -140,6 +144,11 @@ class BacktestingEngine:
         self.trade_count = 0
         self.trades = {}
 
+        # tick 模式的撮合模型, 默认挂单穿过对手盘一档就全部成交
+        self.fill_model = InstantFillModel()
+        self.market_trades = []
+        self.tick_index = -1
+
         self.logs = []
 
         self.daily_results = {}
@@ -167,6 +176,9 @@ class BacktestingEngine:
         self.trade_count = 0
         self.trades.clear()
 
+        self.tick_index = -1
+        self.fill_model.clear()
+
         self.logs.clear()
         self.daily_results.clear()
 
@@ -200,6 +212,14 @@ class BacktestingEngine:
         if mode:
             self.mode = mode
 
+    def set_fill_model(self, fill_model, market_trades=None):
+        """
+        设置 tick 模式的撮合模型, market_trades 为录制的 MarketTradeData 列表, QueueFillModel 用来推算排队消耗
+        """
+        self.fill_model = fill_model
+        if market_trades is not None:
+            self.market_trades = market_trades
+
     def add_strategy(self, strategy_class, setting):
         self.strategy_class = strategy_class
         self.strategy = strategy_class(self, strategy_class.__name__, setting)
@@ -219,14 +239,23 @@ class BacktestingEngine:
             return
 
         if filename:
-            data = BarData.load_file_data(filename)
-            data = [bar for bar in data if self.end >= bar.datetime >= self.start]
+            if BarArrayData.is_bar_store(filename):
+                data = BarArrayData.load_file(filename, self.start, self.end).get_bars()
+            else:
+                data = BarData.load_file_data(filename)
+                data = [bar for bar in data if self.end >= bar.datetime >= self.start]
             self.history_data.extend(data)
             self.output("[1] load history data finished，all data num:{}".format(len(self.history_data)))
             return
 
         self.history_data.clear()  # Clear previously loaded history data
 
+        if self.mode == BacktestingMode.BAR.value:
+            # bar 数据走本地磁盘缓存, 只有缺的区间才会去数据库取
+            self.history_data = load_bar_data(self.symbol, self.exchange, self.interval, self.start, self.end)
+            self.output("[2] load history data finished，all data num:{}".format(len(self.history_data)))
+            return
+
         # Load 30 days of data each time and allow for progress update
         progress_delta = timedelta(days=30)
         total_delta = self.end - self.start
@@ -238,10 +267,7 @@ class BacktestingEngine:
         while start < self.end:
             end = min(end, self.end)  # Make sure end time stays within set range
 
-            if self.mode == BacktestingMode.BAR.value:
-                data = load_bar_data(self.symbol, self.exchange, self.interval, start, end)
-            else:
-                data = load_tick_data(self.symbol, self.exchange, start, end)
+            data = load_tick_data(self.symbol, self.exchange, start, end)
 
             self.history_data.extend(data)
 
@@ -283,6 +309,10 @@ class BacktestingEngine:
         self.strategy.trading = True
         self.output("now go to trading")
 
+        if self.mode != BacktestingMode.BAR.value:
+            self.tick_index = -1
+            self.fill_model.prepare(self.history_data[ix:], self.market_trades)
+
         # Use the rest of history data for running backtesting
         for data in self.history_data[ix:]:
             self.datetime = data.datetime
@@ -518,7 +548,7 @@ class BacktestingEngine:
 
         plt.show()
 
-    def run_optimization(self, optimization_setting, output=True):
+    def run_optimization(self, optimization_setting, output=True, processes=None, chunksize=None):
         # Get optimization setting and target
         settings = optimization_setting.generate_setting()
         target_name = optimization_setting.target_name
@@ -531,12 +561,19 @@ class BacktestingEngine:
             self.output("优化目标未设置，请检查")
             return
 
-        # Use multiprocessing pool for running backtesting with different setting
-        pool = multiprocessing.Pool(multiprocessing.cpu_count())
+        # 父进程只读取一次历史数据，写成 memory-map 文件，子进程只读挂载
+        store_path = ""
+        if self.mode == BacktestingMode.BAR.value:
+            store_path = self.publish_history_data()
 
-        results = []
+        if not processes:
+            processes = multiprocessing.cpu_count()
+        if not chunksize:
+            chunksize = max(1, len(settings) // (processes * 4))
+
+        tasks = []
         for setting in settings:
-            result = (pool.apply_async(optimize, (
+            tasks.append((
                 target_name,
                 self.strategy_class,
                 setting,
@@ -549,15 +586,33 @@ class BacktestingEngine:
                 self.price_tick,
                 self.capital,
                 self.end,
-                self.mode
-            )))
-            results.append(result)
+                self.mode,
+                self.__class__
+            ))
 
-        pool.close()
-        pool.join()
+        # Use multiprocessing pool for running backtesting with different setting
+        total = len(tasks)
+        report_step = max(1, total // 20)
+        start = time()
+        result_values = []
+        try:
+            with multiprocessing.Pool(processes, initializer=init_optimize_worker, initargs=(store_path,)) as pool:
+                for result in pool.imap_unordered(optimize_task, tasks, chunksize):
+                    result_values.append(result)
+                    finished = len(result_values)
+                    if output and (finished % report_step == 0 or finished == total):
+                        cost = max(time() - start, 1e-6)
+                        self.output("optimization progress:{}/{} [{:.1f}%] cost:{:.1f}s speed:{:.2f} setting/s".format(
+                            finished, total, finished * 100.0 / total, cost, finished / cost))
+
+                pool.close()
+                pool.join()
+        finally:
+            # 子进程出错或者被中断时也要删掉共享的历史数据文件
+            if store_path:
+                shutil.rmtree(store_path, ignore_errors=True)
 
         # Sort results and output
-        result_values = [result.get() for result in results]
         result_values.sort(reverse=True, key=lambda result: result[1])
 
         if output:
@@ -567,6 +622,26 @@ class BacktestingEngine:
 
         return result_values
 
+    def get_bar_array(self):
+        return BarArrayData.from_bars(self.history_data, self.interval)
+
+    def set_bar_array(self, bar_array):
+        self.history_data = bar_array.slice(self.start, self.end).get_bars()
+
+    def publish_history_data(self):
+        """
+        读取历史数据并保存成本地二进制bar，返回目录，给优化的子进程共享
+        """
+        self.load_data()
+        bar_array = self.get_bar_array()
+        if not len(bar_array):
+            return ""
+
+        store_path = os.path.join(get_folder_path("optimization"), "{}_{}".format(os.getpid(), int(time() * 1000)))
+        bar_array.save_file(store_path)
+        self.output("publish history data:{} num:{}".format(store_path, len(bar_array)))
+        return store_path
+
     def run_ga_optimization(self, optimization_setting, population_size=100, ngen_size=30, output=True):
         # Get optimization setting and target
         settings = optimization_setting.generate_setting_ga()
@@ -703,6 +778,7 @@ class BacktestingEngine:
     def new_tick(self, tick):
         self.tick = tick
         self.datetime = tick.datetime
+        self.tick_index += 1
 
         self.cross_limit_order()
         self.cross_stop_order()
@@ -714,16 +790,14 @@ class BacktestingEngine:
         """
         Cross limit order with last bar/tick data.
         """
-        if self.mode == BacktestingMode.BAR.value:
-            long_cross_price = self.bar.low_price
-            short_cross_price = self.bar.high_price
-            long_best_price = self.bar.open_price
-            short_best_price = self.bar.open_price
-        else:
-            long_cross_price = self.tick.ask_prices[0]
-            short_cross_price = self.tick.bid_prices[0]
-            long_best_price = long_cross_price
-            short_best_price = short_cross_price
+        if self.mode != BacktestingMode.BAR.value:
+            self.cross_limit_order_tick()
+            return
+
+        long_cross_price = self.bar.low_price
+        short_cross_price = self.bar.high_price
+        long_best_price = self.bar.open_price
+        short_best_price = self.bar.open_price
 
         for order in list(self.active_limit_orders.values()):
             # Push order update with status "not traded" (pending).
@@ -757,8 +831,6 @@ class BacktestingEngine:
             self.strategy.on_order(order)
 
             # Push trade update
-            self.trade_count += 1
-
             trade_price = order.price
             if long_cross:
                 if is_submitting:
@@ -767,27 +839,64 @@ class BacktestingEngine:
                 if is_submitting:
                     trade_price = max(order.price, short_best_price)
 
-            trade = TradeData()
-            trade.symbol = order.symbol
-            trade.exchange = order.exchange
-            trade.vt_symbol = get_vt_key(trade.symbol, trade.exchange)
-
-            trade.order_id = order.order_id
-            trade.vt_order_id = order.vt_order_id
-            trade.trade_id = str(self.trade_count)
-            trade.vt_trade_id = get_vt_key(trade.trade_id, trade.exchange)
-            trade.direction = order.direction
-            trade.offset = order.offset
-            trade.price = trade_price
-            trade.volume = order.volume
-            trade.trade_time = self.datetime.strftime("%Y-%m-%d %H:%M:%S")
-            trade.datetime = self.datetime
-            trade.gateway_name = self.gateway_name
-
+            trade = self.new_trade(order, trade_price, order.volume)
             self.strategy.on_trade(trade)
             self.state_pnl.on_trade(trade)
 
-            self.trades[trade.vt_trade_id] = trade
+    def cross_limit_order_tick(self):
+        """
+        tick 模式由 fill_model 决定每个挂单在这个 tick 上成交多少, 可以部分成交
+        """
+        for order in list(self.active_limit_orders.values()):
+            is_submitting = False
+            if order.status == Status.SUBMITTING.value:
+                is_submitting = True
+                order.status = Status.NOTTRADED.value
+                self.strategy.on_order(order)
+
+            fills = self.fill_model.match(order, self.tick_index, self.tick, is_submitting)
+            if not fills:
+                continue
+
+            trades = []
+            for trade_price, trade_volume in fills:
+                order.traded += trade_volume
+                trades.append(self.new_trade(order, trade_price, trade_volume))
+
+            if order.volume - order.traded <= order.volume * 1e-9:
+                order.traded = order.volume
+                order.status = Status.ALLTRADED.value
+                self.active_limit_orders.pop(order.vt_order_id)
+            else:
+                order.status = Status.PARTTRADED.value
+            self.strategy.on_order(order)
+
+            for trade in trades:
+                self.strategy.on_trade(trade)
+                self.state_pnl.on_trade(trade)
+
+    def new_trade(self, order, price, volume):
+        self.trade_count += 1
+
+        trade = TradeData()
+        trade.symbol = order.symbol
+        trade.exchange = order.exchange
+        trade.vt_symbol = get_vt_key(trade.symbol, trade.exchange)
+
+        trade.order_id = order.order_id
+        trade.vt_order_id = order.vt_order_id
+        trade.trade_id = str(self.trade_count)
+        trade.vt_trade_id = get_vt_key(trade.trade_id, trade.exchange)
+        trade.direction = order.direction
+        trade.offset = order.offset
+        trade.price = price
+        trade.volume = volume
+        trade.trade_time = self.datetime.strftime("%Y-%m-%d %H:%M:%S")
+        trade.datetime = self.datetime
+        trade.gateway_name = self.gateway_name
+
+        self.trades[trade.vt_trade_id] = trade
+        return trade
 
     def cross_stop_order(self):
         """
@@ -987,6 +1096,7 @@ class BacktestingEngine:
         if vt_order_id not in self.active_limit_orders:
             return
         order = self.active_limit_orders.pop(vt_order_id)
+        self.fill_model.on_cancel(order)
 
         order.status = Status.CANCELLED.value
         self.strategy.on_order(order)
@@ -1123,11 +1233,11 @@ class DailyResult:
 
 def optimize(target_name, strategy_class, setting, vt_symbol,
              interval, start, rate, slippage, size, price_tick,
-             capital, end, mode):
+             capital, end, mode, engine_class=BacktestingEngine):
     """
     Function for running in multiprocessing.pool
     """
-    engine = BacktestingEngine()
+    engine = engine_class()
 
     engine.set_parameters(
         vt_symbol=vt_symbol,
@@ -1143,7 +1253,10 @@ def optimize(target_name, strategy_class, setting, vt_symbol,
     )
 
     engine.add_strategy(strategy_class, setting)
-    engine.load_data()
+    if optimize_bar_array is not None and mode == BacktestingMode.BAR.value:
+        engine.set_bar_array(optimize_bar_array)
+    else:
+        engine.load_data()
     engine.run_backtesting()
     engine.calculate_result()
     statistics = engine.calculate_statistics(output=False)
@@ -1152,6 +1265,19 @@ def optimize(target_name, strategy_class, setting, vt_symbol,
     return str(setting), target_value, statistics
 
 
+def optimize_task(args):
+    return optimize(*args)
+
+
+def init_optimize_worker(store_path):
+    """
+    Initializer of optimization worker, attach the shared history data read-only.
+    """
+    global optimize_bar_array
+    if store_path:
+        optimize_bar_array = BarArrayData.load_file(store_path)
+
+
 @lru_cache(maxsize=1000000)
 def _ga_optimize(parameter_values):
     setting = dict(parameter_values)
@@ -1166,15 +1292,17 @@ def ga_optimize(parameter_values):
     return _ga_optimize(tuple(parameter_values))
 
 
-@lru_cache(maxsize=999)
 def load_bar_data(symbol, exchange, interval, start, end):
-    return mongo_service_manager.load_bar_data(symbol, exchange, interval, start, end)
+    return bar_cache_manager.load_bar_data(symbol, exchange, interval, start, end)
 
 
 def load_tick_data(symbol, exchange, start, end):
     return mongo_service_manager.load_tick_data(symbol, exchange, start, end)
 
 
+# Optimization worker shared history data
+optimize_bar_array = None
+
 # GA related global value
 ga_end = None
 ga_mode = None
@@ -0,0 +1,273 @@
+# coding=utf-8
+
+import numpy as np
+
+from tumbler.constant import Direction
+
+# 价格相等的相对误差
+PRICE_EPS = 1e-9
+
+
+def is_same_price(a, b):
+    return abs(a - b) <= PRICE_EPS * max(abs(a), abs(b))
+
+
+class FillModel(object):
+    """
+    tick 模式回测的限价单撮合模型, 通过 BacktestingEngine.set_fill_model 设置
+    prepare 在回测开始前把行情 (以及逐笔成交) 预先整理成数组, match 按 tick 序号取数据, 不在每个 tick 上构造对象
+    match 返回本 tick 的成交列表 [(price, volume)], 成交量之和不超过挂单剩余量, 可以部分成交
+    """
+
+    def prepare(self, ticks, market_trades=None):
+        pass
+
+    def clear(self):
+        pass
+
+    def on_cancel(self, order):
+        pass
+
+    def match(self, order, ix, tick, is_submitting):
+        raise NotImplementedError
+
+
+class InstantFillModel(FillModel):
+    """
+    原来的撮合方式: 挂单价格穿过对手盘一档就全部成交, 不考虑排队和盘口深度
+    新下单时按对手价和挂单价中较优的价格成交, 之后按挂单价成交
+    """
+
+    def match(self, order, ix, tick, is_submitting):
+        if order.direction == Direction.LONG.value:
+            cross_price = tick.ask_prices[0]
+            if cross_price <= 0 or order.price < cross_price:
+                return []
+            trade_price = min(order.price, cross_price) if is_submitting else order.price
+        elif order.direction == Direction.SHORT.value:
+            cross_price = tick.bid_prices[0]
+            if cross_price <= 0 or order.price > cross_price:
+                return []
+            trade_price = max(order.price, cross_price) if is_submitting else order.price
+        else:
+            return []
+        return [(trade_price, order.volume - order.traded)]
+
+
+class QueueFillModel(FillModel):
+    """
+    考虑排队位置和盘口深度的撮合:
+    1. 新下单价格穿过对手盘时, 按对手盘前 depth 档的量逐档吃掉, 吃不完的部分挂在挂单价上
+    2. 挂单按同方向盘口在该价位的量 * queue_ratio 估计排在前面的量, 价位在盘口之外时等它出现在盘口里再估计
+    3. 之后每个 tick:
+       对手盘一档价格穿过挂单价, 剩余量全部按挂单价成交;
+       盘口上该价位的量比排在前面的量小, 说明前面有人撤单, 前面的量跟着减少;
+       上一个 tick 之后的逐笔成交里, 对手方主动成交的价格穿过挂单价, 剩余量全部成交,
+       正好在挂单价上的成交量 * trade_ratio 是这个价位本 tick 的共用额度, 先消耗前面的排队量,
+       再按下单先后给同价位上的挂单成交, 同一笔成交量不会重复算给多个挂单
+    没有逐笔成交数据时只有对手盘穿过挂单价才会成交
+    market_trades 为录制的 MarketTradeData 列表, info_arr 里每笔是 (price, volume, direction, 毫秒时间戳)
+    """
+
+    def __init__(self, depth=5, queue_ratio=1.0, trade_ratio=1.0):
+        self.depth = depth
+        self.queue_ratio = queue_ratio
+        self.trade_ratio = trade_ratio
+
+        self.bid1 = []
+        self.ask1 = []
+        self.bid_prices = None
+        self.ask_prices = None
+        self.bid_volumes = None
+        self.ask_volumes = None
+
+        self.trade_prices = []
+        self.trade_volumes = []
+        self.trade_sides = []
+        self.trade_end = []
+
+        self.queue = {}  # vt_order_id: 排在前面的量, None 表示还不知道
+        self.budget_ix = -1
+        self.level_budget = {}  # (is_long, price): [剩余成交额度, 本 tick 已消耗的排队量, 是否有成交穿过挂单价]
+
+    def prepare(self, ticks, market_trades=None):
+        depth = self.depth
+        self.bid_prices = np.array([tick.bid_prices[:depth] for tick in ticks], dtype=np.float64).reshape(-1, depth)
+        self.ask_prices = np.array([tick.ask_prices[:depth] for tick in ticks], dtype=np.float64).reshape(-1, depth)
+        self.bid_volumes = np.array([tick.bid_volumes[:depth] for tick in ticks], dtype=np.float64).reshape(-1, depth)
+        self.ask_volumes = np.array([tick.ask_volumes[:depth] for tick in ticks], dtype=np.float64).reshape(-1, depth)
+        self.bid1 = self.bid_prices[:, 0].tolist()
+        self.ask1 = self.ask_prices[:, 0].tolist()
+
+        tick_times = np.array([tick.datetime.timestamp() * 1000 for tick in ticks], dtype=np.float64)
+        rows = []
+        for market_trade in market_trades or []:
+            for price, volume, direction, ts in market_trade.info_arr:
+                if direction == Direction.LONG.value:
+                    side = 1
+                elif direction == Direction.SHORT.value:
+                    side = -1
+                else:
+                    side = 0
+                rows.append((float(ts), float(price), float(volume), side))
+        rows.sort(key=lambda x: x[0])
+
+        trade_times = np.array([row[0] for row in rows], dtype=np.float64)
+        self.trade_prices = [row[1] for row in rows]
+        self.trade_volumes = [row[2] for row in rows]
+        self.trade_sides = [row[3] for row in rows]
+        # 第 i 个 tick 对应 (tick_times[i - 1], tick_times[i]] 之间的成交
+        self.trade_end = np.searchsorted(trade_times, tick_times, side="right").tolist()
+        self.clear()
+
+    def clear(self):
+        self.queue.clear()
+        self.budget_ix = -1
+        self.level_budget = {}
+
+    def on_cancel(self, order):
+        self.queue.pop(order.vt_order_id, None)
+
+    def get_queue_ahead(self, vt_order_id):
+        """
+        挂单前面估计还排着的量, 不知道时返回 None
+        """
+        return self.queue.get(vt_order_id, None)
+
+    def get_level_volume(self, ix, is_long, price):
+        """
+        同方向盘口在 price 上的量; 价位在盘口范围内但没人挂返回 0, 比看得到的档位都差返回 None
+        """
+        if is_long:
+            prices = self.bid_prices[ix].tolist()
+            volumes = self.bid_volumes[ix]
+        else:
+            prices = self.ask_prices[ix].tolist()
+            volumes = self.ask_volumes[ix]
+
+        for j, level_price in enumerate(prices):
+            if level_price <= 0:
+                break
+            if is_same_price(level_price, price):
+                return float(volumes[j])
+            if (is_long and level_price < price) or (not is_long and level_price > price):
+                return 0.0
+        return None
+
+    def take_depth(self, ix, is_long, price, volume):
+        """
+        按对手盘逐档吃单, 只吃价格不差于 price 的档位
+        """
+        if is_long:
+            prices = self.ask_prices[ix].tolist()
+            volumes = self.ask_volumes[ix].tolist()
+        else:
+            prices = self.bid_prices[ix].tolist()
+            volumes = self.bid_volumes[ix].tolist()
+
+        fills = []
+        for level_price, level_volume in zip(prices, volumes):
+            if volume <= 0 or level_price <= 0:
+                break
+            if (is_long and level_price > price) or (not is_long and level_price < price):
+                break
+            if level_volume <= 0:
+                continue
+            fill_volume = min(level_volume, volume)
+            fills.append((level_price, fill_volume))
+            volume -= fill_volume
+        return fills
+
+    def get_level_budget(self, ix, is_long, price):
+        """
+        第 ix 个 tick 在 price 上的成交额度, 同价位的挂单共用, 引擎按下单先后调用 match, 依次消耗
+        """
+        if ix != self.budget_ix:
+            self.budget_ix = ix
+            self.level_budget = {}
+
+        key = (is_long, price)
+        level = self.level_budget.get(key, None)
+        if level is None:
+            volume = 0.0
+            through = False
+            start = self.trade_end[ix - 1] if ix > 0 else self.trade_end[0]
+            for k in range(start, self.trade_end[ix]):
+                side = self.trade_sides[k]
+                # 只有对手方主动成交才会吃到挂单
+                if (is_long and side > 0) or (not is_long and side < 0):
+                    continue
+                trade_price = self.trade_prices[k]
+                if is_same_price(trade_price, price):
+                    volume += self.trade_volumes[k] * self.trade_ratio
+                elif (is_long and trade_price < price) or (not is_long and trade_price > price):
+                    through = True
+                    break
+            level = self.level_budget[key] = [volume, 0.0, through]
+        return level
+
+    def match(self, order, ix, tick, is_submitting):
+        is_long = order.direction == Direction.LONG.value
+        if not is_long and order.direction != Direction.SHORT.value:
+            return []
+
+        price = order.price
+        remaining = order.volume - order.traded
+        if is_long:
+            cross_price = self.ask1[ix]
+            crossed = 0 < cross_price <= price
+        else:
+            cross_price = self.bid1[ix]
+            crossed = cross_price > 0 and cross_price >= price
+
+        if is_submitting:
+            fills = []
+            if crossed:
+                fills = self.take_depth(ix, is_long, price, remaining)
+                for fill_price, fill_volume in fills:
+                    remaining -= fill_volume
+
+            if remaining > 0:
+                level_volume = self.get_level_volume(ix, is_long, price)
+                if level_volume is not None:
+                    level_volume *= self.queue_ratio
+                self.queue[order.vt_order_id] = level_volume
+            return fills
+
+        if crossed:
+            self.queue.pop(order.vt_order_id, None)
+            return [(price, remaining)]
+
+        ahead = self.queue.get(order.vt_order_id, None)
+        level_volume = self.get_level_volume(ix, is_long, price)
+        if level_volume is not None:
+            if ahead is None:
+                ahead = level_volume * self.queue_ratio
+            elif level_volume < ahead:
+                ahead = level_volume
+
+        level = self.get_level_budget(ix, is_long, price)
+        traded = 0
+        if level[2]:
+            traded = remaining
+        elif ahead is not None:
+            budget, drained = level[0], level[1]
+            # 排在更早挂单前面的量已经被消耗掉的部分, 也排在这个挂单前面
+            ahead = max(0.0, ahead - drained)
+            used = min(ahead, budget)
+            ahead -= used
+            budget -= used
+            drained += used
+            if ahead <= 0:
+                traded = min(remaining, budget)
+                budget -= traded
+            level[0], level[1] = budget, drained
+
+        if traded >= remaining:
+            self.queue.pop(order.vt_order_id, None)
+            return [(price, remaining)]
+
+        self.queue[order.vt_order_id] = ahead
+        if traded > 0:
+            return [(price, traded)]
+        return []
@@ -1,5 +1,7 @@
 # coding=utf-8
 
+import os
+import heapq
 from datetime import datetime, timedelta
 from copy import copy
 import numpy as np
@@ -7,7 +9,8 @@ import matplotlib.pyplot as plt
 
 from tumbler.function import get_vt_key, get_from_vt_key
 from tumbler.service.log_service import log_service_manager
-from tumbler.object import BarData
+from tumbler.service import mongo_service_manager, mysql_service_manager
+from tumbler.object import BarData, BarArrayData
 
 from .base import BacktestingMode
 from .backtesting import load_bar_data, load_tick_data
@@ -41,6 +44,10 @@ class MultiBacktestingEngine:
         self.vt_symbols = []
         self.history_data = []
 
+        # 流式回放: 每个 vt_symbol 一个按时间有序的迭代器, 回测时按时间堆归并
+        self.data_iterators = []
+        self.stream_chunk = timedelta(days=1)
+
     def clear_data(self):
         """
         Clear all data of last backtesting.
@@ -67,34 +74,58 @@ class MultiBacktestingEngine:
         self.strategy_class = strategy_class
         self.strategy = strategy_class(self, strategy_class.__name__, setting)
 
-    def load_data(self, filename=""):
+    def load_data(self, filename="", stream=False, use_mysql=False):
+        """
+        stream=True 时不把所有品种的数据读进内存, 只为每个品种准备一个迭代器,
+        run_backtesting 中按时间堆归并 (k路归并), 内存只与 品种数 * stream_chunk 有关
+        use_mysql=True 时从 mysql 读取bar, 否则从 mongodb 读取
+        """
         self.output("start load_data")
 
-        if len(self.history_data) > 0:
-            self.output("already has data，all data num:{}".format(len(self.history_data)))
+        if len(self.history_data) > 0 or self.data_iterators:
+            self.output("already has data，all data num:{} iterators:{}".format(
+                len(self.history_data), len(self.data_iterators)))
+            return
+
+        if stream:
+            self.load_data_iterators(filename, use_mysql)
             return
 
         if filename:
-            data = BarData.load_file_data(filename)
+            if BarArrayData.is_bar_store(filename):
+                data = BarArrayData.load_file(filename, self.start, self.end).get_bars()
+            elif os.path.isdir(filename):
+                # 目录下按 vt_symbol 存放的本地二进制bar
+                data = []
+                for vt_symbol in self.vt_symbols:
+                    path = BarArrayData.get_store_path(filename, vt_symbol, self.interval)
+                    if BarArrayData.is_bar_store(path):
+                        data.extend(BarArrayData.load_file(path, self.start, self.end).get_bars())
+                    else:
+                        self.output("[load_data] bar store not found:{}".format(path))
+                data.sort()
+            else:
+                data = BarData.load_file_data(filename)
             self.history_data.extend(data)
             self.output("load history data finished，all data num:{}".format(len(self.history_data)))
             return
 
         progress_delta = timedelta(days=30)
         self.history_data.clear()  # Clear previously loaded history data
-        # Load 30 days of data each time and allow for progress update
-        start = self.start
-        end = self.start + progress_delta
 
         for vt_symbol in self.vt_symbols:
             self.output("[load_data] vt_symbol:{}".format(vt_symbol))
             symbol, exchange = get_from_vt_key(vt_symbol)
+            if self.mode == BacktestingMode.BAR.value:
+                # 本地磁盘缓存, 一次取整个区间
+                self.history_data.extend(load_bar_data(symbol, exchange, self.interval, self.start, self.end))
+                continue
+
+            # Load 30 days of data each time and allow for progress update
+            start = self.start
+            end = self.start + progress_delta
             while start < self.end:
-                if self.mode == BacktestingMode.BAR.value:
-                    data = load_bar_data(symbol, exchange, self.interval, start, end)
-                else:
-                    data = load_tick_data(symbol, exchange, start, end)
-
+                data = load_tick_data(symbol, exchange, start, end)
                 self.history_data.extend(data)
 
                 start = end
@@ -102,6 +133,34 @@ class MultiBacktestingEngine:
 
         self.history_data.sort()
 
+    def load_data_iterators(self, filename="", use_mysql=False):
+        if not self.end:
+            self.end = datetime.now()
+
+        self.data_iterators = []
+        for vt_symbol in self.vt_symbols:
+            symbol, exchange = get_from_vt_key(vt_symbol)
+            if filename:
+                path = BarArrayData.get_store_path(filename, vt_symbol, self.interval)
+                if not BarArrayData.is_bar_store(path):
+                    self.output("[load_data_iterators] bar store not found:{}".format(path))
+                    continue
+                # 内存映射, 只有迭代到的部分才会被读入
+                it = BarArrayData.load_file(path, self.start, self.end).iter_bars()
+            elif self.mode == BacktestingMode.BAR.value:
+                it = iter_bar_data(symbol, exchange, self.interval, self.start, self.end,
+                                   self.stream_chunk, use_mysql)
+            else:
+                it = iter_tick_data(symbol, exchange, self.start, self.end, self.stream_chunk)
+            self.data_iterators.append(it)
+
+        self.output("[load_data_iterators] iterators num:{}".format(len(self.data_iterators)))
+
+    def get_history_data_iterator(self):
+        if self.data_iterators:
+            return heapq.merge(*self.data_iterators, key=lambda x: (x.datetime, x.vt_symbol))
+        return iter(self.history_data)
+
     def run_backtesting(self):
         if self.mode == BacktestingMode.BAR.value:
             func = self.new_bar
@@ -118,11 +177,15 @@ class MultiBacktestingEngine:
         self.output("now go to trading")
 
         # Use the rest of history data for running backtesting
-        for data in self.history_data:
+        count = 0
+        for data in self.get_history_data_iterator():
             self.datetime = data.datetime
             func(data)
+            count += 1
 
-        self.output("end trading")
+        # 迭代器只能用一次
+        self.data_iterators = []
+        self.output("end trading, data num:{}".format(count))
 
     def calculate_result(self):
         self.output("calculate_result")
@@ -415,3 +478,35 @@ class MultiBacktestingEngine:
         Return all daily result data.
         """
         return []
+
+
+def iter_chunk_data(load_func, start, end, chunk):
+    """
+    按 chunk 分段读取一个品种的数据, 每次只在内存中保留一段
+    load_func(start, end) 的区间是闭区间, 这里去掉段与段边界上重复的数据
+    """
+    while start < end:
+        chunk_end = min(start + chunk, end)
+        for data in load_func(start, chunk_end):
+            if data.datetime < chunk_end or chunk_end >= end:
+                yield data
+        start = chunk_end
+
+
+def iter_bar_data(symbol, exchange, interval, start, end, chunk=timedelta(days=1), use_mysql=False):
+    if not use_mysql:
+        # mongodb 服务端游标本身就是分批取数据的
+        return mongo_service_manager.iter_bar_data(symbol, exchange, interval, start, end)
+
+    # 每段读完就释放连接, 避免同时为每个品种占用一个服务端游标
+    def load_func(s, e):
+        return mysql_service_manager.get_bars(symbols=[symbol], period=interval, start_datetime=s, end_datetime=e)
+
+    return iter_chunk_data(load_func, start, end, chunk)
+
+
+def iter_tick_data(symbol, exchange, start, end, chunk=timedelta(hours=1)):
+    def load_func(s, e):
+        return mongo_service_manager.load_tick_data(symbol, exchange, s, e)
+
+    return iter_chunk_data(load_func, start, end, chunk)
@@ -0,0 +1,111 @@
+# coding=utf-8
+
+from bisect import bisect_left, bisect_right
+
+
+class PriceLevel(object):
+    """
+    同一价格上的挂单, dict 保持下单先后顺序 (FIFO), 按 id 撤单 O(1)
+    """
+    __slots__ = ("price", "orders")
+
+    def __init__(self, price):
+        self.price = price
+        self.orders = {}  # order_id: order
+
+    def __len__(self):
+        return len(self.orders)
+
+    def get_volume(self):
+        return sum(order.qty for order in self.orders.values())
+
+
+class PriceLevelBook(object):
+    """
+    一边 (买或卖) 的挂单簿, 代替原来 TickEngine 里两层单链表 OrderNode
+    keys 为有序价格列表 (买单存 -price, 卖单存 price, 都是从最优价开始升序), 二分 O(log n) 定位价位
+    order_index 记录每个挂单所在的价位, 撤单不用再遍历
+    价格相等用的是 dict 精确匹配, 与原来链表的 == 比较一致
+    """
+
+    def __init__(self, is_bid):
+        self.is_bid = is_bid
+        self.sign = -1 if is_bid else 1
+        self.keys = []
+        self.levels = {}  # price: PriceLevel
+        self.order_index = {}  # order_id: PriceLevel
+
+    def __len__(self):
+        return len(self.order_index)
+
+    def __contains__(self, order_id):
+        return order_id in self.order_index
+
+    def __iter__(self):
+        """
+        从最优价开始, 每个价位内按排队顺序遍历挂单
+        """
+        for level in self.get_levels():
+            for order in list(level.orders.values()):
+                yield order
+
+    def add(self, order):
+        price = order.price
+        level = self.levels.get(price, None)
+        if level is None:
+            level = self.levels[price] = PriceLevel(price)
+            key = self.sign * price
+            self.keys.insert(bisect_left(self.keys, key), key)
+        level.orders[order.id] = order
+        self.order_index[order.id] = level
+
+    def remove(self, order_id):
+        """
+        返回被移除的挂单, 不在簿里返回 None
+        """
+        level = self.order_index.pop(order_id, None)
+        if level is None:
+            return None
+        order = level.orders.pop(order_id)
+        if not level.orders:
+            del self.levels[level.price]
+            key = self.sign * level.price
+            i = bisect_left(self.keys, key)
+            if i < len(self.keys) and self.keys[i] == key:
+                del self.keys[i]
+        return order
+
+    def get_order(self, order_id):
+        level = self.order_index.get(order_id, None)
+        if level is None:
+            return None
+        return level.orders[order_id]
+
+    def get_best_level(self):
+        if not self.keys:
+            return None
+        return self.levels[self.sign * self.keys[0]]
+
+    def get_levels(self, through_price=None):
+        """
+        从最优价开始的价位列表 (快照, 遍历时可以增删挂单)
+        through_price 不为空时只返回被该价格穿过的价位: 买单价格 >= through_price, 卖单价格 <= through_price
+        """
+        if through_price is None:
+            keys = self.keys[:]
+        else:
+            keys = self.keys[:bisect_right(self.keys, self.sign * through_price)]
+        return [self.levels[self.sign * key] for key in keys]
+
+    def get_queue_position(self, order_id):
+        """
+        估计的排队位置: 盘口在它前面的量 (order.aheadqty, 未知时为 nan) 加上同价位排在它前面的自己的挂单量
+        """
+        level = self.order_index.get(order_id, None)
+        if level is None:
+            return None
+        own_ahead = 0
+        for oid, order in level.orders.items():
+            if oid == order_id:
+                return order.aheadqty + own_ahead
+            own_ahead += order.qty
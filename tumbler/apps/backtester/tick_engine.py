@@ -3,6 +3,8 @@ import numpy as np
 # from qpython import *
 import heapq
 
+from tumbler.apps.backtester.order_book import PriceLevelBook
+
 
 class InsConfig:
     def __init__(self, ip, port):
@@ -108,32 +110,31 @@ class OrderHeap(object):
         assert trd.id == ord.id, "trade wrong"
 
 
-class OrderNode:
-    def __init__(self, Data=None):
-        self.Data = None
-        self.Next = None
-        self.Next2 = None
-        if Data != None:
-            self.Data = Data
+class TickRow:
+    """
+    Start 里按列预先取出的行情, tick['bid1'] 取第 i 行的值, 用法和原来每个 tick 生成的 dict 一样
+    """
+    __slots__ = ("columns", "i")
+
+    def __init__(self, columns, i):
+        self.columns = columns
+        self.i = i
 
-    def insert(self, newNode):
-        newNode.Next = self.Next
-        self.Next = newNode
+    def __getitem__(self, key):
+        return self.columns[key][self.i]
 
-    def insert2(self, newNode):
-        newNode.Next2 = self.Next2
-        self.Next2 = newNode
+    def __contains__(self, key):
+        return key in self.columns
 
-    def removeNext(self):
-        delnode = self.Next
-        assert not delnode.Next2, '[Error] level 2 node not empty.'
-        self.Next = delnode.Next
-        del delnode
+    def get(self, key, default=None):
+        arr = self.columns.get(key, None)
+        return default if arr is None else arr[self.i]
 
-    def removeNext2(self):
-        delnode = self.Next2
-        self.Next2 = delnode.Next2
-        del delnode
+    def keys(self):
+        return self.columns.keys()
+
+    def to_dict(self):
+        return {key: arr[self.i] for key, arr in self.columns.items()}
 
 
 class Trade:
@@ -293,8 +294,8 @@ class TickEngine:
         self.SellPrc = None
         self.i = 0
         self.ctick = None
-        self.askQueue = OrderNode()
-        self.bidQueue = OrderNode()
+        self.askQueue = PriceLevelBook(is_bid=False)
+        self.bidQueue = PriceLevelBook(is_bid=True)
         self.insCfg = InsConfig(qip, qport)
 
         if debug:
@@ -311,19 +312,20 @@ class TickEngine:
         self.BuyPrc = np.zeros((ticks.shape[0], 1))
         self.SellPrc = np.zeros((ticks.shape[0], 1))
 
-        columns = ticks.columns
-        data = ticks.values
+        # 按列取出来, 每个 tick 只生成一个 TickRow, 不再 dict(zip(columns, row))
+        columns = {c: ticks[c].tolist() for c in ticks.columns}
+        strategy = self.strategy
+        pos = self.pos
 
         for i in range(ticks.shape[0]):
             self.i = i
-            t = data[i, :]
-            tick = dict(zip(columns, t))
+            tick = TickRow(columns, i)
             self.ctick = tick
             # if self.debug and self.nOrder != 0:
             #    self.printTick(tick)
             self.DoMatch(tick)
-            self.strategy.OnTick(tick)
-            self.pos[i] = self.strategy.pos
+            strategy.OnTick(tick)
+            pos[i] = strategy.pos
             # if self.debug and self.nOrder != 0:
             #    self.printOrderBook()
 
@@ -335,17 +337,11 @@ class TickEngine:
         print('Quote|\t time:%s\nask:%.2f\t%d\nbid:%.2f\t%d' % (
         tick['date'], tick['ask1'], tick['askvol1'], tick['bid1'], tick['bidvol1']), file=self.logfile)
 
-    def printOB(self, node):
-        if node:
-            node = node.Next
-        while node:
-            nextorder = node.Next2
-            while nextorder:
-                order = nextorder.Data
+    def printOB(self, book):
+        for level in book.get_levels():
+            for order in level.orders.values():
                 self.logfile.write('%.2f %d | ' % (order.price, order.aheadqty))
-                nextorder = nextorder.Next2
             print('\n', file=self.logfile)
-            node = node.Next
 
     def printOrderBook(self):
         self.logfile.write('Order\nAsk: %d ' % self.nAsk)
@@ -354,18 +350,12 @@ class TickEngine:
         self.printOB(self.bidQueue)
         print('\n------------------------------------------', file=self.logfile)
 
-    def getOB(self, node):
+    def getOB(self, book):
         obstr = ''
-        if node:
-            node = node.Next
-        while node:
-            nextorder = node.Next2
-            while nextorder:
-                order = nextorder.Data
+        for level in book.get_levels():
+            for order in level.orders.values():
                 obstr += '%.2f %s | ' % (order.price, order.aheadqty)
-                nextorder = nextorder.Next2
             obstr += '\n'
-            node = node.Next
         return obstr
 
     def getOrderBookStr(self):
@@ -396,73 +386,51 @@ class TickEngine:
         return order
 
     def insertOrder(self, order):
-        price = order.price
-        newOrderNode = OrderNode(order)
         if order.side == 'B':
-            next = self.bidQueue
-            while next.Next and price < next.Next.Data:
-                next = next.Next
-            if not next.Next or price > next.Next.Data:
-                node = OrderNode(price)
-                next.insert(node)
-            next = next.Next
-            nextorder = next
-            while nextorder.Next2:
-                nextorder = nextorder.Next2
-            nextorder.insert2(newOrderNode)
+            self.bidQueue.add(order)
             self.nBid += 1
         elif order.side == 'S':
-            next = self.askQueue
-            while next.Next and price > next.Next.Data:
-                next = next.Next
-            if not next.Next or price < next.Next.Data:
-                node = OrderNode(price)
-                next.insert(node)
-            next = next.Next
-            nextorder = next
-            while nextorder.Next2:
-                nextorder = nextorder.Next2
-            nextorder.insert2(newOrderNode)
+            self.askQueue.add(order)
             self.nAsk += 1
         self.nOrder += 1
         self.orderMap[order.id] = order
 
-    def removeOrder(self, node2, orderid, side):
-        node2.removeNext2()
+    def getQueue(self, side):
+        if side == 'B':
+            return self.bidQueue
+        return self.askQueue
+
+    def getQueuePosition(self, orderid):
+        """
+        挂单前面估计还要排多少量 (盘口量 aheadqty + 同价位排在前面的自己的挂单), 不在簿里返回 None
+        """
+        order = self.orderMap.get(orderid, None)
+        if order is None:
+            return None
+        return self.getQueue(order.side).get_queue_position(orderid)
+
+    def removeOrder(self, orderid, side):
+        self.getQueue(side).remove(orderid)
         del self.orderMap[orderid]
 
     def cancelOrder(self, orderid):
-        isCanceled = False
         assert orderid in self.orderMap, 'No such Order id:%d' % orderid
         Order = self.orderMap[orderid]
-        price = Order.price
         self.nOrder -= 1
         if Order.side == 'B':
-            node = self.bidQueue
             self.nBid -= 1
         elif Order.side == 'S':
-            node = self.askQueue
             self.nAsk -= 1
-        assert node, 'Order Queue empty.'
-        while node.Next and price != node.Next.Data:
-            node = node.Next
-        node2 = node.Next
-        while node2.Next2 and orderid != node2.Next2.Data.id:
-            node2 = node2.Next2
-        if node2.Next2:
-            self.removeOrder(node2, orderid, Order.side)
-            isCanceled = True
-        if not node.Next.Next2:
-            node.removeNext()
-        assert isCanceled, 'Order id:%d Not Found in Queue.' % orderid
-
-    def DoTrade(self, trdprice, node2, order, msg):
+        assert orderid in self.getQueue(Order.side), 'Order id:%d Not Found in Queue.' % orderid
+        self.removeOrder(orderid, Order.side)
+
+    def DoTrade(self, trdprice, order, msg):
         if self.debug:
             print('Trade\n%s %.2f' % (order.side, trdprice), file=self.logfile)
         trd = Trade(order.id, order.symbol, order.side, order.qty, trdprice, self.ctick['date'], 'F')
         trd.msg = msg
         self.strategy.OnTrade(trd)
-        self.removeOrder(node2, order.id, order.side)
+        self.removeOrder(order.id, order.side)
         self.allTrade.append(trd)
         if order.side == 'B':
             self.BuyPrc[self.i] = trdprice
@@ -472,6 +440,11 @@ class TickEngine:
             self.nAsk -= 1
 
     def DoMatch(self, tick):
+        bidQueue = self.bidQueue
+        askQueue = self.askQueue
+        if not bidQueue and not askQueue:
+            return
+
         bid1 = tick['bid1']
         ask1 = tick['ask1']
         bidvol1 = tick['bidvol1']
@@ -481,18 +454,21 @@ class TickEngine:
         afPrice = tick['afPrice']
         bfPrice = tick['bfPrice']
 
-        node = self.bidQueue
-        while node and node.Next and bid1 <= node.Next.Data:
-            node2 = node.Next
-            price = node.Next.Data
+        # 只取价格 >= bid1 的买单价位, 从高到低
+        # 挂单可能在前面成交的 OnTrade 回调里被撤掉, 处理前先确认还在簿里
+        for level in bidQueue.get_levels(bid1):
+            if not level.orders:
+                continue
+            price = level.price
+            orders = list(level.orders.values())
             if bid1 - price < -1e-6:  # bid1 < price
                 # 1、盘口买价小于买单价格，直接fill买单，DoTrade
-                while node2 and node2.Next2:
-                    order = node2.Next2.Data
-                    trdprice = max(bid1, order.price)
-                    self.DoTrade(trdprice, node2, order, '1')
+                for order in orders:
+                    if order.id in bidQueue:
+                        trdprice = max(bid1, order.price)
+                        self.DoTrade(trdprice, order, '1')
             else:
-                order = node2.Next2.Data
+                order = orders[0]
                 if abs(price - bid1) < 1e-6:  # price == bid1
                     if np.isnan(order.aheadqty):
                         # 如果aheadqty为空补足
@@ -504,45 +480,41 @@ class TickEngine:
                 # 2. bfprice小于等于买单价：
                 #    1).每个同bfprice的买单aheadqty减去bidFill，如aheadqty == 0，DoTrade
                 #    2).每个买单价大于bfprice的买单fill，DoTrade
-                while node2 and node2.Next2:
-                    order = node2.Next2.Data
+                for order in orders:
+                    if order.id not in bidQueue:
+                        continue
                     if abs(price - bfPrice) < 1e-6:  # price == bfPrice
                         order.aheadqty -= bidFill
                         if order.aheadqty <= 0:
-                            self.DoTrade(price, node2, order, '2')
+                            self.DoTrade(price, order, '2')
                     elif price - bfPrice > 1e-6:  # price > bfPrice
-                        self.DoTrade(price, node2, order, '3')
-                    node2 = node2.Next2
-            if not node.Next.Next2:
-                node.removeNext()
-            node = node.Next
-
-        node = self.askQueue
-        while node and node.Next and ask1 >= node.Next.Data:
-            node2 = node.Next
-            price = node.Next.Data
+                        self.DoTrade(price, order, '3')
+
+        # 只取价格 <= ask1 的卖单价位, 从低到高
+        for level in askQueue.get_levels(ask1):
+            if not level.orders:
+                continue
+            price = level.price
+            orders = list(level.orders.values())
             if ask1 - price > 1e-6:  # ask1 > price
-                while node2 and node2.Next2:
-                    order = node2.Next2.Data
-                    trdprice = min(ask1, order.price)  # // max -> min
-                    self.DoTrade(trdprice, node2, order, '4')
+                for order in orders:
+                    if order.id in askQueue:
+                        trdprice = min(ask1, order.price)  # // max -> min
+                        self.DoTrade(trdprice, order, '4')
             else:
-                order = node2.Next2.Data
+                order = orders[0]
                 if abs(price - ask1) < 1e-6:  # price == ask1
                     if np.isnan(order.aheadqty):
                         order.aheadqty = askvol1 * self.queueparam
                     elif order.aheadqty >= askvol1:
                         askFill = max(askFill, self.fillparam * (order.aheadqty - askvol1))
 
-                while node2 and node2.Next2:
-                    order = node2.Next2.Data
+                for order in orders:
+                    if order.id not in askQueue:
+                        continue
                     if abs(price - afPrice) < 1e-6:
                         order.aheadqty -= askFill
                         if order.aheadqty <= 0:
-                            self.DoTrade(price, node2, order, '5')
+                            self.DoTrade(price, order, '5')
                     elif price - afPrice < -1e-6:
-                        self.DoTrade(price, node2, order, '6')
-                    node2 = node2.Next2
-            if not node.Next.Next2:
-                node.removeNext()
-            node = node.Next
+                        self.DoTrade(price, order, '6')
@@ -0,0 +1,166 @@
+# coding=utf-8
+
+from datetime import datetime
+
+import numpy as np
+
+from tumbler.function import get_vt_key
+from tumbler.constant import Direction, Offset
+from tumbler.object import TradeData, BarArrayData
+from tumbler.data.bar_cache import bar_cache_manager
+
+from .base import BacktestingMode, DailyResult
+from .backtesting import BacktestingEngine
+
+
+class VectorBacktestingEngine(BacktestingEngine):
+    """
+    列式的bar回测引擎
+    1. 历史数据用 BarArrayData (numpy数组) 保存，不再一次性生成所有 BarData
+    2. 事件策略: 只有在有挂单时才去做撮合检查
+    3. 目标仓位策略 (PD_Technique 产生的 pos 列): run_vector_backtesting 全部向量化计算
+    计算结果与 BacktestingEngine 的 calculate_result / calculate_statistics 保持一致
+    """
+
+    def __init__(self):
+        super(VectorBacktestingEngine, self).__init__()
+        self.bar_array = None
+
+    def clear_data(self):
+        super(VectorBacktestingEngine, self).clear_data()
+        self.daily_df = None
+
+    def get_bar_array(self):
+        return self.bar_array
+
+    def set_bar_array(self, bar_array):
+        """
+        直接传入已经准备好的列式数据
+        """
+        self.bar_array = bar_array.slice(self.start, self.end)
+
+    def load_data(self, filename=""):
+        if self.mode != BacktestingMode.BAR.value:
+            return super(VectorBacktestingEngine, self).load_data(filename)
+
+        if self.bar_array is not None and len(self.bar_array) > 0:
+            self.output("already has data，all data num:{}".format(len(self.bar_array)))
+            return
+
+        if filename and BarArrayData.is_bar_store(filename):
+            if not self.end:
+                self.end = datetime.now()
+            self.bar_array = BarArrayData.load_file(filename, self.start, self.end)
+            self.output("[vector] load bar store finished，all data num:{}".format(len(self.bar_array)))
+            return
+
+        if not filename:
+            # 本地缓存直接读成列式数据
+            if not self.end:
+                self.end = datetime.now()
+            self.bar_array = bar_cache_manager.load_bar_array(self.symbol, self.exchange, self.interval,
+                                                              self.start, self.end)
+            self.output("[vector] load bar array finished，all data num:{}".format(len(self.bar_array)))
+            return
+
+        super(VectorBacktestingEngine, self).load_data(filename)
+        self.bar_array = BarArrayData.from_bars(self.history_data, self.interval)
+        self.history_data = []
+        self.output("[vector] bar array ready，all data num:{}".format(len(self.bar_array)))
+
+    def prepare_daily_results(self):
+        """
+        一次性按日生成 DailyResult, 代替每根bar调用 update_daily_close
+        """
+        days, index = self.bar_array.get_day_close_index()
+        self.daily_results.clear()
+        for d, close_price in zip(days.tolist(), self.bar_array.close[index].tolist()):
+            self.daily_results[d] = DailyResult(d, close_price)
+
+    def run_backtesting(self):
+        if self.mode != BacktestingMode.BAR.value or self.bar_array is None:
+            return super(VectorBacktestingEngine, self).run_backtesting()
+
+        self.prepare_daily_results()
+
+        self.strategy.on_init()
+        self.strategy.inited = True
+        self.output("strategy.inited")
+
+        self.strategy.on_start()
+        self.strategy.trading = True
+        self.output("now go to trading")
+
+        strategy = self.strategy
+        state_pnl = self.state_pnl
+        for bar in self.bar_array.iter_bars():
+            self.bar = bar
+            self.datetime = bar.datetime
+
+            if self.active_limit_orders:
+                self.cross_limit_order()
+            if self.active_stop_orders:
+                self.cross_stop_order()
+
+            strategy.on_bar(bar)
+            state_pnl.on_bar(bar)
+
+        self.output("end trading")
+
+    def run_vector_backtesting(self, pos_arr):
+        """
+        传入目标仓位序列 (如 df["pos"])，第i根bar收盘产生的仓位在第i+1根bar开盘价成交，
+        与 PD_Technique.quick_income_compute 的成交假设相同。
+        只对仓位发生变化的bar生成 TradeData。
+        """
+        arr = self.bar_array
+        if arr is None or not len(arr):
+            self.output("[run_vector_backtesting] no bar data, please load_data first")
+            return
+
+        n = len(arr)
+        pos_arr = np.nan_to_num(np.asarray(pos_arr, dtype=np.float64))
+        if len(pos_arr) != n:
+            self.output("[run_vector_backtesting] pos length:{} not equal bar length:{}".format(len(pos_arr), n))
+            return
+
+        self.prepare_daily_results()
+        self.output("now go to vector trading")
+
+        hold_pos = np.zeros(n)
+        hold_pos[1:] = pos_arr[:-1]
+        change = np.diff(hold_pos, prepend=0.0)
+        change_index = np.flatnonzero(change)
+
+        exchange = arr.exchange
+        vt_symbol = get_vt_key(arr.symbol, exchange)
+        datetime_arr = arr.datetime[change_index].tolist()
+        price_arr = arr.open[change_index].tolist()
+        for _datetime, price, volume in zip(datetime_arr, price_arr, change[change_index].tolist()):
+            self.trade_count += 1
+
+            trade = TradeData()
+            trade.symbol = arr.symbol
+            trade.exchange = exchange
+            trade.vt_symbol = vt_symbol
+            trade.order_id = str(self.trade_count)
+            trade.vt_order_id = get_vt_key(trade.order_id, exchange)
+            trade.trade_id = str(self.trade_count)
+            trade.vt_trade_id = get_vt_key(trade.trade_id, exchange)
+            if volume > 0:
+                trade.direction = Direction.LONG.value
+            else:
+                trade.direction = Direction.SHORT.value
+            trade.offset = Offset.NONE.value
+            trade.price = price
+            trade.volume = abs(volume)
+            trade.trade_time = _datetime.strftime("%Y-%m-%d %H:%M:%S")
+            trade.datetime = _datetime
+            trade.gateway_name = self.gateway_name
+
+            self.state_pnl.on_trade(trade)
+            self.trades[trade.vt_trade_id] = trade
+
+        self.datetime = arr.datetime[-1].item()
+        self.state_pnl.on_bar(arr.get_bar(n - 1))
+        self.output("end vector trading, trade num:{}".format(len(change_index)))
@@ -31,13 +31,13 @@ class TestStrategy(Strategy):
         #log_service_manager.write_log("[onTick] t:{} {}".format(tick["bid1"], tick["ask1"]))
         if self.pos == 0:
             order = self.sendOrder("btc_usdt", 'B', 'O', tick["ask1"], 1)
-            log_service_manager.write_log("[onTick] order:{}".format(order.__dict__))
+            log_service_manager.write_log("[onTick] order:{}".format(order))
         elif self.pos > 0:
             order = self.sendOrder("btc_usdt", 'S', 'O', tick["bid1"], 1)
-            log_service_manager.write_log("[onTick] order:{}".format(order.__dict__))
+            log_service_manager.write_log("[onTick] order:{}".format(order))
         elif self.pos < 0:
             order = self.sendOrder("btc_usdt", 'B', 'O', tick['ask1'], 1)
-            log_service_manager.write_log("[onTick] order:{}".format(order.__dict__))
+            log_service_manager.write_log("[onTick] order:{}".format(order))
 
     def OnTrade(self, trd):
         super(TestStrategy, self).OnTrade(trd)
@@ -397,7 +397,7 @@ class CalendarSpreadEngine(BaseEngine):
 
     def process_order_event(self, event):
         order = event.data
-        log_service_manager.write_log("process_order_event:{}".format(order.__dict__))
+        log_service_manager.write_log("process_order_event:{}".format(order.get_fields()))
         strategy = self.order_id_strategy_map.get(order.vt_order_id, None)
         if not strategy:
             return
@@ -420,7 +420,7 @@ class CalendarSpreadEngine(BaseEngine):
 
     def process_trade_event(self, event):
         trade = event.data
-        log_service_manager.write_log("process_trade_event:{}".format(trade.__dict__))
+        log_service_manager.write_log("process_trade_event:{}".format(trade.get_fields()))
         # Filter duplicate trade push
         if trade.vt_trade_id in self.vt_trade_ids:
             return
@@ -456,7 +456,7 @@ class CalendarSpreadEngine(BaseEngine):
 
     def process_position_event(self, event):
         position = event.data
-        log_service_manager.write_log("process_position_event:{}".format(position.__dict__))
+        log_service_manager.write_log("process_position_event:{}".format(position.get_fields()))
 
         pos_obj = self.position_dic.get(position.vt_symbol, None)
         if pos_obj:
@@ -67,7 +67,7 @@ class FutureCrossV1Strategy(CalendarSpreadTemplate):
         if acct is not None:
             self.target_exchange_info["account_val"] = acct.balance
 
-        # self.write_log("[update_account] acct :{}".format(acct.__dict__))
+        # self.write_log("[update_account] acct :{}".format(acct.get_fields()))
         # base
         acct = self.get_account(self.base_exchange_info["account_key"])
         if acct is not None:
@@ -75,7 +75,7 @@ class FutureCrossV1Strategy(CalendarSpreadTemplate):
 
         self.update_account_flag = True
 
-        # self.write_log("[update_account] acct :{}".format(acct.__dict__))
+        # self.write_log("[update_account] acct :{}".format(acct.get_fields()))
         # self.write_log("[update_account] base_exchange_info :{}".format(self.base_exchange_info))
 
     def on_init(self):
@@ -389,4 +389,4 @@ class FutureCrossV1Strategy(CalendarSpreadTemplate):
 
     def on_trade(self, trade):
         self.write_log('[on_trade] start')
-        self.write_log('[trade detail] :{}'.format(trade.__dict__))
+        self.write_log('[trade detail] :{}'.format(trade.get_fields()))
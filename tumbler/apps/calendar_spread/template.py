@@ -53,7 +53,7 @@ class CalendarSpreadTemplate(object):
         """
         Write a log message.
         """
-        self.file_print.write('{}:[{}]:{}'.format(datetime.now().strftime("%Y-%m-%d %H:%M:%S"), self.strategy_name, msg))
+        self.file_print.write('{:%Y-%m-%d %H:%M:%S}:[{}]:{}', args=(datetime.now(), self.strategy_name, msg))
 
     def get_contract(self, vt_symbol):
         """
@@ -89,7 +89,7 @@ class Auto1MarketStrategy(CtaTemplate):
         self.bg.update_bar(bar)
         self.fixed_spread_price = get_round_order_price(bar.close_price * self.fixed_spread / 100.0, self.price_tick)
         if bar.datetime.hour == 8 and 0 <= bar.datetime.minute <= 5:
-            self.write_log("[on_bar] end day bar:{}".format(bar.__dict__))
+            self.write_log("[on_bar] end day bar:{}".format(bar.get_fields()))
             self.cancel_all_orders()
             if self.pos > 0:
                 list_orders = self.sell(self.symbol_pair, self.exchange, bar.close_price - self.fixed_spread_price,
@@ -123,7 +123,7 @@ class FactorCrossSectionStrategy(CtaTemplate):
         self.bar_dict[tick.vt_symbol].update_tick(tick)
 
     def on_bar(self, bar: BarData):
-        self.write_log("[on_bar] bar:{}".format(bar.__dict__))
+        self.write_log("[on_bar] bar:{}".format(bar.get_fields()))
         self.bar_dict[bar.vt_symbol].update_bar(bar)
 
     def compute_rank(self, new_data_dict, reverse=False):
@@ -161,7 +161,7 @@ class FactorCrossSectionStrategy(CtaTemplate):
             self.write_log("[Error] buy sell num not right!")
             return
 
-        self.write_log("[on_window_bar] bar:{}".format(bar.__dict__))
+        self.write_log("[on_window_bar] bar:{}".format(bar.get_fields()))
         self.recent_bars[bar.vt_symbol] = copy(bar)
 
         self.df_index.append(bar.get_unique_index())
@@ -34,7 +34,7 @@ class FactorMultiPeriodStrategy(CtaTemplate):
     pos = 0
     target_pos = 0
 
-    bar_period_factor = []     # func, window, interval,
+    bar_period_factor = []     # func, window, interval, [max_lookback]
 
     is_backtesting = False
     initDays = 20  # 初始化天数
@@ -67,9 +67,11 @@ class FactorMultiPeriodStrategy(CtaTemplate):
         self.bg = BarGenerator(self.on_bar, interval=Interval.MINUTE.value, quick_minute=1)
 
         self.bg_pandas_array = []
-        for func, window, interval in self.bar_period_factor:
-            self.write_log("window:{} interval:{}".format(window, interval))
-            pandas_deal = PandasDeal(func, window, interval, strategy=self)
+        for item in self.bar_period_factor:
+            func, window, interval = item[:3]
+            max_lookback = item[3] if len(item) > 3 else 0
+            self.write_log("window:{} interval:{} max_lookback:{}".format(window, interval, max_lookback))
+            pandas_deal = PandasDeal(func, window, interval, strategy=self, max_lookback=max_lookback)
             self.bg_pandas_array.append(pandas_deal)
 
         self.vt_symbol = get_vt_key(self.symbol_pair, self.exchange)
@@ -714,8 +714,7 @@ class CtaTemplate(object):
         """
         Write a log message.
         """
-        self.file_print.write(
-            '{}:[{}]:{}'.format(datetime.now().strftime("%Y-%m-%d %H:%M:%S"), self.strategy_name, msg))
+        self.file_print.write('{:%Y-%m-%d %H:%M:%S}:[{}]:{}', args=(datetime.now(), self.strategy_name, msg))
 
     def load_server_bars(self, vt_symbols: list, days, interval=Interval.DAY.value, callback=None):
         if not callback:
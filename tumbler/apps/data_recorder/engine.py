@@ -3,6 +3,7 @@
 from threading import Thread
 from queue import Queue, Empty
 from copy import copy
+from time import time
 
 from tumbler.engine import BaseEngine
 from tumbler.function import load_json, save_json
@@ -21,6 +22,16 @@ EVENT_RECORDER_UPDATE = "eRecorderUpdate"
 class RecorderEngine(BaseEngine):
     setting_filename = "data_recorder_setting.json"
 
+    # 攒够 batch_size 条 或者 距离上次写入超过 flush_interval 秒 就批量写一次 mongodb
+    batch_size = 500
+    flush_interval = 1
+    # 每隔多少秒输出一次写入统计
+    stat_interval = 60
+    # mongodb 写入失败时数据放回缓冲区, 按 1, 2, 4 ... max_retry_interval 秒退避重试
+    # 每种数据最多缓存 max_buffer_size 条, 超过时丢掉最早的
+    max_retry_interval = 30
+    max_buffer_size = 200000
+
     def __init__(self, main_engine, event_engine):
         super(RecorderEngine, self).__init__(main_engine, event_engine, APP_NAME)
 
@@ -28,6 +39,19 @@ class RecorderEngine(BaseEngine):
         self.thread = Thread(target=self.run)
         self.active = False
 
+        self.buffers = {"tick": [], "bar": []}
+        self.last_flush_time = time()
+        self.retry_interval = 0
+        self.next_retry_time = 0
+        self.drop_count = 0
+
+        self.stat_start_time = time()
+        self.write_count = 0
+        self.flush_count = 0
+        self.flush_cost = 0
+        self.max_flush_cost = 0
+        self.max_queue_size = 0
+
         self.tick_recordings = {}
         self.bar_recordings = {}
         self.bar_generators = {}
@@ -52,21 +76,120 @@ class RecorderEngine(BaseEngine):
     def run(self):
         while self.active:
             try:
-                task = self.queue.get(timeout=1)
-                task_type, data = task
+                task = self.queue.get(timeout=self.flush_interval)
+                self.add_task(task)
+
+                # 把队列里已有的数据一次取完, 写入失败等待重试时也继续取, 避免队列无限增长
+                for _ in range(self.batch_size):
+                    self.add_task(self.queue.get_nowait())
+            except Empty:
+                pass
+            except Exception as ex:
+                log_service_manager.write_log("[RecorderEngine] run error:{}".format(ex))
 
-                if task_type == "tick":
-                    mongo_service_manager.save_tick_data([data])
-                elif task_type == "bar":
-                    mongo_service_manager.save_bar_data([data])
+            self.check_buffer_size()
+            if self.need_flush():
+                self.flush()
+            self.check_stat()
 
+        # 退出前把剩余的数据全部写完
+        while True:
+            try:
+                self.add_task(self.queue.get_nowait())
             except Empty:
-                continue
+                break
+        self.flush()
+
+    def add_task(self, task):
+        task_type, data = task
+        self.buffers[task_type].append(data)
+
+    def check_buffer_size(self):
+        for task_type, datas in self.buffers.items():
+            overflow = len(datas) - self.max_buffer_size
+            if overflow > 0:
+                self.buffers[task_type] = datas[overflow:]
+                self.drop_count += overflow
+                log_service_manager.write_log("[RecorderEngine] {} buffer full, drop num:{}".format(
+                    task_type, overflow))
+
+    def need_flush(self):
+        if time() < self.next_retry_time:
+            return False
+        num = len(self.buffers["tick"]) + len(self.buffers["bar"])
+        return num >= self.batch_size or (num > 0 and time() - self.last_flush_time >= self.flush_interval)
+
+    def flush(self):
+        self.max_queue_size = max(self.max_queue_size, self.queue.qsize())
+        self.last_flush_time = time()
+        for task_type in list(self.buffers.keys()):
+            datas = self.buffers[task_type]
+            self.buffers[task_type] = []
+
+            # 重试时缓冲区可能很大, 按 batch_size 分批写
+            while datas:
+                batch = datas[:self.batch_size]
+                start = time()
+                try:
+                    if task_type == "tick":
+                        mongo_service_manager.save_tick_data(batch)
+                    else:
+                        mongo_service_manager.save_bar_data(batch)
+                except Exception as ex:
+                    self.on_flush_error(task_type, datas, ex)
+                    return
+
+                datas = datas[len(batch):]
+                cost = time() - start
+                self.write_count += len(batch)
+                self.flush_count += 1
+                self.flush_cost += cost
+                self.max_flush_cost = max(self.max_flush_cost, cost)
+
+        self.retry_interval = 0
+        self.next_retry_time = 0
+
+    def on_flush_error(self, task_type, datas, ex):
+        """
+        没写进去的数据放回缓冲区最前面, 退避一段时间后再重试
+        """
+        self.buffers[task_type] = datas + self.buffers[task_type]
+        self.check_buffer_size()
+
+        self.retry_interval = min(self.retry_interval * 2, self.max_retry_interval) if self.retry_interval else 1
+        self.next_retry_time = time() + self.retry_interval
+        log_service_manager.write_log("[RecorderEngine] flush {} num:{} error:{}, retry after {}s".format(
+            task_type, len(datas), ex, self.retry_interval))
+
+    def get_stat(self):
+        seconds = max(time() - self.stat_start_time, 1e-6)
+        return {
+            "queue_size": self.queue.qsize(),
+            "max_queue_size": self.max_queue_size,
+            "records_per_second": self.write_count / seconds,
+            "flush_count": self.flush_count,
+            "avg_flush_ms": self.flush_cost * 1000 / self.flush_count if self.flush_count else 0,
+            "max_flush_ms": self.max_flush_cost * 1000,
+            "buffer_size": len(self.buffers["tick"]) + len(self.buffers["bar"]),
+            "drop_count": self.drop_count
+        }
+
+    def check_stat(self):
+        if time() - self.stat_start_time < self.stat_interval:
+            return
+        log_service_manager.write_log("[RecorderEngine] stat:{}".format(self.get_stat()))
+        self.stat_start_time = time()
+        self.write_count = 0
+        self.flush_count = 0
+        self.flush_cost = 0
+        self.max_flush_cost = 0
+        self.max_queue_size = 0
+        self.drop_count = 0
 
     def close(self):
         self.active = False
 
-        if self.thread.isAlive():
+        if self.thread.is_alive():
             self.thread.join()
 
     def start(self):
@@ -1,7 +1,6 @@
 # coding=utf-8
 
 from copy import copy
-import json
 
 from tumbler.event import Event
 from tumbler.event import (
@@ -29,6 +28,7 @@ from tumbler.object import TickData, MergeTickData, TransferRequest, MQSubscribe
 from tumbler.object import CoverOrderRequest, RejectCoverOrderRequest, DictAccountData
 from tumbler.object import PositionData, AccountData, TradeData, BBOTickData
 from tumbler.service.log_service import log_service_manager
+from tumbler.function.mq_codec import mq_codec_manager
 
 from .base import get_diff_type_exchange_name, get_receive_unique_queue
 
@@ -72,9 +72,7 @@ class MQGet(object):
     def _receive(self, data):
         try:
             # log_service_manager.write_log("_receive data:{}".format(data))
-            data = json.loads(data)
-
-            for key, data in data.items():
+            for key, data in mq_codec_manager.decode(data):
                 u_class, type_event = MQ_PARSE_DICT[key]
                 obj = u_class()
                 obj.get_from_json(data)
@@ -722,7 +722,7 @@ class Flash0xStrategy(Flash0xTemplate):
                 Callback of new trade data update.
                 """
         self.write_log('[on_trade] start')
-        self.write_log('[trade detail] :{}'.format(trade.__dict__))
+        self.write_log('[trade detail] :{}'.format(trade.get_fields()))
 
         self.write_important_log(
             '[trade] symbol:{},exchange:{},direciton:{},price:{},volume:{}'.format(trade.symbol, trade.exchange,
@@ -730,7 +730,7 @@ class Flash0xStrategy(Flash0xTemplate):
                                                                                    trade.volume))
 
     def on_transfer(self, transfer_req):
-        msg = "[process_transfer_event] :{}".format(transfer_req.__dict__)
+        msg = "[process_transfer_event] :{}".format(transfer_req.get_fields())
         self.write_important_log(msg)
 
         if self.working_transfer_request:
@@ -277,7 +277,7 @@ class SuperVolumeV1Strategy(Flash0xTemplate):
                        format(account.account_id, account.available, account.balance))
 
     def on_transfer(self, transfer_req):
-        msg = "[process_transfer_event] :{}".format(transfer_req.__dict__)
+        msg = "[process_transfer_event] :{}".format(transfer_req.get_fields())
         self.write_important_log(msg)
 
         if self.working_transfer_request:
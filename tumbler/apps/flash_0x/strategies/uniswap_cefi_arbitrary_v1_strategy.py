@@ -509,7 +509,7 @@ class UniswapCefiArbitraryV1Strategy(Flash0xTemplate):
             self.output_important_log()
 
     def on_trade(self, trade):
-        self.write_important_log('[trade detail] :{}'.format(trade.__dict__))
+        self.write_important_log('[trade detail] :{}'.format(trade.get_fields()))
 
     def output_important_log(self):
         self.write_log(f"[output_important_log] {self.work_exchange_info}")
@@ -66,7 +66,7 @@ class Flash0xTemplate(object):
         """
         Write a log message.
         """
-        self.file_print.write('[{}]:{}'.format(self.strategy_name, msg))
+        self.file_print.write('[{}]:{}', args=(self.strategy_name, msg))
 
     def load_bar(self, days, interval=Interval.MINUTE.value, callback=None):
         if not callback:
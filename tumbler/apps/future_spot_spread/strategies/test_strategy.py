@@ -303,7 +303,7 @@ class TestStrategy(FutureSpotSpreadTemplate):
                         get_vt_key(self.now_this_week_symbol, self.contract_exchange))
                     if contract:
                         self.write_log(f"[update_contracts] now go to unsubscribe {self.now_this_week_symbol}! "
-                                       f"contract:{contract.__dict__}")
+                                       f"contract:{contract.get_fields()}")
                         self.unsubscribe(contract)
                     else:
                         self.write_log(f"[update_contracts] now go to unsubscribe contract is None! "
@@ -432,7 +432,7 @@ class TestStrategy(FutureSpotSpreadTemplate):
 
     def on_trade(self, trade):
         self.write_log('[on_trade] start')
-        msg = '[trade detail] :{}'.format(trade.__dict__)
+        msg = '[trade detail] :{}'.format(trade.get_fields())
         self.write_important_log(msg)
         self.send_ding_msg(msg)
 
@@ -57,8 +57,7 @@ class FutureSpotSpreadTemplate(object):
         """
         Write a log message.
         """
-        self.file_print.write(
-            '{}:[{}]:{}'.format(datetime.now().strftime("%Y-%m-%d %H:%M:%S"), self.strategy_name, msg))
+        self.file_print.write('{:%Y-%m-%d %H:%M:%S}:[{}]:{}', args=(datetime.now(), self.strategy_name, msg))
 
     def write_important_log(self, msg):
         """
@@ -559,7 +559,7 @@ class Maker0xV1Strategy(Maker0xTemplate):
 
     def on_trade(self, trade):
         self.write_log('[on_trade] start')
-        self.write_log('[trade detail] :{}'.format(trade.__dict__))
+        self.write_log('[trade detail] :{}'.format(trade.get_fields()))
 
         self.write_important_log(
             '[trade] symbol:{},exchange:{},direciton:{},price:{},volume:{}'.format(trade.symbol, trade.exchange,
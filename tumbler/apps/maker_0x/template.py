@@ -67,7 +67,7 @@ class Maker0xTemplate(object):
         """
         Write a log message.
         """
-        self.file_print.write('{}:[{}]:{}'.format(datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f"), self.strategy_name, msg))
+        self.file_print.write('{:%Y-%m-%d %H:%M:%S.%f}:[{}]:{}', args=(datetime.now(), self.strategy_name, msg))
 
     def get_contract(self, vt_symbol):
         """
@@ -1,7 +1,5 @@
 # coding=utf-8
 
-import importlib
-import os
 import traceback
 from copy import copy
 from pathlib import Path
@@ -38,8 +36,11 @@ from tumbler.apps.market_maker.base import (
     STOP_ORDER_PREFIX
 )
 from tumbler.object import BBOTickData
+from tumbler.function.lazy import StrategyClassDict
+from tumbler.function.stop_order_book import StopOrderBook
 
 from tumbler.service import log_service_manager
+from tumbler.service.latency_trace_service import latency_trace_manager
 
 
 class MakerMakerEngine(BaseEngine):
@@ -52,7 +53,7 @@ class MakerMakerEngine(BaseEngine):
 
         self.strategy_setting = {}  # strategy_name: dict
 
-        self.classes = {}  # class_name: stategy_class
+        self.classes = StrategyClassDict(MarketMakerTemplate, self.write_log)  # class_name: stategy_class, 用到时才 import
         self.strategies = {}  # strategy_name: strategy
 
         self.symbol_strategy_map = defaultdict(list)  # vt_symbol: strategy list
@@ -66,7 +67,7 @@ class MakerMakerEngine(BaseEngine):
         self.order_id_strategy_map = {}  # vt_order_id: strategy
 
         self.stop_order_count = 0  # for generating stop_order_id
-        self.stop_orders = {}  # stop_order_id: stop_order
+        self.stop_orders = StopOrderBook()  # stop_order_id: stop_order, 按 vt_symbol 和价格索引
 
         self.strategy_order_id_map = defaultdict(set)  # strategy_name: order_id list
         self.vt_trade_ids = set()  # for filtering duplicate trade
@@ -179,36 +180,15 @@ class MakerMakerEngine(BaseEngine):
 
     def load_strategy_class_from_folder(self, path, module_name=""):
         """
-        Load strategy class from certain folder.
+        Index strategy class in certain folder, the module is imported when the class is used.
         """
-        for dirpath, dirnames, filenames in os.walk(str(path)):
-            for filename in filenames:
-                strategy_module_name = None
-                if filename.endswith(".py"):
-                    strategy_module_name = ".".join(
-                        [module_name, filename.replace(".py", "")])
-                elif filename.endswith(".pyd"):
-                    strategy_module_name = ".".join(
-                        [module_name, filename.split(".")[0]])
-
-                if strategy_module_name:
-                    self.load_strategy_class_from_module(strategy_module_name)
+        self.classes.add_folder(path, module_name)
 
     def load_strategy_class_from_module(self, module_name):
         """
         Load strategy class from module file.
         """
-        try:
-            module = importlib.import_module(module_name)
-
-            for name in dir(module):
-                value = getattr(module, name)
-                if (isinstance(value, type) and issubclass(value,
-                                                           MarketMakerTemplate) and value is not MarketMakerTemplate):
-                    self.classes[value.__name__] = value
-        except:
-            msg = "strategy_file {} load error ：\n{}".format(module_name, traceback.format_exc())
-            self.write_log(msg)
+        self.classes.load_module(module_name)
 
     def load_strategy_setting(self, strategy_setting={}):
         """
@@ -415,52 +395,50 @@ class MakerMakerEngine(BaseEngine):
         self.main_engine.cancel_order(req, order.exchange)
 
     def check_stop_order(self, tick):
-        for stop_order in list(self.stop_orders.values()):
-            if stop_order.vt_symbol != tick.vt_symbol:
+        # 只取出被这个 tick 价格穿过的停止单
+        for stop_order in self.stop_orders.get_triggered(tick.vt_symbol, tick.last_price):
+            if stop_order.vt_order_id not in self.stop_orders:
+                # 前面触发的停止单回调里撤掉了
                 continue
 
-            long_triggered = (stop_order.direction == Direction.LONG.value and tick.last_price >= stop_order.price)
-            short_triggered = (stop_order.direction == Direction.SHORT.value and tick.last_price <= stop_order.price)
-
-            if long_triggered or short_triggered:
-                strategy = self.strategies[stop_order.strategy_name]
-
-                # To get excuted immediately after stop order is
-                # triggered, use limit price if available, otherwise
-                # use ask_price_5 or bid_price_5
-                if stop_order.direction == Direction.LONG:
-                    price = tick.ask_prices[5]
-                    if not price:
-                        price = tick.ask_prices[0] * 1.01
-                else:
-                    price = tick.bid_prices[5]
-                    if not price:
-                        price = tick.bid_prices[0] * 0.99
-
-                vt_order_ids = self.send_limit_order(
-                    strategy,
-                    stop_order.symbol,
-                    stop_order.exchange,
-                    stop_order.direction,
-                    stop_order.offset,
-                    price,
-                    stop_order.volume
-                )
-
-                # Update stop order status if placed successfully
-                if vt_order_ids:
-                    # Remove from relation map.
-                    self.stop_orders.pop(stop_order.vt_order_id)
-
-                    strategy_vt_order_ids = self.strategy_order_id_map[strategy.strategy_name]
-                    if stop_order.vt_order_id in strategy_vt_order_ids:
-                        strategy_vt_order_ids.remove(stop_order.vt_order_id)
-
-                    # Change stop order status to cancelled and update to strategy.
-                    stop_order.status = StopOrderStatus.TRIGGERED.value
-                    stop_order.vt_order_ids = vt_order_ids
-
-                    self.call_strategy_func(strategy, strategy.on_stop_order, stop_order)
+            strategy = self.strategies[stop_order.strategy_name]
+
+            # To get excuted immediately after stop order is
+            # triggered, use limit price if available, otherwise
+            # use ask_price_5 or bid_price_5
+            if stop_order.direction == Direction.LONG:
+                price = tick.ask_prices[5]
+                if not price:
+                    price = tick.ask_prices[0] * 1.01
+            else:
+                price = tick.bid_prices[5]
+                if not price:
+                    price = tick.bid_prices[0] * 0.99
+
+            vt_order_ids = self.send_limit_order(
+                strategy,
+                stop_order.symbol,
+                stop_order.exchange,
+                stop_order.direction,
+                stop_order.offset,
+                price,
+                stop_order.volume
+            )
+
+            # Update stop order status if placed successfully
+            if vt_order_ids:
+                # Remove from relation map.
+                self.stop_orders.pop(stop_order.vt_order_id)
+
+                strategy_vt_order_ids = self.strategy_order_id_map[strategy.strategy_name]
+                if stop_order.vt_order_id in strategy_vt_order_ids:
+                    strategy_vt_order_ids.remove(stop_order.vt_order_id)
+
+                # Change stop order status to cancelled and update to strategy.
+                stop_order.status = StopOrderStatus.TRIGGERED.value
+                stop_order.vt_order_ids = vt_order_ids
+
+                self.call_strategy_func(strategy, strategy.on_stop_order, stop_order)
 
     def close(self):
         self.stop_all_strategies()
@@ -481,6 +459,20 @@ class MakerMakerEngine(BaseEngine):
             msg = "occour error! \n{} ex:{}".format(traceback.format_exc(), ex)
             self.write_log(msg, strategy)
 
+    def call_strategy_tick_func(self, strategy, func, tick):
+        """
+        推送行情给策略, 开启 latency_trace 时统计推送延迟和策略耗时, 期间发出的订单关联到这个行情
+        """
+        if not latency_trace_manager.enabled:
+            self.call_strategy_func(strategy, func, tick)
+            return
+
+        latency_trace_manager.begin_dispatch(tick, strategy.strategy_name)
+        try:
+            self.call_strategy_func(strategy, func, tick)
+        finally:
+            latency_trace_manager.end_dispatch()
+
     def register_event(self):
         self.event_engine.register(EVENT_TICK, self.process_tick_event)
         self.event_engine.register(EVENT_MERGE_TICK, self.process_merge_tick_event)
@@ -524,7 +516,7 @@ class MakerMakerEngine(BaseEngine):
 
         for strategy in strategies:
             if strategy.inited:
-                self.call_strategy_func(strategy, strategy.on_tick, tick)
+                self.call_strategy_tick_func(strategy, strategy.on_tick, tick)
 
     def process_merge_tick_event(self, event):
         merge_tick = event.data
@@ -534,7 +526,7 @@ class MakerMakerEngine(BaseEngine):
 
         for strategy in strategies:
             if strategy.inited:
-                self.call_strategy_func(strategy, strategy.on_merge_tick, merge_tick)
+                self.call_strategy_tick_func(strategy, strategy.on_merge_tick, merge_tick)
 
     def process_order_event(self, event):
         order = event.data
@@ -566,7 +558,7 @@ class MakerMakerEngine(BaseEngine):
 
     def process_cover_order_event(self, event):
         cover_order_req = event.data
-        self.write_log("[process_cover_order_event] cover_order_req:{}".format(cover_order_req.__dict__))
+        self.write_log("[process_cover_order_event] cover_order_req:{}".format(cover_order_req.get_fields()))
         strategies = self.cover_order_req_map[cover_order_req.vt_symbol]
         if not strategies:
             return
@@ -577,7 +569,7 @@ class MakerMakerEngine(BaseEngine):
 
     def process_trade_event(self, event):
         trade = event.data
-        self.write_log("[process_trade_event]:{}".format(trade.__dict__))
+        self.write_log("[process_trade_event]:{}".format(trade.get_fields()))
 
         # Filter duplicate trade push
         if trade.vt_trade_id in self.vt_trade_ids:
@@ -566,7 +566,7 @@ class GridMakerV1Strategy(MarketMakerTemplate):
 
     def on_trade(self, trade):
         self.write_log('[on_trade] start')
-        self.write_log('[trade detail] :{}'.format(trade.__dict__))
+        self.write_log('[trade detail] :{}'.format(trade.get_fields()))
         self.write_log('[on_trade] end')
 
         self.write_log('exchange_info:{}'.format(self.exchange_info))
@@ -342,7 +342,7 @@ class LineStrategy(MarketMakerTemplate):
         
     def on_trade(self, trade):
         #self.write_log('[on_trade] start')
-        #self.write_log('[trade detail] :{}'.format(trade.__dict__))
+        #self.write_log('[trade detail] :{}'.format(trade.get_fields()))
 
         # if trade.direction == Direction.LONG.value:
         #     self.pos += trade.volume
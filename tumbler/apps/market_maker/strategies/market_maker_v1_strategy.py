@@ -1129,7 +1129,7 @@ class MarketMakerV1Strategy(MarketMakerTemplate):
         Callback of new trade data update.
         """
         self.write_log('[on_trade] start')
-        self.write_log('[trade detail] :{}'.format(trade.__dict__))
+        self.write_log('[trade detail] :{}'.format(trade.get_fields()))
 
         self.write_important_log(
             '[trade] symbol:{},exchange:{},direciton:{},price:{},volume:{}'.format(trade.symbol, trade.exchange,
@@ -1141,7 +1141,7 @@ class MarketMakerV1Strategy(MarketMakerTemplate):
         :param transfer_req:
         :return:
         """
-        msg = "[process_transfer_event] :{}".format(transfer_req.__dict__)
+        msg = "[process_transfer_event] :{}".format(transfer_req.get_fields())
         self.write_important_log(msg)
 
         if self.working_transfer_request:
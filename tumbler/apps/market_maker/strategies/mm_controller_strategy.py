@@ -98,7 +98,7 @@ class MarketMakerControllerStrategy(MarketMakerTemplate):
         self.put_event()
 
     def on_bbo_tick(self, tick: BBOTickData):
-        #self.write_log("[on_bbo_tick] tick:{}".format(tick.__dict__))
+        #self.write_log("[on_bbo_tick] tick:{}".format(tick.get_fields()))
         self.price_info[tick.exchange] = copy(tick.symbol_dic)
 
     def clean_old_orders(self):
@@ -158,7 +158,7 @@ class MarketMakerControllerStrategy(MarketMakerTemplate):
         req.price = price
         req.volume = trade.volume
         cover_order_reqs.append(copy(req))
-        #self.write_log("[get_cover_orders_from_direct_type] req:{}".format(req.__dict__))
+        #self.write_log("[get_cover_orders_from_direct_type] req:{}".format(req.get_fields()))
         return cover_order_reqs
 
     def get_cover_order_from_two_type(self, control_dict, trade: TradeData):
@@ -188,7 +188,7 @@ class MarketMakerControllerStrategy(MarketMakerTemplate):
         req.volume = target_volume
         cover_order_reqs.append(copy(req))
 
-        self.write_log("[get_cover_order_from_two_type] req1:{}".format(req.__dict__))
+        self.write_log("[get_cover_order_from_two_type] req1:{}".format(req.get_fields()))
         req = CoverOrderRequest()
         req.symbol = control_dict["base"]
         req.exchange = base_exchange
@@ -198,11 +198,11 @@ class MarketMakerControllerStrategy(MarketMakerTemplate):
         req.volume = base_volume
         cover_order_reqs.append(copy(req))
 
-        self.write_log("[get_cover_order_from_two_type] req2:{}".format(req.__dict__))
+        self.write_log("[get_cover_order_from_two_type] req2:{}".format(req.get_fields()))
         return cover_order_reqs
 
     def on_trade(self, trade: TradeData):
-        self.write_log("[on_trade]:{}".format(trade.__dict__))
+        self.write_log("[on_trade]:{}".format(trade.get_fields()))
         if trade.trade_type in [TradeType.PUT_ORDER.value, TradeType.COVER_ORDER.value]:
             if trade.vt_trade_id not in self.recevice_trade_data.keys():
                 self.write_log("trade.vt_trade_id:{} is in".format(trade.vt_trade_id))
@@ -222,7 +222,7 @@ class MarketMakerControllerStrategy(MarketMakerTemplate):
                         self.send_cover_order_req(copy(cover_order))
                 else:
                     # COVER_ORDER
-                    self.write_log("has cover order:{}".format(trade.__dict__))
+                    self.write_log("has cover order:{}".format(trade.get_fields()))
                     target_asset, base_asset = get_two_currency(self.target_symbol)
                     if trade.direction == Direction.LONG.value:
                         self.frozen_order_dict[trade.exchange][base_asset] -= trade.price * trade.volume
@@ -230,7 +230,7 @@ class MarketMakerControllerStrategy(MarketMakerTemplate):
                         self.frozen_order_dict[trade.exchange][target_asset] += trade.volume
 
     def on_reject_cover_order_request(self, req: RejectCoverOrderRequest):
-        self.write_log("[receive reject order] req:{}".format(req.__dict__))
+        self.write_log("[receive reject order] req:{}".format(req.get_fields()))
         self.send_cover_order_req(req.make_cover_order_req())
 
     def send_cover_order_req(self, req: CoverOrderRequest):
@@ -129,12 +129,12 @@ class MarketMakerSpotCoverV1(MarketMakerTemplate):
                                 order.status))
 
     def on_bbo_tick(self, tick: BBOTickData):
-        #self.write_log("[on_bbo_tick] tick:{}".format(tick.__dict__))
+        #self.write_log("[on_bbo_tick] tick:{}".format(tick.get_fields()))
         self.price_info = copy(tick.symbol_dic)
         self.cover_orders()
 
     def on_cover_order_request(self, cover_req: CoverOrderRequest):
-        self.write_log("on_cover_order_request req:{}".format(cover_req.__dict__))
+        self.write_log("on_cover_order_request req:{}".format(cover_req.get_fields()))
         dic = self.need_work_volume_compute.get(cover_req.symbol, {})
         if dic:
             dic[cover_req.direction]["need_cover_target_volume"] += float(cover_req.volume)
@@ -499,7 +499,7 @@ class MarketMakerSpotPutOrderV1(MarketMakerTemplate):
             self.mov_xishu_sell = 1
 
     def on_merge_tick(self, merge_tick: MergeTickData):
-        # self.write_log("[on_merge_tick] :{}".format(merge_tick.__dict__))
+        # self.write_log("[on_merge_tick] :{}".format(merge_tick.get_fields()))
         if merge_tick.bids[0][0] > 0:
             self.base_bids, self.base_asks = merge_tick.get_depth()
             self.flag_update_base_tick = True
@@ -559,7 +559,7 @@ class MarketMakerSpotPutOrderV1(MarketMakerTemplate):
         elif req.asset_id == self.base_symbol:
             self.target_exchange_info["pos_base_symbol"] -= req.transfer_amount
         else:
-            self.write_log("[has transfer other symbols] req:{}".format(req.__dict__))
+            self.write_log("[has transfer other symbols] req:{}".format(req.get_fields()))
 
     def on_order(self, order):
         """
@@ -596,7 +596,7 @@ class MarketMakerSpotPutOrderV1(MarketMakerTemplate):
         Callback of new trade data update.
         """
         self.write_log('[on_trade] start')
-        self.write_log('[trade detail] :{}'.format(trade.__dict__))
+        self.write_log('[trade detail] :{}'.format(trade.get_fields()))
 
         self.write_important_log(
             '[trade] symbol:{},exchange:{},direciton:{},price:{},volume:{}'.format(trade.symbol, trade.exchange,
@@ -609,7 +609,7 @@ class MarketMakerSpotPutOrderV1(MarketMakerTemplate):
     #     :param acct:
     #     :return:
     #     """
-    #     self.write_log("on_account acct:{}".format(acct.__dict__))
+    #     self.write_log("on_account acct:{}".format(acct.get_fields()))
     #     asset, exchange = get_from_vt_key(acct.vt_account_id)
     #     if exchange == self.base_exchange_info["exchange_name"]:
     #         self.cover_asset_dict[asset] = acct.balance
@@ -619,10 +619,10 @@ class MarketMakerSpotPutOrderV1(MarketMakerTemplate):
     #         elif asset == self.base_symbol:
     #             self.target_exchange_info["pos_base_symbol"] = acct.balance
     #     else:
-    #         self.write_log("maybe error:{}".format(acct.__dict__))
+    #         self.write_log("maybe error:{}".format(acct.get_fields()))
 
     def on_dict_account(self, dict_acct: DictAccountData):
-        # self.write_log("on_dict_account:{}".format(dict_acct.__dict__))
+        # self.write_log("on_dict_account:{}".format(dict_acct.get_fields()))
         if dict_acct.account_name == MQCommonInfo.COVER_ALL_ACCOUNT.value:
             for asset, dic in dict_acct.account_dict.items():
                 self.cover_asset_dict[asset] = dic["balance"]
@@ -71,7 +71,7 @@ class MarketMakerTemplate(object):
         """
         Write a log message.
         """
-        self.file_print.write('[{}]:{}'.format(self.strategy_name, msg))
+        self.file_print.write('[{}]:{}', args=(self.strategy_name, msg))
 
     def get_contract(self, vt_symbol):
         """
@@ -173,7 +173,7 @@ class MarketMakerTemplate(object):
         self.send_mq_msg(exchange_name, acct.get_mq_msg())
 
     def send_put_trades(self, trade: TradeData):
-        # self.write_log("[send_put_trades] trade:{}".format(trade.__dict__))
+        # self.write_log("[send_put_trades] trade:{}".format(trade.get_fields()))
         exchange_name = get_diff_type_exchange_name(MQSubscribeType.TRADE_DATA.value, trade.vt_symbol)
         self.send_mq_msg(exchange_name, trade.get_mq_msg())
 
@@ -218,7 +218,7 @@ class MarketMakerTemplate(object):
         :param transfer_req:
         :return:
         """
-        msg = "[process_transfer_event] :{}".format(transfer_req.__dict__)
+        msg = "[process_transfer_event] :{}".format(transfer_req.get_fields())
         self.write_important_log(msg)
 
         if self.working_transfer_request:
@@ -43,12 +43,36 @@ SETTINGS = {
     "mysql_port": 3306,
     "mysql_user": "root",
     "mysql_password": "",
+    "mysql_pool_min_cached": 5,  # 连接池启动时建立的空闲连接数
+    "mysql_pool_max_cached": 10,  # 连接池最多保留的空闲连接数
+    "mysql_pool_max_connections": 30,  # 同时借出的连接上限, 达到上限时等待归还
+    "mysql_pool_ping": 1,  # 借出连接时 ping 检查, 断开的连接自动重连
+
+    #####################################
+    # local bar cache config
+    "bar_cache_dir": "",  # 为空时使用 .tumbler/bar_cache
+    "bar_cache_max_size": 2 * 1024 * 1024 * 1024,  # 本地bar缓存最多占用的字节数
+
+    #####################################
+    # mq codec config
+    "mq_codec": "json",  # 发送端编码, json 或 binary; 接收端按消息头自动识别, 先升级接收端再切换发送端
 
     #####################################
     # log config
     "log.level": DEBUG,
     "log.console": True,
     "log.file": True,
+    "log.queue": False,  # True 时日志先进有界队列, 由后台线程批量写盘, 行情/下单线程不等磁盘和进程锁
+    "log.queue_size": 100000,  # 队列最多缓存的日志条数
+    "log.queue_full_policy": "drop",  # 队列满时 drop: 直接丢弃; block: 最多等 log.queue_block_timeout 秒再丢弃
+    "log.queue_block_timeout": 0.05,
+    "log.queue_batch_size": 500,  # 写日志线程每批最多写多少条后刷盘
+
+    #####################################
+    # latency trace config
+    "latency_trace": False,  # True 时统计行情收到 -> 进队列 -> 推给策略 -> 下单各阶段的延迟
+    "latency_trace_interval": 60,  # 每隔多少秒推送一次 EVENT_LATENCY_TRACE 并写入文件
+    "latency_trace_file": "latency_trace.json",  # 写在 .tumbler 目录下
 
     #####################################
     "ETH_PROVIDER": "https://mainnet.infura.io/v3/9785c3b226dd4c2e9bc9a62739059356",
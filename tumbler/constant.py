@@ -151,6 +151,23 @@ class RunMode(Enum):
     NORMAL = "NORMAL"
 
 
+class DataSource(Enum):
+    """
+    Source of history bar data
+    """
+    MONGO = "MONGO"
+    MYSQL = "MYSQL"
+    REST = "REST"
+
+
+class MQCodecType(Enum):
+    """
+    Wire codec of mq message
+    """
+    JSON = "json"
+    BINARY = "binary"
+
+
 class NrpeState(Enum):
     """
     Statement of Nrpe
@@ -0,0 +1,307 @@
+# coding=utf-8
+
+import os
+import json
+import shutil
+from time import time
+from datetime import datetime, timedelta
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+import tumbler.config as config
+from tumbler.constant import DataSource
+from tumbler.function import get_vt_key, get_folder_path, timeframe_to_seconds
+from tumbler.object import BarArrayData
+from tumbler.service import mongo_service_manager
+from tumbler.service.mysql_service import MysqlService
+from tumbler.service.log_service import log_service_manager
+
+INDEX_FILE = "index.json"
+LOCK_FILE = ".lock"
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class BarCache(object):
+    """
+    本地磁盘上的历史bar缓存, 按 vt_symbol + interval 分目录保存
+    1. 每个目录下是若干段互不重叠的连续数据 (BarArrayData 二进制格式, 可以 memory-map 读取),
+       index.json 记录每一段覆盖的时间区间 [start, end]
+    2. 查询任意区间时, 只从 mongodb / mysql / 交易所REST 下载没有覆盖到的部分,
+       然后和相邻的段合并成一段; 每段只覆盖到下载到的最后一根bar, 最近还没走完的bar不缓存
+    3. 总大小超过 max_size 时, 按最近访问时间淘汰
+    4. 数据源修正了某段数据后用 invalidate 删除这段缓存
+    多个进程(比如参数优化)可以共用同一个目录, 修改 index.json 时加文件锁
+    """
+
+    def __init__(self, root_dir="", max_size=0):
+        self._root_dir = root_dir
+        self.max_size = max_size or config.SETTINGS.get("bar_cache_max_size", 0)
+
+    @property
+    def root_dir(self):
+        if not self._root_dir:
+            self._root_dir = config.SETTINGS.get("bar_cache_dir", "") or get_folder_path("bar_cache")
+            if not os.path.exists(self._root_dir):
+                os.makedirs(self._root_dir)
+        return self._root_dir
+
+    def get_symbol_dir(self, vt_symbol, interval):
+        path = BarArrayData.get_store_path(self.root_dir, vt_symbol, interval)
+        if not os.path.exists(path):
+            os.makedirs(path, exist_ok=True)
+        return path
+
+    @contextmanager
+    def lock(self, symbol_dir):
+        f = open(os.path.join(symbol_dir, LOCK_FILE), "w")
+        try:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            f.close()
+
+    @staticmethod
+    def load_index(symbol_dir):
+        path = os.path.join(symbol_dir, INDEX_FILE)
+        if not os.path.exists(path):
+            return []
+        with open(path, "r") as f:
+            chunks = json.load(f)
+        for chunk in chunks:
+            chunk["start"] = datetime.strptime(chunk["start"], DATETIME_FORMAT)
+            chunk["end"] = datetime.strptime(chunk["end"], DATETIME_FORMAT)
+        chunks.sort(key=lambda x: x["start"])
+        return chunks
+
+    @staticmethod
+    def save_index(symbol_dir, chunks):
+        data = []
+        for chunk in chunks:
+            d = dict(chunk)
+            d["start"] = chunk["start"].strftime(DATETIME_FORMAT)
+            d["end"] = chunk["end"].strftime(DATETIME_FORMAT)
+            data.append(d)
+
+        path = os.path.join(symbol_dir, INDEX_FILE)
+        tmp_path = "{}.{}".format(path, os.getpid())
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def get_gaps(chunks, start, end):
+        """
+        [start, end] 中没有被任何一段覆盖的区间
+        """
+        gaps = []
+        cur = start
+        for chunk in chunks:
+            if chunk["end"] < cur:
+                continue
+            if chunk["start"] > end:
+                break
+            if chunk["start"] > cur:
+                gaps.append((cur, chunk["start"]))
+            cur = max(cur, chunk["end"])
+        if cur < end:
+            gaps.append((cur, end))
+        return gaps
+
+    @staticmethod
+    def fetch(symbol, exchange, interval, start, end, source):
+        if source == DataSource.MONGO.value:
+            return mongo_service_manager.load_bar_array(symbol, exchange, interval, start, end)
+
+        if source == DataSource.MYSQL.value:
+            bars = MysqlService.get_mysql_service().get_bars(symbols=[symbol], period=interval,
+                                                             start_datetime=start, end_datetime=end)
+        else:
+            from tumbler.data import data_client_dict
+            bars = data_client_dict[exchange]().get_kline(symbol, interval, start_datetime=start, end_datetime=end)
+        bars.sort(key=lambda x: x.datetime)
+        return BarArrayData.from_bars(bars, interval).slice(start, end)
+
+    def save_chunk(self, symbol_dir, arr, start, end):
+        chunk = {
+            "start": start,
+            "end": end,
+            "dir": "{}_{}".format(os.getpid(), int(time() * 1e6))
+        }
+        path = os.path.join(symbol_dir, chunk["dir"])
+        arr.save_file(path)
+        chunk["size"] = get_dir_size(path)
+        chunk["access"] = time()
+        return chunk
+
+    def fill_gaps(self, symbol_dir, chunks, symbol, exchange, interval, start, end, source, now):
+        """
+        下载缺失的区间, 并把与 [start, end] 相交且连续的段合并成一段
+        1. 每段只记录到返回的最后一根bar, 数据源之后补进来的数据下次还会去取
+        2. 还没走完的bar (开始时间 + 周期 > now) 不缓存
+        """
+        closed_end = now - timedelta(seconds=timeframe_to_seconds(interval) or 0)
+        new_chunks = []
+        for gap_start, gap_end in self.get_gaps(chunks, start, end):
+            arr = self.fetch(symbol, exchange, interval, gap_start, gap_end, source)
+            log_service_manager.write_log("[BarCache] fetch {} {} {}~{} from {} num:{}".format(
+                get_vt_key(symbol, exchange), interval, gap_start, gap_end, source, len(arr)))
+            if gap_end > closed_end:
+                arr = arr.slice(None, closed_end)
+            if not len(arr):
+                continue
+            last = arr.datetime[-1].item()
+            if last <= gap_start and any(c["start"] <= gap_start <= c["end"] for c in chunks):
+                # 只返回了已缓存的边界上那根bar, 没有新数据
+                continue
+            new_chunks.append({"start": gap_start, "end": last, "arr": arr})
+
+        touched = sorted([c for c in chunks + new_chunks if c["start"] <= end and c["end"] >= start],
+                         key=lambda x: x["start"])
+        groups = []
+        for chunk in touched:
+            if groups and chunk["start"] <= max(c["end"] for c in groups[-1]):
+                groups[-1].append(chunk)
+            else:
+                groups.append([chunk])
+
+        merged_list = []
+        for group in groups:
+            if len(group) == 1 and "arr" not in group[0]:
+                merged_list.append(group[0])
+                continue
+
+            arr_list = []
+            for chunk in group:
+                if "arr" in chunk:
+                    arr_list.append(chunk["arr"])
+                else:
+                    arr_list.append(BarArrayData.load_file(os.path.join(symbol_dir, chunk["dir"]), mmap_mode=None))
+            arr = BarArrayData.merge(arr_list)
+            arr.symbol, arr.exchange, arr.interval = symbol, exchange, interval
+            arr.vt_symbol = get_vt_key(symbol, exchange)
+            merged_list.append(self.save_chunk(symbol_dir, arr, min(c["start"] for c in group),
+                                               max(c["end"] for c in group)))
+
+            for chunk in group:
+                if "dir" in chunk:
+                    shutil.rmtree(os.path.join(symbol_dir, chunk["dir"]), ignore_errors=True)
+        return [c for c in chunks if c not in touched] + merged_list
+
+    def load_bar_array(self, symbol, exchange, interval, start, end=None, source=DataSource.MONGO.value):
+        now = datetime.now()
+        if end is None or end > now:
+            # 还没发生的时间不能记为已缓存
+            end = now
+
+        vt_symbol = get_vt_key(symbol, exchange)
+        symbol_dir = self.get_symbol_dir(vt_symbol, interval)
+        with self.lock(symbol_dir):
+            chunks = self.load_index(symbol_dir)
+            if self.get_gaps(chunks, start, end):
+                chunks = self.fill_gaps(symbol_dir, chunks, symbol, exchange, interval, start, end, source, now)
+
+            # 数据源中间缺数据时可能有多段
+            overlapping = sorted([c for c in chunks if c["start"] <= end and c["end"] >= start],
+                                 key=lambda x: x["start"])
+            if not overlapping:
+                return BarArrayData(symbol, exchange, interval)
+            for chunk in overlapping:
+                chunk["access"] = time()
+            self.save_index(symbol_dir, chunks)
+
+            # 拿着锁打开 (memory-map) 文件, 之后别的进程合并或淘汰时删掉目录, 已经映射的数据仍然可以读
+            paths = [os.path.join(symbol_dir, chunk["dir"]) for chunk in overlapping]
+            arr_list = [BarArrayData.load_file(path, start, end) for path in paths]
+
+        arr = arr_list[0] if len(arr_list) == 1 else BarArrayData.merge(arr_list)
+        self.evict(keep=paths)
+        return arr
+
+    def invalidate(self, vt_symbol, interval, start=None, end=None):
+        """
+        删除 [start, end] 内的缓存, 下次读取时重新下载, 数据源补录或修正了这段数据后调用
+        start / end 为空表示不限
+        """
+        symbol_dir = BarArrayData.get_store_path(self.root_dir, vt_symbol, interval)
+        if not os.path.exists(symbol_dir):
+            return
+
+        with self.lock(symbol_dir):
+            chunks = []
+            for chunk in self.load_index(symbol_dir):
+                if (start is not None and chunk["end"] < start) or (end is not None and chunk["start"] > end):
+                    chunks.append(chunk)
+                    continue
+
+                path = os.path.join(symbol_dir, chunk["dir"])
+                arr = BarArrayData.load_file(path, mmap_mode=None)
+                i, j = arr.get_index(start, end)
+                # 保留 [start, end] 前后的部分
+                before = arr.slice_index(0, i)
+                if len(before):
+                    chunks.append(self.save_chunk(symbol_dir, before, chunk["start"], before.datetime[-1].item()))
+                after = arr.slice_index(j, len(arr))
+                if len(after):
+                    chunks.append(self.save_chunk(symbol_dir, after, after.datetime[0].item(), chunk["end"]))
+                shutil.rmtree(path, ignore_errors=True)
+            self.save_index(symbol_dir, chunks)
+        log_service_manager.write_log("[BarCache] invalidate {} {} {}~{}".format(vt_symbol, interval, start, end))
+
+    def load_bar_data(self, symbol, exchange, interval, start, end=None, source=DataSource.MONGO.value):
+        return self.load_bar_array(symbol, exchange, interval, start, end, source).get_bars()
+
+    def get_all_chunks(self):
+        ret = []
+        for name in os.listdir(self.root_dir):
+            symbol_dir = os.path.join(self.root_dir, name)
+            if os.path.isdir(symbol_dir):
+                for chunk in self.load_index(symbol_dir):
+                    ret.append((symbol_dir, chunk))
+        return ret
+
+    def evict(self, keep=()):
+        """
+        超过 max_size 时按最近访问时间从旧到新删除
+        """
+        if not self.max_size:
+            return
+        all_chunks = self.get_all_chunks()
+        total = sum(chunk.get("size", 0) for _, chunk in all_chunks)
+        if total <= self.max_size:
+            return
+
+        all_chunks.sort(key=lambda x: x[1].get("access", 0))
+        for symbol_dir, chunk in all_chunks:
+            if total <= self.max_size:
+                break
+            path = os.path.join(symbol_dir, chunk["dir"])
+            if path in keep:
+                continue
+            with self.lock(symbol_dir):
+                chunks = [c for c in self.load_index(symbol_dir) if c["dir"] != chunk["dir"]]
+                self.save_index(symbol_dir, chunks)
+                shutil.rmtree(path, ignore_errors=True)
+            total -= chunk.get("size", 0)
+            log_service_manager.write_log("[BarCache] evict {}".format(path))
+
+    def clear(self, vt_symbol=None, interval=None):
+        for name in os.listdir(self.root_dir):
+            if vt_symbol and not name.startswith(vt_symbol):
+                continue
+            if interval and not name.endswith("_{}".format(interval)):
+                continue
+            shutil.rmtree(os.path.join(self.root_dir, name), ignore_errors=True)
+
+
+def get_dir_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+bar_cache_manager = BarCache()
@@ -45,9 +45,16 @@ PERIOD_MAPPING = {
 
 
 class BinanceClient(DataClient):
+    support_range_request = True
+    page_limit = 1000
+
+    def __init__(self, url_base=REST_MARKET_HOST):
+        super(BinanceClient, self).__init__()
+        self.url_base = url_base
+
     def make_request(self, symbol, interval, start_dt=None, end_dt=None, limit=1000):
         try:
-            url = REST_MARKET_HOST + "/api/v3/klines"
+            url = self.url_base + "/api/v3/klines"
             params = {"symbol": symbol, "interval": interval, "startTime": start_dt, "endTime": end_dt, "limit": limit}
             log_service_manager.write_log("[make_request] url:{}/{}".format(url, urlencode(params)))
             response = requests.request("GET", url, params=params, timeout=15)
@@ -3,15 +3,25 @@
 from datetime import datetime, timedelta
 import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
 
 from tumbler.object import BarData
 from tumbler.constant import Interval, Exchange
 from tumbler.function import get_format_lower_symbol, get_vt_key
 from tumbler.service.log_service import log_service_manager
 from tumbler.service import mongo_service_manager
+from tumbler.data.download.kline_downloader import KlineDownloader, save_bars_to_mongodb
 
 
 class DataClient(object):
+    # make_request 是否严格按 [start_dt, end_dt] 返回数据, 是的话 KlineDownloader 可以把时间段拆成多页并发下载
+    support_range_request = False
+    # 每次请求最多返回的K线数量
+    page_limit = 1000
+
     def format_time_stamp_10(self, s):
         if len(str(int(s))) == 13:
             return int(float(s) / 1000.0)
@@ -42,10 +52,63 @@ class DataClient(object):
 
     def get_bars_to_pandas_data(self, symbols=[], period=Interval.DAY.value, start_datetime=datetime(2010, 1, 1),
                                 end_datetime=datetime(2024, 12, 31)):
-        bars = self.get_klines(symbols, period, start_datetime, end_datetime)
-        return BarData.get_pandas_from_bars(bars)
+        if self.__class__.get_kline is not DataClient.get_kline:
+            # 子类自己实现了 get_kline, 只能走 BarData
+            bars = self.get_klines(symbols, period, start_datetime, end_datetime)
+            return BarData.get_pandas_from_bars(bars)
+
+        dfs = []
+        for symbol in symbols:
+            rows = self.get_kline_rows(symbol, period, start_datetime, end_datetime)
+            dfs.append(self.get_pandas_from_rows(get_format_lower_symbol(symbol), rows))
+        if not dfs:
+            return BarData.get_pandas_from_bars([])
+        return pd.concat(dfs, ignore_index=True)
+
+    def get_pandas_from_rows(self, symbol, rows):
+        """
+        交易所返回的 [timestamp, open, high, low, close, volume, ...] 直接转成 DataFrame, 不创建 BarData
+        """
+        values = []
+        datetimes = []
+        for row in rows:
+            try:
+                value = [float(x) for x in row[1:6]]
+                if len(value) < 5:
+                    raise ValueError("need 6 columns")
+                # 与 get_bars_from_rows 一样逐行转本地时间, 跨夏令时也正确
+                dt = datetime.fromtimestamp(float(row[0]) / 1e3)
+            except Exception as ex:
+                self.write_error('error when convert bar:{},ex:{}'.format(row, str(ex)))
+                continue
+            values.append(value)
+            datetimes.append(dt)
+
+        if not values:
+            return BarData.get_pandas_from_bars([])
+
+        arr = np.array(values, dtype=np.float64)
+        return pd.DataFrame({
+            "symbol": symbol,
+            "exchange": self.get_exchange(),
+            "datetime": pd.to_datetime(datetimes),
+            "open": arr[:, 0],
+            "high": arr[:, 1],
+            "low": arr[:, 2],
+            "close": arr[:, 3],
+            "volume": arr[:, 4]
+        })
+
+    def get_klines(self, symbols, period, start_datetime=None, end_datetime=None, max_workers=1):
+        """
+        max_workers > 1 时多个 symbol 并发下载, 返回顺序与 symbols 一致
+        """
+        if max_workers > 1 and len(symbols) > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                results = executor.map(lambda x: self.get_kline(symbol=x, period=period, start_datetime=start_datetime,
+                                                                end_datetime=end_datetime), symbols)
+                return [bar for bars in results for bar in bars]
 
-    def get_klines(self, symbols, period, start_datetime=None, end_datetime=None):
         ret = []
         for symbol in symbols:
             bars = self.get_kline(
@@ -53,19 +116,19 @@ class DataClient(object):
             ret.extend(bars)
         return ret
 
-    def get_kline(self, symbol, period, start_datetime=None, end_datetime=None):
-        ori_symbol = get_format_lower_symbol(symbol)
+    def get_kline_rows(self, symbol, period, start_datetime=None, end_datetime=None):
+        """
+        分页下载原始K线 [timestamp, open, high, low, close, volume, ...]
+        """
         symbol = self.get_format_symbol(symbol)
         period = self.get_format_period(period)
-        exchange = self.get_exchange()
-        ret_bars = []
         if isinstance(start_datetime, datetime):
             start_timestamp = int(time.mktime(start_datetime.timetuple()) * 1e3)
         else:
             start_timestamp = None
 
+        bars = []
         try:
-            bars = []
             if start_timestamp is not None:
                 if end_datetime is None:
                     end_timestamp = int(time.mktime(datetime.now().timetuple()) * 1e3)
@@ -109,36 +172,62 @@ class DataClient(object):
                         break
 
             log_service_manager.write_log("[get_kline] DownloadData Finished!")
-            for i, bar in enumerate(bars):
-                try:
-                    b = BarData()
-                    b.symbol = ori_symbol
-                    b.exchange = exchange
-                    b.vt_symbol = get_vt_key(b.symbol, b.exchange)
-                    b.open_price = float(bar[1])
-                    b.high_price = float(bar[2])
-                    b.low_price = float(bar[3])
-                    b.close_price = float(bar[4])
-
-                    b.datetime = datetime.fromtimestamp(bar[0] / 1e3)
-                    b.date = b.datetime.strftime("%Y-%m-%d")
-                    b.time = b.datetime.strftime("%H:%M:%S")
-
-                    b.volume = float(bar[5])
-                    b.interval = period
-
-                    b.gateway_name = "DB"
-                    ret_bars.append(b)
-                except Exception as ex:
-                    self.write_error(
-                        'error when convert bar:{},ex:{},t:{}'.format(bar, str(ex), traceback.format_exc()))
-            return ret_bars
         except Exception as ex:
             log_service_manager.write_log(
                 'exception in get:{},{},{}'.format(symbol, str(ex), traceback.format_exc()))
-            return ret_bars
+        return bars
+
+    def get_bars_from_rows(self, symbol, period, rows):
+        """
+        [timestamp, open, high, low, close, volume, ...] -> BarData
+        """
+        ori_symbol = get_format_lower_symbol(symbol)
+        exchange = self.get_exchange()
+        period = self.get_format_period(period)
+        vt_symbol = get_vt_key(ori_symbol, exchange)
+        ret_bars = []
+        for bar in rows:
+            try:
+                b = BarData()
+                b.symbol = ori_symbol
+                b.exchange = exchange
+                b.vt_symbol = vt_symbol
+                b.open_price = float(bar[1])
+                b.high_price = float(bar[2])
+                b.low_price = float(bar[3])
+                b.close_price = float(bar[4])
+
+                b.datetime = datetime.fromtimestamp(int(bar[0]) / 1e3)
+                b.date = b.datetime.strftime("%Y-%m-%d")
+                b.time = b.datetime.strftime("%H:%M:%S")
+
+                b.volume = float(bar[5])
+                b.interval = period
+
+                b.gateway_name = "DB"
+                ret_bars.append(b)
+            except Exception as ex:
+                self.write_error(
+                    'error when convert bar:{},ex:{},t:{}'.format(bar, str(ex), traceback.format_exc()))
+        return ret_bars
+
+    def get_kline(self, symbol, period, start_datetime=None, end_datetime=None):
+        try:
+            bars = self.get_kline_rows(symbol, period, start_datetime, end_datetime)
+            return self.get_bars_from_rows(symbol, period, bars)
+        except Exception as ex:
+            log_service_manager.write_log(
+                'exception in get:{},{},{}'.format(symbol, str(ex), traceback.format_exc()))
+            return []
+
+    def download_save_mongodb(self, symbol, _start_datetime, _end_datetime, interval, max_workers=1):
+        """
+        max_workers > 1 时走 KlineDownloader: 分页并发下载, 批量写库与下载同时进行, 支持断点续传
+        """
+        if max_workers > 1:
+            downloader = KlineDownloader(self, save_bars_to_mongodb, max_workers=max_workers)
+            return downloader.download([symbol], interval, _start_datetime, _end_datetime)[symbol]
 
-    def download_save_mongodb(self, symbol, _start_datetime, _end_datetime, interval):
         n = 0
         start_datetime = _start_datetime
         end_datetime = _end_datetime
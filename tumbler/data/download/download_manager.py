@@ -10,6 +10,7 @@ from tumbler.service import log_service_manager
 from tumbler.record.client_quick_query import ClientPosPriceQuery
 from tumbler.constant import Exchange
 from tumbler.object import BarData
+from tumbler.data.download.kline_downloader import KlineDownloader
 
 
 def get_all_symbols():
@@ -68,6 +69,18 @@ class DownloadManager(object):
                 "[Error][get_kline_to_mysql] ex:{} symbol:{}, period:{}, start_datetime:{}, end_datetime:{}".
                     format(ex, symbol, period, _start_datetime, _end_datetime))
 
+    def download_klines_to_mysql(self, symbols, periods, start_datetime=None, end_datetime=None, max_workers=8,
+                                 resume=True):
+        """
+        多个 symbol 并发下载写入 mysql, 中断后 resume=True 从断点继续
+        """
+        start_datetime = start_datetime or datetime(2017, 8, 1)
+        downloader = KlineDownloader(self._client, self._mq_manager.replace_bars, max_workers=max_workers)
+        ret = {}
+        for period in periods:
+            ret[period] = downloader.download(symbols, period, start_datetime, end_datetime, resume=resume)
+        return ret
+
     def recovery_k_line(self, symbol, period, _start_datetime=None, _end_datetime=None):
         log_service_manager.write_log("[recovery_k_line] symbol:{} period:{}".format(symbol, period))
         table_name = MysqlService.get_kline_table(period)
@@ -0,0 +1,306 @@
+# coding=utf-8
+
+import time
+import json
+import codecs
+import traceback
+from queue import Queue
+from datetime import datetime
+from threading import Thread, Lock
+from concurrent.futures import ThreadPoolExecutor
+
+from tumbler.constant import Exchange
+from tumbler.function import get_file_path, timeframe_to_seconds
+from tumbler.service.log_service import log_service_manager
+from tumbler.service import mongo_service_manager
+
+# 每个交易所K线接口每秒最多请求数, 同一进程内所有 KlineDownloader 共用
+DOWNLOAD_RATE_LIMITS = {
+    Exchange.BINANCE.value: 20,
+    Exchange.OKEX5.value: 10,
+    Exchange.HUOBI.value: 10
+}
+
+DEFAULT_DOWNLOAD_RATE = 5
+
+CHECKPOINT_FILENAME = "kline_download_checkpoint.json"
+
+
+class RateLimiter(object):
+    """
+    线程安全的令牌桶, acquire 在令牌不够时阻塞
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.tokens = self.capacity
+        self.last_time = time.monotonic()
+        self.lock = Lock()
+
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last_time) * self.rate)
+            self.last_time = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
+
+_rate_limiters = {}
+_rate_limiters_lock = Lock()
+
+
+def get_rate_limiter(exchange, rate=None):
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(exchange, None)
+        if limiter is None or (rate and limiter.rate != rate):
+            limiter = RateLimiter(rate or DOWNLOAD_RATE_LIMITS.get(exchange, DEFAULT_DOWNLOAD_RATE))
+            _rate_limiters[exchange] = limiter
+        return limiter
+
+
+class KlineCheckpoint(object):
+    """
+    断点表 {exchange|symbol|period: [[first_ms, last_ms], ...]}, 存在 .tumbler/kline_download_checkpoint.json
+    每一段是已经连续写入数据库的时间范围(毫秒), 只有数据写库成功后才会记录, 相邻或重叠的段会合并
+    旧版本只存了最后时间戳, 不知道从哪里开始, 读到时忽略, 重新下载
+    """
+
+    def __init__(self, filename=CHECKPOINT_FILENAME):
+        self.filepath = get_file_path(filename)
+        self.lock = Lock()
+        self.data = {}
+        self.load()
+
+    @staticmethod
+    def get_key(exchange, symbol, period):
+        return "{}|{}|{}".format(exchange, symbol, period)
+
+    def load(self):
+        try:
+            with codecs.open(self.filepath, mode="r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.data = {key: ranges for key, ranges in data.items() if isinstance(ranges, list)}
+        except Exception:
+            self.data = {}
+
+    def save(self):
+        with codecs.open(self.filepath, mode="w+", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=4, sort_keys=True)
+
+    def get(self, exchange, symbol, period):
+        """
+        返回已写库的时间段列表 [[first_ms, last_ms]], 按时间升序
+        """
+        with self.lock:
+            return [list(r) for r in self.data.get(self.get_key(exchange, symbol, period), [])]
+
+    def get_resume_ms(self, exchange, symbol, period, start_ms):
+        """
+        start_ms 落在某个已写库的时间段里时返回该段之后的第一个时间戳, 否则返回 start_ms
+        """
+        for first, last in self.get(exchange, symbol, period):
+            if first <= start_ms <= last + 1:
+                return last + 1
+        return start_ms
+
+    def update(self, exchange, symbol, period, first, last):
+        with self.lock:
+            key = self.get_key(exchange, symbol, period)
+            ranges = []
+            for r in self.data.get(key, []):
+                if r[1] + 1 < first or last + 1 < r[0]:
+                    ranges.append(r)
+                else:
+                    first, last = min(first, r[0]), max(last, r[1])
+            ranges.append([first, last])
+            ranges.sort()
+            if ranges != self.data.get(key, None):
+                self.data[key] = ranges
+                self.save()
+
+    def clear(self, exchange, symbol, period):
+        with self.lock:
+            if self.data.pop(self.get_key(exchange, symbol, period), None) is not None:
+                self.save()
+
+
+class KlineJob(object):
+    """
+    一个 symbol 一个周期的下载任务, 时间段拆成多个窗口
+    窗口可以乱序完成, 断点只推进到连续写库成功的最后一个窗口
+    """
+
+    def __init__(self, symbol, period, windows):
+        self.symbol = symbol
+        self.period = period
+        self.windows = windows  # [(start_ms, end_ms)]
+        self.start_ms = windows[0][0] if windows else None
+        self.saved = [False] * len(windows)
+        self.failed = False
+        self.next_index = 0
+        self.bar_count = 0
+
+    def mark_saved(self, index):
+        """
+        返回断点可以推进到的时间戳, 没有推进时返回 None
+        """
+        self.saved[index] = True
+        checkpoint = None
+        while self.next_index < len(self.windows) and self.saved[self.next_index]:
+            checkpoint = self.windows[self.next_index][1]
+            self.next_index += 1
+        return checkpoint
+
+
+def save_bars_to_mongodb(bars, symbol, period):
+    mongo_service_manager.save_bar_data(bars)
+
+
+class KlineDownloader(object):
+    """
+    并发K线下载流水线
+    1. max_workers 个线程按时间窗口并发请求 (client.support_range_request 为 False 时每个 symbol 一个窗口)
+    2. 每个交易所一个令牌桶限频
+    3. 下载结果放进有界队列, 单独的写库线程批量调用 saver(bars, symbol, period), 网络和数据库同时进行
+    4. 写库成功后更新 KlineCheckpoint, resume=True 时从断点继续
+    """
+
+    def __init__(self, client, saver, max_workers=8, rate=None, checkpoint=None, batch_size=5000, queue_size=64):
+        self.client = client
+        self.saver = saver
+        self.max_workers = max_workers
+        self.exchange = client.get_exchange()
+        self.limiter = get_rate_limiter(self.exchange, rate)
+        self.checkpoint = checkpoint if checkpoint is not None else KlineCheckpoint()
+        self.batch_size = batch_size
+        self.queue = Queue(maxsize=queue_size)
+
+        self.stat_lock = Lock()
+        self.request_count = 0
+        self.bar_count = 0
+        self.error_count = 0
+
+    def add_stat(self, requests=0, bars=0, errors=0):
+        with self.stat_lock:
+            self.request_count += requests
+            self.bar_count += bars
+            self.error_count += errors
+
+    def make_windows(self, period, start_ms, end_ms):
+        if not self.client.support_range_request:
+            return [(start_ms, end_ms)]
+
+        step = self.client.page_limit * timeframe_to_seconds(period) * 1000
+        windows = []
+        while start_ms <= end_ms:
+            windows.append((start_ms, min(start_ms + step - 1, end_ms)))
+            start_ms += step
+        return windows
+
+    def make_job(self, symbol, period, start_datetime, end_datetime, resume):
+        start_ms = int(time.mktime(start_datetime.timetuple()) * 1e3)
+        end_ms = int(time.mktime((end_datetime or datetime.now()).timetuple()) * 1e3)
+        if resume:
+            # 只有起点落在已下载的连续区间里才跳过, 补下更早的数据时不受后面的断点影响
+            start_ms = self.checkpoint.get_resume_ms(self.exchange, symbol, period, start_ms)
+        return KlineJob(symbol, period, self.make_windows(period, start_ms, end_ms))
+
+    def fetch(self, job, index):
+        start_ms, end_ms = job.windows[index]
+        try:
+            self.limiter.acquire()
+            self.add_stat(requests=1)
+            if self.client.support_range_request:
+                rows = self.client.make_request(symbol=self.client.get_format_symbol(job.symbol),
+                                                interval=self.client.get_format_period(job.period),
+                                                start_dt=start_ms, end_dt=end_ms, limit=self.client.page_limit)
+                if not isinstance(rows, list):
+                    raise ValueError("unexpected response:{}".format(rows))
+                rows = [row for row in rows if start_ms <= int(row[0]) <= end_ms]
+                bars = self.client.get_bars_from_rows(job.symbol, job.period, rows)
+            else:
+                bars = self.client.get_kline(job.symbol, job.period, datetime.fromtimestamp(start_ms / 1e3),
+                                             datetime.fromtimestamp(end_ms / 1e3))
+            self.queue.put((job, index, bars))
+        except Exception:
+            job.failed = True
+            self.add_stat(errors=1)
+            log_service_manager.write_log("[KlineDownloader] fetch {} {} {}~{} error:{}".format(
+                job.symbol, job.period, start_ms, end_ms, traceback.format_exc()))
+
+    def flush(self, job, items):
+        """
+        同一个 job 缓存的多个窗口合成一次批量写入, 写入成功后推进断点
+        """
+        bars = [bar for index, arr in items for bar in arr]
+        try:
+            if bars:
+                self.saver(bars, job.symbol, job.period)
+        except Exception:
+            job.failed = True
+            self.add_stat(errors=1)
+            log_service_manager.write_log("[KlineDownloader] save {} {} error:{}".format(
+                job.symbol, job.period, traceback.format_exc()))
+            return
+
+        job.bar_count += len(bars)
+        self.add_stat(bars=len(bars))
+        checkpoint = None
+        for index, arr in items:
+            checkpoint = job.mark_saved(index) or checkpoint
+        if checkpoint is not None:
+            self.checkpoint.update(self.exchange, job.symbol, job.period, job.start_ms, checkpoint)
+
+    def run_writer(self):
+        buffer = {}  # {job: [(index, bars)]}
+        buffer_size = {}  # {job: bar count}
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            job, index, bars = item
+            buffer.setdefault(job, []).append((index, bars))
+            buffer_size[job] = buffer_size.get(job, 0) + len(bars)
+
+            if buffer_size[job] >= self.batch_size:
+                self.flush(job, buffer.pop(job))
+                buffer_size.pop(job)
+            elif self.queue.empty():
+                # 下载跟不上写库时不再等待凑批, 直接写
+                for job, items in buffer.items():
+                    self.flush(job, items)
+                buffer.clear()
+                buffer_size.clear()
+
+        for job, items in buffer.items():
+            self.flush(job, items)
+
+    def download(self, symbols, period, start_datetime, end_datetime=None, resume=True):
+        """
+        返回 {symbol: 写入的K线数}, 有窗口失败的 symbol 断点停在失败窗口之前, 再次调用会补下
+        """
+        start = time.time()
+        jobs = [self.make_job(symbol, period, start_datetime, end_datetime, resume) for symbol in symbols]
+
+        writer = Thread(target=self.run_writer)
+        writer.start()
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                # 按时间交错提交, 每个 symbol 的断点都能尽早前移
+                max_len = max([len(job.windows) for job in jobs] or [0])
+                for index in range(max_len):
+                    for job in jobs:
+                        if index < len(job.windows):
+                            executor.submit(self.fetch, job, index)
+        finally:
+            self.queue.put(None)
+            writer.join()
+
+        log_service_manager.write_log("[KlineDownloader] {} {} symbols:{} requests:{} bars:{} errors:{} cost:{:.2f}s"
+                                      .format(self.exchange, period, len(symbols), self.request_count,
+                                              self.bar_count, self.error_count, time.time() - start))
+        return {job.symbol: job.bar_count for job in jobs}
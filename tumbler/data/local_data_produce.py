@@ -1,11 +1,14 @@
 # coding=utf-8
 
 from datetime import datetime, timedelta
+from collections import defaultdict
 
 from tumbler.constant import Exchange, Interval, Status, Direction
 from tumbler.service import mongo_service_manager, mysql_service_manager
 from tumbler.service.mysql_service import MysqlService
+from tumbler.function import get_vt_key
 from tumbler.function.order_math import my_str
+from tumbler.object import BarData, BarArrayData
 from tumbler.data.binance_data import BinanceClient
 from tumbler.service import log_service_manager
 
@@ -114,3 +117,38 @@ def go_to_fix_mongodb(symbol, interval, start_time=datetime(2017, 1, 1), end_tim
         n = client.download_save_mongodb(symbol=symbol, _start_datetime=before, _end_datetime=now, interval=interval)
 
         log_service_manager.write_log("[go_to_fix_mongodb] finished compare before, now, num:{}".format(n))
+
+
+def convert_csv_to_bar_store(filename, root_dir, interval):
+    """
+    把本地csv bar文件转换成按列保存的二进制格式，多品种的csv会按 vt_symbol 拆开
+    """
+    symbol_bars = defaultdict(list)
+    for bar in BarData.load_file_data(filename):
+        symbol_bars[bar.vt_symbol].append(bar)
+
+    for vt_symbol, bars in symbol_bars.items():
+        bars.sort(key=lambda x: x.datetime)
+        path = BarArrayData.get_store_path(root_dir, vt_symbol, interval)
+        BarArrayData.from_bars(bars, interval).save_file(path)
+        log_service_manager.write_log("[convert_csv_to_bar_store] {} num:{}".format(path, len(bars)))
+
+
+def get_bar_store_from_mongo(symbol, exchange, interval, root_dir,
+                             start_time=datetime(2017, 1, 1), end_time=datetime(2022, 12, 20)):
+    data = mongo_service_manager.load_bar_data(symbol, exchange, interval, start_time, end_time)
+    path = BarArrayData.get_store_path(root_dir, get_vt_key(symbol, exchange), interval)
+    BarArrayData.from_bars(data, interval).save_file(path)
+    log_service_manager.write_log("[get_bar_store_from_mongo] {} num:{}".format(path, len(data)))
+
+
+def get_bar_store_from_mysql(symbol, interval, root_dir,
+                             start_time=datetime(2010, 1, 1), end_time=None):
+    if end_time is None:
+        end_time = datetime.now() + timedelta(hours=3)
+    mysql_service_manager = MysqlService()
+    data = mysql_service_manager.get_bars(symbols=[symbol], period=interval,
+                                          start_datetime=start_time, end_datetime=end_time)
+    path = BarArrayData.get_store_path(root_dir, get_vt_key(symbol, Exchange.BINANCE.value), interval)
+    BarArrayData.from_bars(data, interval).save_file(path)
+    log_service_manager.write_log("[get_bar_store_from_mysql] {} num:{}".format(path, len(data)))
@@ -6,19 +6,22 @@ from threading import Lock
 
 from tumbler.event import Event, EventEngine
 from tumbler.event import (
+    EVENT_TIMER,
     EVENT_TICK,
     EVENT_ORDER,
     EVENT_TRADE,
     EVENT_POSITION,
     EVENT_ACCOUNT,
     EVENT_CONTRACT,
-    EVENT_LOG
+    EVENT_LOG,
+    EVENT_LATENCY_TRACE
 )
 from tumbler.function import TRADER_DIR, get_from_vt_key
 from tumbler.constant import Exchange
 from tumbler.object import LogData
 from tumbler.service.mongo_service import mongo_service_manager
 from tumbler.service.log_service import log_service_manager
+from tumbler.service.latency_trace_service import latency_trace_manager
 
 
 class MainEngine:
@@ -41,6 +44,21 @@ class MainEngine:
         os.chdir(str(TRADER_DIR))  # Change working directory
         self.init_engines()  # Initialize function engines
 
+        # 运行中可以通过 latency_trace_manager.enable 开关, 定时器一直注册
+        self.event_engine.register(EVENT_TIMER, self.process_latency_trace_timer)
+
+    def process_latency_trace_timer(self, event):
+        """
+        定时推送延迟统计, 同时写入 .tumbler/latency_trace.json
+        """
+        if not latency_trace_manager.enabled:
+            return
+
+        report = latency_trace_manager.check_report()
+        if report is not None:
+            self.event_engine.put(Event(EVENT_LATENCY_TRACE, report))
+            log_service_manager.write_log("[latency_trace] {}".format(report))
+
     def add_engine(self, engine_class):
         """
         Add function engine.
@@ -206,12 +224,26 @@ class MainEngine:
         """
         gateway = self.get_gateway(gateway_name)
         if gateway:
-            return gateway.send_order(req)
+            if not latency_trace_manager.enabled:
+                return gateway.send_order(req)
+
+            latency_trace_manager.on_order(req)
+            vt_order_id = gateway.send_order(req)
+            latency_trace_manager.on_sent(req)
+            return vt_order_id
 
     def send_orders(self, reqs, gateway_name):
         gateway = self.get_gateway(gateway_name)
         if gateway:
-            return gateway.send_orders(reqs)
+            if not latency_trace_manager.enabled:
+                return gateway.send_orders(reqs)
+
+            for req in reqs:
+                latency_trace_manager.on_order(req)
+            ret = gateway.send_orders(reqs)
+            for req in reqs:
+                latency_trace_manager.on_sent(req)
+            return ret
 
     def get_orders(self, symbol, side):
         """
@@ -2,10 +2,9 @@
 Event-driven framework of vn.py framework.
 """
 
-from collections import defaultdict
-from queue import Empty, Queue
-from threading import Thread
-from time import sleep
+from collections import defaultdict, deque
+from threading import Thread, Event as ThreadEvent
+from time import sleep, time, perf_counter
 
 from tumbler.service.log_service import log_service_manager
 
@@ -39,6 +38,7 @@ EVENT_LOG = "eLog"
 EVENT_TRANSFER = "eTransfer"
 EVENT_TRADE_LOG = "eLog.Trade."                     # 导出 Trade 日志对象
 EVENT_STRATEGY_VARIABLES_LOG = "eLog.Strategy."     # 导出 策略 运行时日志
+EVENT_LATENCY_TRACE = "eLatencyTrace"               # 行情到下单各阶段的延迟统计, 开启 latency_trace 时定时推送
 
 
 class Event:
@@ -57,6 +57,56 @@ class Event:
 # HandlerType = Callable[[Event], None]
 
 
+class EventStat(object):
+    """
+    EventEngine 的运行统计: 队列深度, 每秒事件数, 每个handler的耗时
+    """
+
+    def __init__(self):
+        self.start_time = time()
+        self.put_count = 0
+        self.process_count = 0
+        self.coalesce_count = 0
+        self.batch_count = 0
+        self.max_queue_size = 0
+        self.handler_cost = defaultdict(float)
+        self.handler_count = defaultdict(int)
+
+    def reset(self):
+        self.__init__()
+
+    def on_handler(self, handler, cost):
+        name = get_handler_name(handler)
+        self.handler_cost[name] += cost
+        self.handler_count[name] += 1
+
+    def get_dict(self, queue_size=0):
+        seconds = max(time() - self.start_time, 1e-6)
+        handlers = {}
+        for name, cost in self.handler_cost.items():
+            count = self.handler_count[name]
+            handlers[name] = {
+                "count": count,
+                "total_ms": cost * 1000,
+                "avg_us": cost * 1e6 / count
+            }
+        return {
+            "seconds": seconds,
+            "queue_size": queue_size,
+            "max_queue_size": self.max_queue_size,
+            "put_count": self.put_count,
+            "process_count": self.process_count,
+            "coalesce_count": self.coalesce_count,
+            "events_per_second": self.process_count / seconds,
+            "avg_batch_size": self.process_count / self.batch_count if self.batch_count else 0,
+            "handlers": handlers
+        }
+
+
+def get_handler_name(handler):
+    return getattr(handler, "__qualname__", None) or repr(handler)
+
+
 class EventEngine:
     """
     Event engine distributes event object based on its type
@@ -64,34 +114,101 @@ class EventEngine:
 
     It also generates timer event by every interval seconds,
     which can be used for timing purpose.
+
+    batch_size: 每次从队列中最多取出多少个事件一起处理
+    coalesce_tick: 处理不过来时, 同一个 topic (如 EVENT_TICK + vt_symbol) 一批里只推送最新的 tick
+    stat_interval: >0 时统计队列深度/每秒事件数/每个handler耗时, 每 stat_interval 秒在 EVENT_TIMER 时输出一次
     """
 
-    def __init__(self, interval=1):
+    def __init__(self, interval=1, batch_size=1000, coalesce_tick=False, stat_interval=0):
         """
         Timer event is generated every 1 second by default, if
         interval not specified.
         """
         self._interval = interval
-        self._queue = Queue()
+        self._queue = deque()
+        self._wakeup = ThreadEvent()
         self._active = False
         self._thread = Thread(target=self._run)
         self._timer = Thread(target=self._run_timer)
         self._handler_dic_list = defaultdict(list)
         self._general_handlers = []
 
+        # e_type -> tuple(话题handler + 通用handler), register 时预先算好
+        self._handler_tuples = {}
+        self._general_tuple = ()
+
+        self._batch_size = batch_size
+        self._coalesce_tick = coalesce_tick
+
+        self._stat_interval = stat_interval
+        self._stat = EventStat()
+        self._last_stat_time = time()
+        if stat_interval > 0:
+            self.register(EVENT_TIMER, self._on_stat_timer)
+
     def _run(self):
         """
-        Get event from queue and then process it.
+        Get events from queue and then process them in batches.
         """
+        queue = self._queue
         while self._active:
+            self._wakeup.clear()
+            if not queue:
+                self._wakeup.wait(1)
+                continue
+
             try:
-                event = self._queue.get(block=True, timeout=1)
-                self._process(event)
-            except Empty:
-                pass
+                self._process_batch(self._get_batch())
             except Exception as ex:
                 log_service_manager.write_log("[event] _run error:{}".format(ex))
 
+    def _get_batch(self):
+        """
+        一次取出队列中的一批事件
+        """
+        queue = self._queue
+        n = min(len(queue), self._batch_size)
+        if self._stat_interval > 0:
+            self._stat.max_queue_size = max(self._stat.max_queue_size, len(queue))
+
+        popleft = queue.popleft
+        events = [popleft() for _ in range(n)]
+
+        if self._coalesce_tick and n > 1:
+            events = self._coalesce(events)
+        return events
+
+    def _coalesce(self, events):
+        """
+        同一批里相同 (tick 话题, vt_symbol) 的事件只保留最新的一个 (保留在其最后出现的位置)
+        """
+        keys = [None] * len(events)
+        last_index = {}
+        for i, event in enumerate(events):
+            if event.e_type.startswith(EVENT_TICK):
+                key = (event.e_type, getattr(event.data, "vt_symbol", None))
+                keys[i] = key
+                last_index[key] = i
+
+        if not last_index:
+            return events
+
+        ret = [event for i, event in enumerate(events) if keys[i] is None or last_index[keys[i]] == i]
+
+        if self._stat_interval > 0:
+            self._stat.coalesce_count += len(events) - len(ret)
+        return ret
+
+    def _process_batch(self, events):
+        if self._stat_interval > 0:
+            self._stat.batch_count += 1
+            for event in events:
+                self._process_with_stat(event)
+        else:
+            for event in events:
+                self._process(event)
+
     def _process(self, event):
         """
         First distribute event to those handlers registered listening
@@ -101,11 +218,19 @@ class EventEngine:
         to all types.
         """
         try:
-            if event.e_type in self._handler_dic_list:
-                [handler(event) for handler in self._handler_dic_list[event.e_type]]
+            for handler in self._handler_tuples.get(event.e_type, self._general_tuple):
+                handler(event)
+        except Exception as ex:
+            log_service_manager.write_log("[event] _process error:{}".format(ex))
 
-            if self._general_handlers:
-                [handler(event) for handler in self._general_handlers]
+    def _process_with_stat(self, event):
+        stat = self._stat
+        stat.process_count += 1
+        try:
+            for handler in self._handler_tuples.get(event.e_type, self._general_tuple):
+                start = perf_counter()
+                handler(event)
+                stat.on_handler(handler, perf_counter() - start)
         except Exception as ex:
             log_service_manager.write_log("[event] _process error:{}".format(ex))
 
@@ -118,6 +243,23 @@ class EventEngine:
             event = Event(EVENT_TIMER)
             self.put(event)
 
+    def _on_stat_timer(self, event):
+        now = time()
+        if now - self._last_stat_time < self._stat_interval:
+            return
+        self._last_stat_time = now
+        log_service_manager.write_log("[event] stat:{}".format(self.get_stat()))
+        self._stat.reset()
+
+    def get_stat(self):
+        """
+        返回当前统计周期内的统计数据
+        """
+        return self._stat.get_dict(self.get_queue_size())
+
+    def get_queue_size(self):
+        return len(self._queue)
+
     def start(self):
         """
         Start event engine to process events and generate timer events.
@@ -132,6 +274,7 @@ class EventEngine:
         Stop event engine.
         """
         self._active = False
+        self._wakeup.set()
         self._timer.join()
         self._thread.join()
 
@@ -139,7 +282,21 @@ class EventEngine:
         """
         Put an event object into event queue.
         """
-        self._queue.put(event)
+        self._queue.append(event)
+        if self._stat_interval > 0:
+            self._stat.put_count += 1
+        if not self._wakeup.is_set():
+            self._wakeup.set()
+
+    def _rebuild_handlers(self):
+        """
+        预先计算好每个话题需要调用的 handler
+        """
+        self._general_tuple = tuple(self._general_handlers)
+        self._handler_tuples = {
+            e_type: tuple(handler_list) + self._general_tuple
+            for e_type, handler_list in self._handler_dic_list.items()
+        }
 
     def register(self, e_type, handler):
         """
@@ -149,6 +306,7 @@ class EventEngine:
         handler_list = self._handler_dic_list[e_type]
         if handler not in handler_list:
             handler_list.append(handler)
+        self._rebuild_handlers()
 
     def unregister(self, e_type, handler):
         """
@@ -161,6 +319,7 @@ class EventEngine:
 
         if not handler_list:
             self._handler_dic_list.pop(e_type)
+        self._rebuild_handlers()
 
     def register_general(self, handler):
         """
@@ -169,6 +328,7 @@ class EventEngine:
         """
         if handler not in self._general_handlers:
             self._general_handlers.append(handler)
+        self._rebuild_handlers()
 
     def unregister_general(self, handler):
         """
@@ -176,3 +336,4 @@ class EventEngine:
         """
         if handler in self._general_handlers:
             self._general_handlers.remove(handler)
+        self._rebuild_handlers()
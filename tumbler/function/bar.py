@@ -4,6 +4,7 @@ import numpy as np
 import talib
 import pandas as pd
 from copy import copy
+from functools import wraps
 
 from datetime import timedelta
 # from numba import njit
@@ -256,12 +257,87 @@ class BarGenerator:
         self.bar = None
 
 
+def with_lookback(n):
+    """
+    给 PD_Technique 组合出来的信号函数标记最大回看长度，
+    PandasDeal 会只用最近 n 根bar做增量计算
+    """
+
+    def decorator(func):
+        func.lookback = n
+        return func
+
+    return decorator
+
+
+class BarBuffer(object):
+    """
+    预分配列的bar缓存，只保留最近 size 根，append 均摊 O(1)
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.capacity = size * 2
+        self.count = 0
+
+        self.datetime_array = np.empty(self.capacity, dtype=object)
+        self.open_array = np.zeros(self.capacity)
+        self.high_array = np.zeros(self.capacity)
+        self.low_array = np.zeros(self.capacity)
+        self.close_array = np.zeros(self.capacity)
+        self.volume_array = np.zeros(self.capacity)
+
+    def __len__(self):
+        return min(self.count, self.size)
+
+    def append(self, _datetime, open_price, high_price, low_price, close_price, volume):
+        if self.count == self.capacity:
+            # 写满后把最近 size-1 根挪到前面，每 size 根才搬一次
+            keep = self.size - 1
+            for arr in [self.datetime_array, self.open_array, self.high_array,
+                        self.low_array, self.close_array, self.volume_array]:
+                arr[:keep] = arr[self.count - keep:self.count]
+            self.count = keep
+
+        i = self.count
+        self.datetime_array[i] = _datetime
+        self.open_array[i] = open_price
+        self.high_array[i] = high_price
+        self.low_array[i] = low_price
+        self.close_array[i] = close_price
+        self.volume_array[i] = volume
+        self.count += 1
+
+    def update_bar(self, bar):
+        self.append(bar.datetime, bar.open_price, bar.high_price, bar.low_price, bar.close_price, bar.volume)
+
+    def update_df(self, df):
+        for _datetime, open_price, high_price, low_price, close_price, volume in zip(
+                df["datetime"].tail(self.size), df["open"].tail(self.size), df["high"].tail(self.size),
+                df["low"].tail(self.size), df["close"].tail(self.size), df["volume"].tail(self.size)):
+            self.append(_datetime, open_price, high_price, low_price, close_price, volume)
+
+    def get_df(self):
+        start = max(0, self.count - self.size)
+        end = self.count
+        return pd.DataFrame({
+            "datetime": self.datetime_array[start:end],
+            "open": self.open_array[start:end],
+            "high": self.high_array[start:end],
+            "low": self.low_array[start:end],
+            "close": self.close_array[start:end],
+            "volume": self.volume_array[start:end]
+        }, columns=BarData.get_columns())
+
+
 class PandasDeal(object):
     """
     用于处理各个周期的pandas数据
+    max_lookback > 0 (或 func 被 with_lookback 标记) 时为增量模式:
+    只保留最近 max_lookback 根bar, 每根bar只用这段尾部窗口重新计算信号, 耗时不随运行时间增长
     """
 
-    def __init__(self, func, window, interval, quick_minute=1, factor_nums=1, strategy=None):
+    def __init__(self, func, window, interval, quick_minute=1, factor_nums=1, strategy=None, max_lookback=0):
         print(window, interval, quick_minute, factor_nums)
         self.strategy = strategy
         self.window = window
@@ -279,6 +355,11 @@ class PandasDeal(object):
         self.last_bar = None
         self.last_window_bar = None
 
+        self.max_lookback = max_lookback or getattr(func, "lookback", 0)
+        self.buffer = None
+        if self.max_lookback > 0:
+            self.buffer = BarBuffer(self.max_lookback)
+
     def start_trading(self):
         self.trading = True
 
@@ -290,6 +371,9 @@ class PandasDeal(object):
         n = self.df.shape[0] - 1
         self.target_pos = self.df["pos"][n]
 
+        if self.buffer is not None:
+            self.buffer.update_df(self.df)
+
     def on_tick(self, tick):
         self.bg.update_tick(tick)
 
@@ -315,9 +399,13 @@ class PandasDeal(object):
                         .format(self.interval, self.window, s1, s2))
 
         self.last_window_bar = copy(bar)
-        self.strategy.write_log("[PandasDeal] [last_window_bar] {} {} {}".format(self.interval, self.window, bar.datetime))
+        if self.strategy:
+            self.strategy.write_log("[PandasDeal] [last_window_bar] {} {} {}".format(
+                self.interval, self.window, bar.datetime))
         if not self.trading:
             self.init_array.append(bar.get_dict())
+        elif self.buffer is not None:
+            self.work_df_incremental(bar)
         else:
             self.work_df(bar)
 
@@ -334,9 +422,16 @@ class PandasDeal(object):
         self.df = self.func(self.df)
         self.target_pos = self.df["pos"][n]
 
+    def work_df_incremental(self, bar: BarData):
+        self.buffer.update_bar(bar)
+        self.df = self.func(self.buffer.get_df())
+        self.target_pos = self.df["pos"].iloc[-1]
+
     def compute_df(self):
         self.df = pd.DataFrame(self.init_array, columns=BarData.get_columns())
         self.df["pos"] = None
+        if self.buffer is not None:
+            self.init_array = []
 
     def get_pos(self):
         if str(self.target_pos) == str(np.nan):
@@ -419,11 +514,35 @@ class NewPandasDeal(object):
         return self.df
 
 
+def cache_indicator(func):
+    """
+    同一根bar内, 相同 (指标, 参数) 只计算一次, update_bar 时缓存失效
+    注意返回的数组是共享的, 调用方不要原地修改
+    """
+    name = func.__name__
+
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        key = (name, args, tuple(sorted(kwargs.items()))) if kwargs else (name, args)
+        cache = self.indicator_cache
+        if key in cache:
+            return cache[key]
+        result = func(self, *args, **kwargs)
+        cache[key] = result
+        return result
+
+    return wrapper
+
+
 class ArrayManager(object):
     """
     For:
     1. time series container of bar data
     2. calculating technical indicator value
+
+    Notice:
+    数据保存在两倍长度的环形缓存里, 每个值同时写入 i 和 i+size 两个位置,
+    update_bar 是 O(1) 的, 同时 open/high/low/close 总能返回按时间排序的连续视图给 talib 使用
     """
 
     def __init__(self, size=100):
@@ -431,51 +550,81 @@ class ArrayManager(object):
         self.count = 0
         self.size = size
         self.inited = False
+        self.pos = 0
 
-        self.open_array = np.zeros(size)
-        self.high_array = np.zeros(size)
-        self.low_array = np.zeros(size)
-        self.close_array = np.zeros(size)
-        self.volume_array = np.zeros(size)
+        self.open_buffer = np.zeros(size * 2)
+        self.high_buffer = np.zeros(size * 2)
+        self.low_buffer = np.zeros(size * 2)
+        self.close_buffer = np.zeros(size * 2)
+        self.volume_buffer = np.zeros(size * 2)
 
-        self.symbol_array = []
-        self.exchange_array = []
+        self.symbol_buffer = np.full(size * 2, "", dtype=object)
+        self.exchange_buffer = np.full(size * 2, "", dtype=object)
+        self.datetime_buffer = np.full(size * 2, None, dtype=object)
 
-        self.datetime_array = [None] * size
+        self.indicator_cache = {}
 
     def update_bar(self, bar):
         """
         Update new bar data into array manager.
         """
-        self.symbol_array.append(bar.symbol)
-        if len(self.symbol_array) > self.size:
-            self.symbol_array.pop(0)
-        self.exchange_array.append(bar.exchange)
-        if len(self.exchange_array) > self.size:
-            self.exchange_array.pop(0)
-
         self.count += 1
         if not self.inited and self.count >= self.size:
             self.inited = True
 
-        self.open_array[:-1] = self.open_array[1:]
-        self.high_array[:-1] = self.high_array[1:]
-        self.low_array[:-1] = self.low_array[1:]
-        self.close_array[:-1] = self.close_array[1:]
-        self.volume_array[:-1] = self.volume_array[1:]
-        self.datetime_array[:-1] = self.datetime_array[1:]
+        i = self.pos
+        j = i + self.size
+        self.open_buffer[i] = self.open_buffer[j] = bar.open_price
+        self.high_buffer[i] = self.high_buffer[j] = bar.high_price
+        self.low_buffer[i] = self.low_buffer[j] = bar.low_price
+        self.close_buffer[i] = self.close_buffer[j] = bar.close_price
+        self.volume_buffer[i] = self.volume_buffer[j] = bar.volume
+        self.symbol_buffer[i] = self.symbol_buffer[j] = bar.symbol
+        self.exchange_buffer[i] = self.exchange_buffer[j] = bar.exchange
+        self.datetime_buffer[i] = self.datetime_buffer[j] = bar.datetime
+
+        self.pos = (i + 1) % self.size
+        self.indicator_cache.clear()
+
+    def get_ordered(self, buffer):
+        return buffer[self.pos:self.pos + self.size]
+
+    @property
+    def open_array(self):
+        return self.get_ordered(self.open_buffer)
+
+    @property
+    def high_array(self):
+        return self.get_ordered(self.high_buffer)
+
+    @property
+    def low_array(self):
+        return self.get_ordered(self.low_buffer)
+
+    @property
+    def close_array(self):
+        return self.get_ordered(self.close_buffer)
+
+    @property
+    def volume_array(self):
+        return self.get_ordered(self.volume_buffer)
+
+    @property
+    def datetime_array(self):
+        return self.get_ordered(self.datetime_buffer)
 
-        self.open_array[-1] = bar.open_price
-        self.high_array[-1] = bar.high_price
-        self.low_array[-1] = bar.low_price
-        self.close_array[-1] = bar.close_price
-        self.volume_array[-1] = bar.volume
-        self.datetime_array[-1] = bar.datetime
+    @property
+    def symbol_array(self):
+        return self.get_ordered(self.symbol_buffer)[-min(self.count, self.size):] if self.count else []
+
+    @property
+    def exchange_array(self):
+        return self.get_ordered(self.exchange_buffer)[-min(self.count, self.size):] if self.count else []
 
     def to_pandas_data(self):
-        dic = {"symbol": self.symbol_array, "exchange": self.exchange_array, "datetime": self.datetime_array,
-               "open": self.open_array, "high": self.high_array, "low": self.low_array,
-               "close": self.close_array, "volume": self.volume_array}
+        dic = {"symbol": self.get_ordered(self.symbol_buffer), "exchange": self.get_ordered(self.exchange_buffer),
+               "datetime": self.datetime_array, "open": self.open_array, "high": self.high_array,
+               "low": self.low_array, "close": self.close_array, "volume": self.volume_array}
 
         return pd.DataFrame(dic)
 
@@ -514,6 +663,7 @@ class ArrayManager(object):
         """
         return self.volume_array
 
+    @cache_indicator
     def ma(self, n, array=False):
         """
         MA
@@ -523,6 +673,7 @@ class ArrayManager(object):
             return result
         return result[-1]
 
+    @cache_indicator
     def sma(self, n, array=False):
         """
         Simple moving average.
@@ -532,6 +683,7 @@ class ArrayManager(object):
             return result
         return result[-1]
 
+    @cache_indicator
     def kama(self, n, array=False):
         """
         KAMA.
@@ -541,6 +693,7 @@ class ArrayManager(object):
             return result
         return result[-1]
 
+    @cache_indicator
     def wma(self, n, array=False):
         """
         WMA.
@@ -550,6 +703,7 @@ class ArrayManager(object):
             return result
         return result[-1]
 
+    @cache_indicator
     def apo(self, n, array=False):
         """
         APO.
@@ -559,6 +713,7 @@ class ArrayManager(object):
             return result
         return result[-1]
 
+    @cache_indicator
     def cmo(self, n, array=False):
         """
         CMO.
@@ -568,6 +723,7 @@ class ArrayManager(object):
             return result
         return result[-1]
 
+    @cache_indicator
     def mom(self, n, array=False):
         """
         MOM. --> MTM
@@ -577,6 +733,7 @@ class ArrayManager(object):
             return result
         return result[-1]
 
+    @cache_indicator
     def ppo(self, n, array=False):
         """
         PPO.
@@ -586,6 +743,7 @@ class ArrayManager(object):
             return result
         return result[-1]
 
+    @cache_indicator
     def roc(self, n, array=False):
         """
         ROC.
@@ -595,6 +753,7 @@ class ArrayManager(object):
             return result
         return result[-1]
 
+    @cache_indicator
     def rocr(self, n, array=False):
         """
         ROCR.
@@ -604,6 +763,7 @@ class ArrayManager(object):
             return result
         return result[-1]
 
+    @cache_indicator
     def rocp(self, n, array=False):
         """
         ROCP.
@@ -613,6 +773,7 @@ class ArrayManager(object):
             return result
         return result[-1]
 
+    @cache_indicator
     def rocr_100(self, n, array=False):
         """
         ROCR100.
@@ -622,6 +783,7 @@ class ArrayManager(object):
             return result
         return result[-1]
 
+    @cache_indicator
     def trix(self, n, array=False):
         """
         TRIX.
@@ -631,6 +793,7 @@ class ArrayManager(object):
             return result
         return result[-1]
 
+    @cache_indicator
     def std(self, n, array=False):
         """
         Standard deviation.
@@ -640,6 +803,7 @@ class ArrayManager(object):
             return result
         return result[-1]
 
+    @cache_indicator
     def obv(self, n, array=False):
         """
         OBV.
@@ -649,6 +813,7 @@ class ArrayManager(object):
             return result
         return result[-1]
 
+    @cache_indicator
     def cci(self, n, array=False):
         """
         Commodity Channel Index (CCI).
@@ -658,6 +823,7 @@ class ArrayManager(object):
             return result
         return result[-1]
 
+    @cache_indicator
     def atr(self, n, array=False):
         """
         Average True Range (ATR).
@@ -667,6 +833,7 @@ class ArrayManager(object):
             return result
         return result[-1]
 
+    @cache_indicator
     def natr(self, n, array=False):
         """
         NATR.
@@ -676,6 +843,7 @@ class ArrayManager(object):
             return result
         return result[-1]
 
+    @cache_indicator
     def rsi(self, n, array=False):
         """
         Relative Strenght Index (RSI).
@@ -685,6 +853,7 @@ class ArrayManager(object):
             return result
         return result[-1]
 
+    @cache_indicator
     def macd(self, fast_period, slow_period, signal_period, array=False):
         """
         MACD.
@@ -696,6 +865,7 @@ class ArrayManager(object):
             return macd, signal, hist
         return macd[-1], signal[-1], hist[-1]
 
+    @cache_indicator
     def adx(self, n, array=False):
         """
         ADX.
@@ -705,6 +875,7 @@ class ArrayManager(object):
             return result
         return result[-1]
 
+    @cache_indicator
     def adxr(self, n, array=False):
         """
         ADXR.
@@ -714,6 +885,7 @@ class ArrayManager(object):
             return result
         return result[-1]
 
+    @cache_indicator
     def dx(self, n, array=False):
         """
         DX.
@@ -723,6 +895,7 @@ class ArrayManager(object):
             return result
         return result[-1]
 
+    @cache_indicator
     def minus_di(self, n, array=False):
         """
         MINUS_DI.
@@ -732,6 +905,7 @@ class ArrayManager(object):
             return result
         return result[-1]
 
+    @cache_indicator
     def plus_di(self, n, array=False):
         """
         PLUS_DI.
@@ -741,6 +915,7 @@ class ArrayManager(object):
             return result
         return result[-1]
 
+    @cache_indicator
     def willr(self, n, array=False):
         """
         WILLR.
@@ -750,6 +925,7 @@ class ArrayManager(object):
             return result
         return result[-1]
 
+    @cache_indicator
     def ultosc(self, array=False):
         """
         Ultimate Oscillator.
@@ -759,6 +935,7 @@ class ArrayManager(object):
             return result
         return result[-1]
 
+    @cache_indicator
     def trange(self, array=False):
         """
         TRANGE.
@@ -768,6 +945,7 @@ class ArrayManager(object):
             return result
         return result[-1]
 
+    @cache_indicator
     def boll(self, n, dev, array=False):
         """
         Bollinger Channel.
@@ -780,6 +958,7 @@ class ArrayManager(object):
 
         return up, down
 
+    @cache_indicator
     def keltner(self, n, dev, array=False):
         """
         Keltner Channel.
@@ -792,6 +971,7 @@ class ArrayManager(object):
 
         return up, down
 
+    @cache_indicator
     def donchian(self, n, array=False):
         """
         Donchian Channel.
@@ -803,6 +983,7 @@ class ArrayManager(object):
             return up, down
         return up[-1], down[-1]
 
+    @cache_indicator
     def aroon(self, n, array=False):
         """
         Aroon indicator.
@@ -813,6 +994,7 @@ class ArrayManager(object):
             return aroon_up, aroon_down
         return aroon_up[-1], aroon_down[-1]
 
+    @cache_indicator
     def aroonosc(self, n, array=False):
         """
         Aroon Oscillator.
@@ -823,6 +1005,7 @@ class ArrayManager(object):
             return result
         return result[-1]
 
+    @cache_indicator
     def minus_dm(self, n, array=False):
         """
         MINUS_DM.
@@ -833,6 +1016,7 @@ class ArrayManager(object):
             return result
         return result[-1]
 
+    @cache_indicator
     def plus_dm(self, n, array=False):
         """
         PLUS_DM.
@@ -843,6 +1027,7 @@ class ArrayManager(object):
             return result
         return result[-1]
 
+    @cache_indicator
     def mfi(self, n, array=False):
         """
         Money Flow Index.
@@ -852,6 +1037,7 @@ class ArrayManager(object):
             return result
         return result[-1]
 
+    @cache_indicator
     def ad(self, n, array=False):
         """
         AD.
@@ -861,6 +1047,7 @@ class ArrayManager(object):
             return result
         return result[-1]
 
+    @cache_indicator
     def adosc(self, n, array=False):
         """
         ADOSC.
@@ -870,6 +1057,7 @@ class ArrayManager(object):
             return result
         return result[-1]
 
+    @cache_indicator
     def bop(self, array=False):
         result = talib.BOP(self.open, self.high, self.low, self.close)
 
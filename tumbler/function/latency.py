@@ -0,0 +1,55 @@
+# coding=utf-8
+
+from bisect import bisect_left
+
+# 毫秒, 最后一个桶是 > 5000ms
+DEFAULT_LATENCY_BUCKETS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+class LatencyHistogram(object):
+    """
+    固定分桶的延迟直方图 (毫秒), 记录的开销是一次二分查找, 分位数按桶上界估算
+    """
+
+    def __init__(self, buckets=DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max_value = 0.0
+
+    def add(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max_value:
+            self.max_value = value
+
+    def clear(self):
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max_value = 0.0
+
+    def get_percentile(self, percent):
+        if not self.count:
+            return 0.0
+        need = self.count * percent / 100.0
+        accu = 0
+        for i, n in enumerate(self.counts):
+            accu += n
+            if accu >= need:
+                if i < len(self.buckets):
+                    return min(self.buckets[i], self.max_value)
+                return self.max_value
+        return self.max_value
+
+    def get_stat(self):
+        return {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else 0.0,
+            "p50": self.get_percentile(50),
+            "p90": self.get_percentile(90),
+            "p99": self.get_percentile(99),
+            "max": self.max_value
+        }
@@ -0,0 +1,184 @@
+# coding=utf-8
+
+import os
+import ast
+import json
+import codecs
+import importlib
+import traceback
+from collections.abc import Mapping
+
+from .utility import get_file_path
+
+STRATEGY_INDEX_FILENAME = "strategy_module_index.json"
+
+
+def import_from_path(path):
+    """
+    "tumbler.gateway.huobi:HuobiGateway" -> HuobiGateway, 没有冒号时返回模块本身
+    """
+    module_name, _, attr = path.partition(":")
+    module = importlib.import_module(module_name)
+    if not attr:
+        return module
+    return getattr(module, attr)
+
+
+class LazyImportMap(Mapping):
+    """
+    {key: "module:attr"} 的导入路径表, 第一次取值时才 import, 之后缓存
+    keys / in / len 只看路径表, 不会触发 import
+    """
+
+    def __init__(self, path_dict):
+        self.path_dict = dict(path_dict)
+        self.loaded = {}
+
+    def __getitem__(self, key):
+        value = self.loaded.get(key, None)
+        if value is None:
+            value = self.loaded[key] = import_from_path(self.path_dict[key])
+        return value
+
+    def __contains__(self, key):
+        return key in self.path_dict
+
+    def __iter__(self):
+        return iter(self.path_dict)
+
+    def __len__(self):
+        return len(self.path_dict)
+
+    def __repr__(self):
+        return "{}({})".format(self.__class__.__name__, self.path_dict)
+
+
+def parse_class_names(filepath):
+    """
+    用 ast 读出源码里顶层定义的类名, 不执行模块代码
+    """
+    with codecs.open(filepath, mode="r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=filepath)
+    return [node.name for node in tree.body if isinstance(node, ast.ClassDef)]
+
+
+class StrategyModuleIndex(object):
+    """
+    策略目录的 类名 -> 模块 索引, 按文件 (mtime, size) 缓存到 .tumbler/strategy_module_index.json
+    文件没变时不需要再 parse, 变了只重新 parse 这一个文件
+    """
+
+    def __init__(self, filename=STRATEGY_INDEX_FILENAME):
+        self.filepath = get_file_path(filename)
+        self.cache = {}  # {filepath: {"mtime": , "size": , "classes": []}}
+        self.changed = False
+        self.load()
+
+    def load(self):
+        try:
+            with codecs.open(self.filepath, mode="r", encoding="utf-8") as f:
+                self.cache = json.load(f)
+        except Exception:
+            self.cache = {}
+
+    def save(self):
+        if not self.changed:
+            return
+        try:
+            with codecs.open(self.filepath, mode="w+", encoding="utf-8") as f:
+                json.dump(self.cache, f, indent=4)
+            self.changed = False
+        except Exception:
+            pass
+
+    def get_class_names(self, filepath):
+        stat = os.stat(filepath)
+        item = self.cache.get(filepath, None)
+        if item and item["mtime"] == stat.st_mtime and item["size"] == stat.st_size:
+            return item["classes"]
+
+        classes = parse_class_names(filepath)
+        self.cache[filepath] = {"mtime": stat.st_mtime, "size": stat.st_size, "classes": classes}
+        self.changed = True
+        return classes
+
+
+class StrategyClassDict(dict):
+    """
+    引擎的 self.classes, 用法和原来的 {class_name: strategy_class} 一样
+    add_folder 只建立 类名 -> 模块 的索引, get / [] / in 查到某个类名时才 import 对应的模块
+    模块里 base_class 的子类只有索引指向这个模块时才放进字典, 同名类后加入的目录覆盖先加入的
+    """
+
+    def __init__(self, base_class, write_log=print):
+        super(StrategyClassDict, self).__init__()
+        self.base_class = base_class
+        self.write_log = write_log
+
+        self.index = StrategyModuleIndex()
+        self.class_module_map = {}  # {class_name: module_name}
+        self.loaded_modules = set()
+
+    def add_folder(self, path, module_name=""):
+        for dirpath, dirnames, filenames in os.walk(str(path)):
+            for filename in filenames:
+                if filename.endswith(".py"):
+                    strategy_module_name = ".".join([module_name, filename[:-len(".py")]])
+                    try:
+                        class_names = self.index.get_class_names(os.path.join(dirpath, filename))
+                    except Exception:
+                        msg = "strategy_file {} parse error :\n{}".format(strategy_module_name,
+                                                                         traceback.format_exc())
+                        self.write_log(msg)
+                        continue
+
+                    for class_name in class_names:
+                        self.class_module_map[class_name] = strategy_module_name
+                        dict.pop(self, class_name, None)
+                elif filename.endswith(".pyd"):
+                    # 编译过的模块读不到源码, 只能直接 import
+                    self.load_module(".".join([module_name, filename.split(".")[0]]))
+        self.index.save()
+
+    def load_module(self, module_name):
+        self.loaded_modules.add(module_name)
+        try:
+            module = importlib.import_module(module_name)
+            for name in dir(module):
+                value = getattr(module, name)
+                if isinstance(value, type) and issubclass(value, self.base_class) and value is not self.base_class:
+                    # 模块里 import 进来的别的策略类不能覆盖索引里指向其他模块的同名类
+                    if self.class_module_map.get(value.__name__, module_name) == module_name:
+                        self[value.__name__] = value
+        except Exception:
+            msg = "strategy_file {} load error :\n{}".format(module_name, traceback.format_exc())
+            self.write_log(msg)
+
+    def resolve(self, class_name):
+        if dict.__contains__(self, class_name):
+            return True
+        module_name = self.class_module_map.get(class_name, None)
+        if module_name and module_name not in self.loaded_modules:
+            self.load_module(module_name)
+        return dict.__contains__(self, class_name)
+
+    def load_all(self):
+        """
+        需要列出全部策略类时 (比如界面) 调用, 会 import 全部模块
+        """
+        for module_name in sorted(set(self.class_module_map.values())):
+            if module_name not in self.loaded_modules:
+                self.load_module(module_name)
+
+    def get(self, class_name, default=None):
+        if self.resolve(class_name):
+            return dict.__getitem__(self, class_name)
+        return default
+
+    def __getitem__(self, class_name):
+        if self.resolve(class_name):
+            return dict.__getitem__(self, class_name)
+        raise KeyError(class_name)
+
+    def __contains__(self, class_name):
+        return self.resolve(class_name)
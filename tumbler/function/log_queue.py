@@ -0,0 +1,188 @@
+# coding=utf-8
+
+import os
+import time
+import atexit
+from threading import Thread, Lock, Event
+from queue import Queue, Full, Empty
+from logging.handlers import TimedRotatingFileHandler
+
+# 队列满时的处理方式
+QUEUE_FULL_DROP = "drop"  # 直接丢弃新日志, 调用方不等待
+QUEUE_FULL_BLOCK = "block"  # 最多等待 block_timeout 秒, 仍然满则丢弃
+
+
+class BatchTimedRotatingFileHandler(TimedRotatingFileHandler):
+    """
+    emit 之后不刷盘, 由写日志线程每写完一批调用一次 flush_buffer
+    """
+
+    def flush(self):
+        pass
+
+    def flush_buffer(self):
+        super(BatchTimedRotatingFileHandler, self).flush()
+
+
+class LogQueue(object):
+    """
+    进程内所有日志共用的有界队列和后台写日志线程
+    调用方只把 (logger, level, msg, args, 时间) 放进队列, 字符串格式化和磁盘写入都在写日志线程里做
+    dropped: 因为队列满被丢弃的条数, written: 已经写出的条数, queued: 当前队列里的条数
+    lock: 跨进程锁 (比如 multiprocessing.Value 的锁), 多个进程写同一个日志文件时, 写日志线程每写一批都先拿锁
+    """
+
+    def __init__(self, max_size=100000, full_policy=QUEUE_FULL_DROP, block_timeout=0.05, batch_size=500, lock=None):
+        self.queue = Queue(maxsize=max_size)
+        self.full_policy = full_policy
+        self.block_timeout = block_timeout
+        self.batch_size = batch_size
+        self.lock = lock
+
+        self.drop_lock = Lock()
+        self.dropped = 0
+        self.reported_dropped = 0
+        self.written = 0
+
+        self.thread = None
+        self.start()
+        atexit.register(self.flush)
+        if hasattr(os, "register_at_fork"):
+            # fork 出来的子进程没有写日志线程, 丢掉父进程没写完的日志重新起一个
+            os.register_at_fork(after_in_child=self.restart_in_child)
+
+    def start(self):
+        self.thread = Thread(target=self.run, name="LogQueue", daemon=True)
+        self.thread.start()
+
+    def restart_in_child(self):
+        self.queue = Queue(maxsize=self.queue.maxsize)
+        self.drop_lock = Lock()
+        self.start()
+
+    def put(self, logger, level, msg, args=None):
+        item = (logger, level, msg, args, time.time())
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except Full:
+            pass
+
+        if self.full_policy == QUEUE_FULL_BLOCK:
+            try:
+                self.queue.put(item, timeout=self.block_timeout)
+                return True
+            except Full:
+                pass
+
+        with self.drop_lock:
+            self.dropped += 1
+        return False
+
+    def get_stat(self):
+        return {
+            "queued": self.queue.qsize(),
+            "dropped": self.dropped,
+            "written": self.written
+        }
+
+    def flush(self, timeout=5):
+        """
+        等待调用之前放入的日志全部写出并刷盘, 超时返回 False
+        """
+        if not self.thread.is_alive():
+            return False
+        event = Event()
+        try:
+            self.queue.put(event, timeout=timeout)
+        except Full:
+            return False
+        return event.wait(timeout)
+
+    @staticmethod
+    def emit(item):
+        logger, level, msg, args, created = item
+        if args:
+            try:
+                msg = msg.format(*args)
+            except Exception as ex:
+                msg = "{} {} format error:{}".format(msg, args, ex)
+        record = logger.makeRecord(logger.name, level, "(log_queue)", 0, msg, None, None)
+        record.created = created
+        record.msecs = (created - int(created)) * 1000
+        logger.handle(record)
+        return logger
+
+    def report_dropped(self, loggers):
+        dropped = self.dropped
+        if dropped > self.reported_dropped and loggers:
+            logger = next(iter(loggers))
+            logger.warning("[LogQueue] queue full, dropped:{} total dropped:{}".format(
+                dropped - self.reported_dropped, dropped))
+            self.reported_dropped = dropped
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self.queue.get_nowait())
+            except Empty:
+                pass
+
+            if self.lock is not None:
+                with self.lock:
+                    events = self.write_batch(batch)
+            else:
+                events = self.write_batch(batch)
+
+            for event in events:
+                event.set()
+
+    def write_batch(self, batch):
+        """
+        写出一批日志并刷盘, 返回批里的 flush 事件
+        """
+        loggers = set()
+        events = []
+        for item in batch:
+            if isinstance(item, Event):
+                events.append(item)
+                continue
+            try:
+                loggers.add(self.emit(item))
+                self.written += 1
+            except Exception:
+                pass
+
+        self.report_dropped(loggers)
+        for logger in loggers:
+            for handler in logger.handlers:
+                try:
+                    getattr(handler, "flush_buffer", handler.flush)()
+                except Exception:
+                    pass
+        return events
+
+
+_log_queue = None
+_log_queue_lock = Lock()
+
+
+def enable_log_queue(**kwargs):
+    """
+    开启队列日志模式, 进程内只创建一次, 之后新建的 LogService / FilePrint 都走队列
+    """
+    global _log_queue
+    with _log_queue_lock:
+        if _log_queue is None:
+            _log_queue = LogQueue(**kwargs)
+        return _log_queue
+
+
+def get_log_queue():
+    """
+    没有开启队列日志模式时返回 None
+    """
+    return _log_queue
+
@@ -0,0 +1,243 @@
+# coding=utf-8
+
+"""
+MQMsg 的线上编码
+1. json: 原来的 {mq_type: 字段字典} 格式, 以 '{' 开头
+2. binary: 以 BINARY_HEADER 开头, 之后是 mq_type 和按 MQLayout 固定布局 struct 打包的字段,
+   datetime 用 epoch 微秒整数表示
+接收端按第一个字节识别格式, 所以 json 和 binary 的发送端可以混用
+"""
+
+import json
+import struct
+from datetime import datetime, timedelta
+
+import tumbler.config as config
+from tumbler.constant import MQDataType, MQCodecType
+
+BINARY_HEADER = b"\x01"
+EPOCH = datetime(1970, 1, 1)
+NONE_DATETIME = -(1 << 63)
+
+UINT8_STRUCT = struct.Struct("<B")
+UINT16_STRUCT = struct.Struct("<H")
+UINT32_STRUCT = struct.Struct("<I")
+DEPTH_EXCHANGE_SEP = ","
+
+ENCODE_ERRORS = (struct.error, TypeError, AttributeError, ValueError, OverflowError)
+
+
+def datetime_to_int(dt):
+    if dt is None:
+        return NONE_DATETIME
+    delta = dt - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+def int_to_datetime(v):
+    if v == NONE_DATETIME:
+        return None
+    return EPOCH + timedelta(microseconds=v)
+
+
+class MQLayout(object):
+    """
+    一种 mq_type 的固定布局:
+    头部 struct: datetime(q) + 浮点字段(d) + 字符串长度(H)
+    之后依次是: 字符串内容, 浮点列表, 盘口列表[(price, volume, exchange)], json字段, 额外字段
+    盘口列表按列打包: 价格数组 + 数量数组 + 逗号拼接的交易所
+    """
+
+    def __init__(self, floats=(), strs=(), float_lists=(), depths=(), jsons=()):
+        self.floats = tuple(floats)
+        self.strs = tuple(strs)
+        self.float_lists = tuple(float_lists)
+        self.depths = tuple(depths)
+        self.jsons = tuple(jsons)
+        self.fields = set(self.floats + self.strs + self.float_lists + self.depths + self.jsons)
+        self.fields.update(("datetime", "mq_type"))
+
+        self.head_struct = struct.Struct("<q{}d{}H".format(len(self.floats), len(self.strs)))
+
+    def get_extra(self, obj):
+        """
+        运行时额外添加的字段, 用 json 附在最后
+        """
+        extra = getattr(obj, "__dict__", None)
+        if not extra:
+            return None
+        fields = self.fields
+        return {k: v for k, v in extra.items() if k not in fields}
+
+    def pack(self, obj):
+        strs = [getattr(obj, k).encode("utf-8") for k in self.strs]
+        values = [datetime_to_int(obj.datetime)]
+        values.extend([getattr(obj, k) for k in self.floats])
+        values.extend([len(s) for s in strs])
+
+        parts = [self.head_struct.pack(*values)]
+        parts.extend(strs)
+
+        for k in self.float_lists:
+            arr = getattr(obj, k)
+            parts.append(struct.pack("<H{}d".format(len(arr)), len(arr), *arr))
+
+        for k in self.depths:
+            levels = getattr(obj, k)
+            n = len(levels)
+            values = [level[0] for level in levels]
+            values.extend([level[1] for level in levels])
+            exchanges = DEPTH_EXCHANGE_SEP.join([level[2] for level in levels]).encode("utf-8")
+            parts.append(struct.pack("<H{}dH".format(2 * n), n, *values, len(exchanges)))
+            parts.append(exchanges)
+
+        for k in self.jsons:
+            s = json.dumps(getattr(obj, k)).encode("utf-8")
+            parts.append(UINT32_STRUCT.pack(len(s)))
+            parts.append(s)
+
+        extra = self.get_extra(obj)
+        s = json.dumps(extra).encode("utf-8") if extra else b""
+        parts.append(UINT32_STRUCT.pack(len(s)))
+        parts.append(s)
+        return b"".join(parts)
+
+    def unpack(self, data, offset):
+        values = self.head_struct.unpack_from(data, offset)
+        offset += self.head_struct.size
+
+        n_floats = len(self.floats)
+        d = {"datetime": int_to_datetime(values[0])}
+        d.update(zip(self.floats, values[1:1 + n_floats]))
+        for k, n in zip(self.strs, values[1 + n_floats:]):
+            d[k] = data[offset:offset + n].decode("utf-8")
+            offset += n
+
+        for k in self.float_lists:
+            n, = UINT16_STRUCT.unpack_from(data, offset)
+            offset += UINT16_STRUCT.size
+            d[k] = list(struct.unpack_from("<{}d".format(n), data, offset))
+            offset += 8 * n
+
+        for k in self.depths:
+            n, = UINT16_STRUCT.unpack_from(data, offset)
+            offset += UINT16_STRUCT.size
+            values = struct.unpack_from("<{}dH".format(2 * n), data, offset)
+            offset += 16 * n + UINT16_STRUCT.size
+            m = values[-1]
+            exchanges = data[offset:offset + m].decode("utf-8").split(DEPTH_EXCHANGE_SEP) if n else []
+            offset += m
+            d[k] = list(zip(values[:n], values[n:2 * n], exchanges))
+
+        for k in self.jsons:
+            n, = UINT32_STRUCT.unpack_from(data, offset)
+            offset += UINT32_STRUCT.size
+            d[k] = json.loads(data[offset:offset + n])
+            offset += n
+
+        n, = UINT32_STRUCT.unpack_from(data, offset)
+        offset += UINT32_STRUCT.size
+        if n:
+            d.update(json.loads(data[offset:offset + n]))
+        return d
+
+
+TICK_LAYOUT = MQLayout(
+    floats=("last_price", "last_volume", "volume", "open_interest", "upper_limit", "lower_limit"),
+    strs=("symbol", "exchange", "vt_symbol", "name", "gateway_name", "time", "date"),
+    float_lists=("bid_prices", "ask_prices", "bid_volumes", "ask_volumes")
+)
+
+MERGE_TICK_LAYOUT = MQLayout(
+    strs=("vt_symbol", "symbol"),
+    depths=("bids", "asks")
+)
+
+SPREAD_LAYOUT = MQLayout(
+    floats=("spread",),
+    strs=("vt_symbol", "symbol"),
+    depths=("bids", "asks")
+)
+
+BBO_TICK_LAYOUT = MQLayout(
+    strs=("exchange",),
+    jsons=("symbol_dic",)
+)
+
+ORDER_LAYOUT = MQLayout(
+    floats=("price", "deal_price", "volume", "traded"),
+    strs=("symbol", "exchange", "vt_symbol", "order_id", "vt_order_id", "client_id", "direction", "type",
+          "offset", "status", "order_time", "cancel_time", "gateway_name")
+)
+
+TRADE_LAYOUT = MQLayout(
+    floats=("price", "volume"),
+    strs=("symbol", "exchange", "vt_symbol", "trade_id", "vt_trade_id", "order_id", "vt_order_id", "direction",
+          "offset", "trade_time", "gateway_name", "trade_type")
+)
+
+
+class MQCodec(object):
+    """
+    发送端按 codec 编码, 没有布局或者字段类型不符合布局的消息退回 json
+    接收端按第一个字节自动识别
+    """
+
+    def __init__(self, codec=MQCodecType.JSON.value):
+        self.codec = codec
+        self.layouts = {}
+
+    def set_codec(self, codec):
+        self.codec = codec
+
+    def register_layout(self, mq_type, layout):
+        self.layouts[mq_type] = layout
+
+    @staticmethod
+    def encode_json(obj):
+        return json.dumps({obj.mq_type: obj.get_transfer()})
+
+    def encode_binary(self, obj, layout):
+        mq_type = obj.mq_type.encode("utf-8")
+        return b"".join([BINARY_HEADER, UINT8_STRUCT.pack(len(mq_type)), mq_type, layout.pack(obj)])
+
+    def encode(self, obj):
+        if self.codec == MQCodecType.BINARY.value:
+            layout = self.layouts.get(obj.mq_type, None)
+            if layout is not None:
+                try:
+                    return self.encode_binary(obj, layout)
+                except ENCODE_ERRORS:
+                    pass
+        return self.encode_json(obj)
+
+    def decode(self, data):
+        """
+        返回 [(mq_type, 字段字典)]
+        json 消息的 datetime 还是字符串, 由 MQMsg.parse_transfer 解析; binary 消息已经是 datetime
+        """
+        if data[:1] == BINARY_HEADER:
+            n = data[1]
+            mq_type = data[2:2 + n].decode("utf-8")
+            fields = self.layouts[mq_type].unpack(data, 2 + n)
+            fields["mq_type"] = mq_type
+            return [(mq_type, fields)]
+        return list(json.loads(data).items())
+
+    def to_text(self, data):
+        """
+        写日志用, binary 消息解码成 {mq_type: 字段字典} 的字符串, json 消息原样返回
+        """
+        if isinstance(data, bytes) and data[:1] == BINARY_HEADER:
+            return str(dict(self.decode(data)))
+        return data
+
+
+mq_codec_manager = MQCodec(config.SETTINGS.get("mq_codec", MQCodecType.JSON.value))
+mq_codec_manager.register_layout(MQDataType.TICKER.value, TICK_LAYOUT)
+mq_codec_manager.register_layout(MQDataType.MERGE_TICKER.value, MERGE_TICK_LAYOUT)
+mq_codec_manager.register_layout(MQDataType.FUTURE_SPOT_SPREAD.value, SPREAD_LAYOUT)
+mq_codec_manager.register_layout(MQDataType.BBO_TICKER.value, BBO_TICK_LAYOUT)
+mq_codec_manager.register_layout(MQDataType.ORDER.value, ORDER_LAYOUT)
+mq_codec_manager.register_layout(MQDataType.SEND_ORDER.value, ORDER_LAYOUT)
+mq_codec_manager.register_layout(MQDataType.TRADE_DATA.value, TRADE_LAYOUT)
@@ -7,6 +7,7 @@ from logging.handlers import TimedRotatingFileHandler
 from logging import DEBUG, INFO
 
 from tumbler.function import get_folder_path
+from tumbler.function.log_queue import get_log_queue, BatchTimedRotatingFileHandler
 
 
 class FilePrint(object):
@@ -21,8 +22,11 @@ class FilePrint(object):
 
         self.formatter = logging.Formatter('%(asctime)s  %(levelname)s: %(message)s')
 
-        self.file_handler = TimedRotatingFileHandler(filename=self.file_path, when="H", interval=1, backupCount=0,
-                                                     encoding='utf-8', delay=False)
+        # 开启了队列日志模式时, write 只入队, 由写日志线程格式化和写盘
+        self.log_queue = get_log_queue()
+        handler_class = BatchTimedRotatingFileHandler if self.log_queue is not None else TimedRotatingFileHandler
+        self.file_handler = handler_class(filename=self.file_path, when="H", interval=1, backupCount=0,
+                                          encoding='utf-8', delay=False)
         self.file_handler.suffix = "%Y%m%d%H%M%S"
         self.file_handler.setFormatter(self.formatter)
         self.file_handler.setLevel(self.level)
@@ -31,10 +35,18 @@ class FilePrint(object):
         self.logger.setLevel(self.level)
         self.logger.addHandler(self.file_handler)
 
-    def write(self, msg, level=INFO):
-        self.logger.log(level, msg)
+    def write(self, msg, level=INFO, args=None):
+        """
+        args 不为空时 msg 作为 format 模板, 队列模式下在写日志线程里才格式化
+        """
+        if self.log_queue is not None:
+            self.log_queue.put(self.logger, level, msg, args)
+        else:
+            self.logger.log(level, msg.format(*args) if args else msg)
 
     def close(self):
+        if self.log_queue is not None:
+            self.log_queue.flush()
         self.file_handler.close()
 
 
@@ -0,0 +1,223 @@
+# coding=utf-8
+
+"""
+PD_Technique.quick_income_compute / quick_rate_compute 的数组实现
+逐行的状态只有开仓均价是路径相关的, 其余 (仓位变化, 手续费, 平仓量, 盈亏) 都可以整列计算
+结果和原来逐行循环的浮点运算顺序一致, 数值完全相同
+"""
+
+import numpy as np
+import pandas as pd
+
+from tumbler.constant import Direction
+
+
+def get_symbol_arr(df):
+    if "symbol" in df.columns:
+        return np.asarray(df["symbol"])
+    return np.array([col[0] for col in df.index])
+
+
+def get_pos_matrix(df, pos_names):
+    """
+    多个仓位列组成 (行数, 列数) 的矩阵, nan 当作 0
+    """
+    pos = np.array(df[list(pos_names)], dtype=np.float64)
+    pos[np.isnan(pos)] = 0
+    return pos
+
+
+def compute_income_matrix(symbol_arr, open_arr, close_arr, pos, size=1, rate=0.0, sllippage=0.0, detail=False):
+    """
+    pos 为 (n,) 或 (n, m), 每一列是一组参数的仓位
+    开仓价用下一根K线的 open, 同一个 symbol 的最后一根用 close 平仓, 换 symbol 时状态清零
+    :return: income, income_rate 形状同 pos, total_fee, win_times, loss_times 每列一个
+    detail=True 时额外返回每行的中间结果, 用于 debug 打印
+    """
+    pos = np.asarray(pos, dtype=np.float64)
+    one_dim = pos.ndim == 1
+    if one_dim:
+        pos = pos.reshape(-1, 1)
+    n, m = pos.shape
+
+    symbol_arr = np.asarray(symbol_arr)
+    close_arr = np.asarray(close_arr, dtype=np.float64)
+    open_arr = np.asarray(open_arr, dtype=np.float64)
+    open_next = np.append(open_arr[1:], open_arr[-1])[:, None]
+    close_col = close_arr[:, None]
+
+    same_prev = np.zeros(n, dtype=bool)
+    same_prev[1:] = symbol_arr[1:] == symbol_arr[:-1]
+    same_next = np.append(same_prev[1:], False)
+
+    pre = np.zeros((n, m))
+    pre[1:] = pos[:-1]
+    pre[~same_prev] = 0
+
+    fee = size * np.abs(pos - pre) * (open_next * rate + sllippage)
+
+    long_reduce = (pre > 0) & (pos < pre)
+    long_add = (pre > 0) & (pos > pre)
+    short_add = (pre < 0) & (pos < pre)
+    short_reduce = (pre < 0) & (pos > pre)
+
+    pc_pos = np.zeros((n, m))
+    pc_pos[long_reduce] = np.minimum(pre, pre - pos)[long_reduce]
+    pc_pos[short_reduce] = np.minimum(pos - pre, np.abs(pre))[short_reduce]
+
+    # 开仓均价: 新开仓/反手直接取下一根 open, 加仓要用上一次的均价加权, 减仓不变
+    set_event = ((pre == 0) & (pos != 0)) | (long_reduce & (pos < 0)) | (short_reduce & (pos > 0))
+    add_event = long_add | short_add
+    event = set_event | add_event | ~same_prev[:, None]
+
+    rows = np.arange(n)[:, None]
+    cols = np.arange(m)[None, :]
+    value = np.where(set_event, open_next, 0.0)
+    event_row = np.maximum.accumulate(np.where(event, rows, 0), axis=0)
+
+    add_rows, add_cols = np.nonzero(add_event)
+    if len(add_rows):
+        # 按行号顺序处理, 前面的加仓已经算好
+        prev_rows = event_row[add_rows - 1, add_cols]
+        for i, j, k in zip(add_rows.tolist(), add_cols.tolist(), prev_rows.tolist()):
+            value[i, j] = (float(value[k, j]) * abs(float(pre[i, j])) + float(open_next[i, 0]) * abs(
+                float(pos[i, j] - pre[i, j]))) / abs(float(pos[i, j]))
+
+    entry_price = value[event_row, cols]
+    last_entry_price = np.zeros((n, m))
+    last_entry_price[1:] = entry_price[:-1]
+    last_entry_price[~same_prev] = 0
+
+    exit_price = np.where(same_next[:, None], open_next, close_col)
+    direction = np.sign(pre)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pnl = size * pc_pos * (exit_price - last_entry_price) * direction
+        net = pnl - fee
+        hit = np.abs(pnl) > 0
+        income = np.cumsum(np.where(hit, net, 0.0), axis=0)
+        income_rate = np.cumsum(np.where(hit, net / close_col, 0.0), axis=0)
+
+    total_fee = np.cumsum(fee, axis=0)[-1]
+    win_times = (hit & (net > 0)).sum(axis=0)
+    loss_times = hit.sum(axis=0) - win_times
+
+    if one_dim:
+        ret = [income[:, 0], income_rate[:, 0], float(total_fee[0]), int(win_times[0]), int(loss_times[0])]
+    else:
+        ret = [income, income_rate, total_fee, win_times, loss_times]
+
+    if detail:
+        entry_time_row = np.zeros((n, m), dtype=np.int64)
+        entry_time_row[1:] = event_row[:-1]
+        has_entry = np.zeros((n, m), dtype=bool)
+        has_entry[1:] = (set_event | add_event)[event_row[:-1], cols]
+        has_entry[~same_prev] = False
+        ret.append({
+            "pnl": pnl, "fee": fee, "pc_pos": pc_pos, "direction": direction, "hit": hit,
+            "exit_price": np.where(pc_pos > 0, open_next, 0.0), "last_entry_price": last_entry_price,
+            "entry_row": np.where(has_entry, entry_time_row, -1)
+        })
+    return ret
+
+
+def get_trade_day_codes(datetime_arr, add_hours=8):
+    """
+    每行所属交易日 "%Y-%m-%d 00:00:00" (减去 add_hours), 返回 (不重复的交易日字符串, 每行的下标)
+    """
+    dt = pd.to_datetime(pd.Series(datetime_arr).astype(str), format="%Y-%m-%d %H:%M:%S")
+    days = (dt - pd.Timedelta(hours=add_hours)).dt.normalize().values.astype("datetime64[D]")
+    uniq, codes = np.unique(days, return_inverse=True)
+    day_strs = [str(day) + " 00:00:00" for day in uniq]
+    return day_strs, codes
+
+
+def compute_rate_dict(close_arr, open_arr, datetime_arr, pos_arr, slippage, fee_rate, dates_arr, add_hours=8,
+                      direction=Direction.BOTH.value):
+    """
+    quick_rate_compute 的数组实现
+    交易日内的仓位取上一根K线的信号 (按 direction 过滤), 离开交易日第一根K线平仓, 平仓成本记在前一个交易日
+    每个交易日的累加仍按原来的行顺序做 (cumsum 是顺序累加), 结果和逐行循环一致
+    """
+    close_arr = np.asarray(close_arr, dtype=np.float64)
+    open_arr = np.asarray(open_arr, dtype=np.float64)
+    pos_arr = np.array(pos_arr, dtype=np.float64)
+    pos_arr[np.isnan(pos_arr)] = 0
+    n = len(pos_arr)
+
+    fee_dic = {}
+    slippage_dic = {}
+    income_dic = {}
+    if n == 0:
+        return fee_dic, slippage_dic, income_dic
+
+    day_strs, codes = get_trade_day_codes(datetime_arr, add_hours)
+    trade_day = np.array([day in dates_arr for day in day_strs], dtype=bool)[codes]
+
+    pre_signal = np.zeros(n)
+    pre_signal[1:] = pos_arr[:-1]
+    if direction == Direction.BOTH.value:
+        target = pre_signal
+    elif direction == Direction.LONG.value:
+        target = np.where(pre_signal >= 0, pre_signal, 0.0)
+    elif direction == Direction.SHORT.value:
+        target = np.where(pre_signal <= 0, pre_signal, 0.0)
+    else:
+        print("[quick_rate_compute] direction error!")
+        target = np.zeros(n)
+
+    active = trade_day.copy()
+    active[0] = False
+    entry_pos = np.where(active, target, 0.0)
+    entry_before = np.zeros(n)
+    entry_before[1:] = entry_pos[:-1]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        change = np.where(active, np.abs(target - entry_before), 0.0)
+        changed = change > 0
+        fee = np.where(changed, change * fee_rate, 0.0)
+        slip = np.where(changed, change * slippage / close_arr, 0.0)
+        cost = np.where(changed, change * fee_rate + change * slippage / close_arr, 0.0)
+        ret = np.where(active, (close_arr - open_arr) / open_arr * entry_pos, 0.0)
+
+        # 离开交易日时的平仓, 用前一根K线的 close
+        exit_size = np.zeros(n)
+        exit_size[1:] = np.where(trade_day[1:], 0.0, np.abs(entry_before[1:]))
+        exited = exit_size > 0
+        exit_fee = np.zeros(n)
+        exit_slip = np.zeros(n)
+        exit_cost = np.zeros(n)
+        exit_fee[1:] = np.where(exited[1:], exit_size[1:] * fee_rate, 0.0)
+        exit_slip[1:] = np.where(exited[1:], exit_size[1:] * slippage / close_arr[:-1], 0.0)
+        exit_cost[1:] = np.where(exited[1:], exit_size[1:] * fee_rate + exit_size[1:] * slippage / close_arr[:-1],
+                                 0.0)
+
+    # 连续同一交易日的K线为一段
+    same_day = trade_day[1:] & trade_day[:-1] & (codes[1:] == codes[:-1])
+    starts = np.flatnonzero(trade_day & ~np.append(False, same_day))
+    ends = np.flatnonzero(trade_day & ~np.append(same_day, False)) + 1
+    for s, e in zip(starts.tolist(), ends.tolist()):
+        break_row = e if e < n and exited[e] else None
+        day = day_strs[codes[s]]
+        if day not in fee_dic:
+            fee_dic[day] = 0
+            slippage_dic[day] = 0
+            income_dic[day] = 0
+
+        if changed[s:e].any() or break_row is not None:
+            fee_ops = [fee[s:e]]
+            slip_ops = [slip[s:e]]
+            if break_row is not None:
+                fee_ops.append(exit_fee[break_row:break_row + 1])
+                slip_ops.append(exit_slip[break_row:break_row + 1])
+            fee_dic[day] = float(np.cumsum(np.concatenate([[fee_dic[day]]] + fee_ops))[-1])
+            slippage_dic[day] = float(np.cumsum(np.concatenate([[slippage_dic[day]]] + slip_ops))[-1])
+
+        income_ops = np.empty(2 * (e - s))
+        income_ops[0::2] = -cost[s:e]
+        income_ops[1::2] = ret[s:e]
+        income_ops = [[income_dic[day]], income_ops]
+        if break_row is not None:
+            income_ops.append(-exit_cost[break_row:break_row + 1])
+        income_dic[day] = float(np.cumsum(np.concatenate(income_ops))[-1])
+
+    return fee_dic, slippage_dic, income_dic
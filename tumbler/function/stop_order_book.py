@@ -0,0 +1,99 @@
+# coding=utf-8
+
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+from tumbler.constant import Direction
+
+INF = float("inf")
+
+
+class StopOrderBook(dict):
+    """
+    stop_order_id: stop_order 的 dict, 增删时同时维护按 vt_symbol 分开的两个价格索引
+    buy 停止单按价格升序, 最新价 >= 价格时触发; sell 停止单按价格降序, 最新价 <= 价格时触发
+    每个 tick 用 get_triggered 二分找出被价格穿过的停止单, 不再扫描全部停止单
+    停止单进入 book 之后不要再修改 vt_symbol / direction / price
+    """
+
+    def __init__(self):
+        super(StopOrderBook, self).__init__()
+        self.long_index = defaultdict(list)  # vt_symbol: [(price, seq, stop_order_id)]
+        self.short_index = defaultdict(list)  # vt_symbol: [(-price, seq, stop_order_id)]
+        self.entries = {}  # stop_order_id: (index list, entry)
+        self.seq = 0
+
+    def _add_index(self, key, stop_order):
+        if stop_order.direction == Direction.LONG.value:
+            arr = self.long_index[stop_order.vt_symbol]
+            entry = (stop_order.price, self.seq, key)
+        elif stop_order.direction == Direction.SHORT.value:
+            arr = self.short_index[stop_order.vt_symbol]
+            entry = (-stop_order.price, self.seq, key)
+        else:
+            return
+        self.seq += 1
+        arr.insert(bisect_left(arr, entry), entry)
+        self.entries[key] = (arr, entry)
+
+    def _remove_index(self, key):
+        item = self.entries.pop(key, None)
+        if item is None:
+            return
+        arr, entry = item
+        i = bisect_left(arr, entry)
+        if i < len(arr) and arr[i] == entry:
+            del arr[i]
+
+    def __setitem__(self, key, stop_order):
+        self._remove_index(key)
+        super(StopOrderBook, self).__setitem__(key, stop_order)
+        self._add_index(key, stop_order)
+
+    def __delitem__(self, key):
+        super(StopOrderBook, self).__delitem__(key)
+        self._remove_index(key)
+
+    def pop(self, key, *args):
+        self._remove_index(key)
+        return super(StopOrderBook, self).pop(key, *args)
+
+    def popitem(self):
+        key, stop_order = super(StopOrderBook, self).popitem()
+        self._remove_index(key)
+        return key, stop_order
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        for key, stop_order in dict(*args, **kwargs).items():
+            self[key] = stop_order
+
+    def clear(self):
+        super(StopOrderBook, self).clear()
+        self.long_index.clear()
+        self.short_index.clear()
+        self.entries.clear()
+
+    def get_triggered(self, vt_symbol, last_price):
+        """
+        返回被 last_price 触发的停止单, 按下单先后顺序, 与原来遍历全部停止单的顺序一致
+        """
+        if last_price != last_price:
+            return []
+
+        entries = []
+        arr = self.long_index.get(vt_symbol, None)
+        if arr:
+            entries.extend(arr[:bisect_right(arr, (last_price, INF))])
+        arr = self.short_index.get(vt_symbol, None)
+        if arr:
+            entries.extend(arr[:bisect_right(arr, (-last_price, INF))])
+        if not entries:
+            return []
+
+        entries.sort(key=lambda x: x[1])
+        return [self[entry[2]] for entry in entries]
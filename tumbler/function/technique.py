@@ -14,6 +14,7 @@ import talib
 
 from tumbler.function.bar import *
 from tumbler.constant import Direction, EvalType
+from tumbler.function.quick_compute import get_symbol_arr, get_pos_matrix, compute_income_matrix, compute_rate_dict
 
 '''
 多因子资料 ，讲解 alpha101
@@ -1762,130 +1763,54 @@ class PD_Technique(object):
         :param rate: 交易的手续费 0.1 表示千一
         :return:
         '''
-        if "symbol" in df.columns:
-            symbol_arr = list(df["symbol"])
-        else:
-            symbol_arr = [col[0] for col in df.index]
         if debug:
             df.to_csv("c.log")
-        win_times = 0
-        loss_times = 0
-        total_fee = 0
-        datetime_arr = list(df["datetime"])
-        close_arr = list(df["close"])
-        open_arr = list(df["open"])
-        close_arr.append(close_arr[-1])  # 多加一个close, 用于后面补充计算
-        open_arr.append(open_arr[-1])  # 多加一个open, 用于后面补充计算
-        datetime_arr.append(datetime_arr[-1])  # 多加一个open, 用于后面补充计算
-        pos_arr = list(df[pos_name])
-        for i in range(len(pos_arr)):
-            if str(pos_arr[i]) == "nan":
-                pos_arr[i] = 0
-
-        income_rate_ret = []
-        income_ret = []
-        ll = len(pos_arr)
-        income_rate = 0
-        income = 0
-        pre_pos = 0
-        last_entry_price = 0
-        new_entry_price = 0
-        last_entry_time = ""
-        new_entry_time = ""
-        exit_time = ""
-
-        for i in range(ll):
-            if i > 0 and symbol_arr[i] != symbol_arr[i - 1]:
-                pre_pos = 0
-                last_entry_price = 0
-                new_entry_price = 0
-                last_entry_time = ""
-                new_entry_time = ""
-            fee = size * abs(pos_arr[i] - pre_pos) * (open_arr[i + 1] * rate + sllippage)
-            pc_pos = 0
-            exit_price = 0
-            if pre_pos > 0:
-                if pos_arr[i] < pre_pos:
-                    pc_pos = min(pre_pos, pre_pos - pos_arr[i])
-                    exit_price = open_arr[i + 1]
-                    exit_time = datetime_arr[i + 1]
-
-                    if pos_arr[i] < 0:
-                        new_entry_price = open_arr[i + 1]
-                        new_entry_time = datetime_arr[i + 1]
-
-                elif pos_arr[i] > pre_pos:
-                    pc_pos = 0
-                    exit_price = 0
-                    exit_time = ""
-                    new_sz = pos_arr[i] - pre_pos
-                    new_entry_price = (last_entry_price * abs(pre_pos) + open_arr[i + 1] * new_sz) / abs(pos_arr[i])
-                    new_entry_time = datetime_arr[i + 1]
-
-            elif pre_pos < 0:
-                if pos_arr[i] < pre_pos:
-                    pc_pos = 0
-                    exit_price = 0
-                    exit_time = ""
-                    new_sz = abs(pos_arr[i] - pre_pos)
-                    new_entry_price = (last_entry_price * abs(pre_pos) + open_arr[i + 1] * new_sz) / abs(pos_arr[i])
-                    new_entry_time = datetime_arr[i + 1]
-
-                elif pos_arr[i] > pre_pos:
-                    pc_pos = min(pos_arr[i] - pre_pos, abs(pre_pos))
-                    exit_price = open_arr[i + 1]
-                    exit_time = datetime_arr[i + 1]
-                    if pos_arr[i] > 0:
-                        new_entry_price = open_arr[i + 1]
-                        new_entry_time = datetime_arr[i + 1]
-            else:
-                if pos_arr[i] > 0:
-                    new_entry_price = open_arr[i + 1]
-                    new_entry_time = datetime_arr[i + 1]
-                elif pos_arr[i] < 0:
-                    new_entry_price = open_arr[i + 1]
-                    new_entry_time = datetime_arr[i + 1]
-
-            if pre_pos > 0:
-                direction = 1
-            elif pre_pos < 0:
-                direction = -1
-            else:
-                direction = 0
-
-            if i + 1 < ll and symbol_arr[i + 1] == symbol_arr[i]:
-                pnl = size * pc_pos * (exit_price - last_entry_price) * direction
-            else:
-                pnl = size * pc_pos * (close_arr[i] - last_entry_price) * direction
+        symbol_arr = get_symbol_arr(df)
+        pos_arr = get_pos_matrix(df, [pos_name])[:, 0]
+        income_ret, income_rate_ret, total_fee, win_times, loss_times, detail = compute_income_matrix(
+            symbol_arr, df["open"], df["close"], pos_arr, size=size, rate=rate, sllippage=sllippage, detail=True)
 
-            if debug:
+        if debug:
+            datetime_arr = list(df["datetime"])
+            datetime_arr.append(datetime_arr[-1])
+            close_arr = list(df["close"])
+            for i in range(len(pos_arr)):
                 print(f"datetime:{datetime_arr[i]}, pos:{pos_arr[i]}")
-            if abs(pnl) > 0:
-                if debug:
+                if detail["hit"][i, 0]:
+                    entry_row = detail["entry_row"][i, 0]
+                    last_entry_time = datetime_arr[entry_row + 1] if entry_row >= 0 else ""
+                    exit_time = datetime_arr[i + 1] if detail["pc_pos"][i, 0] > 0 else ""
                     print(
-                        f"{last_entry_time}-{exit_time},pnl:{pnl},fee:{fee},close:{close_arr[i]},exit_price:{exit_price},"
-                        f"last_entry_price:{last_entry_price},pos:{pos_arr[i]},pc_pos:{pc_pos},direction:{direction}")
-                income += pnl - fee
-                income_rate += (pnl - fee) / close_arr[i]
-
-                if pnl - fee > 0:
-                    win_times += 1
-                else:
-                    loss_times += 1
-            total_fee += fee
-
-            income_ret.append(income)
-            income_rate_ret.append(income_rate)
-            last_entry_price = new_entry_price
-            last_entry_time = new_entry_time
-            pre_pos = pos_arr[i]
+                        f"{last_entry_time}-{exit_time},pnl:{detail['pnl'][i, 0]},fee:{detail['fee'][i, 0]},"
+                        f"close:{close_arr[i]},exit_price:{detail['exit_price'][i, 0]},"
+                        f"last_entry_price:{detail['last_entry_price'][i, 0]},pos:{pos_arr[i]},"
+                        f"pc_pos:{detail['pc_pos'][i, 0]},direction:{int(detail['direction'][i, 0])}")
 
-        df[name] = np.array(income_ret)
-        df[name_rate] = np.array(income_rate_ret)
+        df[name] = income_ret
+        df[name_rate] = income_rate_ret
         print(f"[quick_income_compute] total_income:{income_ret[-1]} total_fee:{total_fee}"
               f" win_times:{win_times} loss_times:{loss_times}")
         return df
 
+    @staticmethod
+    def quick_income_compute_matrix(df, sllippage, rate, pos_names, size=1):
+        '''
+        多组参数的仓位列一次算完, 每一列的结果和 quick_income_compute 相同, 用于参数扫描
+        :param pos_names: 仓位列名列表
+        :return: income 矩阵 (行数 x 列数), income_rate 矩阵, 每个仓位列的汇总 df
+        '''
+        income, income_rate, total_fee, win_times, loss_times = compute_income_matrix(
+            get_symbol_arr(df), df["open"], df["close"], get_pos_matrix(df, pos_names),
+            size=size, rate=rate, sllippage=sllippage)
+        stat_df = pd.DataFrame({
+            "total_income": income[-1],
+            "total_income_rate": income_rate[-1],
+            "total_fee": total_fee,
+            "win_times": win_times,
+            "loss_times": loss_times
+        }, index=list(pos_names))
+        return income, income_rate, stat_df
+
     @staticmethod
     def quick_rate_compute(df, slippage, fee_rate, dates_arr, add_hours=8, pos_name="pos",
                            direction=Direction.BOTH.value):
@@ -1898,97 +1823,8 @@ class PD_Technique(object):
         @slippage_dic = {"2018-01-01 00:00:00": 23} 交易日滑点
         @income_dic = {"2018-01-01 00:00:00": 23} 交易日盈亏 (扣除手续费与滑点)
         '''
-        close_arr = list(df["close"])
-        open_arr = list(df["open"])
-        datetime_arr = list(df["datetime"])
-        pos_arr = list(df[pos_name])
-        for i in range(len(pos_arr)):
-            if str(pos_arr[i]) == "nan":
-                pos_arr[i] = 0
-
-        fee_dic = {}
-        slippage_dic = {}
-        income_dic = {}
-
-        pre_dateime_str = ""
-        ll = len(pos_arr)
-        entry_pos = 0
-        for i in range(ll):
-            tmp_datetime_str = (datetime.strptime(str(datetime_arr[i]), '%Y-%m-%d %H:%M:%S') - timedelta(
-                hours=add_hours)).strftime("%Y-%m-%d") + " 00:00:00"
-            # print(f"i:{i}, tmp_datetime_str:{tmp_datetime_str} pre_dateime_str:{pre_dateime_str}")
-            # 判断是否在交易日, 如在交易日，则累加进收入数据里
-            if tmp_datetime_str in dates_arr:
-                if tmp_datetime_str not in fee_dic.keys():
-                    fee_dic[tmp_datetime_str] = 0
-                    slippage_dic[tmp_datetime_str] = 0
-                    income_dic[tmp_datetime_str] = 0
-
-                if i > 0:
-                    pre_signal_pos = pos_arr[i - 1]
-                    # print(f"pre_signal_pos:{pre_signal_pos}")
-                    if pre_signal_pos != entry_pos:
-                        change_size = 0
-                        if direction == Direction.BOTH.value:
-                            change_size = abs(pre_signal_pos - entry_pos)
-                            entry_pos = pre_signal_pos
-                        elif direction == Direction.LONG.value:
-                            if pre_signal_pos >= 0:
-                                change_size = abs(pre_signal_pos - entry_pos)
-                                entry_pos = pre_signal_pos
-                            else:
-                                change_size = abs(entry_pos)
-                                entry_pos = 0
-                        elif direction == Direction.SHORT.value:
-                            if pre_signal_pos <= 0:
-                                change_size = abs(pre_signal_pos - entry_pos)
-                                entry_pos = pre_signal_pos
-                            else:
-                                change_size = abs(entry_pos)
-                                entry_pos = 0
-                        else:
-                            print("[quick_rate_compute] direction error!")
-
-                        # print(f"change_size:{change_size}")
-                        if change_size > 0:
-                            fee_dic[tmp_datetime_str] += change_size * fee_rate
-                            slippage_dic[tmp_datetime_str] += change_size * slippage / close_arr[i]
-                            income_dic[tmp_datetime_str] -= change_size * fee_rate + change_size * slippage / close_arr[
-                                i]
-
-                    # # debug
-                    # if abs(entry_pos) > 0:
-                    #     print(f"add {tmp_datetime_str} {open_arr[i]}, {close_arr[i]}, "
-                    #           f"{(close_arr[i] - open_arr[i]) / open_arr[i] * entry_pos}")
-
-                    income_dic[tmp_datetime_str] += (close_arr[i] - open_arr[i]) / open_arr[i] * entry_pos
-
-                    # # debug
-                    # if abs(entry_pos) > 0:
-                    #     print(f"income_dic[{tmp_datetime_str}]:{income_dic[tmp_datetime_str]}")
-            else:
-                if i > 0:
-                    change_size = abs(entry_pos)
-                    if change_size > 0:
-                        if pre_dateime_str in fee_dic.keys():
-                            fee_dic[pre_dateime_str] += change_size * fee_rate
-                            slippage_dic[pre_dateime_str] += change_size * slippage / close_arr[i - 1]
-
-                            # print("debug add {}".format(change_size * fee_rate + change_size * slippage / close_arr[i - 1]))
-                            income_dic[pre_dateime_str] -= change_size * fee_rate + change_size * slippage \
-                                                           / close_arr[i - 1]
-                        else:
-                            print(f"[quick_rate_compute] error pre_dateime_str:{pre_dateime_str}!")
-
-                    entry_pos = 0
-
-            pre_dateime_str = tmp_datetime_str
-
-            # debug
-            # print(f"after i:{i}, tmp_datetime_str:{tmp_datetime_str}"
-            #       f" pre_dateime_str:{pre_dateime_str} entry_pos:{entry_pos}")
-
-        return fee_dic, slippage_dic, income_dic
+        return compute_rate_dict(df["close"], df["open"], df["datetime"], df[pos_name], slippage, fee_rate,
+                                 dates_arr, add_hours=add_hours, direction=direction)
 
     @staticmethod
     def quick_compute_current_drawdown(df,
@@ -36,14 +36,14 @@ class TestGateway(object):
         Tick event push.
         Tick event of a specific vt_symbol is also pushed.
         """
-        print(tick.__dict__)
+        print(tick.get_fields())
 
     def on_ws_tick(self, tick):
         """
         Tick event push.
         Tick event of a specific vt_symbol is also pushed.
         """
-        # print(tick.__dict__)
+        # print(tick.get_fields())
         print(str(tick.datetime), tick.bid_prices[0], tick.bid_volumes[0], tick.ask_prices[0], tick.ask_volumes[0])
 
     def on_trade(self, trade):
@@ -51,7 +51,7 @@ class TestGateway(object):
         Trade event push.
         Trade event of a specific vt_symbol is also pushed.
         """
-        print(trade.__dict__)
+        print(trade.get_fields())
 
     def on_order(self, order):
         """
@@ -59,7 +59,7 @@ class TestGateway(object):
         Order event of a specific vt_orderid is also pushed.
         """
         # pass
-        print(order.__dict__)
+        print(order.get_fields())
 
     def on_position(self, position):
         """
@@ -67,7 +67,7 @@ class TestGateway(object):
         Position event of a specific vt_symbol is also pushed.
         """
 
-        print(position.__dict__)
+        print(position.get_fields())
 
     def on_account(self, account):
         """
@@ -75,7 +75,7 @@ class TestGateway(object):
         Account event of a specific vt_accountid is also pushed.
         """
         # pass
-        print(account.__dict__)
+        print(account.get_fields())
 
     def on_log(self, log):
         """
@@ -88,7 +88,7 @@ class TestGateway(object):
         Contract event push.
         """
         pass
-        # print(contract.__dict__)
+        # print(contract.get_fields())
 
     def write_log(self, msg):
         """
@@ -5,6 +5,7 @@ from copy import copy
 import tumbler.config as config
 from tumbler.object import LogData
 from tumbler.service import MQSender
+from tumbler.service.latency_trace_service import latency_trace_manager
 from tumbler.event import (
     EVENT_BBO_TICK,
     EVENT_TICK,
@@ -40,6 +41,22 @@ class BaseGateway(object):
         event = Event(e_type, copy(data))
         self.event_engine.put(event)
 
+    def on_shared_event(self, e_type, data):
+        """
+        不复制直接推送, data 必须是不会再被修改的快照
+        """
+        self.event_engine.put(Event(e_type, data))
+
+    def on_tick_snapshot(self, tick):
+        """
+        一个 tick 只生成一次快照, EVENT_TICK 和 EVENT_TICK + vt_symbol 两个话题共用
+        """
+        tick = tick.snapshot()
+        if latency_trace_manager.enabled:
+            latency_trace_manager.stamp_put(tick, self.gateway_name)
+        self.on_shared_event(EVENT_TICK, tick)
+        self.on_shared_event(EVENT_TICK + tick.vt_symbol, tick)
+
     def on_market_trade(self, trade_data):
         """
         :param account:
@@ -52,16 +69,14 @@ class BaseGateway(object):
         Tick event push.
         Tick event of a specific vt_symbol is also pushed.
         """
-        self.on_event(EVENT_TICK, tick)
-        self.on_event(EVENT_TICK + tick.vt_symbol, tick)
+        self.on_tick_snapshot(tick)
 
     def on_rest_tick(self, tick):
         """
         Tick event push.
         Tick event of a specific vt_symbol is also pushed.
         """
-        self.on_event(EVENT_TICK, tick)
-        self.on_event(EVENT_TICK + tick.vt_symbol, tick)
+        self.on_tick_snapshot(tick)
 
     def on_rest_bbo_tick(self, bbo_tick):
         """
@@ -1,82 +1,150 @@
 # coding=utf-8
 
 from tumbler.constant import Exchange
+from tumbler.function.lazy import LazyImportMap, import_from_path
 
-from .binance import BinanceGateway, BinanceRestMarketApi, BinanceWsMarketApi, BinanceBBORestMarketApi
-from .binancef import BinancefGateway, BinancefRestMarketApi, BinancefWsMarketApi, BinancefBBORestMarketApi
-from .bitfinex import BitfinexGateway, BitfinexRestMarketApi, BitfinexWsMarketApi
-from .bitmex import BitmexGateway
-from .bittrex import BittrexGateway, BittrexRestMarketApi
-from .coinex import CoinexGateway
-from .coinexs import CoinexsGateway
-from .gateio import GateioGateway, GateioRestMarketApi, GateioWsMarketApi
-from .huobi import HuobiGateway, HuobiRestMarketApi, HuobiWsMarketApi
-from .huobis import HuobisGateway, HuobisRestMarketApi, HuobisWsMarketApi
-from .huobiu import HuobiuGateway, HuobiuRestMarketApi, HuobiuWsMarketApi, HuobiuBBORestMarketApi
-from .huobif import HuobifGateway, HuobifRestMarketApi, HuobifWsMarketApi
-
-from .nexus import NexusGateway, NexusRestMarketApi
-from .okex import OkexGateway, OkexWsMarketApi, OkexRestMarketApi
-from .okexs import OkexsGateway, OkexsRestMarketApi, OkexsWsMarketApi
-from .okexf import OkexfGateway, OkexfRestMarketApi, OkexfWsMarketApi
-from .okex5 import Okex5Gateway, Okex5RestMarketApi, Okex5WsMarketApi, Okex5BBORestMarketApi
-
-
-gateway_dict = {
-    Exchange.BINANCE.value: BinanceGateway,
-    Exchange.BINANCEF.value: BinancefGateway,
-    Exchange.BITFINEX.value: BitfinexGateway,
-    Exchange.BITMEX.value: BitmexGateway,
-    Exchange.BITTREX.value: BittrexGateway,
-    Exchange.COINEX.value: CoinexGateway,
-    Exchange.COINEXS.value: CoinexsGateway,
-    Exchange.GATEIO.value: GateioGateway,
-    Exchange.HUOBI.value: HuobiGateway,
-    Exchange.HUOBIU.value: HuobiuGateway,
-    Exchange.HUOBIS.value: HuobisGateway,
-    Exchange.HUOBIF.value: HuobifGateway,
-    Exchange.NEXUS.value: NexusGateway,
-    Exchange.OKEX.value: OkexGateway,
-    Exchange.OKEXS.value: OkexsGateway,
-    Exchange.OKEXF.value: OkexfGateway,
-    Exchange.OKEX5.value: Okex5Gateway
-}
+# 类名 -> 导入路径, 网关模块在第一次用到时才 import
+# 之前这里一次性 import 全部 17 个交易所, 启动任何进程都要付出全部的导入开销
+_gateway_path_dict = {
+    "BinanceGateway": "tumbler.gateway.binance:BinanceGateway",
+    "BinanceRestMarketApi": "tumbler.gateway.binance:BinanceRestMarketApi",
+    "BinanceWsMarketApi": "tumbler.gateway.binance:BinanceWsMarketApi",
+    "BinanceBBORestMarketApi": "tumbler.gateway.binance:BinanceBBORestMarketApi",
 
-bbo_exchange_map = {
-    Exchange.HUOBIU.value: HuobiuBBORestMarketApi,
-    Exchange.BINANCE.value: BinanceBBORestMarketApi,
-    Exchange.BINANCEF.value: BinancefBBORestMarketApi,
-    Exchange.OKEX5.value: Okex5BBORestMarketApi
-}
+    "BinancefGateway": "tumbler.gateway.binancef:BinancefGateway",
+    "BinancefRestMarketApi": "tumbler.gateway.binancef:BinancefRestMarketApi",
+    "BinancefWsMarketApi": "tumbler.gateway.binancef:BinancefWsMarketApi",
+    "BinancefBBORestMarketApi": "tumbler.gateway.binancef:BinancefBBORestMarketApi",
 
-rest_exchange_map = {
-    Exchange.OKEX.value: OkexRestMarketApi,
-    Exchange.OKEXS.value: OkexsRestMarketApi,
-    Exchange.OKEXF.value: OkexfRestMarketApi,
-    Exchange.HUOBI.value: HuobiRestMarketApi,
-    Exchange.HUOBIU.value: HuobiuRestMarketApi,
-    Exchange.HUOBIS.value: HuobisRestMarketApi,
-    Exchange.HUOBIF.value: HuobifRestMarketApi,
-    Exchange.GATEIO.value: GateioRestMarketApi,
-    Exchange.BINANCE.value: BinanceRestMarketApi,
-    Exchange.BITFINEX.value: BitfinexRestMarketApi,
-    Exchange.BITTREX.value: BittrexRestMarketApi,
-    Exchange.NEXUS.value: NexusRestMarketApi,
-    Exchange.BINANCEF.value: BinancefRestMarketApi,
-    Exchange.OKEX5.value: Okex5BBORestMarketApi
-}
+    "BitfinexGateway": "tumbler.gateway.bitfinex:BitfinexGateway",
+    "BitfinexRestMarketApi": "tumbler.gateway.bitfinex:BitfinexRestMarketApi",
+    "BitfinexWsMarketApi": "tumbler.gateway.bitfinex:BitfinexWsMarketApi",
+
+    "BitmexGateway": "tumbler.gateway.bitmex:BitmexGateway",
+
+    "BittrexGateway": "tumbler.gateway.bittrex:BittrexGateway",
+    "BittrexRestMarketApi": "tumbler.gateway.bittrex:BittrexRestMarketApi",
+
+    "CoinexGateway": "tumbler.gateway.coinex:CoinexGateway",
+    "CoinexsGateway": "tumbler.gateway.coinexs:CoinexsGateway",
+
+    "GateioGateway": "tumbler.gateway.gateio:GateioGateway",
+    "GateioRestMarketApi": "tumbler.gateway.gateio:GateioRestMarketApi",
+    "GateioWsMarketApi": "tumbler.gateway.gateio:GateioWsMarketApi",
+
+    "HuobiGateway": "tumbler.gateway.huobi:HuobiGateway",
+    "HuobiRestMarketApi": "tumbler.gateway.huobi:HuobiRestMarketApi",
+    "HuobiWsMarketApi": "tumbler.gateway.huobi:HuobiWsMarketApi",
+
+    "HuobisGateway": "tumbler.gateway.huobis:HuobisGateway",
+    "HuobisRestMarketApi": "tumbler.gateway.huobis:HuobisRestMarketApi",
+    "HuobisWsMarketApi": "tumbler.gateway.huobis:HuobisWsMarketApi",
+
+    "HuobiuGateway": "tumbler.gateway.huobiu:HuobiuGateway",
+    "HuobiuRestMarketApi": "tumbler.gateway.huobiu:HuobiuRestMarketApi",
+    "HuobiuWsMarketApi": "tumbler.gateway.huobiu:HuobiuWsMarketApi",
+    "HuobiuBBORestMarketApi": "tumbler.gateway.huobiu:HuobiuBBORestMarketApi",
+
+    "HuobifGateway": "tumbler.gateway.huobif:HuobifGateway",
+    "HuobifRestMarketApi": "tumbler.gateway.huobif:HuobifRestMarketApi",
+    "HuobifWsMarketApi": "tumbler.gateway.huobif:HuobifWsMarketApi",
+
+    "NexusGateway": "tumbler.gateway.nexus:NexusGateway",
+    "NexusRestMarketApi": "tumbler.gateway.nexus:NexusRestMarketApi",
+
+    "OkexGateway": "tumbler.gateway.okex:OkexGateway",
+    "OkexWsMarketApi": "tumbler.gateway.okex:OkexWsMarketApi",
+    "OkexRestMarketApi": "tumbler.gateway.okex:OkexRestMarketApi",
 
-ws_exchange_map = {
-    Exchange.OKEX.value: OkexWsMarketApi,
-    Exchange.OKEXS.value: OkexsWsMarketApi,
-    Exchange.OKEXF.value: OkexfWsMarketApi,
-    Exchange.HUOBI.value: HuobiWsMarketApi,
-    Exchange.HUOBIU.value: HuobiuWsMarketApi,
-    Exchange.HUOBIS.value: HuobisWsMarketApi,
-    Exchange.HUOBIF.value: HuobifWsMarketApi,
-    Exchange.GATEIO.value: GateioWsMarketApi,
-    Exchange.BINANCE.value: BinanceWsMarketApi,
-    Exchange.BITFINEX.value: BitfinexWsMarketApi,
-    Exchange.BINANCEF.value: BinancefWsMarketApi,
-    Exchange.OKEX5.value: Okex5WsMarketApi
+    "OkexsGateway": "tumbler.gateway.okexs:OkexsGateway",
+    "OkexsRestMarketApi": "tumbler.gateway.okexs:OkexsRestMarketApi",
+    "OkexsWsMarketApi": "tumbler.gateway.okexs:OkexsWsMarketApi",
+
+    "OkexfGateway": "tumbler.gateway.okexf:OkexfGateway",
+    "OkexfRestMarketApi": "tumbler.gateway.okexf:OkexfRestMarketApi",
+    "OkexfWsMarketApi": "tumbler.gateway.okexf:OkexfWsMarketApi",
+
+    "Okex5Gateway": "tumbler.gateway.okex5:Okex5Gateway",
+    "Okex5RestMarketApi": "tumbler.gateway.okex5:Okex5RestMarketApi",
+    "Okex5WsMarketApi": "tumbler.gateway.okex5:Okex5WsMarketApi",
+    "Okex5BBORestMarketApi": "tumbler.gateway.okex5:Okex5BBORestMarketApi"
 }
+
+__all__ = list(_gateway_path_dict.keys()) + ["gateway_dict", "bbo_exchange_map", "rest_exchange_map",
+                                             "ws_exchange_map"]
+
+
+def __getattr__(name):
+    """
+    兼容 from tumbler.gateway import HuobiGateway 的写法
+    """
+    path = _gateway_path_dict.get(name, None)
+    if path is None:
+        raise AttributeError("module {} has no attribute {}".format(__name__, name))
+    value = import_from_path(path)
+    globals()[name] = value
+    return value
+
+
+def _make_map(name_dict):
+    return LazyImportMap({key: _gateway_path_dict[name] for key, name in name_dict.items()})
+
+
+gateway_dict = _make_map({
+    Exchange.BINANCE.value: "BinanceGateway",
+    Exchange.BINANCEF.value: "BinancefGateway",
+    Exchange.BITFINEX.value: "BitfinexGateway",
+    Exchange.BITMEX.value: "BitmexGateway",
+    Exchange.BITTREX.value: "BittrexGateway",
+    Exchange.COINEX.value: "CoinexGateway",
+    Exchange.COINEXS.value: "CoinexsGateway",
+    Exchange.GATEIO.value: "GateioGateway",
+    Exchange.HUOBI.value: "HuobiGateway",
+    Exchange.HUOBIU.value: "HuobiuGateway",
+    Exchange.HUOBIS.value: "HuobisGateway",
+    Exchange.HUOBIF.value: "HuobifGateway",
+    Exchange.NEXUS.value: "NexusGateway",
+    Exchange.OKEX.value: "OkexGateway",
+    Exchange.OKEXS.value: "OkexsGateway",
+    Exchange.OKEXF.value: "OkexfGateway",
+    Exchange.OKEX5.value: "Okex5Gateway"
+})
+
+bbo_exchange_map = _make_map({
+    Exchange.HUOBIU.value: "HuobiuBBORestMarketApi",
+    Exchange.BINANCE.value: "BinanceBBORestMarketApi",
+    Exchange.BINANCEF.value: "BinancefBBORestMarketApi",
+    Exchange.OKEX5.value: "Okex5BBORestMarketApi"
+})
+
+rest_exchange_map = _make_map({
+    Exchange.OKEX.value: "OkexRestMarketApi",
+    Exchange.OKEXS.value: "OkexsRestMarketApi",
+    Exchange.OKEXF.value: "OkexfRestMarketApi",
+    Exchange.HUOBI.value: "HuobiRestMarketApi",
+    Exchange.HUOBIU.value: "HuobiuRestMarketApi",
+    Exchange.HUOBIS.value: "HuobisRestMarketApi",
+    Exchange.HUOBIF.value: "HuobifRestMarketApi",
+    Exchange.GATEIO.value: "GateioRestMarketApi",
+    Exchange.BINANCE.value: "BinanceRestMarketApi",
+    Exchange.BITFINEX.value: "BitfinexRestMarketApi",
+    Exchange.BITTREX.value: "BittrexRestMarketApi",
+    Exchange.NEXUS.value: "NexusRestMarketApi",
+    Exchange.BINANCEF.value: "BinancefRestMarketApi",
+    Exchange.OKEX5.value: "Okex5BBORestMarketApi"
+})
+
+ws_exchange_map = _make_map({
+    Exchange.OKEX.value: "OkexWsMarketApi",
+    Exchange.OKEXS.value: "OkexsWsMarketApi",
+    Exchange.OKEXF.value: "OkexfWsMarketApi",
+    Exchange.HUOBI.value: "HuobiWsMarketApi",
+    Exchange.HUOBIU.value: "HuobiuWsMarketApi",
+    Exchange.HUOBIS.value: "HuobisWsMarketApi",
+    Exchange.HUOBIF.value: "HuobifWsMarketApi",
+    Exchange.GATEIO.value: "GateioWsMarketApi",
+    Exchange.BINANCE.value: "BinanceWsMarketApi",
+    Exchange.BITFINEX.value: "BitfinexWsMarketApi",
+    Exchange.BINANCEF.value: "BinancefWsMarketApi",
+    Exchange.OKEX5.value: "Okex5WsMarketApi"
+})
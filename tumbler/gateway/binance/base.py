@@ -21,6 +21,7 @@ REST_TRADE_HOST = "https://www.binance.com"
 
 WEBSOCKET_TRADE_HOST = "wss://stream.binance.com:9443/ws/"
 WEBSOCKET_DATA_HOST = "wss://stream.binance.com:9443/stream?streams="
+WEBSOCKET_STREAM_HOST = "wss://stream.binance.com:9443/stream"
 
 STATUS_BINANCE2VT = {
     "NEW": Status.NOTTRADED.value,
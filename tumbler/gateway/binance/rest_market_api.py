@@ -1,7 +1,6 @@
 # coding=utf-8
 
 import time
-from copy import copy
 from datetime import datetime
 from threading import Thread
 
@@ -90,4 +89,4 @@ class BinanceRestMarketApi(RestClient):
         tick.datetime = datetime.now()
         simplify_tick(tick, data["bids"], data["asks"])
 
-        self.gateway.on_rest_tick(copy(tick))
+        self.gateway.on_rest_tick(tick)
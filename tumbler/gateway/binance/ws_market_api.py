@@ -1,8 +1,7 @@
 # coding=utf-8
 
-from copy import copy
 from datetime import datetime
-from tumbler.api.websocket import WebsocketClient
+from tumbler.api.websocket.async_websocket_client import AsyncWebsocketClient
 from tumbler.constant import (
     Exchange
 )
@@ -12,10 +11,15 @@ from tumbler.object import (
 from tumbler.object import MAX_PRICE_NUM
 from tumbler.function import get_vt_key, get_dt_use_timestamp, simplify_tick
 from .base import change_binance_format_to_system_format, change_system_format_to_binance_format
-from .base import WEBSOCKET_DATA_HOST
+from .base import WEBSOCKET_STREAM_HOST
 
+# 一条 SUBSCRIBE / UNSUBSCRIBE 消息里最多的 stream 数
+MAX_PARAMS_PER_PACKET = 200
 
-class BinanceWsMarketApi(WebsocketClient):
+
+class BinanceWsMarketApi(AsyncWebsocketClient):
+    # 交易所限制每个连接每秒最多收 5 条消息
+    send_rate_limit = 4
 
     def __init__(self, gateway):
         super(BinanceWsMarketApi, self).__init__()
@@ -29,13 +33,14 @@ class BinanceWsMarketApi(WebsocketClient):
         self.secret_key = ""
 
         self.ticks = {}
+        self.req_id = 0
 
     def connect(self, api_key, secret_key, proxy_host="", proxy_port=0):
         self.api_key = api_key
         self.secret_key = secret_key
 
-        self.proxy_host = proxy_host
-        self.proxy_port = proxy_port
+        self.init(WEBSOCKET_STREAM_HOST, proxy_host, proxy_port)
+        self.start()
 
     def on_connected(self):
         self.gateway.write_log("BinanceWsMarketApi connected success!")
@@ -52,29 +57,53 @@ class BinanceWsMarketApi(WebsocketClient):
 
         self.ticks[req.symbol] = tick
 
-        # Close previous connection
-        if self._active:
-            self.stop()
-            self.join()
-
-        # Create new connection
-        channels = []
-        for symbol in self.ticks.keys():
-            ws_symbol = change_system_format_to_binance_format(symbol).lower()
-            channels.append(ws_symbol + "@ticker")
-            channels.append(ws_symbol + "@depth10")
-
-        url = WEBSOCKET_DATA_HOST + "/".join(channels)
-        self.init(url, self.proxy_host, self.proxy_port)
-        self.start()
+        # 在已有连接上增量订阅, 不需要重建连接
+        ws_symbol = change_system_format_to_binance_format(req.symbol).lower()
+        self.req_id += 1
+        self.subscribe_packet(req.symbol, {
+            "method": "SUBSCRIBE",
+            "params": [ws_symbol + "@ticker", ws_symbol + "@depth10"],
+            "id": self.req_id
+        })
+
+    def unsubscribe(self, req):
+        self.set_all_symbols.discard(req.symbol)
+        self.ticks.pop(req.symbol, None)
+
+        ws_symbol = change_system_format_to_binance_format(req.symbol).lower()
+        self.req_id += 1
+        self.unsubscribe_packet(req.symbol, {
+            "method": "UNSUBSCRIBE",
+            "params": [ws_symbol + "@ticker", ws_symbol + "@depth10"],
+            "id": self.req_id
+        })
+
+    def merge_packets(self, packets):
+        """
+        连续的 SUBSCRIBE / UNSUBSCRIBE 合并成一条, 保持先后顺序
+        """
+        ret = []
+        for packet in packets:
+            last = ret[-1] if ret else None
+            if last and last["method"] == packet["method"] \
+                    and len(last["params"]) + len(packet["params"]) <= MAX_PARAMS_PER_PACKET:
+                last["params"].extend(packet["params"])
+            else:
+                ret.append(dict(packet, params=list(packet["params"])))
+        return ret
 
     def on_packet(self, packet):
-        stream = packet["stream"]
+        stream = packet.get("stream", None)
+        if stream is None:
+            # 订阅回报 {"result": null, "id": 1}
+            return
         data = packet["data"]
 
         ws_symbol, channel = stream.split("@")
         symbol = change_binance_format_to_system_format(ws_symbol)
-        tick = self.ticks[symbol]
+        tick = self.ticks.get(symbol, None)
+        if tick is None:
+            return
 
         if channel == "ticker":
             tick.volume = float(data['v'])
@@ -84,4 +113,4 @@ class BinanceWsMarketApi(WebsocketClient):
             simplify_tick(tick, data["bids"], data["asks"])
 
         if tick.last_price:
-            self.gateway.on_ws_tick(copy(tick))
+            self.gateway.on_ws_tick(tick)
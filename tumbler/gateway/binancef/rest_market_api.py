@@ -1,7 +1,6 @@
 # coding=utf-8
 
 import time
-from copy import copy
 from datetime import datetime
 from threading import Thread
 
@@ -85,4 +84,4 @@ class BinancefRestMarketApi(RestClient):
         tick = self.ticks[symbol]
         tick.datetime = datetime.now()
         simplify_tick(tick, data["bids"], data["asks"])
-        self.gateway.on_rest_tick(copy(tick))
+        self.gateway.on_rest_tick(tick)
@@ -1,6 +1,5 @@
 # coding=utf-8
 
-from copy import copy
 from datetime import datetime
 
 from tumbler.api.websocket import WebsocketClient
@@ -75,4 +74,4 @@ class BinancefWsMarketApi(WebsocketClient):
             simplify_tick(tick, data["b"], data["a"])
 
         if tick.datetime:
-            self.gateway.on_ws_tick(copy(tick))
+            self.gateway.on_ws_tick(tick)
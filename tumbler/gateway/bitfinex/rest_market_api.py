@@ -1,7 +1,6 @@
 # coding=utf-8
 
 import time
-from copy import copy
 from datetime import datetime
 from threading import Thread
 
@@ -108,4 +107,4 @@ class BitfinexRestMarketApi(RestClient):
                 asks.append([price, abs(volume)])
 
         simplify_tick(tick, bids, asks)
-        self.gateway.on_rest_tick(copy(tick))
+        self.gateway.on_rest_tick(tick)
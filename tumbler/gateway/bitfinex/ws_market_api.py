@@ -1,6 +1,5 @@
 # coding=utf-8
 
-from copy import copy
 from datetime import datetime
 
 from tumbler.function import get_vt_key, simplify_tick
@@ -140,4 +139,4 @@ class BitfinexWsMarketApi(BitfinexWsApiBase):
         tick.datetime = dt
 
         if tick.bid_prices[0] and tick.ask_prices[0]:
-            self.gateway.on_ws_tick(copy(tick))
+            self.gateway.on_ws_tick(tick)
@@ -1,7 +1,6 @@
 # coding=utf-8
 
 import time
-from copy import copy
 from datetime import datetime
 
 from threading import Thread
@@ -94,4 +93,4 @@ class BitmexRestMarketApi(RestClient):
         tick = self.ticks[symbol]
         tick = parse_ticker(tick, data)
 
-        self.gateway.on_rest_tick(copy(tick))
+        self.gateway.on_rest_tick(tick)
@@ -125,7 +125,7 @@ class BitmexWsMarketApi(BitmexWsApiBase):
         tick.datetime = parse_timestamp(d["timestamp"])
 
         if tick.bid_prices[0]:
-            self.gateway.on_ws_tick(copy(tick))
+            self.gateway.on_ws_tick(tick)
 
     # def on_l2_depth(self, dic, action=None):
     #     now_time = time.time()
@@ -224,4 +224,4 @@ class BitmexWsMarketApi(BitmexWsApiBase):
             return
 
         simplify_tick(tick, d["bids"], d["asks"])
-        self.gateway.on_ws_tick(copy(tick))
+        self.gateway.on_ws_tick(tick)
@@ -1,7 +1,6 @@
 # coding=utf-8
 
 import time
-from copy import copy
 from datetime import datetime
 from threading import Thread
 from tumbler.function import split_url, get_vt_key, simplify_tick
@@ -100,7 +99,7 @@ class BittrexRestMarketApi(RestClient):
         asks = [(float(dic["Rate"]), float(dic["Quantity"])) for dic in asks]
 
         simplify_tick(tick, bids, asks)
-        self.gateway.on_rest_tick(copy(tick))
+        self.gateway.on_rest_tick(tick)
 
     def check_error(self, data, func=""):
         if data["success"] is True:
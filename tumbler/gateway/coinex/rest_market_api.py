@@ -2,7 +2,6 @@
 
 import time
 from datetime import datetime
-from copy import copy
 from threading import Thread
 
 from tumbler.object import (
@@ -97,7 +96,7 @@ class CoinexRestMarketApi(RestClient):
         tick.compute_date_and_time()
 
         simplify_tick(tick, data["bids"], data["asks"])
-        self.gateway.on_rest_tick(copy(tick))
+        self.gateway.on_rest_tick(tick)
 
     def check_error(self, data, func=""):
         if str(data["code"]) == "0":
@@ -2,7 +2,6 @@
 
 import time
 from datetime import datetime
-from copy import copy
 from threading import Thread
 
 from tumbler.object import (
@@ -95,7 +94,7 @@ class CoinexsRestMarketApi(RestClient):
         tick.date = dt.strftime("%Y%m%d")
         tick.time = dt.strftime("%H:%M:%S")
         simplify_tick(tick, data["bids"], data["asks"])
-        self.gateway.on_rest_tick(copy(tick))
+        self.gateway.on_rest_tick(tick)
 
     def check_error(self, data, func=""):
         if str(data["code"]) == "0":
@@ -1,7 +1,6 @@
 # coding=utf-8
 
 from datetime import datetime
-from copy import copy
 from tumbler.object import (
     TickData
 )
@@ -129,4 +128,4 @@ class CoinexsWsMarketApi(CoinexsWsApiBase):
                 if last_price is not None:
                     tick.last_price = last_price
 
-                self.gateway.on_ws_tick(copy(tick))
+                self.gateway.on_ws_tick(tick)
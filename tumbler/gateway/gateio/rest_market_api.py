@@ -2,7 +2,6 @@
 
 import time
 from datetime import datetime
-from copy import copy
 from threading import Thread
 
 from tumbler.api.rest import RestClient
@@ -95,7 +94,7 @@ class GateioRestMarketApi(RestClient):
         tick.compute_date_and_time()
 
         simplify_tick(tick, data["bids"], data["asks"])
-        self.gateway.on_rest_tick(copy(tick))
+        self.gateway.on_rest_tick(tick)
 
     def check_error(self, data, func=""):
         if "bids" in data.keys() and "asks" in data.keys():
@@ -1,7 +1,6 @@
 # coding=utf-8
 
 from datetime import datetime
-from copy import copy
 
 from tumbler.constant import MAX_PRICE_NUM
 from tumbler.function import get_vt_key, simplify_tick
@@ -111,5 +110,5 @@ class GateioWsMarketApi(GateioWsApiBase):
             tick.compute_date_and_time()
 
             simplify_tick(tick, dic_bids.items(), dic_asks.items())
-            self.gateway.on_ws_tick(copy(tick))
+            self.gateway.on_ws_tick(tick)
 
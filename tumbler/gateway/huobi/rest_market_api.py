@@ -1,6 +1,5 @@
 # coding=utf-8
 
-from copy import copy
 import time
 from datetime import datetime
 from threading import Thread
@@ -98,7 +97,7 @@ class HuobiRestMarketApi(RestClient):
         tick.compute_date_and_time()
         simplify_tick(tick, data["tick"]["bids"], data["tick"]["asks"])
 
-        self.gateway.on_rest_tick(copy(tick))
+        self.gateway.on_rest_tick(tick)
 
     def check_error(self, data, func=""):
         if data["status"] != "error":
@@ -228,7 +228,7 @@ class HuobiWsTradeApi(HuobiWsApiBase):
         traded_volume = float(data.get("tradeVolume", 0))
         order.traded += traded_volume
         order.status = STATUS_HUOBI2VT.get(data["orderStatus"], None)
-        # log_service_manager.write_log("[order detail]:{}".format(order.__dict__))
+        # log_service_manager.write_log("[order detail]:{}".format(order.get_fields()))
         self.order_manager.on_order(order)
 
         # Push trade event
@@ -251,6 +251,6 @@ class HuobiWsTradeApi(HuobiWsApiBase):
         trade.trade_time = get_str_dt_use_timestamp(data["tradeTime"])
         trade.gateway_name = self.gateway_name
 
-        # log_service_manager.write_log("[trade detail]:{}".format(trade.__dict__))
+        # log_service_manager.write_log("[trade detail]:{}".format(trade.get_fields()))
 
         self.gateway.on_trade(trade)
@@ -123,8 +123,8 @@ class HuobifWsMarketApi(HuobiWsApiBase):
         if "bids" in data["tick"].keys() and "asks" in data["tick"].keys():
             simplify_tick(tick, data["tick"]["bids"], data["tick"]["asks"])
 
-            #print("[on_market_depth] tick:{}".format(tick.__dict__))
-            self.gateway.on_ws_tick(copy(tick))
+            #print("[on_market_depth] tick:{}".format(tick.get_fields()))
+            self.gateway.on_ws_tick(tick)
 
     def on_trade_detail(self, data):
         """成交深度推送"""
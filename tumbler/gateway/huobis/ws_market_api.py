@@ -112,7 +112,7 @@ class HuobisWsMarketApi(HuobiWsApiBase):
         tick.datetime = get_dt_use_timestamp(data["ts"])
         simplify_tick(tick, data["tick"]["bids"], data["tick"]["asks"])
 
-        self.gateway.on_ws_tick(copy(tick))
+        self.gateway.on_ws_tick(tick)
 
     def on_trade_detail(self, data):
         """成交深度推送"""
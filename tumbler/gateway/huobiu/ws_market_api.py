@@ -1,6 +1,5 @@
 # coding=utf-8
 
-from copy import copy
 from datetime import datetime
 from tumbler.function import get_vt_key
 from tumbler.function import get_dt_use_timestamp, simplify_tick
@@ -103,7 +102,7 @@ class HuobiuWsMarketApi(HuobiWsApiBase):
         tick.datetime = get_dt_use_timestamp(data["ts"])
         simplify_tick(tick, data["tick"]["bids"], data["tick"]["asks"])
 
-        self.gateway.on_ws_tick(copy(tick))
+        self.gateway.on_ws_tick(tick)
 
     def on_trade_detail(self, data):
         """成交深度推送"""
@@ -1,7 +1,6 @@
 # coding=utf-8
 
 
-from copy import copy
 import time
 from threading import Thread
 from datetime import datetime
@@ -99,4 +98,4 @@ class NexusRestMarketApi(RestClient):
         bids = [(x["price"], x["quantity"]) for x in bids]
 
         simplify_tick(tick, bids, asks)
-        self.gateway.on_rest_tick(copy(tick))
+        self.gateway.on_rest_tick(tick)
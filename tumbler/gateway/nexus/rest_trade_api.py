@@ -178,7 +178,7 @@ class NexusRestTradeApi(RestClient):
             acct.frozen = 0
             acct.available = acct.balance - acct.frozen
             acct.gateway_name = self.gateway_name
-            self.gateway.write_log("acct:{}".format(acct.__dict__))
+            self.gateway.write_log("acct:{}".format(acct.get_fields()))
             self.gateway.on_account(acct)
 
     def on_query_position(self, data, request):
@@ -69,7 +69,7 @@ class NexusWsTradeApi(NexusApiBase):
         bids = [(x["price"], x["quantity"]) for x in bids]
 
         simplify_tick(self.ticker, bids, asks)
-        self.gateway.on_ws_tick(copy(self.ticker))
+        self.gateway.on_ws_tick(self.ticker)
 
     def on_market_trade(self, data):
         pass
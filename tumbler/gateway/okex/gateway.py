@@ -20,6 +20,7 @@ from .ws_market_api import OkexWsMarketApi
 
 from .base import REST_MARKET_HOST, WEBSOCKET_MARKET_HOST, REST_TRADE_HOST, WEBSOCKET_TRADE_HOST
 from tumbler.service import log_service_manager
+from tumbler.function.mq_codec import mq_codec_manager
 
 
 class OkexGateway(BaseGateway):
@@ -108,9 +109,10 @@ class OkexGateway(BaseGateway):
             vt_order_id, order = self.rest_trade_api.send_order(req)
             if self.run_mode in [RunMode.PUT_ORDER.value, RunMode.COVER.value]:
                 if self.sender:
+                    msg = order.get_mq_msg()
                     log_service_manager.write_log(
-                        "send account_name:{} msg:{}".format(self.account_name, order.get_mq_msg()))
-                    self.sender.send("", order.get_mq_msg())
+                        "send account_name:{} msg:{}".format(self.account_name, mq_codec_manager.to_text(msg)))
+                    self.sender.send("", msg)
             return vt_order_id
 
     def cancel_order(self, req):
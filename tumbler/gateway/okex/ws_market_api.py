@@ -100,7 +100,7 @@ class OkexWsMarketApi(OkexWsApiBase):
         tick.compute_date_and_time()
         simplify_tick(tick, data["bids"], data["asks"])
 
-        self.gateway.on_ws_tick(copy(tick))
+        self.gateway.on_ws_tick(tick)
         '''
         bef_time = tick.datetime
         now_time = parse_timestamp(data["timestamp"])
@@ -109,5 +109,5 @@ class OkexWsMarketApi(OkexWsApiBase):
             tick.compute_date_and_time()
             simplify_tick(tick, data["bids"], data["asks"])
 
-            self.gateway.on_ws_tick(copy(tick))
+            self.gateway.on_ws_tick(tick)
         '''
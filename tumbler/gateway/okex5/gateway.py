@@ -14,6 +14,7 @@ import tumbler.config as config
 from tumbler.service import MQSender
 from tumbler.apps.data_third_part.base import get_query_account_name
 from tumbler.service import log_service_manager
+from tumbler.function.mq_codec import mq_codec_manager
 
 from .rest_market_api import Okex5RestMarketApi
 from .rest_trade_api import Okex5RestTradeApi
@@ -113,9 +114,10 @@ class Okex5Gateway(BaseGateway):
             vt_order_id, order = self.rest_trade_api.send_order(req)
             if self.run_mode in [RunMode.PUT_ORDER.value, RunMode.COVER.value]:
                 if self.sender:
+                    msg = order.get_mq_msg()
                     log_service_manager.write_log(
-                        "send account_name:{} msg:{}".format(self.account_name, order.get_mq_msg()))
-                    self.sender.send("", order.get_mq_msg())
+                        "send account_name:{} msg:{}".format(self.account_name, mq_codec_manager.to_text(msg)))
+                    self.sender.send("", msg)
             return vt_order_id
 
     def send_orders(self, reqs):
@@ -124,9 +126,10 @@ class Okex5Gateway(BaseGateway):
             if self.run_mode in [RunMode.PUT_ORDER.value, RunMode.COVER.value]:
                 if self.sender:
                     for order in ret_orders:
+                        msg = order.get_mq_msg()
                         log_service_manager.write_log(
-                            "send account_name:{} msg:{}".format(self.account_name, order.get_mq_msg()))
-                        self.sender.send("", order.get_mq_msg())
+                            "send account_name:{} msg:{}".format(self.account_name, mq_codec_manager.to_text(msg)))
+                        self.sender.send("", msg)
         return []
 
     def cancel_order(self, req):
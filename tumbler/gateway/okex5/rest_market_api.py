@@ -1,7 +1,6 @@
 # coding=utf-8
 
 import time
-from copy import copy
 from datetime import datetime
 
 from tumbler.api.rest import RestClient
@@ -115,4 +114,4 @@ class Okex5RestMarketApi(RestClient):
             tick.compute_date_and_time()
             simplify_tick(tick, dic["bids"], dic["asks"])
 
-            self.gateway.on_rest_tick(copy(tick))
+            self.gateway.on_rest_tick(tick)
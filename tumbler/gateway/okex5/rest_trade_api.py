@@ -362,7 +362,7 @@ class Okex5RestTradeApi(RestClient):
             order_time = time.mktime(time.strptime(order.order_time, "%Y-%m-%d %H:%M:%S"))
             if time.time() - order_time > 3600:
                 order.status = Status.REJECTED.value
-                self.gateway.write_log(f"on_query_single_order {time.time()} {order_time} rejected order {order.__dict__}")
+                self.gateway.write_log(f"on_query_single_order {time.time()} {order_time} rejected order {order.get_fields()}")
                 self.gateway.on_order(order)
 
     def on_query_order(self, data, request):
@@ -477,7 +477,7 @@ class Okex5RestTradeApi(RestClient):
         req = request.extra
         order = self.gateway.get_order(req.order_id)
         if order:
-            self.gateway.write_log(f"[on_cancel_order_failed] order:{order.__dict__}")
+            self.gateway.write_log(f"[on_cancel_order_failed] order:{order.get_fields()}")
 
     def on_failed(self, status_code, request):
         """
@@ -1,6 +1,5 @@
 # coding=utf-8
 
-from copy import copy
 from datetime import datetime
 from tumbler.function import get_vt_key, get_dt_use_timestamp, simplify_tick
 from tumbler.constant import (
@@ -93,4 +92,4 @@ class Okex5WsMarketApi(Okex5WsApiBase):
         tick.compute_date_and_time()
         simplify_tick(tick, data["bids"], data["asks"])
 
-        self.gateway.on_ws_tick(copy(tick))
+        self.gateway.on_ws_tick(tick)
@@ -20,6 +20,7 @@ from .ws_market_api import OkexfWsMarketApi
 from .ws_trade_api import OkexfWsTradeApi
 
 from tumbler.service import log_service_manager
+from tumbler.function.mq_codec import mq_codec_manager
 
 
 class OkexfGateway(BaseGateway):
@@ -107,9 +108,10 @@ class OkexfGateway(BaseGateway):
             vt_order_id, order = self.rest_trade_api.send_order(req)
             if self.run_mode in [RunMode.COVER.value, RunMode.PUT_ORDER.value]:
                 if self.sender:
+                    msg = order.get_mq_msg()
                     log_service_manager.write_log(
-                        "send account_name:{} msg:{}".format(self.account_name, order.get_mq_msg()))
-                    self.sender.send("", order.get_mq_msg())
+                        "send account_name:{} msg:{}".format(self.account_name, mq_codec_manager.to_text(msg)))
+                    self.sender.send("", msg)
             return vt_order_id
 
     def cancel_order(self, req):
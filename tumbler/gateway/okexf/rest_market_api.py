@@ -2,7 +2,6 @@
 
 import time
 
-from copy import copy
 from datetime import datetime
 from threading import Thread
 
@@ -91,4 +90,4 @@ class OkexfRestMarketApi(RestClient):
         tick.compute_date_and_time()
 
         simplify_tick(tick, data["bids"], data["asks"])
-        self.gateway.on_rest_tick(copy(tick))
+        self.gateway.on_rest_tick(tick)
@@ -104,7 +104,7 @@ class OkexfWsMarketApi(OkexfWsApiBase):
         tick.compute_date_and_time()
         simplify_tick(tick, data["bids"], data["asks"])
 
-        self.gateway.on_ws_tick(copy(tick))
+        self.gateway.on_ws_tick(tick)
 
         '''
         bef_time = tick.datetime
@@ -114,5 +114,5 @@ class OkexfWsMarketApi(OkexfWsApiBase):
             tick.compute_date_and_time()
             simplify_tick(tick, data["bids"], data["asks"])
 
-            self.gateway.on_ws_tick(copy(tick))
+            self.gateway.on_ws_tick(tick)
         '''
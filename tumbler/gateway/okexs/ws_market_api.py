@@ -107,4 +107,4 @@ class OkexsWsMarketApi(OkexsWsApiBase):
             tick.compute_date_and_time()
 
             simplify_tick(tick, data["bids"], data["asks"])
-            self.gateway.on_ws_tick(copy(tick))
+            self.gateway.on_ws_tick(tick)
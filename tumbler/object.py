@@ -1,6 +1,7 @@
 # coding=utf-8
 
 from datetime import datetime, timedelta
+import os
 import json
 import time
 from logging import INFO
@@ -15,6 +16,7 @@ from tumbler.constant import Status, StopOrderStatus, MQDataType, TradeType, Int
 from tumbler.function.function import get_vt_key, get_web_display_format_symbol, get_from_vt_key
 from tumbler.function.order_math import get_round_order_price, get_system_inside_min_volume
 from tumbler.function.alpha_factor import factor_zscore
+from tumbler.function.mq_codec import mq_codec_manager
 
 LIVE_LIMIT_ORDER_CONDITIONS = [Status.SUBMITTING.value, Status.NOTTRADED.value, Status.PARTTRADED.value]
 LIVE_STOP_ORDER_CONDITIONS = [StopOrderStatus.WAITING.value]
@@ -30,6 +32,8 @@ SYSTEM_TO_MOV_DIRECTION_FORMAT = {
     Direction.LONG.value: "buy",
     Direction.SHORT.value: "sell"
 }
+BAR_STORE_COLUMNS = ["datetime", "open", "high", "low", "close", "volume"]
+BAR_STORE_META_FILE = "meta.json"
 
 
 class StrategyParameter(object):
@@ -41,18 +45,84 @@ class StrategyParameter(object):
         self.rate = rate
 
 
-class MQMsg(object):
+_slot_names_cache = {}
+
+
+def get_slot_names(cls):
+    """
+    类及其所有父类中 __slots__ 声明的字段
+    """
+    names = _slot_names_cache.get(cls)
+    if names is None:
+        names = []
+        for klass in reversed(cls.__mro__):
+            slots = klass.__dict__.get("__slots__", ())
+            if isinstance(slots, str):
+                slots = (slots,)
+            for name in slots:
+                if name not in ("__dict__", "__weakref__") and name not in names:
+                    names.append(name)
+        names = tuple(names)
+        _slot_names_cache[cls] = names
+    return names
+
+
+class SlotsObject(object):
+    """
+    固定字段放在 __slots__ 中: 对象更小, 属性访问更快, 复制更便宜
+    保留 __dict__ 兼容运行时额外添加的字段 (只有真正添加时才会分配)
+    读写全部字段用 get_fields / set_fields, 不要直接用 __dict__
+    """
+    __slots__ = ("__dict__",)
+
+    def get_fields(self):
+        d = {}
+        for name in get_slot_names(self.__class__):
+            try:
+                d[name] = getattr(self, name)
+            except AttributeError:
+                pass
+        d.update(self.__dict__)
+        return d
+
+    def set_fields(self, d):
+        for k, v in d.items():
+            setattr(self, k, v)
+
+    def __copy__(self):
+        cls = self.__class__
+        obj = cls.__new__(cls)
+        for name in get_slot_names(cls):
+            try:
+                setattr(obj, name, getattr(self, name))
+            except AttributeError:
+                pass
+        extra = self.__dict__
+        if extra:
+            obj.__dict__.update(extra)
+        return obj
+
+
+class MQMsg(SlotsObject):
+    # trace: 开启 latency_trace 时挂上的 LatencyTrace, 只在进程内使用, 不参与序列化
+    __slots__ = ("mq_type", "datetime", "trace")
+
     def __init__(self):
         self.mq_type = MQDataType.UNKNOWN_DATA.value
         self.datetime = datetime.now()
 
+    def get_fields(self):
+        d = super(MQMsg, self).get_fields()
+        d.pop("trace", None)
+        return d
+
     def get_transfer(self):
-        j = copy(self.__dict__)
+        j = self.get_fields()
         j["datetime"] = str(self.datetime)
         return j
 
     def parse_transfer(self):
-        if self.datetime and self.datetime != "None":
+        if isinstance(self.datetime, str) and self.datetime and self.datetime != "None":
             if len(self.datetime) > 19:
                 self.datetime = datetime.strptime(self.datetime, '%Y-%m-%d %H:%M:%S.%f')
             else:
@@ -62,19 +132,19 @@ class MQMsg(object):
         return json.dumps(self.get_transfer())
 
     def get_from_json(self, json_data):
-        self.__dict__ = json_data
+        self.set_fields(json_data)
         self.parse_transfer()
 
     def get_from_json_msg(self, data):
-        self.__dict__ = json.loads(data)
+        self.set_fields(json.loads(data))
         self.parse_transfer()
 
     def get_mq_msg(self):
-        return json.dumps({self.mq_type: self.get_transfer()})
+        return mq_codec_manager.encode(self)
 
     def get_from_mq_msg(self, data):
-        mq_order = json.loads(data)
-        self.__dict__ = mq_order[self.mq_type]
+        mq_order = dict(mq_codec_manager.decode(data))
+        self.set_fields(mq_order[self.mq_type])
         self.parse_transfer()
 
 
@@ -190,6 +260,26 @@ class TickData(MQMsg):
         * intraday market statistics.
     """
 
+    __slots__ = (
+        "symbol",
+        "exchange",
+        "vt_symbol",
+        "name",
+        "gateway_name",
+        "last_price",
+        "last_volume",
+        "volume",
+        "open_interest",
+        "time",
+        "date",
+        "upper_limit",
+        "lower_limit",
+        "bid_prices",
+        "ask_prices",
+        "bid_volumes",
+        "ask_volumes",
+    )
+
     # ----------------------------------------------------------------------
     def __init__(self):
         """Constructor"""
@@ -228,6 +318,18 @@ class TickData(MQMsg):
     def get_vt_key(self):
         return get_vt_key(self.symbol, self.exchange)
 
+    def snapshot(self):
+        """
+        生成推送给订阅者的快照, 盘口列表单独复制, 网关之后继续修改自己的 tick 不会影响快照
+        同一个快照会被所有订阅者共享, 订阅者不要修改收到的 tick, 需要修改时先 copy
+        """
+        tick = copy(self)
+        tick.bid_prices = self.bid_prices[:]
+        tick.ask_prices = self.ask_prices[:]
+        tick.bid_volumes = self.bid_volumes[:]
+        tick.ask_volumes = self.ask_volumes[:]
+        return tick
+
     @staticmethod
     def make_ticker(price):
         t = TickData()
@@ -314,19 +416,11 @@ class TickData(MQMsg):
         return json.dumps(self.get_transfer())
 
     def get_from_json(self, json_data):
-        self.__dict__ = json_data
+        self.set_fields(json_data)
         self.parse_transfer()
 
     def get_from_json_msg(self, data):
-        self.__dict__ = json.loads(data)
-        self.parse_transfer()
-
-    def get_mq_msg(self):
-        return json.dumps({MQDataType.TICKER.value: self.get_transfer()})
-
-    def get_from_mq_msg(self, data):
-        mq_order = json.loads(data)
-        self.__dict__ = mq_order[MQDataType.TICKER.value]
+        self.set_fields(json.loads(data))
         self.parse_transfer()
 
     def get_depth(self):
@@ -576,11 +670,28 @@ class FactorData(object):
         return diff_ret_dic
 
 
-class BarData(object):
+class BarData(SlotsObject):
     """
     Candlestick bar data of a certain trading period.
     """
 
+    __slots__ = (
+        "vt_symbol",
+        "symbol",
+        "exchange",
+        "open_price",
+        "high_price",
+        "low_price",
+        "close_price",
+        "date",
+        "time",
+        "datetime",
+        "volume",
+        "open_interest",
+        "interval",
+        "gateway_name",
+    )
+
     # ----------------------------------------------------------------------
     def __init__(self):
         """Constructor"""
@@ -616,6 +727,12 @@ class BarData(object):
 
     @staticmethod
     def load_file_data(filename="", max_size=None):
+        if BarArrayData.is_bar_store(filename):
+            arr = BarArrayData.load_file(filename)
+            if max_size:
+                arr = arr.slice_index(0, max_size)
+            return arr.get_bars()
+
         ret = []
         i = 0
         f = open(filename, "r")
@@ -687,6 +804,17 @@ class BarData(object):
                 and not bar.symbol.endswith("up_usdt") and not bar.symbol.endswith("bear_usdt")
                 and not bar.symbol.endswith("bull_usdt")]
 
+    @staticmethod
+    def suffix_filter_df(df, suffix="_usdt"):
+        """
+        与 suffix_filter 相同的过滤规则, 作用于 get_pandas_from_bars 格式的 DataFrame
+        """
+        symbol = df["symbol"]
+        mask = symbol.str.endswith(suffix)
+        for s in ["down_usdt", "up_usdt", "bear_usdt", "bull_usdt"]:
+            mask &= ~symbol.str.endswith(s)
+        return df[mask].reset_index(drop=True)
+
     def __eq__(self, other):
         return self.vt_symbol == other.vt_symbol and self.datetime == other.datetime
 
@@ -857,6 +985,197 @@ class BarData(object):
         return False
 
 
+class BarArrayData(object):
+    """
+    Columnar bar history of one symbol, every field is a numpy array ordered by datetime.
+    """
+
+    def __init__(self, symbol=EMPTY_STRING, exchange=EMPTY_STRING, interval=None):
+        self.symbol = symbol  # 代码
+        self.exchange = exchange  # 交易所
+        self.vt_symbol = get_vt_key(symbol, exchange)  # vt系统代码
+        self.interval = interval  # 时间周期
+
+        self.datetime = np.array([], dtype="datetime64[s]")
+        self.open = np.array([], dtype=np.float64)
+        self.high = np.array([], dtype=np.float64)
+        self.low = np.array([], dtype=np.float64)
+        self.close = np.array([], dtype=np.float64)
+        self.volume = np.array([], dtype=np.float64)
+
+    def __len__(self):
+        return len(self.datetime)
+
+    @staticmethod
+    def from_bars(bars, interval=None):
+        if bars:
+            arr = BarArrayData(bars[0].symbol, bars[0].exchange, interval or bars[0].interval)
+        else:
+            arr = BarArrayData(interval=interval)
+        n = len(bars)
+        arr.datetime = np.array([bar.datetime for bar in bars], dtype="datetime64[s]")
+        arr.open = np.fromiter((bar.open_price for bar in bars), dtype=np.float64, count=n)
+        arr.high = np.fromiter((bar.high_price for bar in bars), dtype=np.float64, count=n)
+        arr.low = np.fromiter((bar.low_price for bar in bars), dtype=np.float64, count=n)
+        arr.close = np.fromiter((bar.close_price for bar in bars), dtype=np.float64, count=n)
+        arr.volume = np.fromiter((bar.volume for bar in bars), dtype=np.float64, count=n)
+        return arr
+
+    @staticmethod
+    def from_columns(symbol, exchange, interval, datetime_list, open_list, high_list, low_list,
+                     close_list, volume_list):
+        """
+        直接由各列数据生成, 不需要创建 BarData
+        """
+        arr = BarArrayData(symbol, exchange, interval)
+        arr.datetime = np.array(datetime_list, dtype="datetime64[s]")
+        arr.open = np.array(open_list, dtype=np.float64)
+        arr.high = np.array(high_list, dtype=np.float64)
+        arr.low = np.array(low_list, dtype=np.float64)
+        arr.close = np.array(close_list, dtype=np.float64)
+        arr.volume = np.array(volume_list, dtype=np.float64)
+        return arr
+
+    def get_index(self, start=None, end=None):
+        """
+        用二分查找得到 [start, end] 对应的下标区间
+        """
+        i = 0
+        j = len(self.datetime)
+        if start is not None:
+            i = int(np.searchsorted(self.datetime, np.datetime64(start, "s"), side="left"))
+        if end is not None:
+            j = int(np.searchsorted(self.datetime, np.datetime64(end, "s"), side="right"))
+        return i, max(i, j)
+
+    def slice(self, start=None, end=None):
+        i, j = self.get_index(start, end)
+        return self.slice_index(i, j)
+
+    def slice_index(self, i, j):
+        arr = BarArrayData(self.symbol, self.exchange, self.interval)
+        arr.datetime = self.datetime[i:j]
+        arr.open = self.open[i:j]
+        arr.high = self.high[i:j]
+        arr.low = self.low[i:j]
+        arr.close = self.close[i:j]
+        arr.volume = self.volume[i:j]
+        return arr
+
+    def get_bar(self, i):
+        bar = BarData()
+        bar.symbol = self.symbol
+        bar.exchange = self.exchange
+        bar.vt_symbol = self.vt_symbol
+        bar.interval = self.interval
+        bar.datetime = self.datetime[i].item()
+        bar.open_price = float(self.open[i])
+        bar.high_price = float(self.high[i])
+        bar.low_price = float(self.low[i])
+        bar.close_price = float(self.close[i])
+        bar.volume = float(self.volume[i])
+        return bar
+
+    def iter_bars(self):
+        """
+        按顺序生成 BarData，只在遍历时才创建对象
+        """
+        for _datetime, open_price, high_price, low_price, close_price, volume in zip(
+                self.datetime.tolist(), self.open.tolist(), self.high.tolist(),
+                self.low.tolist(), self.close.tolist(), self.volume.tolist()):
+            bar = BarData()
+            bar.symbol = self.symbol
+            bar.exchange = self.exchange
+            bar.vt_symbol = self.vt_symbol
+            bar.interval = self.interval
+            bar.datetime = _datetime
+            bar.open_price = open_price
+            bar.high_price = high_price
+            bar.low_price = low_price
+            bar.close_price = close_price
+            bar.volume = volume
+            yield bar
+
+    def get_bars(self):
+        return list(self.iter_bars())
+
+    def get_day_close_index(self):
+        """
+        每个自然日最后一根bar的下标
+        """
+        days = self.datetime.astype("datetime64[D]")
+        if not len(days):
+            return days, np.array([], dtype=np.int64)
+        index = np.append(np.flatnonzero(days[1:] != days[:-1]), len(days) - 1)
+        return days[index], index
+
+    def get_pandas(self):
+        return pd.DataFrame({
+            "datetime": self.datetime.astype("datetime64[ns]"),
+            "open": self.open,
+            "high": self.high,
+            "low": self.low,
+            "close": self.close,
+            "volume": self.volume
+        })
+
+    @staticmethod
+    def get_store_path(root_dir, vt_symbol, interval):
+        """
+        本地二进制bar目录: root_dir/btc_usdt.BINANCE_1m
+        """
+        return os.path.join(root_dir, "{}_{}".format(vt_symbol, interval))
+
+    @staticmethod
+    def is_bar_store(path):
+        return os.path.isfile(os.path.join(path, BAR_STORE_META_FILE))
+
+    def save_file(self, path):
+        """
+        按列保存成 .npy 文件，每一列都可以被 memory-map 读取
+        """
+        if not os.path.exists(path):
+            os.makedirs(path)
+        for column in BAR_STORE_COLUMNS:
+            np.save(os.path.join(path, column + ".npy"), np.ascontiguousarray(getattr(self, column)))
+        with open(os.path.join(path, BAR_STORE_META_FILE), "w") as f:
+            json.dump({"symbol": self.symbol, "exchange": self.exchange,
+                       "interval": self.interval, "size": len(self)}, f)
+
+    @staticmethod
+    def load_file(path, start=None, end=None, mmap_mode="r"):
+        """
+        memory-map 方式读取本地二进制bar, 按 start/end 二分查找切片, 返回的都是文件上的视图
+        """
+        with open(os.path.join(path, BAR_STORE_META_FILE), "r") as f:
+            meta = json.load(f)
+        arr = BarArrayData(meta["symbol"], meta["exchange"], meta["interval"])
+        for column in BAR_STORE_COLUMNS:
+            setattr(arr, column, np.load(os.path.join(path, column + ".npy"), mmap_mode=mmap_mode))
+        if start is not None or end is not None:
+            arr = arr.slice(start, end)
+        return arr
+
+    @staticmethod
+    def merge(arr_list):
+        """
+        同一个品种的多段数据合并, 按时间排序去重
+        """
+        arr_list = [arr for arr in arr_list if len(arr) > 0]
+        if not arr_list:
+            return BarArrayData()
+        first = arr_list[0]
+        arr = BarArrayData(first.symbol, first.exchange, first.interval)
+        _datetime = np.concatenate([x.datetime for x in arr_list])
+        order = np.argsort(_datetime, kind="mergesort")
+        sorted_datetime = _datetime[order]
+        # 重复的时间保留后面传入的数据
+        index = order[np.append(sorted_datetime[1:] != sorted_datetime[:-1], True)]
+        for column in BAR_STORE_COLUMNS:
+            setattr(arr, column, np.concatenate([getattr(x, column) for x in arr_list])[index])
+        return arr
+
+
 class OrderManager(object):
     """
     某个交易品种所发的 订单管理
@@ -920,6 +1239,26 @@ class OrderData(MQMsg):
     of a specific order.
     """
 
+    __slots__ = (
+        "symbol",
+        "exchange",
+        "vt_symbol",
+        "order_id",
+        "vt_order_id",
+        "client_id",
+        "direction",
+        "type",
+        "offset",
+        "price",
+        "deal_price",
+        "volume",
+        "traded",
+        "status",
+        "order_time",
+        "cancel_time",
+        "gateway_name",
+    )
+
     # ----------------------------------------------------------------------
     def __init__(self):
         """Constructor"""
@@ -1049,6 +1388,23 @@ class TradeData(MQMsg):
     can have several trade fills.
     """
 
+    __slots__ = (
+        "symbol",
+        "exchange",
+        "vt_symbol",
+        "trade_id",
+        "vt_trade_id",
+        "order_id",
+        "vt_order_id",
+        "direction",
+        "offset",
+        "price",
+        "volume",
+        "trade_time",
+        "gateway_name",
+        "trade_type",
+    )
+
     # ----------------------------------------------------------------------
     def __init__(self):
         """Constructor"""
@@ -83,7 +83,7 @@ class Querier(object):
         order = OrderData()
         order.get_from_mq_msg(data)
         log_service_manager.write_log("[receive_send_order_cb] self.account_name:{}, self.exchange:{} order:{}"
-                                      .format(self.account_name, self.exchange, order.__dict__))
+                                      .format(self.account_name, self.exchange, order.get_fields()))
 
         if order.is_active():
             e = Event(EVENT_SENDER_ORDER, order)
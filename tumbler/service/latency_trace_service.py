@@ -0,0 +1,168 @@
+# coding=utf-8
+
+import json
+import codecs
+from time import perf_counter, time
+from datetime import datetime
+from threading import local, Lock
+
+import tumbler.config as config
+from tumbler.function import get_file_path
+from tumbler.function.latency import LatencyHistogram
+from tumbler.service.log_service import log_service_manager
+
+# 毫秒, 行情内部的几个阶段通常在 1ms 以内
+TRACE_LATENCY_BUCKETS = (0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000)
+
+
+class LatencyTrace(object):
+    """
+    挂在行情和订单对象上的各阶段时间戳 (perf_counter 秒)
+    recv: WebsocketClient 收到数据帧, put: 网关放进 EventEngine 队列, dispatch: 策略引擎推给策略
+    order: MainEngine.send_order 交给网关, sent: 网关 send_order 返回
+    """
+    __slots__ = ("gateway_name", "strategy_name", "recv", "put", "dispatch", "order", "sent")
+
+    def __init__(self, gateway_name="", recv=None, put=None):
+        self.gateway_name = gateway_name
+        self.strategy_name = ""
+        self.recv = recv
+        self.put = put
+        self.dispatch = None
+        self.order = None
+        self.sent = None
+
+    def copy_for_strategy(self, strategy_name, dispatch):
+        trace = LatencyTrace(self.gateway_name, self.recv, self.put)
+        trace.strategy_name = strategy_name
+        trace.dispatch = dispatch
+        return trace
+
+
+class LatencyTraceService(object):
+    """
+    行情到下单的延迟追踪, 配置 latency_trace 为 True 时开启, 关闭时各个埋点只多一次属性判断
+    1. WebsocketClient 收到数据帧时 mark_recv, 记在当前线程上
+    2. 网关推送行情时 stamp_put, 在行情快照上挂 LatencyTrace
+    3. 策略引擎推送给每个策略前 begin_dispatch, 结束后 end_dispatch, 期间当前线程发出的订单属于这个行情
+    4. MainEngine.send_order 调用 on_order / on_sent, 订单请求上挂 LatencyTrace
+    每一段的延迟按 (网关, 策略, 区间) 统计直方图, 每 latency_trace_interval 秒推送 EVENT_LATENCY_TRACE 并写入文件
+    """
+
+    def __init__(self):
+        self.enabled = config.SETTINGS["latency_trace"]
+        self.report_interval = config.SETTINGS["latency_trace_interval"]
+        self.filename = config.SETTINGS["latency_trace_file"]
+
+        self.local = local()
+        self.lock = Lock()
+        self.hists = {}  # {(gateway_name, strategy_name, span): LatencyHistogram}
+        self.start_time = time()
+        self.last_report_time = time()
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def add(self, gateway_name, strategy_name, span, seconds):
+        key = (gateway_name, strategy_name, span)
+        with self.lock:
+            hist = self.hists.get(key, None)
+            if hist is None:
+                hist = self.hists[key] = LatencyHistogram(TRACE_LATENCY_BUCKETS)
+            hist.add(seconds * 1000)
+
+    def mark_recv(self, recv_time=None):
+        self.local.recv = recv_time if recv_time is not None else perf_counter()
+
+    def stamp_put(self, data, gateway_name=""):
+        """
+        data 为推送的行情快照 (TickData / MergeTickData / BBOTickData)
+        """
+        now = perf_counter()
+        recv = getattr(self.local, "recv", None)
+        self.local.recv = None
+        gateway_name = gateway_name or getattr(data, "gateway_name", "") or getattr(data, "exchange", "")
+        data.trace = LatencyTrace(gateway_name, recv, now)
+        if recv is not None:
+            self.add(gateway_name, "", "recv->put", now - recv)
+
+    def begin_dispatch(self, data, strategy_name):
+        now = perf_counter()
+        trace = getattr(data, "trace", None)
+        if trace is None:
+            trace = LatencyTrace(getattr(data, "gateway_name", "") or getattr(data, "exchange", ""))
+        trace = trace.copy_for_strategy(strategy_name, now)
+        self.local.dispatch = trace
+        if trace.put is not None:
+            self.add(trace.gateway_name, strategy_name, "put->dispatch", now - trace.put)
+
+    def end_dispatch(self):
+        trace = getattr(self.local, "dispatch", None)
+        if trace is not None:
+            self.add(trace.gateway_name, trace.strategy_name, "strategy", perf_counter() - trace.dispatch)
+            self.local.dispatch = None
+
+    def on_order(self, req):
+        """
+        不是在行情推送过程中发出的订单 (定时器, 成交回报等) 不统计
+        """
+        trace = getattr(self.local, "dispatch", None)
+        if trace is None:
+            return
+        now = perf_counter()
+        order_trace = trace.copy_for_strategy(trace.strategy_name, trace.dispatch)
+        order_trace.order = now
+        req.trace = order_trace
+
+        self.add(trace.gateway_name, trace.strategy_name, "dispatch->order", now - trace.dispatch)
+        if trace.recv is not None:
+            self.add(trace.gateway_name, trace.strategy_name, "recv->order", now - trace.recv)
+        elif trace.put is not None:
+            self.add(trace.gateway_name, trace.strategy_name, "put->order", now - trace.put)
+
+    def on_sent(self, req):
+        trace = getattr(req, "trace", None)
+        if trace is None or trace.order is None:
+            return
+        trace.sent = perf_counter()
+        self.add(trace.gateway_name, trace.strategy_name, "order->sent", trace.sent - trace.order)
+
+    def get_report(self, reset=False):
+        """
+        {"gateway|strategy|span": {"count", "avg", "p50", "p90", "p99", "max"}} 毫秒
+        """
+        with self.lock:
+            stats = {"{}|{}|{}".format(*key): hist.get_stat() for key, hist in self.hists.items()}
+            if reset:
+                self.hists = {}
+        report = {
+            "datetime": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "seconds": time() - self.start_time,
+            "stats": stats
+        }
+        if reset:
+            self.start_time = time()
+        return report
+
+    def dump(self, report=None):
+        report = report or self.get_report()
+        with codecs.open(get_file_path(self.filename), mode="w+", encoding="utf-8") as f:
+            json.dump(report, f, indent=4, sort_keys=True)
+
+    def check_report(self):
+        """
+        到了 report_interval 返回本周期的报告并写文件, 否则返回 None
+        """
+        now = time()
+        if now - self.last_report_time < self.report_interval:
+            return None
+        self.last_report_time = now
+        report = self.get_report(reset=True)
+        try:
+            self.dump(report)
+        except Exception as ex:
+            log_service_manager.write_log("[LatencyTraceService] dump error:{}".format(ex))
+        return report
+
+
+latency_trace_manager = LatencyTraceService()
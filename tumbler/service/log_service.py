@@ -8,6 +8,7 @@ from logging.handlers import TimedRotatingFileHandler
 
 import tumbler.config as config
 from tumbler.function import get_folder_path
+from tumbler.function.log_queue import enable_log_queue, BatchTimedRotatingFileHandler
 
 
 def get_module_logger(module_name, level=None):
@@ -42,6 +43,15 @@ class LogService(object):
 
         self.lock_counter = Value('i', 0)
 
+        # 队列模式: 调用方只入队, 不拿跨进程锁也不等磁盘, 写日志线程每写一批拿一次跨进程锁
+        self.log_queue = None
+        if config.SETTINGS["log.queue"]:
+            self.log_queue = enable_log_queue(max_size=config.SETTINGS["log.queue_size"],
+                                              full_policy=config.SETTINGS["log.queue_full_policy"],
+                                              block_timeout=config.SETTINGS["log.queue_block_timeout"],
+                                              batch_size=config.SETTINGS["log.queue_batch_size"],
+                                              lock=self.lock_counter.get_lock())
+
         self.formatter = logging.Formatter('%(asctime)s  %(levelname)s: %(message)s')
 
         self.add_null_handler()
@@ -52,13 +62,33 @@ class LogService(object):
         if config.SETTINGS["log.file"]:
             self.add_file_handler()
 
-    def write_log(self, msg, level=logging.INFO):
+    def write_log(self, msg, level=logging.INFO, args=None):
         """
         write log info
+        args 不为空时 msg 作为 format 模板, 队列模式下在写日志线程里才格式化
         """
+        if self.log_queue is not None:
+            if self.logger.isEnabledFor(level):
+                self.log_queue.put(self.logger, level, msg, args)
+            return
+
+        if args:
+            msg = msg.format(*args)
         with self.lock_counter.get_lock():
             self.logger.log(level, msg)
 
+    def get_queue_stat(self):
+        """
+        队列模式下的 queued / dropped / written 计数, 非队列模式返回 None
+        """
+        if self.log_queue is not None:
+            return self.log_queue.get_stat()
+
+    def flush(self, timeout=5):
+        if self.log_queue is not None:
+            return self.log_queue.flush(timeout)
+        return True
+
     def add_null_handler(self):
         """
         Add null handler for logger.
@@ -84,8 +114,9 @@ class LogService(object):
         log_path = get_folder_path("log")
         file_path = os.path.join(log_path, filename)
 
-        file_handler = TimedRotatingFileHandler(filename=file_path, when="D", interval=1, backupCount=0,
-                                                encoding='utf-8', delay=False)
+        handler_class = BatchTimedRotatingFileHandler if self.log_queue is not None else TimedRotatingFileHandler
+        file_handler = handler_class(filename=file_path, when="D", interval=1, backupCount=0,
+                                     encoding='utf-8', delay=False)
         file_handler.suffix = "%Y%m%d%H%M%S"
         file_handler.setFormatter(self.formatter)
         file_handler.setLevel(self.level)
@@ -93,20 +124,16 @@ class LogService(object):
         self.logger.addHandler(file_handler)
 
     def debug(self, msg):
-        with self.lock_counter.get_lock():
-            self.logger.debug(msg)
+        self.write_log(msg, logging.DEBUG)
 
     def info(self, msg):
-        with self.lock_counter.get_lock():
-            self.logger.info(msg)
+        self.write_log(msg, logging.INFO)
 
     def warning(self, msg):
-        with self.lock_counter.get_lock():
-            self.logger.warning(msg)
+        self.write_log(msg, logging.WARNING)
 
     def error(self, msg):
-        with self.lock_counter.get_lock():
-            self.logger.error(msg)
+        self.write_log(msg, logging.ERROR)
 
 
 log_service_manager = LogService()
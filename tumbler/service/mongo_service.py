@@ -2,9 +2,10 @@
 
 from enum import Enum
 
+from pymongo import UpdateOne
 from mongoengine import DateTimeField, Document, FloatField, StringField, ListField, connect
 
-from tumbler.object import BarData, TickData
+from tumbler.object import BarData, TickData, BarArrayData
 import tumbler.config as config
 from tumbler.function import get_vt_key
 
@@ -203,17 +204,89 @@ class DbTickData(Document):
 
 
 class MongoService(object):
+    # 读bar时只取这些字段
+    bar_projection = {
+        "_id": 0, "symbol": 1, "exchange": 1, "vt_symbol": 1, "open_price": 1, "high_price": 1,
+        "low_price": 1, "close_price": 1, "date": 1, "time": 1, "datetime": 1, "volume": 1, "open_interest": 1
+    }
+    bar_array_projection = {
+        "_id": 0, "datetime": 1, "open_price": 1, "high_price": 1, "low_price": 1, "close_price": 1, "volume": 1
+    }
+
+    def get_bar_cursor(self, symbol, exchange, interval, start, end, projection=None, batch_size=5000):
+        """
+        服务端游标, 按 batch_size 分批取回, 不会一次把所有文档读进内存
+        """
+        if isinstance(exchange, Enum):
+            exchange = exchange.value
+        return DbBarData._get_collection().find(
+            {
+                "symbol": symbol,
+                "exchange": exchange,
+                "interval": interval,
+                "datetime": {"$gte": start, "$lte": end}
+            },
+            projection=projection,
+            batch_size=batch_size
+        ).sort("datetime", 1)
+
+    def iter_bar_data(self, symbol, exchange, interval, start, end, batch_size=5000):
+        """
+        逐个生成 BarData, 内存里最多只有一批文档
+        """
+        cursor = self.get_bar_cursor(symbol, exchange, interval, start, end, self.bar_projection, batch_size)
+        for doc in cursor:
+            bar = BarData()
+            bar.symbol = doc.get("symbol")
+            bar.exchange = doc.get("exchange")
+            bar.vt_symbol = doc.get("vt_symbol")
+            if not bar.vt_symbol:
+                bar.vt_symbol = get_vt_key(bar.symbol, bar.exchange)
+
+            bar.open_price = doc.get("open_price")
+            bar.high_price = doc.get("high_price")
+            bar.low_price = doc.get("low_price")
+            bar.close_price = doc.get("close_price")
+
+            bar.date = doc.get("date")
+            bar.time = doc.get("time")
+            bar.datetime = doc.get("datetime")
+
+            bar.volume = doc.get("volume")
+            bar.open_interest = doc.get("open_interest")
+            yield bar
 
     def load_bar_data(self, symbol, exchange, interval, start, end):
-        s = DbBarData.objects(
-            symbol=symbol,
-            exchange=exchange,
-            interval=interval,
-            datetime__gte=start,
-            datetime__lte=end,
-        )
-        data = [db_bar.to_bar() for db_bar in s]
-        return data
+        return list(self.iter_bar_data(symbol, exchange, interval, start, end))
+
+    def load_bar_array(self, symbol, exchange, interval, start, end, batch_size=5000):
+        """
+        直接读成列式的 BarArrayData, 不创建 BarData
+        """
+        cursor = self.get_bar_cursor(symbol, exchange, interval, start, end, self.bar_array_projection, batch_size)
+        datetime_list, open_list, high_list, low_list, close_list, volume_list = [], [], [], [], [], []
+        for doc in cursor:
+            datetime_list.append(doc["datetime"])
+            open_list.append(doc.get("open_price"))
+            high_list.append(doc.get("high_price"))
+            low_list.append(doc.get("low_price"))
+            close_list.append(doc.get("close_price"))
+            volume_list.append(doc.get("volume"))
+
+        if isinstance(exchange, Enum):
+            exchange = exchange.value
+        return BarArrayData.from_columns(symbol, exchange, interval, datetime_list, open_list, high_list,
+                                         low_list, close_list, volume_list)
+
+    def load_bar_df(self, symbol, exchange, interval, start, end, batch_size=5000):
+        """
+        返回与 BarData.get_pandas_from_bars 相同格式的 DataFrame
+        """
+        arr = self.load_bar_array(symbol, exchange, interval, start, end, batch_size)
+        df = arr.get_pandas()
+        df.insert(0, "symbol", arr.symbol)
+        df.insert(1, "exchange", arr.exchange)
+        return df
 
     def load_tick_data(self, symbol, exchange, start, end):
         s = DbTickData.objects(
@@ -229,30 +302,57 @@ class MongoService(object):
     def to_update_param(d):
         return {
             "set__" + k: v.value if isinstance(v, Enum) else v
-            for k, v in d.__dict__.items()
+            for k, v in d.get_fields().items()
+        }
+
+    @staticmethod
+    def to_update_doc(d, fields):
+        """
+        生成 bulk_write 用的 $set 文档, 只保留表中存在的字段
+        """
+        return {
+            k: v.value if isinstance(v, Enum) else v
+            for k, v in d.get_fields().items()
+            if k in fields and k not in ("gateway_name", "vt_symbol")
         }
 
     def save_bar_data(self, datas):
-        for d in datas:
-            updates = self.to_update_param(d)
-            updates.pop("set__gateway_name")
-            updates.pop("set__vt_symbol")
-            (
-                DbBarData.objects(
-                    symbol=d.symbol, interval=d.interval, datetime=d.datetime
-                ).update_one(upsert=True, **updates)
+        """
+        一次 unordered bulk_write 批量 upsert
+        """
+        if not datas:
+            return 0
+        fields = DbBarData._fields
+        requests = [
+            UpdateOne(
+                {"symbol": d.symbol, "interval": d.interval, "datetime": d.datetime},
+                {"$set": self.to_update_doc(d, fields)},
+                upsert=True
             )
+            for d in datas
+        ]
+        DbBarData._get_collection().bulk_write(requests, ordered=False)
+        return len(requests)
 
     def save_tick_data(self, datas):
+        """
+        一次 unordered bulk_write 批量 upsert
+        """
+        if not datas:
+            return 0
+        fields = DbTickData._fields
+        requests = []
         for d in datas:
-            updates = self.to_update_param(d)
-            updates.pop("set__gateway_name")
-            updates.pop("set__vt_symbol")
-            (
-                DbTickData.objects(
-                    symbol=d.symbol, exchange=d.exchange, datetime=d.datetime
-                ).update_one(upsert=True, **updates)
+            doc = self.to_update_doc(d, fields)
+            requests.append(
+                UpdateOne(
+                    {"symbol": d.symbol, "exchange": doc.get("exchange", d.exchange), "datetime": d.datetime},
+                    {"$set": doc},
+                    upsert=True
+                )
             )
+        DbTickData._get_collection().bulk_write(requests, ordered=False)
+        return len(requests)
 
     def get_newest_bar_data(self, symbol, exchange, interval):
         s = (
@@ -86,7 +86,7 @@ class MQSender(MQBase):
                 self._get_channel()
                 self._channel.basic_publish(exchange=self.exchange,
                                             routing_key=route,
-                                            body=str(msg),
+                                            body=msg if isinstance(msg, bytes) else str(msg),
                                             properties=self._properties)
             except Exception as e:
                 success = False
@@ -1,17 +1,27 @@
 # coding=utf-8
+import time
 from datetime import datetime
 from collections import defaultdict
+from contextlib import contextmanager
+from threading import Lock
 import pandas as pd
 
 import json
+import numpy as np
 import MySQLdb
+import MySQLdb.cursors
 from DBUtils.PooledDB import PooledDB
 
 import tumbler.config as config
 from tumbler.object import BarData, FactorData, FundamentalData
-from tumbler.constant import Interval
+from tumbler.constant import Interval, Exchange
 from tumbler.service.log_service import log_service_manager
 
+KLINE_COLUMNS = ["symbol", "datetime", "open", "high", "low", "close", "volume"]
+FACTOR_COLUMNS = ["factor_code", "symbol", "datetime", "val"]
+# 因子表 upsert 依赖的唯一键, 老的表需要先执行 tumbler/sql/add_factor_unique_key.sql
+FACTOR_UNIQUE_COLUMNS = ["factor_code", "symbol", "datetime"]
+
 table_period = {
     Interval.MINUTE.value: "1min",
     Interval.HOUR.value: "1hour",
@@ -21,16 +31,128 @@ table_period = {
 
 
 class MysqlService(object):
+    # 同一个数据库的所有 MysqlService 实例共用一个连接池
+    _pools = {}
+    _pools_lock = Lock()
+    # 已经检查过唯一键的表 {table_name: 是否有唯一键}, 进程内只查一次
+    _unique_keys = {}
+    _factor_tables_checked = False
+
     def __init__(self):
-        self.pool = PooledDB(MySQLdb, 5, host=config.SETTINGS["mysql_host"], user=config.SETTINGS["mysql_user"],
-                             passwd=config.SETTINGS["mysql_password"], db=config.SETTINGS["mysql_database"],
-                             port=config.SETTINGS["mysql_port"])  # 5为连接池里的最少连接数
+        self.pool = MysqlService.get_pool()
 
         self.max_update_nums = 5000
 
+        if not MysqlService._factor_tables_checked:
+            MysqlService._factor_tables_checked = True
+            self.check_factor_tables()
+
+    @staticmethod
+    def get_pool():
+        settings = config.SETTINGS
+        key = (settings["mysql_host"], settings["mysql_port"], settings["mysql_user"], settings["mysql_database"])
+        with MysqlService._pools_lock:
+            pool = MysqlService._pools.get(key, None)
+            if pool is None:
+                pool = PooledDB(MySQLdb,
+                                mincached=settings.get("mysql_pool_min_cached", 5),
+                                maxcached=settings.get("mysql_pool_max_cached", 10),
+                                maxconnections=settings.get("mysql_pool_max_connections", 30),
+                                blocking=True,
+                                ping=settings.get("mysql_pool_ping", 1),
+                                host=settings["mysql_host"], user=settings["mysql_user"],
+                                passwd=settings["mysql_password"], db=settings["mysql_database"],
+                                port=settings["mysql_port"])
+                MysqlService._pools[key] = pool
+            return pool
+
     def get_conn(self):
+        """
+        从连接池借一个连接, conn.close() 时归还
+        """
         return self.pool.connection()
 
+    @contextmanager
+    def cursor(self, cursor_class=None):
+        """
+        with mysql_service_manager.cursor() as cur:
+            cur.execute(sqll, args)
+        正常结束提交, 异常回滚, 最后把连接还给连接池
+        """
+        conn = self.pool.connection()
+        cur = conn.cursor(cursor_class) if cursor_class else conn.cursor()
+        try:
+            yield cur
+            conn.commit()
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            raise
+        finally:
+            cur.close()
+            conn.close()
+
+    def fetch_all(self, sqll, args=None):
+        with self.cursor() as cur:
+            cur.execute(sqll, args)
+            return cur.fetchall()
+
+    def execute(self, sqll, args=None):
+        with self.cursor() as cur:
+            return cur.execute(sqll, args)
+
+    def check_health(self):
+        """
+        连接池能否正常取到可用连接
+        """
+        try:
+            return self.fetch_all("select 1")[0][0] == 1
+        except Exception as ex:
+            log_service_manager.write_log(f"[MysqlService] [check_health] ex:{ex}")
+            return False
+
+    def has_unique_key(self, table_name, columns):
+        """
+        用 SHOW INDEX 检查表上有没有正好由 columns 组成的唯一键
+        """
+        ret = MysqlService._unique_keys.get(table_name, None)
+        if ret is None:
+            keys = defaultdict(set)
+            # Table, Non_unique, Key_name, Seq_in_index, Column_name ...
+            for row in self.fetch_all("show index from {}".format(table_name)):
+                if int(row[1]) == 0:
+                    keys[row[2]].add(row[4])
+            ret = MysqlService._unique_keys[table_name] = set(columns) in keys.values()
+        return ret
+
+    def check_factor_unique_key(self, period):
+        """
+        因子表没有唯一键时 on duplicate key update 会不断插入重复行, 直接拒绝写入
+        """
+        table_name = MysqlService.get_factor_table(period)
+        if not self.has_unique_key(table_name, FACTOR_UNIQUE_COLUMNS):
+            msg = "[MysqlService] {} has no unique key ({}), run tumbler/sql/add_factor_unique_key.sql first" \
+                .format(table_name, ",".join(FACTOR_UNIQUE_COLUMNS))
+            log_service_manager.write_log(msg)
+            raise ValueError(msg)
+
+    def check_factor_tables(self):
+        """
+        启动时检查已有的因子表, 缺少唯一键只打日志, 真正写入时再拒绝
+        """
+        try:
+            tables = set(row[0] for row in self.fetch_all("show tables from `tumbler` like 'factor\\_%'"))
+            for period, name in table_period.items():
+                if "factor_{}".format(name) in tables:
+                    try:
+                        self.check_factor_unique_key(period)
+                    except ValueError:
+                        pass
+        except Exception as ex:
+            log_service_manager.write_log(f"[MysqlService] [check_factor_tables] ex:{ex}")
+
     @staticmethod
     def get_sql_params(**kwargs):
         arr = []
@@ -70,99 +192,82 @@ class MysqlService(object):
     def get_mysql_service():
         global mysql_service_manager
         if not mysql_service_manager:
-            mysql_service_manager = MysqlService()
+            with _manager_lock:
+                if not mysql_service_manager:
+                    mysql_service_manager = MysqlService()
         return mysql_service_manager
 
     def update_asset_info(self, asset, **kwargs):
         flag = True
-        conn = self.get_conn()
-        sqll = f"select id, tags from `tumbler`.`symbol_fundamental` where `asset`='{asset}'"
-        cur = conn.cursor()
-        cur.execute(sqll)
-        myresult = cur.fetchall()
         sqll = ""
         try:
-            if len(myresult) > 0:
-                Id, tags = myresult[0]
-                if tags:
-                    tags = json.loads(tags)
+            with self.cursor() as cur:
+                cur.execute("select id, tags from `tumbler`.`symbol_fundamental` where `asset`=%s", (asset,))
+                myresult = cur.fetchall()
+                if len(myresult) > 0:
+                    Id, tags = myresult[0]
+                    if tags:
+                        tags = json.loads(tags)
+                    else:
+                        tags = []
+                    if "tags" in kwargs.keys():
+                        tags.extend(kwargs["tags"])
+                        tags = list(set(tags))
+                        kwargs["tags"] = tags
+
+                    kwargs["tags"] = json.dumps(kwargs["tags"])
+                    keys = list(kwargs.keys())
+                    sqll = "update `tumbler`.`symbol_fundamental` set {} where `id`=%s".format(
+                        ",".join(["`{}`=%s".format(k) for k in keys]))
+                    cur.execute(sqll, tuple([kwargs[k] for k in keys]) + (Id,))
                 else:
-                    tags = []
-                if "tags" in kwargs.keys():
-                    tags.extend(kwargs["tags"])
-                    tags = list(set(tags))
-                    kwargs["tags"] = tags
-
-                kwargs["tags"] = json.dumps(kwargs["tags"])
-                set_params = self.get_sql_params(**kwargs)
-
-                sqll = f"update `tumbler`.`symbol_fundamental` set {set_params} where `id`='{Id}'"
-                cur.execute(sqll)
-                conn.commit()
-            else:
-                name = kwargs.get("name", "")
-                chain = kwargs.get("chain", "")
-                exchange = kwargs.get("exchange", "")
-                max_supply = kwargs.get("max_supply", 0)
-                tags = json.dumps(kwargs.get("tags", []))
-                create_date = datetime.now().strftime("%Y-%m-%d")
-                sqll = f"insert into `tumbler`.`symbol_fundamental`" \
-                       f"(id, asset, name, chain, exchange, max_supply, tags, create_date)" \
-                       f" values (NULL, '{asset}', '{name}', '{chain}', '{exchange}', " \
-                       f" '{max_supply}', '{tags}', '{create_date}')"
-                cur.execute(sqll)
-                conn.commit()
+                    name = kwargs.get("name", "")
+                    chain = kwargs.get("chain", "")
+                    exchange = kwargs.get("exchange", "")
+                    max_supply = kwargs.get("max_supply", 0)
+                    tags = json.dumps(kwargs.get("tags", []))
+                    create_date = datetime.now().strftime("%Y-%m-%d")
+                    sqll = "insert into `tumbler`.`symbol_fundamental`" \
+                           "(id, asset, name, chain, exchange, max_supply, tags, create_date)" \
+                           " values (NULL, %s, %s, %s, %s, %s, %s, %s)"
+                    cur.execute(sqll, (asset, name, chain, exchange, max_supply, tags, create_date))
         except Exception as ex:
             flag = False
             log_service_manager.write_log(f"[update_asset_info] ex:{ex} sqll:{sqll}")
-        cur.close()
-        conn.close()
         return flag
 
     def get_mysql_distinct_symbol(self, table='kline_1hour'):
-        ret = []
         if "`tumbler`." in table:
             sqll = "select distinct symbol from {} order by symbol asc".format(table)
         else:
             sqll = "select distinct symbol from `tumbler`.`{}` order by symbol asc".format(table)
-        conn = self.get_conn()
-        cur = conn.cursor()
-
-        cur.execute(sqll)
-        myresult = cur.fetchall()
-        for x, in myresult:
-            ret.append(x)
-
-        cur.close()
-        conn.close()
-        return ret
+        return [x for x, in self.fetch_all(sqll)]
 
     def get_all_datetime(self, symbol, table_name):
-        ret = []
-        sqll = "select datetime from {} where symbol='{}' order by datetime asc".format(table_name, symbol)
-        conn = self.get_conn()
-        cur = conn.cursor()
-        cur.execute(sqll)
-        my_result = cur.fetchall()
-        for x, in my_result:
-            ret.append(x)
-        cur.close()
-        conn.close()
+        sqll = "select datetime from {} where symbol=%s order by datetime asc".format(table_name)
+        ret = [x for x, in self.fetch_all(sqll, (symbol,))]
         ret.sort()
         return ret
 
+    def get_all_datetime_dict(self, symbols, table_name):
+        """
+        多个 symbol 一次查询, 返回 {symbol: [datetime_str]}
+        """
+        ret = defaultdict(list)
+        if not symbols:
+            return ret
+        sqll = "select symbol, datetime from {} where symbol in ({}) order by symbol asc, datetime asc".format(
+            table_name, ",".join(["%s"] * len(symbols)))
+        for symbol, x in self.fetch_all(sqll, tuple(symbols)):
+            ret[symbol].append(x)
+        return ret
+
     def get_distinct_tags(self):
         ret = []
         sqll = "select distinct(`tags`) from `tumbler`.`symbol_fundamental`"
-        conn = self.get_conn()
-        cur = conn.cursor()
-        cur.execute(sqll)
-        my_result = cur.fetchall()
-        for tags, in my_result:
+        for tags, in self.fetch_all(sqll):
             tags = json.loads(tags)
             ret.extend(tags)
-        cur.close()
-        conn.close()
         ret = list(set(ret))
         ret.sort()
         return ret
@@ -170,182 +275,211 @@ class MysqlService(object):
     def get_tag_asset_dic(self):
         ret_dic = defaultdict(list)
         sqll = "select `asset`, `tags` from `tumbler`.`symbol_fundamental`"
-        conn = self.get_conn()
-        cur = conn.cursor()
-        cur.execute(sqll)
-        my_result = cur.fetchall()
-        for asset, tags in my_result:
+        for asset, tags in self.fetch_all(sqll):
             tags = json.loads(tags)
             for tag in tags:
                 ret_dic[tag].append(asset)
-        cur.close()
-        conn.close()
         return ret_dic
 
     def get_distinct_datetime(self, table_name):
-        ret = []
         sqll = f"select distinct(`datetime`) from {table_name}"
-        conn = self.get_conn()
-        cur = conn.cursor()
-        cur.execute(sqll)
-        my_result = cur.fetchall()
-        for x, in my_result:
-            ret.append(x)
-        cur.close()
-        conn.close()
+        ret = [x for x, in self.fetch_all(sqll)]
         ret.sort()
         return ret
 
     def delete_distinct_datetime(self, table_name, str_datetime):
-        sqll = f"delete from {table_name} where datetime = '{str_datetime}';"
-        conn = self.get_conn()
-        cur = conn.cursor()
-        cur.execute(sqll)
-        cur.close()
-        conn.close()
+        sqll = f"delete from {table_name} where datetime = %s"
+        self.execute(sqll, (str_datetime,))
 
     def select_coins(self):
-        conn = self.get_conn()
-        ret = []
-        cur = conn.cursor()
-
         sqll = "select `id`,`coin`,`name`,`circulating_supply`,`max_supply` from `coin`.`coin_fundamental`"
-        cur.execute(sqll)
-
-        my_result = cur.fetchall()
-        for x in my_result:
-            ret.append(x)
-
-        cur.close()
-        conn.close()
-
+        ret = list(self.fetch_all(sqll))
         ret.sort()
         return ret
 
     def get_all_base_symbol(self, end_base="_usdt"):
-        conn = self.get_conn()
         sqll = "select distinct symbol from {}".format(MysqlService.get_symbol_table())
         ret = set([])
-        cur = conn.cursor()
-        cur.execute(sqll)
-        my_result = cur.fetchall()
-        for symbol, in my_result:
+        for symbol, in self.fetch_all(sqll):
             if symbol.endswith(end_base):
                 ret.add(symbol)
-        cur.close()
-        conn.close()
         return list(ret)
 
     def get_fundamentals(self):
-        conn = self.get_conn()
         sqll = "select asset, name, chain, exchange, max_supply, tags from {} where id > '0'"\
             .format(MysqlService.get_fundamental_table())
-        ret = []
-        cur = conn.cursor()
-        cur.execute(sqll)
-        my_result = cur.fetchall()
-        for arr in my_result:
-            ret.append(FundamentalData.init_from_mysql_db(arr))
-        cur.close()
-        conn.close()
-        return ret
+        return [FundamentalData.init_from_mysql_db(arr) for arr in self.fetch_all(sqll)]
 
-    def get_bars(self, symbols=[], period=Interval.DAY.value, start_datetime=datetime(2017, 1, 1),
-                 end_datetime=datetime(2022, 12, 31), sort_way="symbol"):
+    def get_bars_sql(self, fields, symbols, period, start_datetime, end_datetime, sort_way):
+        """
+        返回 (sqll, args)
+        """
         start_dt_str = start_datetime.strftime("%Y-%m-%d %H:%M:%S")
         end_dt_str = end_datetime.strftime("%Y-%m-%d %H:%M:%S")
 
-        conn = self.get_conn()
-        sqll = "select * from {} where datetime >= '{}' and datetime <= '{}'".format(
-            MysqlService.get_kline_table(period), start_dt_str, end_dt_str)
+        sqll = "select {} from {} where datetime >= %s and datetime <= %s".format(
+            fields, MysqlService.get_kline_table(period))
+        args = [start_dt_str, end_dt_str]
 
         if len(symbols) > 0:
-            sqll = sqll + " and symbol in ({})".format(MysqlService.get_array_to_string(symbols))
+            sqll = sqll + " and symbol in ({})".format(",".join(["%s"] * len(symbols)))
+            args.extend(symbols)
         if sort_way == "symbol":
             sqll = sqll + " order by symbol asc, datetime asc"
         else:
             sqll = sqll + " order by datetime asc, symbol asc"
+        return sqll, tuple(args)
+
+    def iter_rows(self, sqll, batch_size=10000, args=None):
+        """
+        服务端游标(SSCursor) 分批 fetchmany, 不会把整个结果集读进内存
+        """
+        with self.cursor(MySQLdb.cursors.SSCursor) as cur:
+            cur.execute(sqll, args)
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+
+    def iter_bars(self, symbols=[], period=Interval.DAY.value, start_datetime=datetime(2017, 1, 1),
+                  end_datetime=datetime(2022, 12, 31), sort_way="symbol", batch_size=10000):
+        sqll, args = self.get_bars_sql("*", symbols, period, start_datetime, end_datetime, sort_way)
+        for rows in self.iter_rows(sqll, batch_size, args):
+            for arr in rows:
+                yield BarData.init_from_mysql_db(arr)
 
-        ret = []
-        cur = conn.cursor()
-        cur.execute(sqll)
-        my_result = cur.fetchall()
-        for arr in my_result:
-            ret.append(BarData.init_from_mysql_db(arr))
-        cur.close()
-        conn.close()
+    def get_bars(self, symbols=[], period=Interval.DAY.value, start_datetime=datetime(2017, 1, 1),
+                 end_datetime=datetime(2022, 12, 31), sort_way="symbol"):
+        return list(self.iter_bars(symbols, period, start_datetime, end_datetime, sort_way))
+
+    def get_bars_dict(self, symbols, period=Interval.DAY.value, start_datetime=datetime(2017, 1, 1),
+                      end_datetime=datetime(2022, 12, 31)):
+        """
+        多个 symbol 一次查询, 返回 {symbol: [BarData]}, 每个 symbol 按时间升序
+        """
+        ret = defaultdict(list)
+        if not symbols:
+            return ret
+        for bar in self.iter_bars(symbols, period, start_datetime, end_datetime, sort_way="symbol"):
+            ret[bar.symbol].append(bar)
+        return ret
+
+    def get_bars_columns(self, symbols=[], period=Interval.DAY.value, start_datetime=datetime(2017, 1, 1),
+                         end_datetime=datetime(2022, 12, 31), sort_way="symbol", batch_size=10000):
+        """
+        只查需要的列, 按批转成 numpy 数组, 不创建 BarData
+        返回 dict: symbol, datetime, open, high, low, close, volume
+        """
+        sqll, args = self.get_bars_sql("`symbol`, `datetime`, `open`, `high`, `low`, `close`, `volume`",
+                                       symbols, period, start_datetime, end_datetime, sort_way)
+        names = ["symbol", "datetime", "open", "high", "low", "close", "volume"]
+        chunks = {name: [] for name in names}
+        for rows in self.iter_rows(sqll, batch_size, args):
+            for name, col in zip(names, zip(*rows)):
+                if name == "symbol":
+                    chunks[name].append(np.array(col, dtype=object))
+                elif name == "datetime":
+                    chunks[name].append(np.array(col, dtype="datetime64[s]"))
+                else:
+                    chunks[name].append(np.array(col, dtype=np.float64))
+
+        ret = {}
+        for name in names:
+            if chunks[name]:
+                ret[name] = np.concatenate(chunks[name])
+            elif name == "symbol":
+                ret[name] = np.array([], dtype=object)
+            elif name == "datetime":
+                ret[name] = np.array([], dtype="datetime64[s]")
+            else:
+                ret[name] = np.array([], dtype=np.float64)
         return ret
 
+    def upsert_rows(self, table_name, columns, rows, update_columns=None, batch_size=None):
+        """
+        参数化的 insert ... on duplicate key update 批量写入, 表上需要有唯一键
+        rows 可以是生成器, 在一个连接上按 batch_size 分批 executemany (MySQLdb 会合成一条多行 insert)
+        返回写入的行数
+        """
+        if update_columns is None:
+            update_columns = columns
+        sqll = "insert into {}({}) values({}) on duplicate key update {}".format(
+            table_name, ",".join(["`{}`".format(x) for x in columns]), ",".join(["%s"] * len(columns)),
+            ",".join(["`{0}`=values(`{0}`)".format(x) for x in update_columns]))
+        batch_size = batch_size or self.max_update_nums
+
+        start = time.time()
+        n = 0
+        with self.cursor() as cur:
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    cur.executemany(sqll, batch)
+                    cur.connection.commit()
+                    n += len(batch)
+                    batch = []
+            if batch:
+                cur.executemany(sqll, batch)
+                n += len(batch)
+
+        cost = time.time() - start
+        log_service_manager.write_log("[upsert_rows] {} rows:{} cost:{:.2f}s rows/sec:{:.0f}".format(
+            table_name, n, cost, n / cost if cost > 0 else 0))
+        return n
+
     def replace_factor(self, ret, symbol, period, factor_code):
+        """
+        ret: [[factor_code, symbol, datetime_str, val]]
+        """
         if ret:
             start_datetime = ret[0][2]
             end_datetime = ret[-1][2]
             log_service_manager.write_log(f"[replace_factor] {symbol} {factor_code} {period} "
                                           f"{start_datetime} {end_datetime} {len(ret)}")
-            table_name = MysqlService.get_factor_table(period)
-            conn = self.get_conn()
-            cur = conn.cursor()
-            ll = len(ret)
-            ii = 0
-            while ii < ll:
-                tmp_rets = ret[ii: ii + self.max_update_nums]
-                all_datetime_strs = [x[2] for x in tmp_rets]
-                ii = ii + self.max_update_nums
-
-                if len(all_datetime_strs) > 0:
-                    all_datetime_strs = ["'" + x + "'" for x in all_datetime_strs]
-                    sqll = "delete from {} where datetime in ({}) and symbol='{}' and factor_code='{}'". \
-                        format(table_name, ','.join(all_datetime_strs), symbol, factor_code)
-                    cur.execute(sqll)
-                if len(tmp_rets) > 0:
-                    sqll = "insert into {}(factor_code,symbol,datetime,val) values(%s,%s,%s,%s)" \
-                        .format(table_name)
-                    cur.executemany(sqll, tmp_rets)
-                conn.commit()
+            self.check_factor_unique_key(period)
+            self.upsert_rows(MysqlService.get_factor_table(period), FACTOR_COLUMNS, ret, update_columns=["val"])
 
-            cur.close()
-            conn.close()
+    @staticmethod
+    def iter_factor_rows_from_pd(df):
+        """
+        宽表 (symbol, datetime, 因子1, 因子2 ...) 按列向量化展开成 [factor_code, symbol, datetime_str, val], 跳过空值
+        """
+        if "symbol" not in df.columns:
+            df = df.reset_index()
+        factor_codes = [col for col in df.columns
+                        if col not in BarData.get_columns() and col not in ["symbol", "exchange", "datetime", "index"]]
+        if not factor_codes or df.empty:
+            return
+
+        if pd.api.types.is_datetime64_any_dtype(df["datetime"]):
+            datetime_strs = df["datetime"].dt.strftime("%Y-%m-%d %H:%M:%S").values
+        else:
+            datetime_strs = df["datetime"].astype(str).str[:19].values
+        symbols = df["symbol"].values
+
+        for factor_code in factor_codes:
+            values = df[factor_code].values.astype(np.float64)
+            mask = ~np.isnan(values)
+            yield from zip([factor_code] * int(mask.sum()), symbols[mask].tolist(), datetime_strs[mask].tolist(),
+                           values[mask].tolist())
 
     def replace_factor_from_pd(self, df, period):
-        df = df.set_index(["symbol", "datetime"])
-        for col in df.columns:
-            if col not in BarData.get_columns() and col not in ["symbol", "exchange"]:
-                series = df[col].dropna()
-                ret = FactorData.get_data_from_series(col, series)
-                diff_dic = FactorData.get_diff_symbol_from_ret(ret)
-                for symbol in list(diff_dic.keys()):
-                    self.replace_factor(diff_dic[symbol], symbol, period, col)
+        """
+        整个因子 DataFrame 一次流式写入
+        """
+        self.check_factor_unique_key(period)
+        return self.upsert_rows(MysqlService.get_factor_table(period), FACTOR_COLUMNS,
+                                MysqlService.iter_factor_rows_from_pd(df), update_columns=["val"])
 
     def replace_bars(self, ret, symbol, period):
         if ret:
             start_time = ret[0].datetime
             end_datetime = ret[-1].datetime
             log_service_manager.write_log(f"[replace_bars] {symbol} {period} {start_time} {end_datetime} {len(ret)}")
-
-            table_name = MysqlService.get_kline_table(period)
-            conn = self.get_conn()
-            cur = conn.cursor()
-            new_ret = BarData.from_bar_array_to_mysql_data(ret)
-            ll = len(new_ret)
-            ii = 0
-            while ii < ll:
-                tmp_rets = new_ret[ii: ii + self.max_update_nums]
-                all_datetime_strs = [x[1] for x in tmp_rets]
-                ii = ii + self.max_update_nums
-
-                if len(all_datetime_strs) > 0:
-                    all_datetime_strs = ["'" + x + "'" for x in all_datetime_strs]
-                    sqll = "delete from {} where datetime in ({}) and symbol='{}'". \
-                        format(table_name, ','.join(all_datetime_strs), symbol)
-                    cur.execute(sqll)
-                if len(tmp_rets) > 0:
-                    sqll = "insert into {}(symbol,datetime,open,high,low,close,volume) values(%s,%s,%s,%s,%s,%s,%s)" \
-                        .format(table_name)
-                    cur.executemany(sqll, tmp_rets)
-                conn.commit()
-
-            cur.close()
-            conn.close()
+            self.upsert_rows(MysqlService.get_kline_table(period), KLINE_COLUMNS,
+                             BarData.from_bar_array_to_mysql_data(ret), update_columns=KLINE_COLUMNS[2:])
 
     def insert_bars(self, ret, period):
         if ret:
@@ -355,83 +489,108 @@ class MysqlService(object):
             log_service_manager.write_log(f"[insert_bars] {symbol} {period} {start_time} {end_datetime} {len(ret)}")
 
             new_ret = BarData.from_bar_array_to_mysql_data(ret)
-            conn = self.get_conn()
-            cur = conn.cursor()
-
-            ll = len(ret)
-            ii = 0
-
-            while ii < ll:
-                tmp_rets = new_ret[ii: ii + self.max_update_nums]
-                ii = ii + self.max_update_nums
-
-                table_name = MysqlService.get_kline_table(period)
-                sqll = "insert into {}(symbol,datetime,open,high,low,close,volume) values(%s,%s,%s,%s,%s,%s,%s)" \
-                    .format(table_name)
-                try:
-                    cur.executemany(sqll, tmp_rets)
-                    conn.commit()
-                except Exception as ex:
-                    log_service_manager.write_log(f"[insert_bars] insert error, insert one by one! ex:{ex}")
-                    for ret in tmp_rets:
-                        try:
-                            cur.executemany(sqll, [ret])
-                            conn.commit()
-                        except Exception as ex:
-                            log_service_manager.write_log(f"[insert_bars] insert one by one error, ex:{ex}")
-
-            cur.close()
-            conn.close()
+            table_name = MysqlService.get_kline_table(period)
+            sqll = "insert into {}(symbol,datetime,open,high,low,close,volume) values(%s,%s,%s,%s,%s,%s,%s)" \
+                .format(table_name)
+
+            with self.cursor() as cur:
+                conn = cur.connection
+                ll = len(new_ret)
+                ii = 0
+                while ii < ll:
+                    tmp_rets = new_ret[ii: ii + self.max_update_nums]
+                    ii = ii + self.max_update_nums
+                    try:
+                        cur.executemany(sqll, tmp_rets)
+                        conn.commit()
+                    except Exception as ex:
+                        log_service_manager.write_log(f"[insert_bars] insert error, insert one by one! ex:{ex}")
+                        for row in tmp_rets:
+                            try:
+                                cur.execute(sqll, row)
+                                conn.commit()
+                            except Exception as ex:
+                                log_service_manager.write_log(f"[insert_bars] insert one by one error, ex:{ex}")
 
     def delete_bars(self, symbols=[], period=Interval.DAY.value, start_datetime=datetime(2020, 1, 1),
                     end_datetime=datetime(2022, 12, 31)):
         start_dt_str = start_datetime.strftime("%Y-%m-%d %H:%M:%S")
         end_dt_str = end_datetime.strftime("%Y-%m-%d %H:%M:%S")
 
-        conn = self.get_conn()
-        cur = conn.cursor()
-        for symbol in symbols:
-            sqll = "delete from {} where symbol='{}' and datetime >= '{}' and datetime <= '{}'".format(
-                MysqlService.get_kline_table(period), symbol, start_dt_str, end_dt_str)
-            cur.execute(sqll)
-            conn.commit()
-
-            log_service_manager.write_log(f"{symbol} {period} {cur.rowcount} records deleted!")
+        sqll = "delete from {} where symbol=%s and datetime >= %s and datetime <= %s".format(
+            MysqlService.get_kline_table(period))
+        with self.cursor() as cur:
+            for symbol in symbols:
+                cur.execute(sqll, (symbol, start_dt_str, end_dt_str))
+                cur.connection.commit()
 
-        cur.close()
-        conn.close()
+                log_service_manager.write_log(f"{symbol} {period} {cur.rowcount} records deleted!")
         return True
 
     def get_bars_to_pandas_data(self, symbols=[], period=Interval.DAY.value, start_datetime=datetime(2010, 1, 1),
                                 end_datetime=datetime(2024, 12, 31), sort_way="symbol"):
-        bars = self.get_bars(symbols, period, start_datetime, end_datetime, sort_way=sort_way)
-        return BarData.get_pandas_from_bars(bars)
-
-    def get_factors(self, factor_codes, interval, start_dt, end_dt, sort_way="symbol"):
+        columns = self.get_bars_columns(symbols, period, start_datetime, end_datetime, sort_way=sort_way)
+        return pd.DataFrame({
+            "symbol": columns["symbol"],
+            "exchange": Exchange.BINANCE.value,
+            "datetime": columns["datetime"].astype("datetime64[ns]"),
+            "open": columns["open"],
+            "high": columns["high"],
+            "low": columns["low"],
+            "close": columns["close"],
+            "volume": columns["volume"]
+        })
+
+    def get_factors_sql(self, factor_codes, interval, start_dt, end_dt, sort_way):
+        """
+        返回 (sqll, args)
+        """
         if isinstance(factor_codes, str):
             factor_codes = [factor_codes]
-        factor_str = ','.join([f"'{factor_code}'" for factor_code in factor_codes])
-        conn = self.get_conn()
         sqll = "select `factor_code`, `symbol`, `datetime`, `val` from {} " \
-               "where factor_code in({}) and datetime >= '{}' and datetime <= '{}'" \
-            .format(MysqlService.get_factor_table(interval), factor_str, start_dt, end_dt)
+               "where factor_code in({}) and datetime >= %s and datetime <= %s" \
+            .format(MysqlService.get_factor_table(interval), ",".join(["%s"] * len(factor_codes)))
+        args = tuple(factor_codes) + (str(start_dt), str(end_dt))
 
-        print(sqll)
         if sort_way == "symbol":
             sqll = sqll + " order by symbol asc, datetime asc"
         else:
             sqll = sqll + " order by datetime asc, symbol asc"
+        return sqll, args
 
+    def get_factors(self, factor_codes, interval, start_dt, end_dt, sort_way="symbol"):
+        sqll, args = self.get_factors_sql(factor_codes, interval, start_dt, end_dt, sort_way)
         ret = []
-        cur = conn.cursor()
-        cur.execute(sqll)
-        my_result = cur.fetchall()
-        for arr in my_result:
-            ret.append(FactorData.init_from_mysql_db(arr))
-        cur.close()
-        conn.close()
+        for rows in self.iter_rows(sqll, args=args):
+            for arr in rows:
+                ret.append(FactorData.init_from_mysql_db(arr))
         return ret
 
+    def get_factors_to_pandas_data(self, factor_codes, interval, start_dt, end_dt, batch_size=10000):
+        """
+        多个因子一次查询, 不创建 FactorData, 返回宽表 symbol, datetime, 因子1, 因子2 ...
+        """
+        if isinstance(factor_codes, str):
+            factor_codes = [factor_codes]
+        sqll, args = self.get_factors_sql(factor_codes, interval, start_dt, end_dt, "symbol")
+        names = ["factor_code", "symbol", "datetime", "val"]
+        chunks = {name: [] for name in names}
+        for rows in self.iter_rows(sqll, batch_size, args):
+            for name, col in zip(names, zip(*rows)):
+                chunks[name].append(np.array(col, dtype=np.float64 if name == "val" else object))
+
+        columns = ["symbol", "datetime"] + list(factor_codes)
+        if not chunks["val"]:
+            return pd.DataFrame(columns=columns)
+
+        df = pd.DataFrame({name: np.concatenate(chunks[name]) for name in names})
+        df["datetime"] = pd.to_datetime(df["datetime"])
+        df = df.pivot_table(index=["symbol", "datetime"], columns="factor_code", values="val", aggfunc="last")
+        df = df.reindex(columns=list(factor_codes)).reset_index()
+        df.columns.name = None
+        return df
+
 
 mysql_service_manager = None
+_manager_lock = Lock()
 # mysql_service_manager = MysqlService()
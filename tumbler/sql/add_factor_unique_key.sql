@@ -0,0 +1,9 @@
+-- MysqlService.replace_factor / replace_factor_from_pd 使用 insert ... on duplicate key update,
+-- 已有的 factor 表需要加上 (factor_code, symbol, datetime) 唯一键, 重复的行只保留一条
+SET NAMES utf8mb4;
+
+CREATE TABLE `factor_1day_new` LIKE `factor_1day`;
+ALTER TABLE `factor_1day_new` ADD UNIQUE KEY `unique_factor_1day` (`factor_code`,`symbol`,`datetime`);
+INSERT IGNORE INTO `factor_1day_new` SELECT * FROM `factor_1day`;
+RENAME TABLE `factor_1day` TO `factor_1day_old`, `factor_1day_new` TO `factor_1day`;
+DROP TABLE `factor_1day_old`;
@@ -67,7 +67,8 @@ CREATE TABLE `factor_1day` (
   `factor_code` varchar(50) NOT NULL COMMENT '因子名字',
   `symbol` varchar(45) NOT NULL COMMENT '交易对',
   `datetime` varchar(20) NOT NULL COMMENT '因子日期',
-  `val` double(50,30) NOT NULL COMMENT '因子值'
+  `val` double(50,30) NOT NULL COMMENT '因子值',
+  UNIQUE KEY `unique_factor_1day` (`factor_code`,`symbol`,`datetime`)
 ) ENGINE=InnoDB DEFAULT CHARSET=latin1;
 
 SET FOREIGN_KEY_CHECKS = 1;